@@ -82,7 +82,7 @@ class AlertProvider(object):
           limit, same format as the return value of
           :py:meth:`~.AwsLimitChecker.check_thresholds`. ``None`` if ``exc`` is
           specified.
-        :type problems: dict or None
+        :type problems: :py:class:`~.CheckResult` or None
         :param problem_str: String representation of ``problems``, as displayed
           in ``awslimitchecker`` command line output. ``None`` if ``exc`` is
           specified.
@@ -103,7 +103,7 @@ class AlertProvider(object):
         :param problems: dict of service name to nested dict of limit name to
           limit, same format as the return value of
           :py:meth:`~.AwsLimitChecker.check_thresholds`.
-        :type problems: dict or None
+        :type problems: :py:class:`~.CheckResult` or None
         :param problem_str: String representation of ``problems``, as displayed
           in ``awslimitchecker`` command line output.
         :type problem_str: str or None
@@ -112,6 +112,16 @@ class AlertProvider(object):
         """
         raise NotImplementedError()
 
+    def flush(self):
+        """
+        Method called after :py:meth:`~.on_success`, :py:meth:`~.on_critical`
+        or :py:meth:`~.on_warning`. Providers that send notifications in the
+        background must override this to wait for them to be sent, and
+        raise an exception if they could not be. The default implementation
+        does nothing.
+        """
+        pass
+
     @staticmethod
     def providers_by_name():
         """
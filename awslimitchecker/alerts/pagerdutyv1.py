@@ -41,9 +41,14 @@ import os
 import logging
 import urllib3
 import json
+import time
+import hashlib
 
 from .base import AlertProvider
-from awslimitchecker.utils import issue_string_tuple
+from awslimitchecker.metrics.base import PayloadSender
+from awslimitchecker.utils import (
+    issue_string_tuple, load_cache_json, save_cache_json
+)
 
 logger = logging.getLogger(__name__)
 
@@ -55,9 +60,15 @@ class PagerDutyV1(AlertProvider):
 
     pd_url = 'https://events.pagerduty.com/generic/2010-04-15/create_event.json'
 
+    #: Maximum number of attempts to send each event.
+    send_max_attempts = 4
+
+    #: Seconds to wait after a failed attempt; doubled after each failure.
+    send_backoff = 1.0
+
     def __init__(
         self, region_name, account_alias=None, critical_service_key=None,
-        warning_service_key=None, incident_key=None
+        warning_service_key=None, incident_key=None, resend_minutes=60
     ):
         """
         Initialize PagerDutyV1 alert provider.
@@ -84,6 +95,13 @@ class PagerDutyV1(AlertProvider):
           specified, this will default to
           ``awslimitchecker-{account_alias}-{region_name}``.
         :type incident_key: str
+        :param resend_minutes: Optional; the last event sent for each incident
+          key and service key is kept in a local state file. A trigger event
+          with the same details (ignoring run duration) as the last one sent
+          is only re-sent after this many minutes, and a resolve event is not
+          re-sent after a resolve. Set to 0 to send every event.
+          Default 60.
+        :type resend_minutes: ``int`` or ``str``
         """
         super(PagerDutyV1, self).__init__(region_name)
         self._service_key_crit = os.environ.get(
@@ -110,38 +128,136 @@ class PagerDutyV1(AlertProvider):
             else self._account_alias,
             region_name=self._region_name
         )
+        try:
+            self._resend_seconds = int(resend_minutes) * 60
+        except ValueError:
+            raise RuntimeError(
+                'ERROR: PagerDutyV1 resend_minutes must be an integer number '
+                'of minutes, not "%s"' % resend_minutes
+            )
+        self._http = urllib3.PoolManager()
+        self._sender = None
+        self._state = None
+
+    @property
+    def _state_name(self):
+        """
+        Return the name of the cache file (see
+        :py:func:`~awslimitchecker.utils.load_cache_json`) holding the last
+        event sent for our incident key.
+
+        :rtype: str
+        """
+        return 'pagerdutyv1-%s.json' % hashlib.sha1(
+            self._incident_key.encode('utf-8')
+        ).hexdigest()[:16]
+
+    @staticmethod
+    def _fingerprint(payload):
+        """
+        Return a string identifying the content of an event, ignoring the
+        run duration (which changes on every run).
+
+        :param payload: event data
+        :type payload: dict
+        :rtype: str
+        """
+        if payload['event_type'] == 'resolve':
+            return 'resolve'
+        details = dict(payload.get('details', {}))
+        details.pop('duration_seconds', None)
+        return 'trigger-%s' % hashlib.sha1(
+            json.dumps(details, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+
+    def _is_duplicate(self, previous, fingerprint, now):
+        """
+        Return whether an event with the given fingerprint duplicates the
+        ``previous`` state entry and should not be sent.
+
+        :param previous: state entry for the last event sent, or None
+        :type previous: dict
+        :param fingerprint: fingerprint of the event to send
+        :type fingerprint: str
+        :param now: current timestamp
+        :type now: float
+        :rtype: bool
+        """
+        if self._resend_seconds <= 0 or previous is None:
+            return False
+        if previous.get('fingerprint') != fingerprint:
+            return False
+        if fingerprint == 'resolve':
+            return True
+        return now - previous.get('sent', 0) < self._resend_seconds
 
     def _send_event(self, service_key, payload):
         """
-        Send an event to PagerDuty.
+        Queue an event to be sent to PagerDuty in the background, unless it
+        duplicates the last event sent for this incident key and service key
+        (see the ``resend_minutes`` constructor parameter). Events are sent
+        over a single pooled connection and retried on connection errors,
+        HTTP 429 and HTTP 5xx responses; call :py:meth:`~.flush` to wait for
+        them.
 
         :param service_key: service key to send to
         :type service_key: str
         :param payload: data to send with event
         :type payload: dict
         """
+        if self._state is None:
+            self._state = load_cache_json(self._state_name)
         payload['service_key'] = service_key
-        http = urllib3.PoolManager()
+        key = hashlib.sha1(service_key.encode('utf-8')).hexdigest()[:16]
+        fingerprint = self._fingerprint(payload)
+        now = time.time()
+        if self._is_duplicate(self._state.get(key), fingerprint, now):
+            logger.info(
+                'Not re-sending %s event for incident %s; identical to '
+                'the last event sent', payload['event_type'],
+                self._incident_key
+            )
+            return
+        if self._sender is None:
+            self._sender = PayloadSender(
+                self._http, max_attempts=self.send_max_attempts,
+                backoff=self.send_backoff, compress=False,
+                name='awslimitchecker-pagerduty-sender'
+            )
         logger.info(
             'POSTing to PagerDuty Events API (%s): %s', self.pd_url, payload
         )
         encoded = json.dumps(payload, sort_keys=True).encode('utf-8')
-        resp = http.request(
-            'POST', self.pd_url,
-            headers={'Content-type': 'application/json'},
-            body=encoded
+
+        def on_sent():
+            self._state[key] = {'fingerprint': fingerprint, 'sent': now}
+
+        self._sender.put(
+            self.pd_url, encoded,
+            headers={'Content-type': 'application/json'}, on_sent=on_sent
         )
-        if resp.status == 200:
-            logger.debug(
-                'Successfully POSTed to PagerDuty; HTTP %d: %s',
-                resp.status, resp.data
-            )
+
+    def flush(self):
+        """
+        Wait for all queued events to be sent, and save the state of
+        successfully-sent events to the local state file.
+
+        :raises: RuntimeError if any event could not be sent
+        """
+        if self._sender is None:
             return
-        raise RuntimeError(
-            'ERROR creating PagerDuty Event; API responded HTTP %d: %s' % (
-                resp.status, resp.data
+        errors = self._sender.join()
+        save_cache_json(self._state_name, self._state)
+        if not errors:
+            logger.debug('Successfully POSTed events to PagerDuty')
+            return
+        err = errors[0]
+        if err.status is not None:
+            raise RuntimeError(
+                'ERROR creating PagerDuty Event; API responded HTTP %d: '
+                '%s' % (err.status, err.data)
             )
-        )
+        raise RuntimeError('ERROR creating PagerDuty Event: %s' % err)
 
     def _event_dict(self):
         """
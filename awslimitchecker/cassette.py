@@ -0,0 +1,330 @@
+"""
+awslimitchecker/cassette.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from functools import partial
+
+from dateutil.parser import parse as parse_date
+
+logger = logging.getLogger(__name__)
+
+#: The currently-active :py:class:`~.Cassette`, if any.
+_active = None
+
+#: Request parameter and response keys whose values are replaced with
+#: ``REDACTED`` when recording.
+SCRUB_KEYS = re.compile(
+    r'^(SecretAccessKey|SessionToken|AccessKeyId|Password|.*Secret|'
+    r'TokenCode|SerialNumber)$'
+)
+
+
+class CassetteMissError(RuntimeError):
+    """
+    Raised when replaying and no response was recorded for a request.
+    """
+    pass
+
+
+class _ReplayedHTTPResponse(object):
+    """
+    Minimal stand-in for the ``botocore.awsrequest.AWSResponse`` of a
+    replayed request.
+    """
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+        self.content = b''
+
+
+def _scrub(data):
+    """
+    Return a copy of ``data`` with the values of keys matching
+    :py:data:`~.SCRUB_KEYS` replaced with ``REDACTED``, and the (large and
+    run-specific) HTTP headers removed from response metadata.
+
+    :param data: request parameters or parsed response
+    :return: scrubbed copy of data
+    """
+    if isinstance(data, dict):
+        res = {}
+        for k, v in data.items():
+            if k == 'HTTPHeaders':
+                continue
+            if SCRUB_KEYS.match(k) and isinstance(v, str):
+                res[k] = 'REDACTED'
+            else:
+                res[k] = _scrub(v)
+        return res
+    if isinstance(data, (list, tuple)):
+        return [_scrub(x) for x in data]
+    return data
+
+
+def _encode(obj):
+    """
+    ``default`` function for ``json.dumps``; serializes datetimes.
+    """
+    if isinstance(obj, datetime):
+        return {'__datetime__': obj.isoformat()}
+    if isinstance(obj, bytes):
+        return {'__bytes__': obj.decode('utf-8', 'replace')}
+    return str(obj)
+
+
+def _decode(d):
+    """
+    ``object_hook`` for ``json.loads``; reverses :py:func:`~._encode`.
+    """
+    if len(d) == 1:
+        if '__datetime__' in d:
+            return parse_date(d['__datetime__'])
+        if '__bytes__' in d:
+            return d['__bytes__'].encode('utf-8')
+    return d
+
+
+def _params_key(params):
+    return json.dumps(_scrub(params), sort_keys=True, default=_encode)
+
+
+class Cassette(object):
+    """
+    Record every AWS API request and response made by the botocore clients
+    that awslimitchecker creates to a compressed cassette file, or replay
+    previously-recorded responses without making any network requests.
+
+    Clients are hooked via :py:func:`~.attach_cassette`, which is a no-op
+    unless a cassette has been started with :py:meth:`~.start`. When
+    replaying, requests are matched by service, region, operation and
+    parameters; repeated identical requests get the recorded responses in
+    order. A request whose parameters were not recorded (for example, one
+    including the current time) gets the next unused response for the same
+    operation, if any.
+    """
+
+    #: Name of the cassette file within the cassette directory.
+    filename = 'cassette.json.gz'
+
+    def __init__(self, path, mode='record', simulate_latency=False):
+        """
+        :param path: cassette directory; created if recording
+        :type path: str
+        :param mode: ``record`` or ``replay``
+        :type mode: str
+        :param simulate_latency: when replaying, sleep for the recorded
+          duration of each request before returning its response
+        :type simulate_latency: bool
+        """
+        if mode not in ['record', 'replay']:
+            raise ValueError('Invalid cassette mode: %s' % mode)
+        self.path = path
+        self.mode = mode
+        self.simulate_latency = simulate_latency
+        self._lock = threading.Lock()
+        self._interactions = []
+        self._by_params = {}
+        self._by_operation = {}
+
+    @property
+    def file_path(self):
+        return os.path.join(self.path, self.filename)
+
+    def start(self):
+        """
+        Make this the active cassette; when replaying, load the cassette
+        file.
+        """
+        global _active
+        if self.mode == 'replay':
+            self._load()
+        _active = self
+        logger.info('Started cassette %s in %s mode', self.path, self.mode)
+
+    def stop(self):
+        """
+        Deactivate this cassette; when recording, write the cassette file.
+        """
+        global _active
+        if _active is self:
+            _active = None
+        if self.mode == 'record':
+            self._save()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _save(self):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        with self._lock:
+            interactions = list(self._interactions)
+        with gzip.open(self.file_path, 'wt') as fh:
+            fh.write(json.dumps({'version': 1}) + '\n')
+            for i in interactions:
+                fh.write(json.dumps(i, sort_keys=True, default=_encode))
+                fh.write('\n')
+        logger.info('Recorded %d API requests to %s',
+                    len(interactions), self.file_path)
+
+    def _load(self):
+        with gzip.open(self.file_path, 'rt') as fh:
+            header = json.loads(fh.readline())
+            if header.get('version') != 1:
+                raise RuntimeError(
+                    'Unsupported cassette version in %s: %s' % (
+                        self.file_path, header.get('version')
+                    )
+                )
+            for line in fh:
+                i = json.loads(line, object_hook=_decode)
+                i['used'] = False
+                op = (i['service'], i['region'], i['operation'])
+                self._by_params.setdefault(
+                    op + (_params_key(i['params']),), []
+                ).append(i)
+                self._by_operation.setdefault(op, []).append(i)
+                self._interactions.append(i)
+        logger.info('Loaded %d API requests from %s',
+                    len(self._interactions), self.file_path)
+
+    def attach(self, client):
+        """
+        Register this cassette's event handlers on a botocore client.
+
+        :param client: the client to attach to
+        :type client: ``botocore.client.BaseClient``
+        """
+        service = client.meta.service_model.service_name
+        region = client.meta.region_name
+        events = client.meta.events
+        events.register('before-parameter-build', self._before_params)
+        if self.mode == 'record':
+            events.register(
+                'after-call', partial(self._after_call, service, region)
+            )
+        else:
+            events.register(
+                'before-call', partial(self._before_call, service, region)
+            )
+
+    def _before_params(self, params, context, **kwargs):
+        context['cassette_params'] = json.loads(
+            json.dumps(_scrub(params), default=_encode), object_hook=_decode
+        )
+        context['cassette_start'] = time.time()
+
+    def _after_call(self, service, region, http_response, parsed, model,
+                    context, **kwargs):
+        interaction = {
+            'service': service,
+            'region': region,
+            'operation': model.name,
+            'params': context.get('cassette_params', {}),
+            'status': http_response.status_code,
+            'response': _scrub(parsed),
+            'latency': round(
+                time.time() - context.get('cassette_start', time.time()), 4
+            )
+        }
+        with self._lock:
+            self._interactions.append(interaction)
+
+    def _before_call(self, service, region, model, context, **kwargs):
+        params = context.get('cassette_params', {})
+        op = (service, region, model.name)
+        with self._lock:
+            interaction = None
+            for candidates in [
+                self._by_params.get(op + (_params_key(params),), []),
+                self._by_operation.get(op, [])
+            ]:
+                unused = [i for i in candidates if not i['used']]
+                if unused:
+                    interaction = unused[0]
+                    break
+                if candidates and interaction is None:
+                    interaction = candidates[-1]
+                    break
+            if interaction is None:
+                raise CassetteMissError(
+                    'No recorded response in %s for %s %s in %s with '
+                    'params: %s' % (
+                        self.file_path, service, model.name, region, params
+                    )
+                )
+            interaction['used'] = True
+        if self.simulate_latency:
+            time.sleep(interaction['latency'])
+        return (
+            _ReplayedHTTPResponse(interaction['status']),
+            json.loads(
+                json.dumps(interaction['response'], default=_encode),
+                object_hook=_decode
+            )
+        )
+
+
+def attach_cassette(client):
+    """
+    If a :py:class:`~.Cassette` is active, attach it to ``client``. Return
+    the client, so this can wrap client construction.
+
+    :param client: botocore client, or boto3 resource
+    :return: ``client``
+    """
+    if _active is None:
+        return client
+    if hasattr(client, 'meta') and hasattr(client.meta, 'client'):
+        _active.attach(client.meta.client)
+    else:
+        _active.attach(client)
+    return client
@@ -37,16 +37,27 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 ################################################################################
 """
 
-from .connectable import ConnectableCredentials
+from .cassette import attach_cassette
+from .connectable import ConnectableCredentials, boto3_client
 from .services import _services
 from .trustedadvisor import TrustedAdvisor
 from .version import _get_version_info
-from .utils import _get_latest_version
+from .utils import _get_latest_version, concurrent_imap_unordered
 from .quotas import ServiceQuotasClient
+from .result import CheckResult, LimitResult
+from .profiling import CpuProfiler, MemoryProfiler
+from .limit import evaluate_thresholds
+from .snapshot import write_snapshot, SnapshotReader
+from .circuitbreaker import CircuitBreaker
 import boto3
+import os
 import sys
+import time
 import logging
 import warnings
+from contextlib import contextmanager, ExitStack
+from functools import partial
+from collections import OrderedDict
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +71,11 @@ warnings.filterwarnings(
 
 class AwsLimitChecker(object):
 
+    #: the default maximum number of services checked concurrently by
+    #: :py:meth:`~.iter_results` and :py:meth:`~.check_thresholds`;
+    #: overridden by the ``ALC_MAX_WORKERS_SERVICES`` environment variable
+    default_max_service_workers = 4
+
     def __init__(self, warning_threshold=80, critical_threshold=99,
                  profile_name=None, account_id=None, account_role=None,
                  role_partition='aws', region=None, external_id=None,
@@ -183,8 +199,11 @@ class AwsLimitChecker(object):
         self.mfa_serial_number = mfa_serial_number
         self.mfa_token = mfa_token
         self.region = region
+        self._current_account_id = None
+        self._profilers = []
 
         self.services = {}
+        self._shared_services = set()
 
         boto_conn_kwargs = self._boto_conn_kwargs
         self._quotas_client = None
@@ -202,6 +221,110 @@ class AwsLimitChecker(object):
                                  ta_refresh_timeout=ta_refresh_timeout,
                                  ta_api_region=ta_api_region)
 
+        #: :py:class:`~.CircuitBreaker` for API operations that fail
+        #: repeatedly in this account
+        self.circuit_breaker = CircuitBreaker(self._circuit_breaker_scope)
+        for svc in self.services.values():
+            svc._circuit_breaker = self.circuit_breaker
+        self.ta._circuit_breaker = self.circuit_breaker
+
+    @property
+    def current_account_id(self):
+        """
+        Return the ID of the account being checked: ``account_id`` if given,
+        otherwise the account of the credentials in use, from STS
+        GetCallerIdentity (called only once).
+
+        :rtype: str
+        """
+        if self.account_id is not None:
+            return self.account_id
+        if self._current_account_id is None:
+            sts = attach_cassette(
+                boto3_client('sts', **self._boto_conn_kwargs)
+            )
+            cid = sts.get_caller_identity()
+            self._current_account_id = cid['Account']
+        return self._current_account_id
+
+    def _circuit_breaker_scope(self):
+        """
+        Return the scope of :py:attr:`~.circuit_breaker`, the
+        :py:attr:`~.current_account_id`; called by the breaker the first time
+        it is needed, so that checkers which make no guarded API calls never
+        look it up.
+
+        :rtype: str
+        """
+        return self.current_account_id
+
+    @classmethod
+    def for_regions(cls, regions, **kwargs):
+        """
+        Construct one checker per region, for the same account, with the
+        checkers for all but the first region sharing the global services
+        (IAM, S3, CloudFront, Route53) of the first one; see
+        :py:meth:`~.share_global_services`. Global services are thus only
+        queried, and only reported, once per account.
+
+        :param regions: AWS region names to connect to
+        :type regions: list
+        :param kwargs: keyword arguments for :py:class:`~.AwsLimitChecker`,
+          other than ``region``; the version is only checked for the first
+          region
+        :type kwargs: dict
+        :returns: region name to checker, in the order of ``regions``
+        :rtype: :py:class:`collections.OrderedDict`
+        """
+        res = OrderedDict()
+        first = None
+        for region in regions:
+            kw = dict(kwargs)
+            kw['region'] = region
+            if first is not None:
+                kw['check_version'] = False
+            checker = cls(**kw)
+            if first is None:
+                first = checker
+            else:
+                checker.share_global_services(first)
+            res[region] = checker
+        return res
+
+    def share_global_services(self, checker):
+        """
+        Use the instances of global services (those with
+        :py:attr:`~._AwsService.global_service` set) from another checker for
+        the same account, i.e. one for another region, in place of this
+        checker's own. The limits and usage of those services are then
+        collected and reported only by ``checker``: unless they are named
+        explicitly, :py:meth:`~.find_usage`, :py:meth:`~.iter_results` and
+        :py:meth:`~.check_thresholds` skip them, and :py:meth:`~.get_limits`
+        returns their limits as collected by ``checker``.
+
+        :param checker: the checker to share global services with
+        :type checker: :py:class:`~.AwsLimitChecker`
+        """
+        for sname, cls in checker.services.items():
+            if not cls.global_service or sname not in self.services:
+                continue
+            logger.debug('Sharing global service %s', sname)
+            self.services[sname] = cls
+            self._shared_services.add(sname)
+
+    def _own_services(self):
+        """
+        Return the names of the services whose limits and usage this checker
+        collects, i.e. all services except those shared from another checker
+        (see :py:meth:`~.share_global_services`).
+
+        :rtype: list
+        """
+        return [
+            sname for sname in self.services
+            if sname not in self._shared_services
+        ]
+
     def _check_python_version(self):
         """
         Check that we are running under a supported Python version, and emit a
@@ -341,9 +464,11 @@ class AwsLimitChecker(object):
         :rtype: dict
         """
         res = {}
-        to_get = self.services
-        if service is not None:
-            to_get = dict((each, self.services[each]) for each in service)
+        if service is None:
+            service = self._own_services()
+            for sname in self._shared_services:
+                res[sname] = self.services[sname].get_limits()
+        to_get = dict((each, self.services[each]) for each in service)
         if use_ta:
             self.ta.update_limits()
         for sname, cls in to_get.items():
@@ -378,7 +503,7 @@ class AwsLimitChecker(object):
         :rtype: :py:class:`~.ConnectableCredentials`
         """
         logger.debug("Connecting to STS in region %s", self.region)
-        sts = boto3.client('sts', region_name=self.region)
+        sts = attach_cassette(boto3_client('sts', region_name=self.region))
         arn = "arn:%s:iam::%s:role/%s" % (
             self.role_partition,
             self.account_id,
@@ -404,7 +529,7 @@ class AwsLimitChecker(object):
                      "(account_id=%s)", creds.access_key, creds.account_id)
         return creds
 
-    def find_usage(self, service=None, use_ta=True):
+    def find_usage(self, service=None, use_ta=True, limits=None):
         """
         For each limit in the specified service (or all services if
         ``service`` is ``None``), query the AWS API via ``boto3``
@@ -414,24 +539,79 @@ class AwsLimitChecker(object):
         :py:class:`~.AwsLimit` objects for each service, which can
         then be queried using :py:meth:`~.get_limits`.
 
+        If ``limits`` is specified, only the named services are checked, and
+        services that declare their usage steps
+        (:py:meth:`~._AwsService.usage_steps`) only make the API calls needed
+        for the named limits; see :py:meth:`~.get_usage_plan`.
+
         :param service: list of :py:class:`~._AwsService` name(s), or ``None``
           to check all services.
         :type service: :py:obj:`None`, or :py:obj:`list` service names to get
         :param use_ta: check Trusted Advisor for information on limits
         :type use_ta: bool
+        :param limits: dict of service name to list of the names of the limits
+          to find usage for, or None for all limits
+        :type limits: :py:obj:`dict` or :py:obj:`None`
         """
-        to_get = self.services
-        if service is not None:
-            to_get = dict((each, self.services[each]) for each in service)
+        if limits is not None:
+            service = list(limits.keys())
+        if service is None:
+            service = self._own_services()
+        to_get = dict((each, self.services[each]) for each in service)
         if use_ta:
             self.ta.update_limits()
-        for cls in to_get.values():
+        for sname, cls in to_get.items():
             if hasattr(cls, '_update_limits_from_api'):
                 cls._update_limits_from_api()
             cls._update_service_quotas()
             logger.debug("Finding usage for service: %s", cls.service_name)
+            self._find_service_usage(
+                cls, None if limits is None else limits[sname]
+            )
+
+    def _find_service_usage(self, cls, limits=None):
+        """
+        Find usage for one service; for only the named limits if ``limits``
+        is not None and the service declares its usage steps.
+
+        :param cls: the service to find usage for
+        :type cls: :py:class:`~._AwsService`
+        :param limits: names of the limits to find usage for, or None for all
+        :type limits: :py:obj:`list` or :py:obj:`None`
+        """
+        if limits is not None and cls.usage_steps() is not None:
+            cls.find_usage(limits=limits)
+        else:
             cls.find_usage()
 
+    def get_usage_plan(self, service=None, limits=None):
+        """
+        Return the usage steps (and the API calls they make) that
+        :py:meth:`~.find_usage` would run for the given services or limits,
+        without making any API calls. See :py:meth:`~._AwsService.usage_plan`.
+
+        :param service: list of :py:class:`~._AwsService` name(s), or ``None``
+          for all services.
+        :type service: :py:obj:`None`, or :py:obj:`list` service names
+        :param limits: dict of service name to list of limit names, or None
+          for all limits; overrides ``service``
+        :type limits: :py:obj:`dict` or :py:obj:`None`
+        :returns: dict of service name to list of :py:class:`~.UsageStep`, or
+          to None for services that always find usage for all limits
+        :rtype: dict
+        """
+        names = self._own_services()
+        if limits is not None:
+            names = list(limits.keys())
+        elif service is not None:
+            names = list(service)
+        res = {}
+        for sname in names:
+            res[sname] = self.services[sname].usage_plan(
+                None if limits is None else limits[sname]
+            )
+        return res
+
     def set_limit_overrides(self, override_dict, override_ta=True):
         """
         Set manual overrides on AWS service limits, i.e. if you
@@ -593,21 +773,246 @@ class AwsLimitChecker(object):
             crit_count=crit_count
         )
 
-    def check_thresholds(self, service=None, use_ta=True):
+    @contextmanager
+    def profile_cpu(self, path):
         """
-        Check all limits and current usage against their specified thresholds;
-        return all :py:class:`~.AwsLimit` instances that have crossed
-        one or more of their thresholds.
+        Context manager to profile CPU use with :py:mod:`cProfile` while
+        checking thresholds within it. The statistics for each service
+        (finding usage, updating limits from the service's API and Service
+        Quotas, and checking thresholds) and for updating Trusted Advisor
+        are written to :py:mod:`pstats` files named ``<path>.<name>``, and
+        the combined statistics to ``path`` on exit. While profiling,
+        services are checked one at a time, and each service makes its API
+        calls serially (see :py:attr:`~._AwsService._serial_calls`), so that
+        all of its work is profiled.
+
+        :param path: path to write combined statistics to
+        :type path: str
+        :returns: the profiler
+        :rtype: :py:class:`~.CpuProfiler`
+        """
+        prof = CpuProfiler(path)
+        self._profilers.append(prof)
+        self._set_serial_calls()
+        try:
+            yield prof
+        finally:
+            self._profilers.remove(prof)
+            self._set_serial_calls()
+            prof.close()
+
+    @contextmanager
+    def profile_memory(self, top=10):
+        """
+        Context manager to measure memory use with :py:mod:`tracemalloc`
+        while checking thresholds within it, like :py:meth:`~.profile_cpu`.
+        Peak memory and the ``top`` allocation sites for each service are
+        available from the yielded profiler's ``results`` attribute and
+        :py:meth:`~.MemoryProfiler.report` method.
+
+        :param top: number of allocation sites to keep for each service
+        :type top: int
+        :returns: the profiler
+        :rtype: :py:class:`~.MemoryProfiler`
+        """
+        prof = MemoryProfiler(top=top)
+        self._profilers.append(prof)
+        self._set_serial_calls()
+        try:
+            yield prof
+        finally:
+            self._profilers.remove(prof)
+            self._set_serial_calls()
+            prof.close()
+
+    def _set_serial_calls(self):
+        """
+        Make services' concurrent API calls serial while any profiler is
+        active, and concurrent again when none is; see
+        :py:attr:`~._AwsService._serial_calls`.
+        """
+        for svc in self.services.values():
+            svc._serial_calls = len(self._profilers) > 0
 
-        If ``service`` is specified, the returned dict has one element,
-        the service name, whose value is a nested dict as described below;
-        otherwise it includes all known services.
+    @contextmanager
+    def _profiled(self, name):
+        """
+        Context manager to profile a phase (service name or
+        ``TrustedAdvisor``) with all active profilers; see
+        :py:meth:`~.profile_cpu` and :py:meth:`~.profile_memory`.
+
+        :param name: phase name
+        :type name: str
+        """
+        with ExitStack() as stack:
+            for prof in list(self._profilers):
+                stack.enter_context(prof.profile(name))
+            yield
+
+    @property
+    def _max_service_workers(self):
+        """
+        Return the maximum number of services to check concurrently. This is
+        the value of the ``ALC_MAX_WORKERS_SERVICES`` environment variable if
+        set and parseable as an integer, otherwise
+        :py:attr:`~.default_max_service_workers`.
+
+        :rtype: int
+        """
+        key = 'ALC_MAX_WORKERS_SERVICES'
+        if key not in os.environ:
+            return self.default_max_service_workers
+        try:
+            return int(os.environ[key])
+        except Exception:
+            logger.error(
+                'ERROR: Found "%s" environment variable, but unable to '
+                'parse value "%s" to an integer.', key, os.environ[key]
+            )
+            return self.default_max_service_workers
 
-        The returned :py:class:`~.AwsLimit` objects can be interrogated
-        for their limits (:py:meth:`~.AwsLimit.get_limit`) as well as
+    def _check_service(self, sname, limits=None):
+        """
+        Update limits for, find usage of and check thresholds for a single
+        service, and return a :py:class:`~.CheckResult` for just that
+        service. Trusted Advisor must already have been updated.
+
+        :param sname: the name of the service to check
+        :type sname: str
+        :param limits: names of the limits to check, or None for all
+        :type limits: :py:obj:`list` or :py:obj:`None`
+        :rtype: :py:class:`~.CheckResult`
+        """
+        start = time.time()
+        cls = self.services[sname]
+        with self._profiled(sname):
+            if hasattr(cls, '_update_limits_from_api'):
+                cls._update_limits_from_api()
+            cls._update_service_quotas()
+            if limits is not None:
+                self._find_service_usage(cls, limits)
+            return self._service_result(sname, start, limits=limits)
+
+    def _service_result(self, sname, start, limits=None):
+        """
+        Check thresholds of a single service's limits against the usage
+        already found, and return a :py:class:`~.CheckResult` for just that
+        service.
+
+        :param sname: the name of the service to check
+        :type sname: str
+        :param start: time the service check started, for its timing
+        :type start: float
+        :param limits: names of the limits to check, or None for all
+        :type limits: :py:obj:`list` or :py:obj:`None`
+        :rtype: :py:class:`~.CheckResult`
+        """
+        cls = self.services[sname]
+        tmp = cls.check_thresholds()
+        checked = dict(
+            (lname, LimitResult.from_limit(lim))
+            for lname, lim in cls.get_limits().items()
+            if limits is None or lname in limits
+        )
+        duration = time.time() - start
+        return CheckResult(
+            {sname: checked},
+            {sname: [lname for lname in tmp.keys() if lname in checked]},
+            timings={sname: duration}, duration=duration
+        )
+
+    def _check_service_limits(self, limits, sname):
+        """
+        :py:meth:`~._check_service` for only the limits of ``sname`` in the
+        ``limits`` dict of service name to list of limit names.
+
+        :param limits: dict of service name to list of limit names
+        :type limits: dict
+        :param sname: the name of the service to check
+        :type sname: str
+        :rtype: :py:class:`~.CheckResult`
+        """
+        return self._check_service(sname, limits=limits[sname])
+
+    def iter_results(self, service=None, use_ta=True, max_workers=None,
+                     limits=None):
+        """
+        Check usage against thresholds for each service, like
+        :py:meth:`~.check_thresholds`, but yield a :py:class:`~.CheckResult`
+        for each service (containing only that service) as soon as that
+        service is finished, so that output, metrics and alerts for finished
+        services can overlap with collection for the remaining services.
+
+        Up to ``max_workers`` services are checked concurrently, and results
+        are yielded in the order services complete. With ``max_workers`` of
+        1, services are checked serially as the generator is consumed.
+        Exceptions raised while checking a service are re-raised when that
+        service's result is reached.
+
+        :param service: the name(s) of one or more service(s) to check
+        :type service: list
+        :param use_ta: check Trusted Advisor for information on limits
+        :type use_ta: bool
+        :param max_workers: maximum number of services to check concurrently;
+          defaults to :py:attr:`~._max_service_workers`
+        :type max_workers: int
+        :param limits: dict of service name to list of the names of the limits
+          to check, or None for all limits; overrides ``service``. See
+          :py:meth:`~.find_usage`.
+        :type limits: :py:obj:`dict` or :py:obj:`None`
+        :returns: one single-service result per service
+        :rtype: generator of :py:class:`~.CheckResult`
+        """
+        to_get = self._own_services()
+        func = self._check_service
+        if limits is not None:
+            service = list(limits.keys())
+            func = partial(self._check_service_limits, limits)
+        if service is not None:
+            for each in service:
+                if each not in self.services:
+                    raise KeyError(each)
+            to_get = list(service)
+        if max_workers is None:
+            max_workers = self._max_service_workers
+        if self._profilers and max_workers != 1:
+            logger.info('Profiling enabled; checking services serially')
+            max_workers = 1
+        if use_ta:
+            with self._profiled('TrustedAdvisor'):
+                self.ta.update_limits()
+        for _, result in concurrent_imap_unordered(
+            func, to_get, max_workers=max_workers
+        ):
+            yield result
+
+    def check_thresholds(self, service=None, use_ta=True,
+                         on_service_complete=None, limits=None):
+        """
+        Check all limits and current usage against their specified thresholds;
+        return an immutable :py:class:`~.CheckResult` snapshot of the results.
+
+        The returned :py:class:`~.CheckResult` is a read-only mapping of
+        service name to a nested mapping of limit name to
+        :py:class:`~.LimitResult`, for all limits that have crossed one or
+        more of their thresholds; this has the same structure (and the same
+        accessor methods) as the dict of :py:class:`~.AwsLimit` returned by
+        previous versions. If ``service`` is specified, only the named
+        service(s) are checked.
+
+        The returned :py:class:`~.LimitResult` objects can be interrogated
+        for their limits (:py:meth:`~.LimitResult.get_limit`) as well as
         the details of usage that crossed the thresholds
-        (:py:meth:`~.AwsLimit.get_warnings` and
-        :py:meth:`~.AwsLimit.get_criticals`).
+        (:py:meth:`~.LimitResult.get_warnings` and
+        :py:meth:`~.LimitResult.get_criticals`). Snapshots of *all* checked
+        limits (whether or not they crossed thresholds) are available via
+        :py:attr:`.CheckResult.limits`, so that output, metrics and alerts
+        can be produced without calling :py:meth:`~.get_limits` (and thereby
+        querying Trusted Advisor and service APIs) again.
+
+        Services are checked concurrently; see :py:meth:`~.iter_results`. If
+        ``on_service_complete`` is specified, it is called with each
+        service's :py:class:`~.CheckResult` as soon as that service is done.
 
         See :py:meth:`.AwsLimit.check_thresholds`.
 
@@ -616,24 +1021,125 @@ class AwsLimitChecker(object):
         :type service: list
         :param use_ta: check Trusted Advisor for information on limits
         :type use_ta: bool
-        :returns: dict of service name (string) to nested dict
-          of limit name (string) to limit (:py:class:`~.AwsLimit`)
-        :rtype: dict
+        :param on_service_complete: callable taking a single-service
+          :py:class:`~.CheckResult` as its only argument
+        :type on_service_complete: ``callable``
+        :param limits: dict of service name to list of the names of the limits
+          to check, or None for all limits; overrides ``service``. See
+          :py:meth:`~.find_usage`.
+        :type limits: :py:obj:`dict` or :py:obj:`None`
+        :returns: snapshot of limits, usage and crossed thresholds
+        :rtype: :py:class:`~.CheckResult`
         """
-        res = {}
-        to_get = self.services
-        if service is not None:
-            to_get = dict((each, self.services[each]) for each in service)
+        start = time.time()
+        timings = {}
         if use_ta:
-            self.ta.update_limits()
-        for sname, cls in to_get.items():
-            if hasattr(cls, '_update_limits_from_api'):
-                cls._update_limits_from_api()
-            cls._update_service_quotas()
-            tmp = cls.check_thresholds()
-            if len(tmp) > 0:
-                res[sname] = tmp
-        return res
+            with self._profiled('TrustedAdvisor'):
+                self.ta.update_limits()
+            timings['TrustedAdvisor'] = time.time() - start
+        results = []
+        for res in self.iter_results(
+            service=service, use_ta=False, limits=limits
+        ):
+            if on_service_complete is not None:
+                on_service_complete(res)
+            results.append(res)
+        return CheckResult.combine(
+            results, duration=time.time() - start, timings=timings
+        )
+
+    def check_collected_thresholds(self, service=None):
+        """
+        Check the limits and usage that have already been collected (i.e. by
+        :py:meth:`~.find_usage`, kept up to date by
+        :py:class:`~.EventUpdater`) against their thresholds, like
+        :py:meth:`~.check_thresholds` but without updating limits from
+        Trusted Advisor, Service Quotas or service APIs, or finding usage
+        again. Services without any usage yet still find their usage.
+
+        :param service: the name(s) of one or more service(s) to return
+          results for, or None for all services
+        :type service: list
+        :returns: snapshot of limits, usage and crossed thresholds
+        :rtype: :py:class:`~.CheckResult`
+        """
+        start = time.time()
+        if service is None:
+            service = self._own_services()
+        results = [
+            self._service_result(sname, time.time()) for sname in service
+        ]
+        return CheckResult.combine(results, duration=time.time() - start)
+
+    def export_snapshot(self, path, result=None, use_ta=True):
+        """
+        Write the limit values and sources, thresholds and usage of every
+        checked limit to a compact, versioned snapshot file, which can be
+        imported again with :py:meth:`~.import_snapshot` or combined with
+        snapshots from other accounts and regions by
+        :py:class:`~.FleetRollup`. See :py:func:`~.write_snapshot`.
+
+        :param path: path to write the snapshot to
+        :type path: str
+        :param result: the result of checking thresholds to export; if None,
+          :py:meth:`~.check_thresholds` is called first
+        :type result: :py:class:`~.CheckResult`
+        :param use_ta: if ``result`` is None, check Trusted Advisor for
+          information on limits
+        :type use_ta: bool
+        :return: number of limits written
+        :rtype: int
+        """
+        if result is None:
+            result = self.check_thresholds(use_ta=use_ta)
+        return write_snapshot(
+            path, result, account_id=self.account_id, region=self.region_name
+        )
+
+    def import_snapshot(self, path):
+        """
+        Restore limit values, thresholds and usage from a snapshot file
+        written by :py:meth:`~.export_snapshot`, and return the result of
+        checking thresholds against them, without calling any AWS API. Limits
+        that this checker does not have are skipped.
+
+        Usage is not found again for services in the snapshot, but calling
+        :py:meth:`~.check_thresholds` or :py:meth:`~.get_limits` afterwards
+        still updates their limits from Trusted Advisor, the services' APIs
+        and Service Quotas.
+
+        :param path: path to the snapshot file
+        :type path: str
+        :returns: snapshot of the imported limits, usage and crossed
+          thresholds
+        :rtype: :py:class:`~.CheckResult`
+        """
+        names = {}
+        with SnapshotReader(path) as reader:
+            for snap in reader:
+                cls = self.services.get(snap.service)
+                if cls is None or snap.name not in cls.limits:
+                    logger.warning(
+                        'Skipping limit not known to this checker in '
+                        'snapshot: %s/%s', snap.service, snap.name
+                    )
+                    continue
+                snap.restore(cls.limits[snap.name])
+                names.setdefault(snap.service, []).append(snap.name)
+        limits = {}
+        problems = {}
+        for sname, lnames in names.items():
+            cls = self.services[sname]
+            cls._have_usage = True
+            lims = [cls.limits[lname] for lname in lnames]
+            results = evaluate_thresholds(lims)
+            limits[sname] = dict(
+                (lim.name, LimitResult.from_limit(lim)) for lim in lims
+            )
+            problems[sname] = [
+                lim.name for lim, res in zip(lims, results) if res is False
+            ]
+        return CheckResult(limits, problems)
 
     def get_required_iam_policy(self):
         """
@@ -680,5 +1186,5 @@ class AwsLimitChecker(object):
         :rtype: str
         """
         kwargs = self._boto_conn_kwargs
-        conn = boto3.client('ec2', **kwargs)
+        conn = boto3_client('ec2', **kwargs)
         return conn._client_config.region_name
@@ -0,0 +1,303 @@
+"""
+awslimitchecker/circuitbreaker.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from awslimitchecker.utils import load_cache_json, save_cache_json
+
+logger = logging.getLogger(__name__)
+
+#: name of the cache file (see :py:func:`~.load_cache_json`) holding the
+#: state of all circuit breakers
+STATE_NAME = 'circuit_breakers.json'
+
+#: API error codes that count as failures: the operation is throttled
+#: (after botocore's retries are exhausted), disabled or not supported in the
+#: region, or not available to the account
+FAILURE_CODES = frozenset([
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestLimitExceeded',
+    'RequestThrottled',
+    'TooManyRequestsException',
+    'AuthFailure',
+    'AuthError',
+    'OptInRequired',
+    'UnsupportedOperation',
+    'SubscriptionRequiredException',
+])
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised by :py:meth:`.CircuitBreaker.call` instead of calling an
+    operation whose circuit is open.
+
+    :param key: the circuit's key; see :py:meth:`.CircuitBreaker.key`
+    :type key: str
+    :param failures: number of consecutive failures
+    :type failures: int
+    :param error: the last error
+    :type error: str
+    :param retry_at: time after which the operation will be tried again,
+      as epoch seconds
+    :type retry_at: float
+    """
+
+    def __init__(self, key, failures, error, retry_at):
+        self.key = key
+        self.failures = failures
+        self.error = error
+        self.retry_at = retry_at
+        super(CircuitOpenError, self).__init__(
+            '%s skipped: failed %d times (last error: %s); will be tried '
+            'again after %s' % (
+                key, failures, error,
+                datetime.utcfromtimestamp(int(retry_at)).isoformat() + 'Z'
+            )
+        )
+
+
+class CircuitBreaker(object):
+    """
+    Circuit breakers for API operations, one per account, region, service
+    and operation, with their state kept in the cache directory (see
+    :py:func:`~.get_cache_dir`) between runs.
+
+    Each call made through :py:meth:`~.call` that fails with one of
+    :py:data:`~.FAILURE_CODES` (or can't connect to the endpoint) is counted;
+    after ``failures`` consecutive failures the circuit opens, and calls
+    raise :py:exc:`~.CircuitOpenError` immediately, without spending time
+    on API retries, for ``cooldown`` seconds. After that one call is let
+    through as a probe: if it succeeds the circuit closes, and if it fails
+    the circuit stays open for another ``cooldown`` seconds.
+
+    :param scope: the account the breakers are for, part of every key; or a
+      callable returning it, called the first time it is needed. If that
+      fails, circuit breakers are disabled rather than shared with other
+      accounts.
+    :type scope: ``str`` or ``callable``
+    :param failures: consecutive failures that open a circuit; overridden
+      by the ``ALC_CIRCUIT_BREAKER_FAILURES`` environment variable. 0
+      disables circuit breakers.
+    :type failures: int
+    :param cooldown: seconds a circuit stays open before a probe; overridden
+      by the ``ALC_CIRCUIT_BREAKER_COOLDOWN`` environment variable
+    :type cooldown: int
+    """
+
+    def __init__(self, scope, failures=3, cooldown=3600):
+        self._scope = scope
+        self._scope_lock = threading.Lock()
+        self.failures = int(
+            os.environ.get('ALC_CIRCUIT_BREAKER_FAILURES', failures)
+        )
+        self.cooldown = int(
+            os.environ.get('ALC_CIRCUIT_BREAKER_COOLDOWN', cooldown)
+        )
+        #: dict of key to :py:exc:`~.CircuitOpenError`, for the calls
+        #: skipped by this instance
+        self.skipped = {}
+        self._state = None
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    @property
+    def scope(self):
+        """
+        Return the scope (account) of the breakers, resolving it the first
+        time if it was given as a callable; None if that failed.
+
+        :rtype: str
+        """
+        with self._scope_lock:
+            if callable(self._scope):
+                try:
+                    self._scope = self._scope()
+                except Exception:
+                    logger.warning(
+                        'Unable to determine the account for circuit '
+                        'breakers; disabling them', exc_info=True
+                    )
+                    self._scope = None
+            return self._scope
+
+    def key(self, region, service, operation):
+        """
+        Return the key of the circuit for an operation.
+
+        :param region: region name
+        :type region: str
+        :param service: service name
+        :type service: str
+        :param operation: API operation name
+        :type operation: str
+        :rtype: str
+        """
+        return '/'.join([self.scope, region or '', service, operation])
+
+    @property
+    def state(self):
+        """
+        Return the state of all circuits with failures, loading it from the
+        cache directory the first time: a dict of key to a dict with the
+        number of ``failures``, the last ``error`` and, if open, the time
+        it ``opened``.
+
+        :rtype: dict
+        """
+        if self._state is None:
+            self._state = load_cache_json(STATE_NAME)
+        return self._state
+
+    def _save(self):
+        """
+        Write the circuits changed by this instance to the cache file, on
+        top of its current contents, which may include changes from other
+        processes.
+        """
+        data = load_cache_json(STATE_NAME)
+        for key in self._dirty:
+            if key in self._state:
+                data[key] = self._state[key]
+            else:
+                data.pop(key, None)
+        self._dirty = set()
+        save_cache_json(STATE_NAME, data)
+
+    def _is_failure(self, ex):
+        if isinstance(ex, EndpointConnectionError):
+            return True
+        if isinstance(ex, ClientError):
+            return ex.response.get('Error', {}).get('Code') in FAILURE_CODES
+        return False
+
+    def call(self, region, service, operation, func, *args, **kwargs):
+        """
+        Call ``func(*args, **kwargs)`` if the circuit for the operation is
+        closed or due a probe, record whether it failed, and return its
+        result.
+
+        :param region: region name
+        :type region: str
+        :param service: service name
+        :type service: str
+        :param operation: API operation name
+        :type operation: str
+        :param func: function that makes the API call(s)
+        :type func: callable
+        :raises: :py:exc:`~.CircuitOpenError` if the circuit is open, or
+          whatever ``func`` raises
+        """
+        if self.failures < 1 or self.scope is None:
+            return func(*args, **kwargs)
+        key = self.key(region, service, operation)
+        with self._lock:
+            s = self.state.get(key)
+            now = time.time()
+            if s is not None and s.get('opened') is not None:
+                retry_at = s['opened'] + self.cooldown
+                if now < retry_at:
+                    ex = CircuitOpenError(
+                        key, s['failures'], s['error'], retry_at
+                    )
+                    self.skipped[key] = ex
+                    logger.warning('%s', ex)
+                    raise ex
+                # let this call through as a probe, and keep others out
+                logger.info('Probing %s after %d failures', key,
+                            s['failures'])
+                s['opened'] = now
+        try:
+            res = func(*args, **kwargs)
+        except Exception as ex:
+            if self._is_failure(ex):
+                self._record_failure(key, ex)
+            raise
+        self._record_success(key)
+        return res
+
+    def _record_failure(self, key, ex):
+        with self._lock:
+            s = self.state.setdefault(
+                key, {'failures': 0, 'error': None, 'opened': None}
+            )
+            s['failures'] += 1
+            s['error'] = str(ex)
+            if s['failures'] >= self.failures:
+                if s['opened'] is None:
+                    logger.warning(
+                        'Opening circuit for %s after %d failures; skipping '
+                        'it for %d seconds', key, s['failures'], self.cooldown
+                    )
+                s['opened'] = time.time()
+            self._dirty.add(key)
+            self._save()
+
+    def _record_success(self, key):
+        with self._lock:
+            if key not in self.state:
+                return
+            if self.state[key].get('opened') is not None:
+                logger.info('Closing circuit for %s', key)
+            del self.state[key]
+            self._dirty.add(key)
+            self._save()
+
+    def reset(self):
+        """
+        Close all circuits of this scope, and remove them from the cache
+        file.
+        """
+        if self.scope is None:
+            return
+        with self._lock:
+            prefix = self.scope + '/'
+            for key in list(self.state.keys()):
+                if key.startswith(prefix):
+                    del self.state[key]
+                    self._dirty.add(key)
+            self._save()
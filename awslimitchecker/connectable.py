@@ -39,11 +39,47 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 
 import os
 import logging
+import threading
 import boto3
 from botocore.config import Config
 
+from awslimitchecker.cassette import attach_cassette
+
 logger = logging.getLogger(__name__)
 
+#: lock held while creating clients and resources on boto3's default session,
+#: which is not thread-safe; see :py:func:`~.boto3_client`
+_boto3_lock = threading.Lock()
+
+
+def boto3_client(*args, **kwargs):
+    """
+    Create a client with :py:func:`boto3.client`, holding a lock so that
+    clients can be created from several threads (i.e. when services are
+    checked concurrently). Creating clients on boto3's default session is not
+    thread-safe and can intermittently fail with ``KeyError`` or credential
+    errors; the clients themselves are thread-safe once created.
+
+    All arguments are passed to :py:func:`boto3.client`.
+
+    :returns: the new client
+    """
+    with _boto3_lock:
+        return boto3.client(*args, **kwargs)
+
+
+def boto3_resource(*args, **kwargs):
+    """
+    Create a resource with :py:func:`boto3.resource`, holding the same lock
+    as :py:func:`~.boto3_client`.
+
+    All arguments are passed to :py:func:`boto3.resource`.
+
+    :returns: the new resource
+    """
+    with _boto3_lock:
+        return boto3.resource(*args, **kwargs)
+
 
 class ConnectableCredentials(object):
     """
@@ -73,6 +109,32 @@ class Connectable(object):
     connecting via regions and/or STS.
     """
 
+    #: :py:class:`~.CircuitBreaker` for calls made through
+    #: :py:meth:`~._guarded_call`, or None; set by
+    #: :py:class:`~.AwsLimitChecker`
+    _circuit_breaker = None
+
+    def _guarded_call(self, operation, func, *args, **kwargs):
+        """
+        Call ``func(*args, **kwargs)``, which makes the API call(s) for
+        ``operation``, through :py:attr:`~._circuit_breaker` (if set) for
+        this service and region; see :py:meth:`.CircuitBreaker.call`.
+
+        :param operation: API operation name
+        :type operation: str
+        :param func: function that makes the API call(s)
+        :type func: callable
+        :returns: the return value of ``func``
+        :raises: :py:exc:`~.CircuitOpenError` if the operation's circuit is
+          open, or whatever ``func`` raises
+        """
+        if self._circuit_breaker is None:
+            return func(*args, **kwargs)
+        return self._circuit_breaker.call(
+            self._boto3_connection_kwargs.get('region_name'),
+            self.service_name, operation, func, *args, **kwargs
+        )
+
     @property
     def _max_retries_config(self):
         """
@@ -119,7 +181,7 @@ class Connectable(object):
 
         if self._max_retries_config is not None:
             kwargs['config'] = default_config.merge(self._max_retries_config)
-        self.conn = boto3.client(self.api_name, **kwargs)
+        self.conn = attach_cassette(boto3_client(self.api_name, **kwargs))
         logger.info("Connected to %s in region %s",
                     self.api_name, self.conn._client_config.region_name)
 
@@ -144,6 +206,8 @@ class Connectable(object):
         if self._max_retries_config is not None:
             kwargs['config'] = default_config.merge(self._max_retries_config)
 
-        self.resource_conn = boto3.resource(self.api_name, **kwargs)
+        self.resource_conn = attach_cassette(
+            boto3_resource(self.api_name, **kwargs)
+        )
         logger.info("Connected to %s (resource) in region %s", self.api_name,
                     self.resource_conn.meta.client._client_config.region_name)
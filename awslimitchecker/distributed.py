@@ -0,0 +1,934 @@
+"""
+awslimitchecker/distributed.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import io
+import os
+import json
+import time
+import base64
+import socket
+import fnmatch
+import logging
+import threading
+from abc import ABCMeta, abstractmethod
+from collections import namedtuple
+
+try:
+    from urllib.parse import urlparse, quote, unquote
+except ImportError:
+    from urlparse import urlparse
+    from urllib import quote, unquote
+
+from .checker import AwsLimitChecker
+from .services import _services
+from .snapshot import write_snapshot, FleetRollup
+
+logger = logging.getLogger(__name__)
+
+
+class WorkItem(namedtuple('WorkItem', ['account_id', 'region', 'service'])):
+    """
+    One unit of distributed work: checking one service in one region of one
+    account. An ``account_id`` of None means the account of the worker's own
+    credentials.
+    """
+
+    __slots__ = ()
+
+    @property
+    def item_id(self):
+        """
+        Unique identifier of the item, ``ACCOUNT/REGION/SERVICE``.
+
+        :rtype: str
+        """
+        return '%s/%s/%s' % (
+            self.account_id or '', self.region or '', self.service
+        )
+
+
+class Lease(namedtuple('Lease', ['item', 'worker_id', 'expires', 'token'])):
+    """
+    A worker's claim on a :py:class:`~.WorkItem` until ``expires`` (epoch
+    seconds), as returned by :py:meth:`.WorkQueue.lease`. ``token`` is
+    specific to the queue backend.
+    """
+
+    __slots__ = ()
+
+
+class WorkResult(namedtuple('WorkResult', [
+    'item', 'worker_id', 'started', 'finished', 'snapshot', 'error'
+])):
+    """
+    The result of one :py:class:`~.WorkItem`, published by a
+    :py:class:`~.Worker`: the snapshot of the checked service (as written by
+    :py:func:`~.write_snapshot`, as bytes), or the error message if checking
+    it failed.
+    """
+
+    __slots__ = ()
+
+    def to_json(self):
+        """
+        Serialize the result to a JSON string.
+
+        :rtype: str
+        """
+        return json.dumps({
+            'item': list(self.item),
+            'worker_id': self.worker_id,
+            'started': self.started,
+            'finished': self.finished,
+            'snapshot': None if self.snapshot is None else base64.b64encode(
+                self.snapshot
+            ).decode('ascii'),
+            'error': self.error
+        }, sort_keys=True)
+
+    @classmethod
+    def from_json(cls, s):
+        """
+        Deserialize a result serialized by :py:meth:`~.to_json`.
+
+        :param s: JSON string
+        :type s: str
+        :rtype: :py:class:`~.WorkResult`
+        """
+        d = json.loads(s)
+        return cls(
+            item=WorkItem(*d['item']),
+            worker_id=d['worker_id'],
+            started=d['started'],
+            finished=d['finished'],
+            snapshot=None if d['snapshot'] is None else base64.b64decode(
+                d['snapshot']
+            ),
+            error=d['error']
+        )
+
+
+class WorkQueue(object):
+    """
+    Base class for distributed work queues. A queue holds pending
+    :py:class:`~.WorkItem` instances, leases them to workers for a limited
+    time, and stores the :py:class:`~.WorkResult` of each item. Items whose
+    lease expires before a result is published (e.g. because the worker
+    died) are made pending again by :py:meth:`~.requeue_expired`. If a
+    result for an item is published more than once, the last one wins.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def put(self, item):
+        """
+        Add a pending item to the queue.
+
+        :param item: the item
+        :type item: :py:class:`~.WorkItem`
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def lease(self, worker_id, duration):
+        """
+        Lease the next pending item to a worker.
+
+        :param worker_id: unique identifier of the worker
+        :type worker_id: str
+        :param duration: lease duration in seconds
+        :type duration: int
+        :returns: the lease, or None if there are no pending items
+        :rtype: :py:class:`~.Lease`
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def renew(self, lease, duration):
+        """
+        Extend a lease.
+
+        :param lease: the lease to extend
+        :type lease: :py:class:`~.Lease`
+        :param duration: new lease duration in seconds, from now
+        :type duration: int
+        :returns: the new lease, or None if the lease was lost (it expired
+          and the item was requeued)
+        :rtype: :py:class:`~.Lease`
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def complete(self, lease, result):
+        """
+        Publish the result of a leased item and release the lease.
+
+        :param lease: the lease of the item
+        :type lease: :py:class:`~.Lease`
+        :param result: the result
+        :type result: :py:class:`~.WorkResult`
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def requeue_expired(self, now=None):
+        """
+        Make items whose leases have expired pending again.
+
+        :param now: current time as epoch seconds; defaults to now
+        :type now: float
+        :returns: number of items requeued
+        :rtype: int
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def results(self):
+        """
+        Iterate over the published results.
+
+        :rtype: generator of :py:class:`~.WorkResult`
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def counts(self):
+        """
+        Return the number of pending, leased and done items.
+
+        :rtype: dict
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def clear(self):
+        """
+        Remove all items, leases and results from the queue.
+        """
+        raise NotImplementedError()
+
+
+class FilesystemQueue(WorkQueue):
+    """
+    :py:class:`~.WorkQueue` in a directory, which may be on a shared
+    filesystem. Each item is a file in the ``pending``, ``leased`` or
+    ``done`` subdirectory; it is leased by atomically renaming it into
+    ``leased`` with the lease expiry and worker ID in its name, so only one
+    worker can lease each item.
+
+    :param path: the queue directory; created if it does not exist
+    :type path: str
+    """
+
+    def __init__(self, path):
+        self.path = path
+        for name in ['pending', 'leased', 'done']:
+            d = os.path.join(path, name)
+            if not os.path.isdir(d):
+                os.makedirs(d)
+
+    def _dir(self, name):
+        return os.path.join(self.path, name)
+
+    @staticmethod
+    def _lease_name(name, expires, worker_id):
+        return '%s@%d@%s' % (name, int(expires), quote(worker_id, safe=''))
+
+    def _write(self, path, data):
+        """
+        Write a file atomically, via a temporary file (unique to the process
+        and thread, as the queue directory is shared) and a rename.
+        """
+        tmp = os.path.join(self.path, '.%s.%d.%d.tmp' % (
+            os.path.basename(path), os.getpid(),
+            threading.current_thread().ident
+        ))
+        with open(tmp, 'w') as fh:
+            fh.write(data)
+        os.rename(tmp, path)
+
+    def put(self, item):
+        name = quote(item.item_id, safe='')
+        self._write(
+            os.path.join(self._dir('pending'), name), json.dumps(list(item))
+        )
+
+    def lease(self, worker_id, duration):
+        for name in sorted(os.listdir(self._dir('pending'))):
+            expires = time.time() + duration
+            lname = self._lease_name(name, expires, worker_id)
+            try:
+                os.rename(
+                    os.path.join(self._dir('pending'), name),
+                    os.path.join(self._dir('leased'), lname)
+                )
+            except OSError:
+                # another worker leased it first
+                continue
+            with open(os.path.join(self._dir('leased'), lname), 'r') as fh:
+                item = WorkItem(*json.loads(fh.read()))
+            return Lease(
+                item=item, worker_id=worker_id, expires=int(expires),
+                token=lname
+            )
+        return None
+
+    def renew(self, lease, duration):
+        expires = time.time() + duration
+        name = lease.token.split('@')[0]
+        lname = self._lease_name(name, expires, lease.worker_id)
+        try:
+            os.rename(
+                os.path.join(self._dir('leased'), lease.token),
+                os.path.join(self._dir('leased'), lname)
+            )
+        except OSError:
+            return None
+        return lease._replace(expires=int(expires), token=lname)
+
+    def complete(self, lease, result):
+        name = lease.token.split('@')[0]
+        self._write(os.path.join(self._dir('done'), name), result.to_json())
+        try:
+            os.unlink(os.path.join(self._dir('leased'), lease.token))
+        except OSError:
+            logger.debug('Lease %s was lost before completion', lease.token)
+
+    def requeue_expired(self, now=None):
+        if now is None:
+            now = time.time()
+        count = 0
+        for lname in os.listdir(self._dir('leased')):
+            name, expires, _ = lname.split('@')
+            if int(expires) > now:
+                continue
+            try:
+                os.rename(
+                    os.path.join(self._dir('leased'), lname),
+                    os.path.join(self._dir('pending'), name)
+                )
+            except OSError:
+                # completed, renewed or requeued concurrently
+                continue
+            logger.info('Requeued expired lease %s', unquote(lname))
+            count += 1
+        return count
+
+    def results(self):
+        for name in sorted(os.listdir(self._dir('done'))):
+            with open(os.path.join(self._dir('done'), name), 'r') as fh:
+                yield WorkResult.from_json(fh.read())
+
+    def counts(self):
+        return dict(
+            (name, len(os.listdir(self._dir(d))))
+            for name, d in [
+                ('pending', 'pending'), ('leased', 'leased'), ('done', 'done')
+            ]
+        )
+
+    def clear(self):
+        for name in ['pending', 'leased', 'done']:
+            for fname in os.listdir(self._dir(name)):
+                os.unlink(os.path.join(self._dir(name), fname))
+
+
+class RedisQueue(WorkQueue):
+    """
+    :py:class:`~.WorkQueue` in Redis (or any server compatible with its
+    list, hash and sorted set commands), using a `redis-py
+    <https://github.com/redis/redis-py>`_ compatible client. Pending item
+    IDs are kept in a list, lease expiry times in a sorted set and lease
+    owners and results in hashes, all under keys starting with ``prefix``.
+
+    An item popped from the pending list by a worker that dies before it
+    records the lease is not requeued; enqueueing the items again recovers
+    it.
+
+    :param client: Redis client, or a :py:class:`~.LocalRedis`
+    :param prefix: prefix of all keys used by the queue
+    :type prefix: str
+    """
+
+    def __init__(self, client, prefix='awslimitchecker'):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, prefix='awslimitchecker'):
+        """
+        Connect to a Redis server by URL, e.g. ``redis://host:6379/0``. This
+        requires the ``redis`` package (``pip install
+        awslimitchecker[redis]``).
+
+        :param url: Redis URL
+        :type url: str
+        :param prefix: prefix of all keys used by the queue
+        :type prefix: str
+        :rtype: :py:class:`~.RedisQueue`
+        """
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(
+                'Redis work queues require the "redis" package; install it '
+                'with: pip install awslimitchecker[redis]'
+            )
+        return cls(redis.Redis.from_url(url), prefix=prefix)
+
+    def _key(self, name):
+        return '%s:%s' % (self.prefix, name)
+
+    @staticmethod
+    def _str(value):
+        if isinstance(value, bytes):
+            return value.decode('utf-8')
+        return value
+
+    def put(self, item):
+        self.client.hset(
+            self._key('items'), item.item_id, json.dumps(list(item))
+        )
+        self.client.rpush(self._key('pending'), item.item_id)
+
+    def lease(self, worker_id, duration):
+        item_id = self.client.lpop(self._key('pending'))
+        if item_id is None:
+            return None
+        item_id = self._str(item_id)
+        expires = int(time.time() + duration)
+        self.client.hset(self._key('owners'), item_id, worker_id)
+        self.client.zadd(self._key('leases'), {item_id: expires})
+        item = WorkItem(*json.loads(self._str(
+            self.client.hget(self._key('items'), item_id)
+        )))
+        return Lease(
+            item=item, worker_id=worker_id, expires=expires, token=item_id
+        )
+
+    def renew(self, lease, duration):
+        # the score is not rounded so that every renewal changes it; with
+        # xx and ch, zadd atomically updates the lease only if it still
+        # exists (i.e. has not been requeued), and returns 0 if it doesn't
+        expires = time.time() + duration
+        if self.client.zadd(
+            self._key('leases'), {lease.token: expires}, xx=True, ch=True
+        ) == 0:
+            return None
+        owner = self._str(self.client.hget(self._key('owners'), lease.token))
+        if owner != lease.worker_id:
+            # requeued and leased by another worker in the meantime
+            return None
+        return lease._replace(expires=int(expires))
+
+    def complete(self, lease, result):
+        self.client.hset(self._key('results'), lease.token, result.to_json())
+        if self.client.zrem(self._key('leases'), lease.token) == 0:
+            logger.debug('Lease %s was lost before completion', lease.token)
+
+    def requeue_expired(self, now=None):
+        if now is None:
+            now = time.time()
+        count = 0
+        for item_id in self.client.zrangebyscore(
+            self._key('leases'), '-inf', now
+        ):
+            # only one caller removes (and so requeues) each lease
+            if self.client.zrem(self._key('leases'), item_id) == 0:
+                continue
+            self.client.rpush(self._key('pending'), item_id)
+            logger.info('Requeued expired lease %s', self._str(item_id))
+            count += 1
+        return count
+
+    def results(self):
+        for _, value in self.client.hscan_iter(self._key('results')):
+            yield WorkResult.from_json(self._str(value))
+
+    def counts(self):
+        return {
+            'pending': self.client.llen(self._key('pending')),
+            'leased': self.client.zcard(self._key('leases')),
+            'done': self.client.hlen(self._key('results'))
+        }
+
+    def clear(self):
+        self.client.delete(*[
+            self._key(name)
+            for name in ['items', 'pending', 'owners', 'leases', 'results']
+        ])
+
+
+class LocalRedis(object):
+    """
+    In-memory, thread-safe stand-in for a redis-py client, implementing only
+    the commands used by :py:class:`~.RedisQueue`. This allows workers in
+    threads of one process to share a queue, and testing without Redis.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, factory):
+        return self._data.setdefault(key, factory())
+
+    def hset(self, key, field, value):
+        with self._lock:
+            h = self._get(key, dict)
+            new = field not in h
+            h[field] = value
+            return int(new)
+
+    def hget(self, key, field):
+        with self._lock:
+            return self._data.get(key, {}).get(field)
+
+    def hlen(self, key):
+        with self._lock:
+            return len(self._data.get(key, {}))
+
+    def hscan_iter(self, key, match=None):
+        with self._lock:
+            items = list(self._data.get(key, {}).items())
+        for field, value in items:
+            if match is None or fnmatch.fnmatchcase(field, match):
+                yield field, value
+
+    def rpush(self, key, *values):
+        with self._lock:
+            lst = self._get(key, list)
+            lst.extend(values)
+            return len(lst)
+
+    def lpop(self, key):
+        with self._lock:
+            lst = self._data.get(key, [])
+            if len(lst) == 0:
+                return None
+            return lst.pop(0)
+
+    def llen(self, key):
+        with self._lock:
+            return len(self._data.get(key, []))
+
+    def zadd(self, key, mapping, xx=False, ch=False):
+        with self._lock:
+            if xx:
+                z = self._data.get(key, {})
+            else:
+                z = self._get(key, dict)
+            added = 0
+            changed = 0
+            for member, score in mapping.items():
+                if member in z:
+                    if z[member] != score:
+                        changed += 1
+                elif xx:
+                    continue
+                else:
+                    added += 1
+                z[member] = score
+            if ch:
+                return added + changed
+            return added
+
+    def zrem(self, key, *members):
+        with self._lock:
+            z = self._data.get(key, {})
+            return len([m for m in members if z.pop(m, None) is not None])
+
+    def zscore(self, key, member):
+        with self._lock:
+            return self._data.get(key, {}).get(member)
+
+    def zcard(self, key):
+        with self._lock:
+            return len(self._data.get(key, {}))
+
+    def zrangebyscore(self, key, min, max):
+        lo = float(min)
+        hi = float(max)
+        with self._lock:
+            z = self._data.get(key, {})
+            return [
+                m for m, s in sorted(z.items(), key=lambda x: (x[1], x[0]))
+                if lo <= s <= hi
+            ]
+
+    def delete(self, *keys):
+        with self._lock:
+            return len([k for k in keys if self._data.pop(k, None) is not None])
+
+
+def get_work_queue(url):
+    """
+    Return the :py:class:`~.WorkQueue` for a URL: ``redis://`` (or
+    ``rediss://``) URLs for a :py:class:`~.RedisQueue`, and ``file://`` URLs
+    or plain paths for a :py:class:`~.FilesystemQueue`.
+
+    :param url: queue URL or directory path
+    :type url: str
+    :rtype: :py:class:`~.WorkQueue`
+    """
+    parsed = urlparse(url)
+    if parsed.scheme in ['redis', 'rediss']:
+        return RedisQueue.from_url(url)
+    if parsed.scheme == 'file':
+        return FilesystemQueue(parsed.path)
+    return FilesystemQueue(url)
+
+
+class Coordinator(object):
+    """
+    Enqueue one :py:class:`~.WorkItem` per account, region and service.
+    Global services (see :py:attr:`._AwsService.global_service`) are only
+    enqueued for the first region of each account.
+
+    :param queue: the work queue
+    :type queue: :py:class:`~.WorkQueue`
+    :param accounts: account IDs to check; None for the account of the
+      workers' own credentials
+    :type accounts: list
+    :param regions: region names to check
+    :type regions: list
+    :param services: names of the services to check; defaults to all
+    :type services: list
+    """
+
+    def __init__(self, queue, accounts, regions, services=None):
+        self.queue = queue
+        self.accounts = list(accounts)
+        self.regions = list(regions)
+        if services is None:
+            services = sorted(_services.keys())
+        self.services = list(services)
+
+    def items(self):
+        """
+        Return the work items for all accounts, regions and services.
+
+        :rtype: list of :py:class:`~.WorkItem`
+        """
+        res = []
+        for account_id in self.accounts:
+            for idx, region in enumerate(self.regions):
+                for sname in self.services:
+                    if idx > 0 and _services[sname].global_service:
+                        continue
+                    res.append(WorkItem(account_id, region, sname))
+        return res
+
+    def enqueue(self, clear=True):
+        """
+        Enqueue all work items.
+
+        :param clear: remove all items, leases and results from a previous
+          run from the queue first
+        :type clear: bool
+        :returns: number of items enqueued
+        :rtype: int
+        """
+        if clear:
+            self.queue.clear()
+        items = self.items()
+        for item in items:
+            self.queue.put(item)
+        logger.info('Enqueued %d work items', len(items))
+        return len(items)
+
+
+class _LeaseRenewer(threading.Thread):
+    """
+    Thread that renews a lease every ``interval`` seconds until stopped, so
+    that it doesn't expire while its item is being checked.
+
+    :param queue: the work queue
+    :type queue: :py:class:`~.WorkQueue`
+    :param lease: the lease to renew
+    :type lease: :py:class:`~.Lease`
+    :param duration: lease duration in seconds, from each renewal
+    :type duration: int
+    :param interval: seconds between renewals
+    :type interval: float
+    """
+
+    def __init__(self, queue, lease, duration, interval):
+        super(_LeaseRenewer, self).__init__(name='lease-renewer')
+        self.daemon = True
+        self.queue = queue
+        #: the latest lease; renewing may change its token
+        self.lease = lease
+        self.duration = duration
+        self.interval = interval
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            try:
+                lease = self.queue.renew(self.lease, self.duration)
+            except Exception:
+                logger.warning('Error renewing lease %s', self.lease.token,
+                               exc_info=True)
+                continue
+            if lease is None:
+                logger.warning('Lease %s was lost; it may be checked again '
+                               'by another worker', self.lease.token)
+                return
+            self.lease = lease
+
+    def stop(self):
+        """
+        Stop renewing, and return the latest lease.
+
+        :rtype: :py:class:`~.Lease`
+        """
+        self._done.set()
+        self.join()
+        return self.lease
+
+
+class Worker(object):
+    """
+    Lease work items from a queue, check them with an
+    :py:class:`~.AwsLimitChecker` (one per account and region, reused for
+    all of its items), and publish a snapshot of the results.
+
+    :param queue: the work queue
+    :type queue: :py:class:`~.WorkQueue`
+    :param worker_id: unique identifier of the worker; defaults to the
+      hostname and process ID
+    :type worker_id: str
+    :param lease_seconds: duration of each lease; leases are renewed while
+      their item is being checked, so this is how long an item stays leased
+      after its worker stops
+    :type lease_seconds: int
+    :param renew_seconds: seconds between renewals of the lease of the item
+      being checked; defaults to a third of ``lease_seconds``
+    :type renew_seconds: float
+    :param checker_kwargs: keyword arguments for
+      :py:class:`~.AwsLimitChecker`, other than ``account_id`` and
+      ``region``
+    :type checker_kwargs: dict
+    :param use_ta: check Trusted Advisor for information on limits
+    :type use_ta: bool
+    """
+
+    def __init__(self, queue, worker_id=None, lease_seconds=900,
+                 checker_kwargs=None, use_ta=True, renew_seconds=None):
+        self.queue = queue
+        if worker_id is None:
+            worker_id = '%s-%d' % (socket.gethostname(), os.getpid())
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        if renew_seconds is None:
+            renew_seconds = lease_seconds / 3.0
+        self.renew_seconds = renew_seconds
+        self.checker_kwargs = dict(checker_kwargs or {})
+        self.checker_kwargs.setdefault('check_version', False)
+        self.use_ta = use_ta
+        self._checkers = {}
+
+    def _checker(self, item):
+        """
+        Return the checker for the account and region of an item.
+
+        :param item: the work item
+        :type item: :py:class:`~.WorkItem`
+        :rtype: :py:class:`~.AwsLimitChecker`
+        """
+        key = (item.account_id, item.region)
+        if key not in self._checkers:
+            kwargs = dict(self.checker_kwargs)
+            if item.account_id is not None:
+                kwargs['account_id'] = item.account_id
+            kwargs['region'] = item.region
+            self._checkers[key] = AwsLimitChecker(**kwargs)
+        return self._checkers[key]
+
+    def run_one(self):
+        """
+        Lease, check and complete one item, renewing the lease while it is
+        being checked.
+
+        :returns: the result, or None if there were no pending items
+        :rtype: :py:class:`~.WorkResult`
+        """
+        lease = self.queue.lease(self.worker_id, self.lease_seconds)
+        if lease is None:
+            return None
+        item = lease.item
+        logger.info('Checking %s', item.item_id)
+        started = time.time()
+        snapshot = None
+        error = None
+        renewer = _LeaseRenewer(
+            self.queue, lease, self.lease_seconds, self.renew_seconds
+        )
+        renewer.start()
+        try:
+            result = self._checker(item).check_thresholds(
+                service=[item.service], use_ta=self.use_ta
+            )
+            buf = io.BytesIO()
+            write_snapshot(
+                buf, result, account_id=item.account_id, region=item.region
+            )
+            snapshot = buf.getvalue()
+        except Exception as ex:
+            logger.error('Error checking %s', item.item_id, exc_info=True)
+            error = '%s: %s' % (ex.__class__.__name__, ex)
+        finally:
+            lease = renewer.stop()
+        result = WorkResult(
+            item=item, worker_id=self.worker_id, started=started,
+            finished=time.time(), snapshot=snapshot, error=error
+        )
+        self.queue.complete(lease, result)
+        return result
+
+    def run(self, max_items=None, wait=False, poll_interval=5):
+        """
+        Check items until the queue has no more pending items, or until
+        ``max_items`` have been checked.
+
+        :param max_items: maximum number of items to check
+        :type max_items: int
+        :param wait: instead of returning when there are no pending items,
+          wait ``poll_interval`` seconds and try again
+        :type wait: bool
+        :param poll_interval: seconds to wait between polls, with ``wait``
+        :type poll_interval: float
+        :returns: number of items checked
+        :rtype: int
+        """
+        count = 0
+        while max_items is None or count < max_items:
+            if self.run_one() is None:
+                if not wait:
+                    break
+                time.sleep(poll_interval)
+                continue
+            count += 1
+        logger.info('Worker %s checked %d items', self.worker_id, count)
+        return count
+
+
+class WorkerStats(namedtuple('WorkerStats', [
+    'worker_id', 'items', 'errors', 'busy_seconds', 'items_per_minute'
+])):
+    """
+    Throughput of one worker, as returned by
+    :py:meth:`.Aggregator.worker_stats`: the number of ``items`` it
+    completed (of which ``errors`` failed), the total seconds spent checking
+    them, and the items completed per minute between the start of its first
+    item and the end of its last.
+    """
+
+    __slots__ = ()
+
+
+class Aggregator(object):
+    """
+    Assemble the fleet-wide result of a distributed run from the results
+    published to a queue, requeueing items whose leases have expired.
+
+    :param queue: the work queue
+    :type queue: :py:class:`~.WorkQueue`
+    :param top: number of limits closest to exhaustion to keep; see
+      :py:class:`~.FleetRollup`
+    :type top: int
+    """
+
+    def __init__(self, queue, top=10):
+        self.queue = queue
+        self.top = top
+        #: :py:class:`~.FleetRollup` of the results, after :py:meth:`~.collect`
+        self.rollup = None
+        #: list of :py:class:`~.WorkResult` that failed
+        self.errors = []
+        self._workers = {}
+
+    def collect(self):
+        """
+        Requeue expired leases, and (re)build :py:attr:`~.rollup`,
+        :py:attr:`~.errors` and per-worker statistics from all published
+        results.
+
+        :returns: number of pending, leased and done items
+        :rtype: dict
+        """
+        self.queue.requeue_expired()
+        self.rollup = FleetRollup(top=self.top)
+        self.errors = []
+        self._workers = {}
+        for res in self.queue.results():
+            w = self._workers.setdefault(
+                res.worker_id, [0, 0, 0.0, res.started, res.finished]
+            )
+            w[0] += 1
+            w[2] += res.finished - res.started
+            w[3] = min(w[3], res.started)
+            w[4] = max(w[4], res.finished)
+            if res.error is not None:
+                w[1] += 1
+                self.errors.append(res)
+                continue
+            self.rollup.add_snapshot(io.BytesIO(res.snapshot))
+        return self.queue.counts()
+
+    def worker_stats(self):
+        """
+        Return the throughput of each worker, after :py:meth:`~.collect`.
+
+        :rtype: list of :py:class:`~.WorkerStats`
+        """
+        res = []
+        for worker_id, w in sorted(self._workers.items()):
+            items, errors, busy, first, last = w
+            elapsed = last - first
+            res.append(WorkerStats(
+                worker_id=worker_id, items=items, errors=errors,
+                busy_seconds=busy,
+                items_per_minute=(
+                    60.0 * items / elapsed if elapsed > 0 else None
+                )
+            ))
+        return res
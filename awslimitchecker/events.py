@@ -0,0 +1,392 @@
+"""
+awslimitchecker/events.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import json
+import time
+import uuid
+import logging
+import calendar
+import threading
+from collections import OrderedDict
+
+from dateutil import parser
+
+from awslimitchecker.cassette import attach_cassette
+from awslimitchecker.connectable import boto3_client
+
+logger = logging.getLogger(__name__)
+
+#: EventBridge ``detail-type`` of CloudTrail management events
+CLOUDTRAIL_DETAIL_TYPE = 'AWS API Call via CloudTrail'
+
+
+def parse_event(body):
+    """
+    Parse the body of a queue message into a CloudTrail event record. The
+    body may be an EventBridge event for a CloudTrail API call (as delivered
+    to an SQS queue target of an EventBridge rule) or a bare CloudTrail
+    record. Returns None for other events, and for API calls that failed
+    (and so changed nothing).
+
+    :param body: JSON message body
+    :type body: str
+    :returns: CloudTrail event record, or None
+    :rtype: :py:obj:`dict` or :py:obj:`None`
+    """
+    try:
+        event = json.loads(body)
+    except ValueError:
+        logger.warning('Ignoring message that is not valid JSON')
+        return None
+    if not isinstance(event, dict):
+        return None
+    if 'detail' in event:
+        if event.get('detail-type') != CLOUDTRAIL_DETAIL_TYPE:
+            return None
+        event = event['detail']
+    if 'eventName' not in event or 'eventSource' not in event:
+        return None
+    if event.get('errorCode'):
+        return None
+    return event
+
+
+def event_time(detail):
+    """
+    Return the ``eventTime`` of a CloudTrail event record as epoch seconds,
+    or None if it has none (or it can't be parsed).
+
+    :param detail: CloudTrail event record
+    :type detail: dict
+    :rtype: :py:obj:`float` or :py:obj:`None`
+    """
+    try:
+        dt = parser.parse(detail['eventTime'])
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return None
+    if dt.tzinfo is None:
+        return float(calendar.timegm(dt.timetuple()))
+    return float(calendar.timegm(dt.utctimetuple()))
+
+
+class LocalQueue(object):
+    """
+    In-memory stand-in for a boto3 SQS client, implementing
+    ``send_message``, ``receive_message`` and ``delete_message`` (with long
+    polling and visibility timeouts) for any number of queues, identified by
+    ``QueueUrl``. This allows :py:class:`~.EventUpdater` to be fed events
+    from other sources, and to be tested without SQS.
+
+    :param visibility_timeout: seconds that received messages are hidden from
+      other receivers before becoming visible again, unless deleted
+    :type visibility_timeout: int
+    """
+
+    def __init__(self, visibility_timeout=30):
+        self.visibility_timeout = visibility_timeout
+        self._queues = {}
+        self._cond = threading.Condition()
+
+    def _queue(self, url):
+        return self._queues.setdefault(url, OrderedDict())
+
+    def send_message(self, QueueUrl, MessageBody):
+        """
+        Add a message to the queue.
+
+        :param QueueUrl: the queue URL
+        :type QueueUrl: str
+        :param MessageBody: the message body
+        :type MessageBody: str
+        :rtype: dict
+        """
+        msg_id = str(uuid.uuid4())
+        with self._cond:
+            self._queue(QueueUrl)[msg_id] = [MessageBody, 0, None]
+            self._cond.notify_all()
+        return {'MessageId': msg_id}
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages=1,
+                        WaitTimeSeconds=0, VisibilityTimeout=None):
+        """
+        Receive up to ``MaxNumberOfMessages`` visible messages, waiting up to
+        ``WaitTimeSeconds`` for one to become visible.
+
+        :rtype: dict
+        """
+        if VisibilityTimeout is None:
+            VisibilityTimeout = self.visibility_timeout
+        deadline = time.time() + WaitTimeSeconds
+        with self._cond:
+            while True:
+                now = time.time()
+                msgs = []
+                for msg_id, msg in self._queue(QueueUrl).items():
+                    if msg[1] > now:
+                        continue
+                    msg[1] = now + VisibilityTimeout
+                    msg[2] = '%s:%s' % (msg_id, uuid.uuid4())
+                    msgs.append({
+                        'MessageId': msg_id,
+                        'ReceiptHandle': msg[2],
+                        'Body': msg[0]
+                    })
+                    if len(msgs) >= MaxNumberOfMessages:
+                        break
+                if msgs:
+                    return {'Messages': msgs}
+                if now >= deadline:
+                    return {}
+                self._cond.wait(min(deadline - now, 1))
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        """
+        Delete a received message, identified by the receipt handle from its
+        latest receipt.
+
+        :rtype: dict
+        """
+        msg_id = ReceiptHandle.split(':')[0]
+        with self._cond:
+            queue = self._queue(QueueUrl)
+            if msg_id in queue and queue[msg_id][2] == ReceiptHandle:
+                del queue[msg_id]
+        return {}
+
+
+class EventUpdater(object):
+    """
+    Keep usage found by :py:meth:`.AwsLimitChecker.find_usage` up to date
+    by applying CloudTrail management events (i.e. RunInstances,
+    CreateSecurityGroup, CreateVolume) from an SQS queue to current usage,
+    via :py:meth:`._AwsService.apply_event`, instead of finding all usage
+    again. Services whose usage can't be updated from an event are marked
+    for reconciliation, and have their usage found again at most every
+    ``dirty_interval`` seconds; usage for all services is found again every
+    ``reconcile_interval`` seconds to correct any drift.
+
+    CloudTrail events reach the queue minutes after the API call, and the
+    queue may hold events from before the updater started, so events whose
+    ``eventTime`` is before the start of the last time usage was found for a
+    service are not applied to that service; that usage already includes
+    them.
+
+    :param checker: the checker whose usage to keep up to date
+    :type checker: :py:class:`~.AwsLimitChecker`
+    :param queue_url: URL of the SQS queue that receives the events
+    :type queue_url: str
+    :param sqs_client: SQS client (or :py:class:`~.LocalQueue`) to receive
+      messages with; defaults to a boto3 SQS client
+    :param reconcile_interval: seconds between finding usage for all services
+    :type reconcile_interval: int
+    :param dirty_interval: minimum seconds between finding usage for
+      services that couldn't be updated from events
+    :type dirty_interval: int
+    :param wait_time: seconds to long-poll the queue for messages
+    :type wait_time: int
+    :param use_ta: check Trusted Advisor when finding the baseline usage
+    :type use_ta: bool
+    """
+
+    def __init__(self, checker, queue_url, sqs_client=None,
+                 reconcile_interval=3600, dirty_interval=300, wait_time=20,
+                 use_ta=True):
+        self.checker = checker
+        self.queue_url = queue_url
+        if sqs_client is None:
+            sqs_client = attach_cassette(
+                boto3_client('sqs', **checker._boto_conn_kwargs)
+            )
+        self._sqs = sqs_client
+        self.reconcile_interval = reconcile_interval
+        self.dirty_interval = dirty_interval
+        self.wait_time = wait_time
+        self.use_ta = use_ta
+        self.region = None
+        self.dirty = set()
+        self._last_full = None
+        self._last_dirty = None
+        #: dict of service name to the time usage was last found for it
+        self._scanned = {}
+        #: number of events applied to usage
+        self.applied = 0
+        #: number of messages that weren't applied to any usage
+        self.ignored = 0
+        #: number of times usage was found again
+        self.reconciliations = 0
+
+    def baseline(self):
+        """
+        Find usage for all services.
+        """
+        self.region = self.checker.region_name
+        logger.info('Finding baseline usage')
+        start = time.time()
+        self.checker.find_usage(use_ta=self.use_ta)
+        self._set_scanned(self.checker.services.keys(), start)
+        self._last_full = self._last_dirty = start
+        self.dirty.clear()
+
+    def _set_scanned(self, services, when):
+        """
+        Record the time usage started to be found for some services, and
+        have them forget the usage deltas of events applied before then.
+
+        :param services: names of the services
+        :type services: iterable
+        :param when: epoch seconds usage started to be found at
+        :type when: float
+        """
+        for sname in services:
+            self._scanned[sname] = when
+            self.checker.services[sname]._clear_event_deltas()
+
+    def handle_message(self, body):
+        """
+        Apply the event in one queue message body to current usage.
+
+        :param body: JSON message body
+        :type body: str
+        :returns: whether usage was updated
+        :rtype: bool
+        """
+        detail = parse_event(body)
+        if detail is None or detail.get('awsRegion', self.region) != \
+                self.region:
+            self.ignored += 1
+            return False
+        api_name = detail['eventSource'].split('.')[0]
+        when = event_time(detail)
+        applied = False
+        for sname, cls in sorted(self.checker.services.items()):
+            if cls.api_name != api_name:
+                continue
+            if when is not None and when < self._scanned.get(sname, 0):
+                logger.debug(
+                    'Not applying %s event from %s to %s usage found after '
+                    'it', detail['eventName'], detail['eventTime'], sname
+                )
+                continue
+            res = cls.apply_event(detail['eventName'], detail)
+            if res is False:
+                logger.debug(
+                    'Unable to apply %s event to %s usage; marking for '
+                    'reconciliation', detail['eventName'], sname
+                )
+                self.dirty.add(sname)
+            elif res:
+                applied = True
+        if applied:
+            self.applied += 1
+        else:
+            self.ignored += 1
+        return applied
+
+    def poll(self):
+        """
+        Receive one batch of messages from the queue, apply their events to
+        current usage, and delete them.
+
+        :returns: number of events applied to usage
+        :rtype: int
+        """
+        resp = self._sqs.receive_message(
+            QueueUrl=self.queue_url, MaxNumberOfMessages=10,
+            WaitTimeSeconds=self.wait_time
+        )
+        count = 0
+        for msg in resp.get('Messages', []):
+            if self.handle_message(msg['Body']):
+                count += 1
+            self._sqs.delete_message(
+                QueueUrl=self.queue_url, ReceiptHandle=msg['ReceiptHandle']
+            )
+        return count
+
+    def reconcile(self, now=None):
+        """
+        Find usage again for all services, if ``reconcile_interval`` has
+        passed since usage was last found for all services, or otherwise for
+        services marked for reconciliation, if ``dirty_interval`` has passed.
+
+        :param now: the current time, or None for :py:func:`time.time`
+        :type now: float
+        :returns: whether usage was found again
+        :rtype: bool
+        """
+        if now is None:
+            now = time.time()
+        if now - self._last_full >= self.reconcile_interval:
+            logger.info('Reconciling usage for all services')
+            self.checker.find_usage(use_ta=False)
+            self._set_scanned(self.checker.services.keys(), now)
+            self._last_full = now
+            self.dirty.clear()
+        elif self.dirty and now - self._last_dirty >= self.dirty_interval:
+            logger.info('Reconciling usage for: %s', sorted(self.dirty))
+            self.checker.find_usage(service=sorted(self.dirty), use_ta=False)
+            self._set_scanned(self.dirty, now)
+            self.dirty.clear()
+        else:
+            return False
+        self._last_dirty = now
+        self.reconciliations += 1
+        return True
+
+    def run(self, on_update=None, iterations=None):
+        """
+        Find baseline usage, and then repeatedly :py:meth:`~.poll` the queue
+        and :py:meth:`~.reconcile` usage, calling ``on_update`` (if given)
+        after the baseline and whenever usage changes.
+
+        :param on_update: callable taking no arguments
+        :type on_update: ``callable``
+        :param iterations: number of times to poll, or None to run forever
+        :type iterations: int
+        """
+        self.baseline()
+        if on_update is not None:
+            on_update()
+        count = 0
+        while iterations is None or count < iterations:
+            count += 1
+            changed = self.poll() > 0
+            changed = self.reconcile() or changed
+            if changed and on_update is not None:
+                on_update()
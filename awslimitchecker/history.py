@@ -0,0 +1,330 @@
+"""
+awslimitchecker/history.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import os
+import time
+import logging
+import sqlite3
+from collections import namedtuple
+
+from awslimitchecker.utils import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+#: Resolution (in seconds) of raw samples as recorded.
+RAW = 0
+
+#: Default retention tiers, as a list of ``(resolution, max_age)`` 2-tuples
+#: in seconds, finest first. Samples older than ``max_age`` are aggregated
+#: into the next tier by :py:meth:`~.HistoryStore.compact`; those older than
+#: the last tier's ``max_age`` are deleted. The defaults keep raw samples for
+#: a week, hourly aggregates for 90 days and daily aggregates for 5 years.
+DEFAULT_RETENTION = [
+    (RAW, 7 * 86400),
+    (3600, 90 * 86400),
+    (86400, 5 * 365 * 86400),
+]
+
+
+class HistoryPoint(namedtuple('HistoryPoint', [
+    'account_id', 'region', 'service', 'limit', 'resource_id', 'timestamp',
+    'resolution', 'usage', 'max_usage', 'limit_value', 'samples'
+])):
+    """
+    One (possibly aggregated) usage sample returned by
+    :py:meth:`.HistoryStore.query`.
+
+    Fields:
+
+    * ``account_id``, ``region`` - where the sample was recorded
+    * ``service``, ``limit`` - service and limit name
+    * ``resource_id`` - resource ID for per-resource usage, or ``None``
+    * ``timestamp`` - integer epoch seconds; for aggregates, the start of
+      the aggregation interval
+    * ``resolution`` - aggregation interval in seconds (0 for raw samples)
+    * ``usage`` - usage value, or the mean usage over the interval
+    * ``max_usage`` - maximum usage over the interval
+    * ``limit_value`` - effective limit (or per-resource maximum), or None
+    * ``samples`` - number of raw samples aggregated into this point
+    """
+
+    __slots__ = ()
+
+
+class HistoryStore(object):
+    """
+    Embedded SQLite time-series store for limit and usage history. Each call
+    to :py:meth:`~.record` stores one sample per account, region, limit and
+    resource from a :py:class:`~.CheckResult`; :py:meth:`~.compact`
+    downsamples old samples into coarser aggregates according to the
+    retention tiers, so storage stays bounded no matter how long it is
+    recorded to.
+    """
+
+    _schema = [
+        'CREATE TABLE IF NOT EXISTS samples ('
+        'account_id TEXT NOT NULL, region TEXT NOT NULL, '
+        'service TEXT NOT NULL, limit_name TEXT NOT NULL, '
+        'resource_id TEXT NOT NULL, ts INTEGER NOT NULL, '
+        'resolution INTEGER NOT NULL, usage_sum REAL NOT NULL, '
+        'usage_max REAL NOT NULL, samples INTEGER NOT NULL, '
+        'limit_value REAL)',
+        'CREATE UNIQUE INDEX IF NOT EXISTS samples_key ON samples '
+        '(resolution, account_id, region, service, limit_name, resource_id, '
+        'ts)',
+        'CREATE INDEX IF NOT EXISTS samples_limit_ts ON samples '
+        '(service, limit_name, ts)',
+    ]
+
+    _key_cols = 'account_id, region, service, limit_name, resource_id'
+
+    def __init__(self, path=None, retention=None):
+        """
+        Open (creating if needed) a history store.
+
+        :param path: path to the SQLite database file; defaults to
+          ``history.sqlite`` in the directory returned by
+          :py:func:`~awslimitchecker.utils.get_cache_dir`
+        :type path: str
+        :param retention: retention tiers; see :py:data:`~.DEFAULT_RETENTION`
+        :type retention: list
+        """
+        if path is None:
+            path = os.path.join(get_cache_dir(), 'history.sqlite')
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        self.path = path
+        if retention is None:
+            retention = DEFAULT_RETENTION
+        self.retention = sorted(retention)
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            for stmt in self._schema:
+                self._conn.execute(stmt)
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def record(self, result, account_id=None, region=None, timestamp=None):
+        """
+        Record one sample for each usage of each limit in ``result``.
+
+        :param result: result of checking thresholds
+        :type result: :py:class:`~.CheckResult`
+        :param account_id: account ID to record the samples under; if None,
+          this is determined from the first limit's service (which may call
+          STS GetCallerIdentity)
+        :type account_id: str
+        :param region: region name to record the samples under
+        :type region: str
+        :param timestamp: sample time as epoch seconds; defaults to now
+        :type timestamp: int
+        :return: number of samples recorded
+        :rtype: int
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        timestamp = int(timestamp)
+        rows = []
+        for svc_name, svc_limits in sorted(result.limits.items()):
+            for lim_name, lim in sorted(svc_limits.items()):
+                if account_id is None:
+                    account_id = lim.service.current_account_id
+                limit = lim.get_limit()
+                for u in lim.get_current_usage():
+                    maximum = u.get_maximum()
+                    value = u.get_value()
+                    rows.append((
+                        account_id, region or '', svc_name, lim_name,
+                        u.resource_id or '', timestamp, RAW, value, value, 1,
+                        maximum if maximum is not None else limit
+                    ))
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO samples (%s, ts, resolution, '
+                'usage_sum, usage_max, samples, limit_value) VALUES '
+                '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)' % self._key_cols, rows
+            )
+        logger.debug('Recorded %d samples to history store %s',
+                     len(rows), self.path)
+        return len(rows)
+
+    def query(self, service=None, limit=None, account_id=None, region=None,
+              resource_id=None, start=None, end=None, resolution=None):
+        """
+        Return recorded samples matching all of the given criteria, ordered
+        by time (then account, region, service, limit and resource).
+
+        :param service: service name
+        :type service: str
+        :param limit: limit name
+        :type limit: str
+        :param account_id: account ID
+        :type account_id: str
+        :param region: region name
+        :type region: str
+        :param resource_id: resource ID; use ``''`` for usage without one
+        :type resource_id: str
+        :param start: only return samples at or after this epoch time
+        :type start: int
+        :param end: only return samples before this epoch time
+        :type end: int
+        :param resolution: only return samples of this resolution (see
+          :py:data:`~.DEFAULT_RETENTION`); by default, return all of them
+        :type resolution: int
+        :rtype: list of :py:class:`~.HistoryPoint`
+        """
+        where = []
+        params = []
+        for col, val in [
+            ('service', service), ('limit_name', limit),
+            ('account_id', account_id), ('region', region),
+            ('resource_id', resource_id), ('resolution', resolution)
+        ]:
+            if val is not None:
+                where.append('%s = ?' % col)
+                params.append(val)
+        if start is not None:
+            where.append('ts >= ?')
+            params.append(int(start))
+        if end is not None:
+            where.append('ts < ?')
+            params.append(int(end))
+        sql = 'SELECT %s, ts, resolution, usage_sum, usage_max, samples, ' \
+              'limit_value FROM samples' % self._key_cols
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY ts, %s' % self._key_cols
+        res = []
+        for row in self._conn.execute(sql, params):
+            res.append(HistoryPoint(
+                account_id=row[0], region=row[1], service=row[2],
+                limit=row[3], resource_id=row[4] or None, timestamp=row[5],
+                resolution=row[6], usage=row[7] / row[9], max_usage=row[8],
+                limit_value=row[10], samples=row[9]
+            ))
+        return res
+
+    def compact(self, now=None, vacuum=False):
+        """
+        Apply the retention tiers: aggregate samples older than each tier's
+        maximum age into the next tier (summing usage and sample counts,
+        keeping the maximum usage and the highest limit value), and delete
+        samples older than the last tier's maximum age.
+
+        :param now: current time as epoch seconds; defaults to now
+        :type now: int
+        :param vacuum: whether to also ``VACUUM`` the database, returning
+          freed space to the filesystem
+        :type vacuum: bool
+        :return: number of rows removed
+        :rtype: int
+        """
+        if now is None:
+            now = time.time()
+        now = int(now)
+        removed = 0
+        with self._conn:
+            for idx, (res, max_age) in enumerate(self.retention):
+                cutoff = now - max_age
+                if idx + 1 < len(self.retention):
+                    nxt = self.retention[idx + 1][0]
+                    self._downsample(res, nxt, cutoff)
+                cur = self._conn.execute(
+                    'DELETE FROM samples WHERE resolution = ? AND ts < ?',
+                    (res, cutoff)
+                )
+                removed += cur.rowcount
+        if vacuum:
+            self._conn.execute('VACUUM')
+        logger.debug('Compacted history store %s; removed %d rows',
+                     self.path, removed)
+        return removed
+
+    def _downsample(self, resolution, new_resolution, cutoff):
+        """
+        Merge samples of ``resolution`` older than ``cutoff`` into
+        aggregates of ``new_resolution``. Must be called in a transaction.
+
+        :param resolution: resolution of the samples to aggregate
+        :type resolution: int
+        :param new_resolution: resolution to aggregate them to
+        :type new_resolution: int
+        :param cutoff: aggregate samples before this epoch time
+        :type cutoff: int
+        """
+        rows = self._conn.execute(
+            'SELECT %s, (ts / ?) * ?, SUM(usage_sum), MAX(usage_max), '
+            'SUM(samples), MAX(limit_value) FROM samples '
+            'WHERE resolution = ? AND ts < ? GROUP BY %s, (ts / ?)' % (
+                self._key_cols, self._key_cols
+            ), (new_resolution, new_resolution, resolution, cutoff,
+                new_resolution)
+        ).fetchall()
+        for row in rows:
+            key = row[:6]
+            usage_sum, usage_max, samples, limit_value = row[6:]
+            cur = self._conn.execute(
+                'UPDATE samples SET usage_sum = usage_sum + ?, '
+                'usage_max = MAX(usage_max, ?), samples = samples + ?, '
+                'limit_value = MAX(IFNULL(limit_value, ?), '
+                'IFNULL(?, limit_value)) '
+                'WHERE resolution = ? AND account_id = ? AND region = ? AND '
+                'service = ? AND limit_name = ? AND resource_id = ? AND '
+                'ts = ?', (usage_sum, usage_max, samples, limit_value,
+                           limit_value, new_resolution) + key
+            )
+            if cur.rowcount == 0:
+                self._conn.execute(
+                    'INSERT INTO samples (%s, ts, resolution, usage_sum, '
+                    'usage_max, samples, limit_value) VALUES '
+                    '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)' % self._key_cols,
+                    key + (new_resolution, usage_sum, usage_max, samples,
+                           limit_value)
+                )
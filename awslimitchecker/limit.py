@@ -37,6 +37,16 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 ################################################################################
 """
 
+from array import array
+from collections.abc import Sequence
+
+from .utils import top_k_indexes
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 #: indicates a limit value that came from hard-coded defaults in awslimitchecker
 SOURCE_DEFAULT = 0
 
@@ -130,7 +140,8 @@ class AwsLimit(object):
         self.ta_limit = None
         self.ta_unlimited = False
         self.api_limit = None
-        self._current_usage = []
+        self._usage = _UsageStore()
+        self._skipped = None
         self.def_warning_threshold = def_warning_threshold
         self.def_critical_threshold = def_critical_threshold
         self.warn_percent = None
@@ -267,20 +278,45 @@ class AwsLimit(object):
         :returns: whether of not some resources have a defined maximum
         :rtype: bool
         """
-        return any(usage for usage in self._current_usage if
-                   usage.get_maximum())
+        return self._usage.has_maximums()
+
+    @property
+    def _current_usage(self):
+        """
+        Read-only sequence view of the current usage; see
+        :py:meth:`~.get_current_usage`. Assigning a list of
+        :py:class:`~.AwsLimitUsage` instances replaces all current usage.
+
+        :rtype: :py:class:`~._UsageView`
+        """
+        return _UsageView(self, self._usage)
+
+    @_current_usage.setter
+    def _current_usage(self, usages):
+        store = _UsageStore()
+        for u in usages:
+            store.append(
+                u.value, maximum=u.maximum, resource_id=u.resource_id,
+                aws_type=u.aws_type
+            )
+        self._usage = store
 
     def get_current_usage(self):
         """
-        Get the current usage for this limit, as a list of
+        Get the current usage for this limit, as a sequence of
         :py:class:`~.AwsLimitUsage` instances.
 
-        :returns: list of current usage values
-        :rtype: :py:obj:`list` of :py:class:`~.AwsLimitUsage`
+        Usage is stored internally in a compact, columnar form (see
+        :py:class:`~._UsageStore`); the returned sequence supports ``len()``,
+        indexing, iteration and comparison to a list, and creates
+        :py:class:`~.AwsLimitUsage` instances lazily as they are accessed.
+
+        :returns: current usage values
+        :rtype: :py:class:`~._UsageView` of :py:class:`~.AwsLimitUsage`
         """
         return self._current_usage
 
-    def get_current_usage_str(self):
+    def get_current_usage_str(self, top_k=None):
         """
         Get the a string describing the current usage for this limit.
 
@@ -297,28 +333,27 @@ class AwsLimit(object):
         of the ``AwsLimitUsage.__str__`` values of all usage
         instances in ascending order.
 
+        If ``top_k`` is less than the number of usage instances, ``Y`` is
+        instead of the form ``top K of N: Z``, where ``Z`` lists only the
+        ``top_k`` highest usage values in ascending order. These are found
+        without sorting all usage; see :py:func:`~.top_k_indexes`.
+
+        :param top_k: maximum number of usage values to list, or None for all
+        :type top_k: ``int`` or ``None``
         :returns: representation of current usage
         :rtype: str
         """
-        if len(self._current_usage) == 0:
-            return '<unknown>'
-        if len(self._current_usage) == 1:
-            return str(self._current_usage[0])
-        lim_str = ', '.join([str(x) for x in sorted(self._current_usage)])
-        s = 'max: {m} ({l})'.format(
-            m=str(max(self._current_usage)),
-            l=lim_str
-        )
-        return s
+        return self._current_usage.summary_str(top_k=top_k)
 
     def _add_current_usage(self, value, maximum=None, resource_id=None,
                            aws_type=None):
         """
         Add a new current usage value for this limit.
 
-        Creates a new :py:class:`~.AwsLimitUsage` instance and
-        appends it to the internal list. If more than one usage value
-        is given to this service, they should have ``id`` and
+        Appends the usage to this limit's internal :py:class:`~._UsageStore`;
+        the corresponding :py:class:`~.AwsLimitUsage` instance is only created
+        when it is accessed via :py:meth:`~.get_current_usage`. If more than
+        one usage value is given to this service, they should have ``id`` and
         ``aws_type`` set.
 
         This method should only be called from the :py:class:`~._AwsService`
@@ -335,19 +370,84 @@ class AwsLimit(object):
           `CloudFormation <http://docs.aws.amazon.com/AWSCloudFormation/latest/UserGuide/aws-template-resource-type-ref.html>`_  # noqa
         :type aws_type: str
         """
-        self._current_usage.append(
-            AwsLimitUsage(
-                self,
-                value,
-                maximum=maximum,
-                resource_id=resource_id,
-                aws_type=aws_type
-            )
+        self._usage.append(
+            value,
+            maximum=maximum,
+            resource_id=resource_id,
+            aws_type=aws_type
         )
 
+    def _adjust_current_usage(self, delta, resource_id=None, aws_type=None):
+        """
+        Add ``delta`` (which may be negative) to the current usage value for
+        ``resource_id``, or to the usage without a resource ID if
+        ``resource_id`` is None, without going below zero. If there is no such
+        usage yet, one is added with a value of ``delta`` (or zero).
+
+        This is used to apply incremental updates (see
+        :py:class:`~.EventUpdater`) to usage found by
+        :py:meth:`~._AwsService.find_usage`, and should only be called from
+        the :py:class:`~._AwsService` instance that manages this Limit. The
+        usage storage is replaced by an updated copy rather than changed in
+        place, so :py:class:`~.LimitResult` snapshots taken earlier are not
+        affected.
+
+        :param delta: amount to change the usage value by
+        :type delta: :py:obj:`int` or :py:obj:`float`
+        :param resource_id: AWS ID of the resource whose usage to change
+        :type resource_id: str
+        :param aws_type: the AWS resource type, for a new usage value
+        :type aws_type: str
+        :returns: the new usage value
+        :rtype: :py:obj:`int` or :py:obj:`float`
+        """
+        store = self._usage.copy()
+        value = store.adjust(delta, resource_id=resource_id, aws_type=aws_type)
+        self._usage = store
+        return value
+
+    def _remove_current_usage(self, resource_id):
+        """
+        Remove the current usage value(s) for ``resource_id``, i.e. when that
+        resource has been deleted. As with
+        :py:meth:`~._adjust_current_usage`, the usage storage is replaced
+        rather than changed in place.
+
+        :param resource_id: AWS ID of the resource
+        :type resource_id: str
+        :returns: number of usage values removed
+        :rtype: int
+        """
+        store = self._usage.without(resource_id)
+        removed = len(self._usage) - len(store)
+        if removed > 0:
+            self._usage = store
+        return removed
+
     def _reset_usage(self):
         """Discard all current usage data."""
-        self._current_usage = []
+        self._usage = _UsageStore()
+        self._skipped = None
+
+    def _set_skipped(self, reason):
+        """
+        Mark usage of this limit as not found, because an API call needed to
+        find it was skipped (i.e. by a :py:class:`~.CircuitBreaker`), until
+        usage is next reset.
+
+        :param reason: why usage was not found
+        :type reason: str
+        """
+        self._skipped = reason
+
+    def get_skipped(self):
+        """
+        If usage of this limit was not found because an API call needed to
+        find it was skipped, return the reason; otherwise return None.
+
+        :rtype: ``str`` or ``None``
+        """
+        return self._skipped
 
     def _get_thresholds(self):
         """
@@ -421,30 +521,14 @@ class AwsLimit(object):
         respectively. If *any* of these evaluations failed, the method returns
         False.
 
+        Warnings and criticals are recomputed from scratch on every call, so
+        this may be called again after changing limit or threshold overrides.
+        To check many limits at once, see :py:func:`~.evaluate_thresholds`.
+
         :returns: False if any thresholds were crossed, True otherwise
         :rtype: bool
         """
-        (warn_int, warn_pct, crit_int, crit_pct) = self._get_thresholds()
-        all_ok = True
-        for u in self._current_usage:
-            usage = u.get_value()
-            limit = u.get_maximum() or self.get_limit()
-            if limit is None or limit == 0:
-                continue
-            pct = (usage / (limit * 1.0)) * 100
-            if crit_int is not None and usage >= crit_int:
-                self._criticals.append(u)
-                all_ok = False
-            elif pct >= crit_pct:
-                self._criticals.append(u)
-                all_ok = False
-            elif warn_int is not None and usage >= warn_int:
-                self._warnings.append(u)
-                all_ok = False
-            elif pct >= warn_pct:
-                self._warnings.append(u)
-                all_ok = False
-        return all_ok
+        return evaluate_thresholds([self])[0]
 
     def get_warnings(self):
         """
@@ -529,8 +613,132 @@ class AwsLimit(object):
         return self._quotas_unit
 
 
+def evaluate_thresholds(limits):
+    """
+    Check the current usage of every limit in ``limits`` against its
+    thresholds, as described in :py:meth:`~.AwsLimit.check_thresholds`, and
+    set each limit's warnings and criticals (replacing any from a previous
+    check).
+
+    The effective limit (:py:meth:`~.AwsLimit.get_limit`) and thresholds of
+    each limit are computed once, and all usages of all limits are then
+    evaluated in a single vectorized pass over the limits' usage columns if
+    `NumPy <https://numpy.org/>`_ is installed, or in a plain Python loop
+    over the same columns otherwise. Usages that crossed a threshold are
+    returned by :py:meth:`~.AwsLimit.get_warnings` and
+    :py:meth:`~.AwsLimit.get_criticals` in the order they were added.
+
+    :param limits: the limits to check
+    :type limits: :py:obj:`list` of :py:class:`~.AwsLimit`
+    :returns: for each limit, in order, False if any thresholds were crossed,
+      True otherwise
+    :rtype: :py:obj:`list` of :py:obj:`bool`
+    """
+    params = []
+    for lim in limits:
+        (warn_int, warn_pct, crit_int, crit_pct) = lim._get_thresholds()
+        params.append((
+            lim.get_limit(), warn_int, warn_pct, crit_int, crit_pct
+        ))
+    if numpy is not None:
+        levels = _threshold_levels_numpy(limits, params)
+    else:
+        levels = _threshold_levels_python(limits, params)
+    results = []
+    for lim, lim_levels in zip(limits, levels):
+        view = lim._current_usage
+        lim._warnings = [view[i] for i in lim_levels[0]]
+        lim._criticals = [view[i] for i in lim_levels[1]]
+        results.append(not (lim._warnings or lim._criticals))
+    return results
+
+
+def _threshold_levels_numpy(limits, params):
+    """
+    Vectorized implementation for :py:func:`~.evaluate_thresholds`.
+
+    :param limits: the limits to check
+    :type limits: :py:obj:`list` of :py:class:`~.AwsLimit`
+    :param params: for each limit, a tuple of its effective limit value and
+      its four :py:meth:`~.AwsLimit._get_thresholds` values
+    :type params: list
+    :returns: for each limit, a 2-tuple of the lists of indexes of its usages
+      that crossed the warning and critical thresholds
+    :rtype: list
+    """
+    counts = numpy.array([len(lim._usage) for lim in limits], dtype=int)
+    if counts.sum() == 0:
+        return [([], []) for _ in limits]
+
+    def column(idx):
+        # per-limit parameter repeated once per usage; None never matches
+        return numpy.repeat(numpy.array([
+            numpy.nan if p[idx] is None else p[idx] for p in params
+        ], dtype=float), counts)
+
+    values = numpy.concatenate([
+        numpy.frombuffer(lim._usage.values, dtype=float) for lim in limits
+    ])
+    maximums = numpy.concatenate([
+        numpy.frombuffer(lim._usage.maximums, dtype=float) for lim in limits
+    ])
+    effective = numpy.where(maximums != 0, maximums, column(0))
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        pct = (values / effective) * 100
+        checked = ~numpy.isnan(effective) & (effective != 0)
+        crit = checked & ((values >= column(3)) | (pct >= column(4)))
+        warn = checked & ~crit & (
+            (values >= column(1)) | (pct >= column(2))
+        )
+    res = []
+    start = 0
+    for count in counts:
+        end = start + count
+        res.append((
+            numpy.flatnonzero(warn[start:end]).tolist(),
+            numpy.flatnonzero(crit[start:end]).tolist()
+        ))
+        start = end
+    return res
+
+
+def _threshold_levels_python(limits, params):
+    """
+    Pure-Python implementation for :py:func:`~.evaluate_thresholds`, used
+    when NumPy is not installed. Parameters and return value are the same as
+    :py:func:`~._threshold_levels_numpy`.
+
+    :rtype: list
+    """
+    res = []
+    for lim, (limit, warn_int, warn_pct, crit_int, crit_pct) in zip(
+        limits, params
+    ):
+        warns = []
+        crits = []
+        for idx, (usage, maximum) in enumerate(
+            zip(lim._usage.values, lim._usage.maximums)
+        ):
+            eff = maximum or limit
+            if eff is None or eff == 0:
+                continue
+            pct = (usage / (eff * 1.0)) * 100
+            if crit_int is not None and usage >= crit_int:
+                crits.append(idx)
+            elif pct >= crit_pct:
+                crits.append(idx)
+            elif warn_int is not None and usage >= warn_int:
+                warns.append(idx)
+            elif pct >= warn_pct:
+                warns.append(idx)
+        res.append((warns, crits))
+    return res
+
+
 class AwsLimitUsage(object):
 
+    __slots__ = ('limit', 'value', 'maximum', 'resource_id', 'aws_type')
+
     def __init__(self, limit, value, maximum=None, resource_id=None,
                  aws_type=None):
         """
@@ -616,3 +824,305 @@ class AwsLimitUsage(object):
 
     def __ge__(self, other):
         return self.value >= other.value
+
+
+class _UsageStore(object):
+    """
+    Compact, column-oriented storage for the usage values of one
+    :py:class:`~.AwsLimit`.
+
+    Limits such as "Rules per VPC security group" can have hundreds of
+    thousands of per-resource usages in large accounts. Rather than one
+    :py:class:`~.AwsLimitUsage` object per usage, values and maximums are
+    stored in ``array`` columns of doubles and ``aws_type`` is stored as an
+    index into a small table of distinct types. Resource IDs are kept as
+    references to the caller's strings; they are *not* passed through
+    ``sys.intern()``, as most IDs are unique and the interned-string table
+    would cost more memory than it saves.
+    A flags column records whether each value and maximum was an ``int`` or a
+    ``float`` so that they round-trip unchanged; any other value type (or an
+    integer too large to store exactly) is kept as-is in a side table. A
+    maximum of ``None`` is stored as ``0``, which has the same meaning when
+    evaluating thresholds.
+    """
+
+    #: flag bit set when the value is a float
+    VALUE_FLOAT = 1
+    #: flag bit set when the maximum is not None
+    HAS_MAX = 2
+    #: flag bit set when the maximum is a float
+    MAX_FLOAT = 4
+    #: flag bit set when the value and/or maximum is kept in ``_objects``
+    OBJECT = 8
+
+    #: largest integer that can be stored exactly as a double
+    MAX_EXACT_INT = 2 ** 53
+
+    __slots__ = (
+        'values', 'maximums', '_flags', '_resource_ids', '_type_idx',
+        '_types', '_type_map', '_objects'
+    )
+
+    def __init__(self):
+        #: ``array`` of usage values, as doubles
+        self.values = array('d')
+        #: ``array`` of usage maximums, as doubles (``0`` if None)
+        self.maximums = array('d')
+        self._flags = array('B')
+        self._resource_ids = []
+        self._type_idx = array('H')
+        self._types = [None]
+        self._type_map = {None: 0}
+        self._objects = {}
+
+    def __len__(self):
+        return len(self._flags)
+
+    def append(self, value, maximum=None, resource_id=None, aws_type=None):
+        """
+        Append one usage to the store.
+
+        :param value: the numeric usage value
+        :type value: :py:obj:`int` or :py:obj:`float`
+        :param maximum: the numeric maximum value
+        :type maximum: :py:obj:`int` or :py:obj:`float`
+        :param resource_id: AWS ID for the resource this usage describes
+        :type resource_id: str
+        :param aws_type: the AWS resource type that ``resource_id`` represents
+        :type aws_type: str
+        """
+        idx = len(self._flags)
+        flags = 0
+        if type(value) is float:
+            flags |= self.VALUE_FLOAT
+        elif type(value) is not int or abs(value) > self.MAX_EXACT_INT:
+            flags |= self.OBJECT
+            self._objects[(idx, 0)] = value
+        if maximum is not None:
+            flags |= self.HAS_MAX
+            if type(maximum) is float:
+                flags |= self.MAX_FLOAT
+            elif type(maximum) is not int or abs(
+                maximum
+            ) > self.MAX_EXACT_INT:
+                flags |= self.OBJECT
+                self._objects[(idx, 1)] = maximum
+        self.values.append(self._to_float(value))
+        self.maximums.append(self._to_float(maximum))
+        self._resource_ids.append(resource_id)
+        if aws_type not in self._type_map:
+            self._type_map[aws_type] = len(self._types)
+            self._types.append(aws_type)
+        self._type_idx.append(self._type_map[aws_type])
+        self._flags.append(flags)
+
+    def adjust(self, delta, resource_id=None, aws_type=None):
+        """
+        Add ``delta`` to the value of the first usage for ``resource_id``,
+        without going below zero, or append a new usage with a value of
+        ``delta`` (or zero) if there is none.
+
+        :param delta: amount to change the usage value by
+        :type delta: :py:obj:`int` or :py:obj:`float`
+        :param resource_id: AWS ID of the resource whose usage to change
+        :type resource_id: str
+        :param aws_type: the AWS resource type, for a new usage
+        :type aws_type: str
+        :returns: the new usage value
+        :rtype: :py:obj:`int` or :py:obj:`float`
+        """
+        try:
+            idx = self._resource_ids.index(resource_id)
+        except ValueError:
+            value = max(delta, 0)
+            self.append(value, resource_id=resource_id, aws_type=aws_type)
+            return value
+        value = max(self.get(idx)[0] + delta, 0)
+        flags = self._flags[idx] & ~(self.VALUE_FLOAT | self.OBJECT)
+        self._objects.pop((idx, 0), None)
+        if type(value) is float:
+            flags |= self.VALUE_FLOAT
+        elif type(value) is not int or abs(value) > self.MAX_EXACT_INT:
+            self._objects[(idx, 0)] = value
+        if (idx, 0) in self._objects or (idx, 1) in self._objects:
+            flags |= self.OBJECT
+        self.values[idx] = self._to_float(value)
+        self._flags[idx] = flags
+        return value
+
+    def copy(self):
+        """
+        Return a copy of this store, which can be changed without affecting
+        this one.
+
+        :rtype: :py:class:`~._UsageStore`
+        """
+        new = _UsageStore()
+        new.values = array('d', self.values)
+        new.maximums = array('d', self.maximums)
+        new._flags = array('B', self._flags)
+        new._resource_ids = list(self._resource_ids)
+        new._type_idx = array('H', self._type_idx)
+        new._types = list(self._types)
+        new._type_map = dict(self._type_map)
+        new._objects = dict(self._objects)
+        return new
+
+    def without(self, resource_id):
+        """
+        Return a new store with all usages of this one except those for
+        ``resource_id``. This is linear in the number of usages.
+
+        :param resource_id: AWS ID of the resource
+        :type resource_id: str
+        :rtype: :py:class:`~._UsageStore`
+        """
+        new = _UsageStore()
+        for idx in range(len(self)):
+            if self._resource_ids[idx] != resource_id:
+                value, maximum, rid, aws_type = self.get(idx)
+                new.append(
+                    value, maximum=maximum, resource_id=rid, aws_type=aws_type
+                )
+        return new
+
+    @staticmethod
+    def _to_float(value):
+        """
+        Convert a usage value or maximum to a float for storage in a column;
+        ``None`` (or anything not convertible) is stored as ``0``.
+
+        :rtype: float
+        """
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def get(self, idx):
+        """
+        Return a 4-tuple of the ``value``, ``maximum``, ``resource_id`` and
+        ``aws_type`` of the usage at index ``idx``, as originally given to
+        :py:meth:`~.append`.
+
+        :param idx: index of the usage
+        :type idx: int
+        :rtype: tuple
+        """
+        flags = self._flags[idx]
+        if flags & self.OBJECT and (idx, 0) in self._objects:
+            value = self._objects[(idx, 0)]
+        elif flags & self.VALUE_FLOAT:
+            value = self.values[idx]
+        else:
+            value = int(self.values[idx])
+        maximum = None
+        if flags & self.OBJECT and (idx, 1) in self._objects:
+            maximum = self._objects[(idx, 1)]
+        elif flags & self.MAX_FLOAT:
+            maximum = self.maximums[idx]
+        elif flags & self.HAS_MAX:
+            maximum = int(self.maximums[idx])
+        return (
+            value, maximum, self._resource_ids[idx],
+            self._types[self._type_idx[idx]]
+        )
+
+    def has_maximums(self):
+        """
+        Return whether any usage has a non-zero maximum.
+
+        :rtype: bool
+        """
+        return any(self.maximums)
+
+
+class _UsageView(Sequence):
+    """
+    Read-only sequence of :py:class:`~.AwsLimitUsage` instances backed by a
+    :py:class:`~._UsageStore`, as returned by
+    :py:meth:`~.AwsLimit.get_current_usage`. Instances are created lazily on
+    access, and the view compares equal to a list of equal usages.
+    """
+
+    def __init__(self, limit, store):
+        self._limit = limit
+        self._store = store
+
+    def __len__(self):
+        return len(self._store)
+
+    def _make(self, idx):
+        value, maximum, resource_id, aws_type = self._store.get(idx)
+        return AwsLimitUsage(
+            self._limit, value, maximum=maximum, resource_id=resource_id,
+            aws_type=aws_type
+        )
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._make(i) for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError('usage index out of range')
+        return self._make(idx)
+
+    def __iter__(self):
+        for idx in range(len(self._store)):
+            yield self._make(idx)
+
+    def rows(self):
+        """
+        Iterate over the usages as ``(value, maximum, resource_id,
+        aws_type)`` 4-tuples, without creating :py:class:`~.AwsLimitUsage`
+        instances.
+
+        :rtype: generator of tuple
+        """
+        for idx in range(len(self._store)):
+            yield self._store.get(idx)
+
+    def summary_str(self, top_k=None):
+        """
+        Return a string describing these usages; see
+        :py:meth:`.AwsLimit.get_current_usage_str`.
+
+        :param top_k: maximum number of usage values to list, or None for all
+        :type top_k: ``int`` or ``None``
+        :rtype: str
+        """
+        num = len(self._store)
+        if num == 0:
+            return '<unknown>'
+        if num == 1:
+            return str(self[0])
+        values = self._store.values
+        max_idx = max(range(num), key=values.__getitem__)
+        idxs = top_k_indexes(values, top_k)
+        lim_str = ', '.join([str(self[i]) for i in idxs])
+        if len(idxs) < num:
+            lim_str = 'top {k} of {n}: {s}'.format(
+                k=len(idxs), n=num, s=lim_str
+            )
+        s = 'max: {m} ({l})'.format(
+            m=str(self[max_idx]),
+            l=lim_str
+        )
+        return s
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, tuple, Sequence)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        res = self.__eq__(other)
+        if res is NotImplemented:
+            return res
+        return not res
+
+    def __repr__(self):
+        return '<_UsageView of %d usages for %s>' % (
+            len(self), self._limit.name
+        )
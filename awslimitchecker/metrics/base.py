@@ -38,16 +38,196 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 """
 
 import logging
+import gzip
+import json
+import time
+import threading
 from abc import ABCMeta, abstractmethod
+from queue import Queue
+
+import urllib3
+
+from awslimitchecker.utils import load_cache_json, save_cache_json
 
 logger = logging.getLogger(__name__)
 
 
+class PayloadSendError(Exception):
+    """
+    A payload could not be sent by :py:class:`~.PayloadSender`; either the
+    last attempt received an HTTP error response (``status`` and ``data``),
+    or raised an exception (``exc``).
+    """
+
+    def __init__(self, status=None, data=None, exc=None):
+        self.status = status
+        self.data = data
+        self.exc = exc
+        if exc is not None:
+            msg = str(exc)
+        else:
+            msg = 'HTTP %s: %s' % (status, data)
+        super(PayloadSendError, self).__init__(msg)
+
+
+class PayloadSender(object):
+    """
+    Background sender for HTTP POST payloads, used by
+    :py:meth:`.MetricsProvider._send_json_items`. Payloads are put on a
+    bounded queue and sent in order by a single daemon thread, which reuses
+    the keep-alive connections of the given ``urllib3.PoolManager``,
+    optionally gzip-compresses each body, and retries connection errors,
+    HTTP 429 and HTTP 5xx responses with exponential backoff.
+    """
+
+    def __init__(self, http, queue_size=4, max_attempts=4, backoff=1.0,
+                 compress=True, name='awslimitchecker-metrics-sender'):
+        """
+        :param http: HTTP connection pool to send with
+        :type http: ``urllib3.PoolManager``
+        :param queue_size: maximum number of payloads waiting to be sent;
+          :py:meth:`~.put` blocks when the queue is full
+        :type queue_size: int
+        :param max_attempts: maximum number of attempts to send each payload
+        :type max_attempts: int
+        :param backoff: seconds to wait after the first failed attempt; this
+          is doubled after each subsequent failure
+        :type backoff: float
+        :param compress: whether to gzip-compress payload bodies
+        :type compress: bool
+        :param name: name of the sender thread
+        :type name: str
+        """
+        self._http = http
+        self._queue = Queue(maxsize=queue_size)
+        self._max_attempts = max_attempts
+        self._backoff = backoff
+        self._compress = compress
+        self._name = name
+        self._thread = None
+        self._errors = []
+
+    def put(self, url, body, headers=None, on_sent=None):
+        """
+        Queue a payload to be POSTed, starting the sender thread if needed.
+        Blocks while the queue is full.
+
+        :param url: URL to POST to
+        :type url: str
+        :param body: uncompressed request body
+        :type body: bytes
+        :param headers: request headers
+        :type headers: dict
+        :param on_sent: optional callable, called with no arguments from the
+          sender thread once the payload has been sent successfully
+        :type on_sent: callable
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self._name)
+            self._thread.daemon = True
+            self._thread.start()
+        self._queue.put((url, body, headers, on_sent))
+
+    def join(self):
+        """
+        Wait for all queued payloads to be sent (or to fail), and return the
+        errors for payloads that could not be sent since the last call.
+
+        :return: list of :py:class:`~.PayloadSendError`
+        :rtype: list
+        """
+        self._queue.join()
+        errors = self._errors
+        self._errors = []
+        return errors
+
+    def _run(self):
+        while True:
+            url, body, headers, on_sent = self._queue.get()
+            try:
+                self._send(url, body, headers)
+                if on_sent is not None:
+                    on_sent()
+            except PayloadSendError as ex:
+                self._errors.append(ex)
+            except Exception as ex:
+                self._errors.append(PayloadSendError(exc=ex))
+            finally:
+                self._queue.task_done()
+
+    def _send(self, url, body, headers=None):
+        """
+        POST one payload, retrying as described above.
+
+        :param url: URL to POST to
+        :type url: str
+        :param body: uncompressed request body
+        :type body: bytes
+        :param headers: request headers
+        :type headers: dict
+        :return: the successful response
+        :raises: :py:exc:`~.PayloadSendError`
+        """
+        headers = dict(headers or {})
+        if self._compress:
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+        attempt = 1
+        while True:
+            try:
+                resp = self._http.request(
+                    'POST', url, headers=headers, body=body
+                )
+            except urllib3.exceptions.HTTPError as ex:
+                if attempt >= self._max_attempts:
+                    raise PayloadSendError(exc=ex)
+                logger.warning(
+                    'Error POSTing metrics (attempt %d of %d): %s',
+                    attempt, self._max_attempts, ex
+                )
+            else:
+                if resp.status < 300:
+                    logger.debug(
+                        'Successfully POSTed %d bytes; HTTP %d: %s',
+                        len(body), resp.status, resp.data
+                    )
+                    return resp
+                if (
+                    (resp.status != 429 and resp.status < 500) or
+                    attempt >= self._max_attempts
+                ):
+                    raise PayloadSendError(
+                        status=resp.status, data=resp.data
+                    )
+                logger.warning(
+                    'Error POSTing metrics (attempt %d of %d): HTTP %d',
+                    attempt, self._max_attempts, resp.status
+                )
+            time.sleep(self._backoff * (2 ** (attempt - 1)))
+            attempt += 1
+
+
 class MetricsProvider(object):
 
     __metaclass__ = ABCMeta
 
-    def __init__(self, region_name):
+    #: Maximum size in bytes of each uncompressed JSON payload sent by
+    #: :py:meth:`~._send_json_items`; larger batches are split.
+    max_payload_bytes = 2 * 1024 * 1024
+
+    #: Maximum number of payloads waiting to be sent in the background.
+    send_queue_size = 4
+
+    #: Maximum number of attempts to send each payload.
+    send_max_attempts = 4
+
+    #: Seconds to wait after a failed attempt; doubled after each failure.
+    send_backoff = 1.0
+
+    #: Whether to gzip-compress payloads sent by :py:meth:`~._send_json_items`.
+    send_compressed = True
+
+    def __init__(self, region_name, delta_heartbeat=None):
         """
         Initialize a MetricsProvider class. This MUST be overridden by
         subclasses. All configuration must be passed as keyword arguments
@@ -57,10 +237,27 @@ class MetricsProvider(object):
 
         :param region_name: the name of the region we're connected to
         :type region_name: str
+        :param delta_heartbeat: if set, enable delta-only emission (see
+          :py:meth:`~._filter_unchanged`), re-sending unchanged values at
+          least every this many minutes
+        :type delta_heartbeat: ``int`` or ``str``
         """
         self._region_name = region_name
         self._duration = 0.0
         self._limits = []
+        self._http = None
+        self._sender = None
+        self._delta_heartbeat = None
+        if delta_heartbeat is not None:
+            try:
+                self._delta_heartbeat = int(delta_heartbeat) * 60
+            except ValueError:
+                raise RuntimeError(
+                    'ERROR: delta_heartbeat must be an integer number of '
+                    'minutes, not "%s"' % delta_heartbeat
+                )
+        self._delta_state = None
+        self._suppressed_points = 0
 
     def set_run_duration(self, duration):
         """
@@ -77,10 +274,19 @@ class MetricsProvider(object):
         Cache a given limit for later sending to the metrics store.
 
         :param limit: a limit to cache
-        :type limit: AwsLimit
+        :type limit: :py:class:`~.AwsLimit` or :py:class:`~.LimitResult`
         """
         self._limits.append(limit)
 
+    def reset(self):
+        """
+        Discard the cached limits and run duration, so that the provider can
+        be used again for another check (i.e. when checking thresholds after
+        each change with ``--event-queue``).
+        """
+        self._limits = []
+        self._duration = 0.0
+
     @abstractmethod
     def flush(self):
         """
@@ -88,9 +294,187 @@ class MetricsProvider(object):
         sends data to your metrics provider/store. It should iterate over
         ``self._limits`` and send metrics for them, as well as for
         ``self._duration``.
+
+        Providers with a JSON-over-HTTP API can send with
+        :py:meth:`~._send_json_items` followed by
+        :py:meth:`~._wait_for_sends`, to get chunking, compression,
+        connection reuse and retries.
         """
         raise NotImplementedError()
 
+    @property
+    def _delta_state_name(self):
+        """
+        Return the name of the cache file (see :py:func:`~.load_cache_json`)
+        holding the last emitted value of each metric. Subclasses should
+        override this to include any configuration, such as tags, that
+        distinguishes separate series of metrics sent from the same host.
+
+        :rtype: str
+        """
+        return 'metrics-%s-%s.json' % (
+            self.__class__.__name__.lower(), self._region_name
+        )
+
+    def _filter_unchanged(self, points, now=None):
+        """
+        If delta-only emission is disabled (the default), return the items
+        of all ``points``. Otherwise, return only the items whose value
+        changed since it was last emitted, has never been emitted, or was
+        last emitted at least ``delta_heartbeat`` minutes ago. The number of
+        points left out is stored in ``self._suppressed_points``.
+
+        The new state is only written to the local state file by
+        :py:meth:`~._save_delta_state`, which providers should call after
+        metrics have been successfully sent. Metrics that are no longer
+        reported are dropped from the state.
+
+        :param points: ``(key, value, item)`` 3-tuples; ``key`` is a string
+          uniquely identifying the metric series, ``value`` its current
+          value and ``item`` what to return if it should be sent
+        :type points: iterable
+        :param now: current time as a float timestamp; defaults to
+          ``time.time()``
+        :type now: float
+        :return: items to send
+        :rtype: list
+        """
+        if self._delta_heartbeat is None:
+            return [item for _, _, item in points]
+        if now is None:
+            now = time.time()
+        previous = load_cache_json(self._delta_state_name)
+        state = {}
+        items = []
+        self._suppressed_points = 0
+        for key, value, item in points:
+            prev = previous.get(key)
+            if (
+                prev is not None and prev[0] == value and
+                now - prev[1] < self._delta_heartbeat
+            ):
+                state[key] = prev
+                self._suppressed_points += 1
+                continue
+            state[key] = [value, now]
+            items.append(item)
+        self._delta_state = state
+        logger.debug(
+            'Delta emission: sending %d metric points, suppressed %d '
+            'unchanged', len(items), self._suppressed_points
+        )
+        return items
+
+    def _save_delta_state(self):
+        """
+        Write the state computed by the last call to
+        :py:meth:`~._filter_unchanged`, if any, to the local state file.
+        """
+        if self._delta_state is None:
+            return
+        save_cache_json(self._delta_state_name, self._delta_state)
+        self._delta_state = None
+
+    def _get_http(self):
+        """
+        Return the HTTP connection pool for this provider, ``self._http``,
+        creating it if it has not been set. Connections in the pool are kept
+        alive and reused for subsequent requests.
+
+        :rtype: ``urllib3.PoolManager``
+        """
+        if self._http is None:
+            self._http = urllib3.PoolManager()
+        return self._http
+
+    def _json_chunks(self, items, key):
+        """
+        Serialize ``items`` into one or more JSON objects of the form
+        ``{key: [item, ...]}``, each at most :py:attr:`~.max_payload_bytes`
+        long (unless a single item is longer than that).
+
+        :param items: JSON-serializable items
+        :type items: iterable
+        :param key: the key of the list in each object
+        :type key: str
+        :return: UTF-8 encoded JSON payloads
+        :rtype: generator of bytes
+        """
+        head = ('{%s: [' % json.dumps(key)).encode('utf-8')
+        tail = b']}'
+        chunk = []
+        size = len(head) + len(tail)
+        for item in items:
+            enc = json.dumps(item).encode('utf-8')
+            if (
+                len(chunk) > 0 and
+                size + len(enc) + 1 > self.max_payload_bytes
+            ):
+                yield head + b','.join(chunk) + tail
+                chunk = []
+                size = len(head) + len(tail)
+            chunk.append(enc)
+            size += len(enc) + 1
+        if len(chunk) > 0:
+            yield head + b','.join(chunk) + tail
+
+    def _send_json_items(self, url, items, key, headers=None):
+        """
+        POST ``items`` to ``url`` as one or more JSON payloads of the form
+        ``{key: [item, ...]}`` (see :py:meth:`~._json_chunks`), in the
+        background via a :py:class:`~.PayloadSender`. This returns once all
+        payloads have been queued; the next payload is serialized while the
+        previous one is being sent. Call :py:meth:`~._wait_for_sends` to
+        wait for them to be sent.
+
+        :param url: URL to POST to
+        :type url: str
+        :param items: JSON-serializable items
+        :type items: iterable
+        :param key: the key of the list in each payload
+        :type key: str
+        :param headers: request headers
+        :type headers: dict
+        :return: number of payloads queued
+        :rtype: int
+        """
+        if self._sender is None:
+            self._sender = PayloadSender(
+                self._get_http(), queue_size=self.send_queue_size,
+                max_attempts=self.send_max_attempts,
+                backoff=self.send_backoff, compress=self.send_compressed
+            )
+        count = 0
+        for body in self._json_chunks(items, key):
+            self._sender.put(url, body, headers=headers)
+            count += 1
+        return count
+
+    def _wait_for_sends(self):
+        """
+        Wait for all payloads queued by :py:meth:`~._send_json_items` to be
+        sent, and raise an exception if any could not be sent.
+
+        :raises: RuntimeError
+        """
+        if self._sender is None:
+            return
+        errors = self._sender.join()
+        if len(errors) == 0:
+            return
+        err = errors[0]
+        if err.exc is not None:
+            raise RuntimeError(
+                'ERROR sending metrics to %s: %s' % (
+                    self.__class__.__name__, err.exc
+                )
+            )
+        raise RuntimeError(
+            'ERROR sending metrics to %s; API responded HTTP %d: %s' % (
+                self.__class__.__name__, err.status, err.data
+            )
+        )
+
     @staticmethod
     def providers_by_name():
         """
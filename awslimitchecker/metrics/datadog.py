@@ -43,6 +43,7 @@ import urllib3
 import time
 import re
 import json
+import hashlib
 from awslimitchecker.metrics.base import MetricsProvider
 
 logger = logging.getLogger(__name__)
@@ -53,7 +54,8 @@ class Datadog(MetricsProvider):
 
     def __init__(
         self, region_name, prefix='awslimitchecker.', api_key=None,
-        extra_tags=None, host='https://api.datadoghq.com'
+        extra_tags=None, host='https://api.datadoghq.com',
+        delta_heartbeat=None
     ):
         """
         Initialize the Datadog metrics provider. This class does not have any
@@ -76,8 +78,15 @@ class Datadog(MetricsProvider):
         :param extra_tags: CSV list of additional tags to send with metrics.
           All metrics will automatically be tagged with ``region:<region name>``
         :type extra_tags: str
+        :param delta_heartbeat: if set, only send usage and limit values that
+          changed since the previous run, plus every value at least once
+          every this many minutes; a ``suppressed_points`` metric reports how
+          many were left out.
+        :type delta_heartbeat: str
         """
-        super(Datadog, self).__init__(region_name)
+        super(Datadog, self).__init__(
+            region_name, delta_heartbeat=delta_heartbeat
+        )
         self._prefix = prefix
         self._tags = ['region:%s' % region_name]
         if extra_tags is not None:
@@ -122,15 +131,24 @@ class Datadog(MetricsProvider):
             re.sub(r'[^0-9a-zA-Z]+', '_', limit)
         )).lower()
 
+    @property
+    def _delta_state_name(self):
+        """
+        Return the name of the delta emission state file; this includes a
+        hash of the host, prefix and tags, so that each distinct series of
+        metrics (e.g. per-account ``extra_tags``) has its own state.
+
+        :rtype: str
+        """
+        h = hashlib.sha1(json.dumps(
+            [self._host, self._prefix, sorted(self._tags)]
+        ).encode('utf-8')).hexdigest()[:12]
+        return 'metrics-datadog-%s-%s.json' % (self._region_name, h)
+
     def flush(self):
         ts = int(time.time())
         logger.debug('Flushing metrics to Datadog.')
-        series = [{
-            'metric': '%sruntime' % self._prefix,
-            'points': [[ts, self._duration]],
-            'type': 'gauge',
-            'tags': self._tags
-        }]
+        series = []
         for lim in self._limits:
             u = lim.get_current_usage()
             if len(u) == 0:
@@ -152,23 +170,27 @@ class Datadog(MetricsProvider):
                     'type': 'gauge',
                     'tags': self._tags
                 })
+        series = [{
+            'metric': '%sruntime' % self._prefix,
+            'points': [[ts, self._duration]],
+            'type': 'gauge',
+            'tags': self._tags
+        }] + self._filter_unchanged(
+            (s['metric'], s['points'][0][1], s) for s in series
+        )
+        if self._delta_heartbeat is not None:
+            series.append({
+                'metric': '%ssuppressed_points' % self._prefix,
+                'points': [[ts, self._suppressed_points]],
+                'type': 'count',
+                'tags': self._tags
+            })
         logger.info('POSTing %d metrics to datadog', len(series))
-        data = {'series': series}
-        encoded = json.dumps(data).encode('utf-8')
         url = self._host + '/api/v1/series?api_key=%s' % self._api_key
-        resp = self._http.request(
-            'POST', url,
-            headers={'Content-type': 'application/json'},
-            body=encoded
-        )
-        if resp.status < 300:
-            logger.debug(
-                'Successfully POSTed to Datadog; HTTP %d: %s',
-                resp.status, resp.data
-            )
-            return
-        raise RuntimeError(
-            'ERROR sending metrics to Datadog; API responded HTTP %d: %s' % (
-                resp.status, resp.data
-            )
+        count = self._send_json_items(
+            url, series, 'series',
+            headers={'Content-type': 'application/json'}
         )
+        self._wait_for_sends()
+        self._save_delta_state()
+        logger.debug('Successfully POSTed %d payload(s) to Datadog', count)
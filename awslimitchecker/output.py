@@ -0,0 +1,321 @@
+"""
+awslimitchecker/output.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import sys
+import csv
+import json
+from abc import ABCMeta, abstractmethod
+
+from .limit import (
+    SOURCE_DEFAULT, SOURCE_OVERRIDE, SOURCE_TA, SOURCE_API, SOURCE_QUOTAS
+)
+from .utils import top_k_indexes
+
+#: Names of the supported ``--output-format`` values.
+OUTPUT_FORMATS = ['text', 'json', 'ndjson', 'csv']
+
+#: Keys of every output record, in the order they are written (CSV columns).
+RECORD_FIELDS = [
+    'type', 'service', 'limit', 'limit_value', 'limit_source',
+    'default_limit', 'resource_id', 'aws_type', 'value', 'maximum', 'status'
+]
+
+#: Names used for limit sources in output records.
+SOURCE_NAMES = {
+    SOURCE_DEFAULT: 'default',
+    SOURCE_OVERRIDE: 'override',
+    SOURCE_TA: 'ta',
+    SOURCE_API: 'api',
+    SOURCE_QUOTAS: 'quotas',
+}
+
+
+def _record(rtype, service_name, limit, usage=None, status=None):
+    """
+    Return one output record (dict with all of :py:data:`~.RECORD_FIELDS`)
+    for the given limit and optional usage.
+
+    :param rtype: record type; ``limit``, ``usage`` or ``threshold``
+    :type rtype: str
+    :param service_name: the name of the service
+    :type service_name: str
+    :param limit: the limit
+    :type limit: :py:class:`~.AwsLimit` or :py:class:`~.LimitResult`
+    :param usage: the usage this record describes, if any
+    :type usage: :py:class:`~.AwsLimitUsage` or None
+    :param status: ``warning``, ``critical`` or ``skipped`` for threshold
+      records
+    :type status: str or None
+    :rtype: dict
+    """
+    rec = {
+        'type': rtype,
+        'service': service_name,
+        'limit': limit.name,
+        'limit_value': limit.get_limit(),
+        'limit_source': SOURCE_NAMES.get(limit.get_limit_source()),
+        'default_limit': limit.default_limit,
+        'resource_id': None,
+        'aws_type': None,
+        'value': None,
+        'maximum': None,
+        'status': status
+    }
+    if usage is not None:
+        rec['resource_id'] = usage.resource_id
+        rec['aws_type'] = usage.aws_type
+        rec['value'] = usage.get_value()
+        rec['maximum'] = usage.get_maximum()
+    return rec
+
+
+def _top_usages(usages, top_k=None):
+    """
+    Return the ``top_k`` highest of ``usages`` (or all of them if ``top_k``
+    is None) in ascending order of value.
+
+    :param usages: usages to select from
+    :type usages: sequence of :py:class:`~.AwsLimitUsage`
+    :param top_k: maximum number of usages to return, or None for all
+    :type top_k: ``int`` or ``None``
+    :rtype: list
+    """
+    idxs = top_k_indexes([u.get_value() for u in usages], top_k)
+    return [usages[i] for i in idxs]
+
+
+def limit_records(service_name, limit):
+    """
+    Generate the ``limit`` records for ``--list-limits``: one record for the
+    limit, or if the limit has per-resource maximums, one record for each
+    resource (with its maximum as ``limit_value`` and source ``api``).
+
+    :param service_name: the name of the service
+    :type service_name: str
+    :param limit: the limit
+    :type limit: :py:class:`~.AwsLimit`
+    :rtype: generator of dict
+    """
+    if not limit.has_resource_limits():
+        yield _record('limit', service_name, limit)
+        return
+    for usage in limit.get_current_usage():
+        rec = _record('limit', service_name, limit, usage=usage)
+        rec['limit_value'] = usage.get_maximum()
+        rec['limit_source'] = SOURCE_NAMES[SOURCE_API]
+        yield rec
+
+
+def usage_records(service_name, limit, top_k=None):
+    """
+    Generate the ``usage`` records for ``--show-usage``: one record for each
+    per-resource usage of the limit in ascending order of value, or a single
+    record with a ``value`` of None if there is no usage.
+
+    :param service_name: the name of the service
+    :type service_name: str
+    :param limit: the limit
+    :type limit: :py:class:`~.AwsLimit` or :py:class:`~.LimitResult`
+    :param top_k: maximum number of usages to output, or None for all
+    :type top_k: ``int`` or ``None``
+    :rtype: generator of dict
+    """
+    usages = limit.get_current_usage()
+    if len(usages) == 0:
+        yield _record('usage', service_name, limit)
+        return
+    for usage in _top_usages(usages, top_k):
+        yield _record('usage', service_name, limit, usage=usage)
+
+
+def threshold_records(service_name, limit, top_k=None):
+    """
+    Generate the ``threshold`` records for a threshold check: one record for
+    each usage that crossed the critical threshold, then one for each usage
+    that crossed the warning threshold, each in ascending order of value.
+
+    :param service_name: the name of the service
+    :type service_name: str
+    :param limit: the limit
+    :type limit: :py:class:`~.AwsLimit` or :py:class:`~.LimitResult`
+    :param top_k: maximum number of usages to output per status, or None
+      for all
+    :type top_k: ``int`` or ``None``
+    :rtype: generator of dict
+    """
+    for status, usages in [
+        ('critical', limit.get_criticals()),
+        ('warning', limit.get_warnings())
+    ]:
+        for usage in _top_usages(usages, top_k):
+            yield _record(
+                'threshold', service_name, limit, usage=usage, status=status
+            )
+
+
+def skipped_records(service_name, limit):
+    """
+    Generate the ``threshold`` record, with a ``status`` of ``skipped``, for a
+    limit whose usage was not found because an API call needed to find it
+    was skipped (see :py:meth:`.AwsLimit.get_skipped`).
+
+    :param service_name: the name of the service
+    :type service_name: str
+    :param limit: the limit
+    :type limit: :py:class:`~.AwsLimit` or :py:class:`~.LimitResult`
+    :rtype: generator of dict
+    """
+    yield _record('threshold', service_name, limit, status='skipped')
+
+
+class RecordWriter(object):
+    """
+    Base class for writing output records to a stream as they are produced,
+    without holding them in memory.
+    """
+
+    __metaclass__ = ABCMeta
+
+    def __init__(self, stream=None, fields=None):
+        """
+        :param stream: file-like object to write to; defaults to
+          ``sys.stdout``
+        :param fields: record field names, for formats that need them;
+          defaults to :py:data:`~.RECORD_FIELDS`
+        :type fields: list
+        """
+        if stream is None:
+            stream = sys.stdout
+        self._stream = stream
+        self._fields = fields or RECORD_FIELDS
+
+    @abstractmethod
+    def write(self, record):
+        """
+        Write one record (a dict with :py:data:`~.RECORD_FIELDS` keys).
+
+        :param record: the record to write
+        :type record: dict
+        """
+        raise NotImplementedError()
+
+    def write_all(self, records):
+        """
+        Write every record from an iterable, then flush the stream.
+
+        :param records: records to write
+        :type records: iterable of dict
+        """
+        for rec in records:
+            self.write(rec)
+        self._stream.flush()
+
+    def close(self):
+        """
+        Finish the output; this does not close the underlying stream.
+        """
+        self._stream.flush()
+
+
+class NdjsonRecordWriter(RecordWriter):
+    """
+    Write records as newline-delimited JSON, one object per line.
+    """
+
+    def write(self, record):
+        self._stream.write(json.dumps(record, sort_keys=True) + '\n')
+
+
+class JsonRecordWriter(RecordWriter):
+    """
+    Write records as a single JSON array, one element per line. The array is
+    opened on the first write and closed by :py:meth:`~.close`.
+    """
+
+    def __init__(self, stream=None, fields=None):
+        super(JsonRecordWriter, self).__init__(stream=stream, fields=fields)
+        self._count = 0
+
+    def write(self, record):
+        self._stream.write('[\n' if self._count == 0 else ',\n')
+        self._stream.write(json.dumps(record, sort_keys=True))
+        self._count += 1
+
+    def close(self):
+        self._stream.write('[]\n' if self._count == 0 else '\n]\n')
+        super(JsonRecordWriter, self).close()
+
+
+class CsvRecordWriter(RecordWriter):
+    """
+    Write records as CSV with a header row of the record fields (by default
+    :py:data:`~.RECORD_FIELDS`); None values are written as empty strings.
+    """
+
+    def __init__(self, stream=None, fields=None):
+        super(CsvRecordWriter, self).__init__(stream=stream, fields=fields)
+        self._writer = csv.DictWriter(
+            self._stream, fieldnames=self._fields, lineterminator='\n'
+        )
+        self._writer.writeheader()
+
+    def write(self, record):
+        self._writer.writerow(record)
+
+
+def get_record_writer(output_format, stream=None, fields=None):
+    """
+    Return a :py:class:`~.RecordWriter` for the given output format.
+
+    :param output_format: one of ``json``, ``ndjson`` or ``csv``
+    :type output_format: str
+    :param stream: file-like object to write to; defaults to ``sys.stdout``
+    :param fields: record field names; defaults to
+      :py:data:`~.RECORD_FIELDS`
+    :type fields: list
+    :rtype: :py:class:`~.RecordWriter`
+    """
+    writers = {
+        'json': JsonRecordWriter,
+        'ndjson': NdjsonRecordWriter,
+        'csv': CsvRecordWriter
+    }
+    if output_format not in writers:
+        raise ValueError('Unknown output format: %s' % output_format)
+    return writers[output_format](stream=stream, fields=fields)
@@ -0,0 +1,178 @@
+"""
+awslimitchecker/profiling.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import re
+import sys
+import cProfile
+import pstats
+import logging
+import threading
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class CpuProfiler(object):
+    """
+    Profile named phases (such as checking one service) with
+    :py:mod:`cProfile`, writing a :py:mod:`pstats` file for each phase and,
+    on :py:meth:`~.close`, one with the combined statistics of all phases.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: path to write combined statistics to; the statistics
+          for each phase are written to ``<path>.<phase name>``
+        :type path: str
+        """
+        self.path = path
+        self.paths = OrderedDict()
+        self._lock = threading.Lock()
+
+    def phase_path(self, name):
+        """
+        Return the path that statistics for the named phase are written to.
+
+        :param name: phase name
+        :type name: str
+        :rtype: str
+        """
+        return '%s.%s' % (self.path, re.sub(r'[^0-9a-zA-Z_-]+', '_', name))
+
+    @contextmanager
+    def profile(self, name):
+        """
+        Context manager to profile the named phase.
+
+        :param name: phase name
+        :type name: str
+        """
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            path = self.phase_path(name)
+            prof.dump_stats(path)
+            with self._lock:
+                self.paths[name] = path
+            logger.debug('Wrote CPU profile for %s to %s', name, path)
+
+    def close(self):
+        """
+        Write the combined statistics of all profiled phases to ``path``.
+        """
+        if not self.paths:
+            return
+        stats = pstats.Stats(*self.paths.values())
+        stats.dump_stats(self.path)
+        logger.info('Wrote CPU profile to %s', self.path)
+
+
+class MemoryProfiler(object):
+    """
+    Measure the peak memory use and top allocation sites of named phases
+    (such as checking one service) with :py:mod:`tracemalloc`. Phases must
+    not overlap, as the traced memory is process-wide.
+    """
+
+    def __init__(self, top=10):
+        """
+        :param top: number of allocation sites to keep for each phase
+        :type top: int
+        """
+        self.top = top
+        #: OrderedDict of phase name to 2-tuple of peak traced memory in bytes
+        #: and a list of the top :py:class:`tracemalloc.Statistic` by size.
+        self.results = OrderedDict()
+        self._started = False
+
+    @contextmanager
+    def profile(self, name):
+        """
+        Context manager to profile the named phase.
+
+        :param name: phase name
+        :type name: str
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        # also resets the peak
+        tracemalloc.clear_traces()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ])
+            self.results[name] = (
+                peak, snapshot.statistics('lineno')[:self.top]
+            )
+
+    def close(self):
+        """
+        Stop tracing memory allocations, if we started it.
+        """
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def report(self, stream=None):
+        """
+        Write the peak memory and top allocation sites of each phase.
+
+        :param stream: file-like object to write to; defaults to
+          ``sys.stderr``
+        """
+        if stream is None:
+            stream = sys.stderr
+        for name, (peak, stats) in self.results.items():
+            stream.write('%s: peak %.1f KiB\n' % (name, peak / 1024.0))
+            for stat in stats:
+                frame = stat.traceback[0]
+                stream.write('    %10.1f KiB %8d blocks  %s:%d\n' % (
+                    stat.size / 1024.0, stat.count, frame.filename,
+                    frame.lineno
+                ))
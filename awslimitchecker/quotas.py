@@ -39,6 +39,7 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 
 from botocore.exceptions import ClientError
 import logging
+import threading
 
 from awslimitchecker.connectable import Connectable
 
@@ -60,6 +61,7 @@ class ServiceQuotasClient(Connectable):
         """
         self._boto3_connection_kwargs = boto_connection_kwargs
         self._cache = {}
+        self._lock = threading.RLock()
         self.conn = None
 
     def quotas_for_service(self, service_code):
@@ -67,6 +69,24 @@ class ServiceQuotasClient(Connectable):
         Return this account's current quotas for the specified service code.
         Also cache them on this class instance.
 
+        This method is safe to call from multiple threads (services may be
+        checked concurrently); concurrent calls are serialized, so each
+        service code is only retrieved once.
+
+        :param service_code: the service code to get quotas for
+        :type service_code: str
+        :return: QuotaName to dictionary of quota information returned by the
+          service
+        :rtype: dict
+        """
+        with self._lock:
+            return self._quotas_for_service(service_code)
+
+    def _quotas_for_service(self, service_code):
+        """
+        Implementation of :py:meth:`~.quotas_for_service`; must be called with
+        ``self._lock`` held.
+
         :param service_code: the service code to get quotas for
         :type service_code: str
         :return: QuotaName to dictionary of quota information returned by the
@@ -0,0 +1,349 @@
+"""
+awslimitchecker/result.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+from collections import namedtuple
+from collections.abc import Mapping
+from types import MappingProxyType
+
+
+class LimitResult(namedtuple('LimitResult', [
+    'service', 'name', 'limit', 'source', 'default_limit', 'thresholds',
+    'usage', 'warnings', 'criticals', 'has_resource_limits', 'skipped'
+])):
+    """
+    Immutable snapshot of one :py:class:`~.AwsLimit` at the time thresholds
+    were checked: its effective limit value and source, current usage, and
+    the usages that crossed the warning and critical thresholds.
+
+    In addition to its fields, this class provides the read-only accessor
+    methods of :py:class:`~.AwsLimit` (:py:meth:`~.get_limit`,
+    :py:meth:`~.get_current_usage`, :py:meth:`~.get_warnings`, etc.), so it
+    can be used in place of an :py:class:`~.AwsLimit` when reporting.
+    Reading a snapshot never calls any AWS API.
+
+    Fields:
+
+    * ``service`` - the :py:class:`~._AwsService` the limit belongs to
+    * ``name`` - the limit name
+    * ``limit`` - the effective limit value (:py:meth:`.AwsLimit.get_limit`)
+    * ``source`` - the limit source (:py:meth:`.AwsLimit.get_limit_source`)
+    * ``default_limit`` - the default limit value
+    * ``thresholds`` - 4-tuple of the warning count, warning percent,
+      critical count and critical percent thresholds
+      (:py:meth:`.AwsLimit._get_thresholds`)
+    * ``usage`` - read-only sequence of :py:class:`~.AwsLimitUsage`
+    * ``warnings`` - tuple of :py:class:`~.AwsLimitUsage` that crossed the
+      warning threshold
+    * ``criticals`` - tuple of :py:class:`~.AwsLimitUsage` that crossed the
+      critical threshold
+    * ``has_resource_limits`` - bool, whether any usage has its own maximum
+    * ``skipped`` - why usage was not found, if an API call needed to find it
+      was skipped (:py:meth:`.AwsLimit.get_skipped`), or None
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_limit(cls, limit):
+        """
+        Snapshot an :py:class:`~.AwsLimit` whose thresholds have been checked.
+
+        The usage sequence refers to the limit's current usage storage; this
+        is never modified in place once collected (finding usage again, and
+        applying events, replace it), so later changes to ``limit`` do not
+        affect the snapshot.
+
+        :param limit: the limit to snapshot
+        :type limit: :py:class:`~.AwsLimit`
+        :rtype: :py:class:`~.LimitResult`
+        """
+        return cls(
+            service=limit.service,
+            name=limit.name,
+            limit=limit.get_limit(),
+            source=limit.get_limit_source(),
+            default_limit=limit.default_limit,
+            thresholds=limit._get_thresholds(),
+            usage=limit.get_current_usage(),
+            warnings=tuple(limit.get_warnings()),
+            criticals=tuple(limit.get_criticals()),
+            has_resource_limits=limit.has_resource_limits(),
+            skipped=limit.get_skipped()
+        )
+
+    @property
+    def service_name(self):
+        """
+        Return the name of the service this limit belongs to.
+
+        :rtype: str
+        """
+        return self.service.service_name
+
+    def get_limit(self):
+        """
+        Return the effective limit value; see :py:meth:`.AwsLimit.get_limit`.
+
+        :returns: effective limit value, ``int`` or ``None``
+        """
+        return self.limit
+
+    def get_limit_source(self):
+        """
+        Return the source of the effective limit value; see
+        :py:meth:`.AwsLimit.get_limit_source`.
+
+        :rtype: int
+        """
+        return self.source
+
+    def get_current_usage(self):
+        """
+        Return the current usage; see :py:meth:`.AwsLimit.get_current_usage`.
+
+        :rtype: :py:class:`~._UsageView` of :py:class:`~.AwsLimitUsage`
+        """
+        return self.usage
+
+    def get_current_usage_str(self, top_k=None):
+        """
+        Return a string describing the current usage; see
+        :py:meth:`.AwsLimit.get_current_usage_str`.
+
+        :param top_k: maximum number of usage values to list, or None for all
+        :type top_k: ``int`` or ``None``
+        :rtype: str
+        """
+        return self.usage.summary_str(top_k=top_k)
+
+    def get_warnings(self):
+        """
+        Return the usages that crossed the warning threshold.
+
+        :rtype: tuple
+        """
+        return self.warnings
+
+    def get_criticals(self):
+        """
+        Return the usages that crossed the critical threshold.
+
+        :rtype: tuple
+        """
+        return self.criticals
+
+    def get_skipped(self):
+        """
+        Return why usage was not found, if an API call needed to find it was
+        skipped; see :py:meth:`.AwsLimit.get_skipped`.
+
+        :rtype: ``str`` or ``None``
+        """
+        return self.skipped
+
+    def get_max_usage(self):
+        """
+        Return the maximum usage value, or None if there is no usage.
+
+        :rtype: :py:obj:`int` or :py:obj:`float` or ``None``
+        """
+        if len(self.usage) == 0:
+            return None
+        return max(self.usage).get_value()
+
+
+class CheckResult(Mapping):
+    """
+    Immutable snapshot of a complete threshold check, as returned by
+    :py:meth:`.AwsLimitChecker.check_thresholds`.
+
+    For backwards compatibility, a CheckResult is a read-only mapping with
+    the same structure as the dict previously returned by
+    :py:meth:`~.AwsLimitChecker.check_thresholds`: service name to a mapping
+    of limit name to limit, for only those limits that crossed one or more
+    thresholds. The values are :py:class:`~.LimitResult` instances rather
+    than :py:class:`~.AwsLimit`.
+
+    The snapshot of *every* checked limit is available via
+    :py:attr:`~.limits`, the limits whose usage could not be found because
+    an API call was skipped via :py:attr:`~.skipped`, and the time taken to
+    check each service via :py:attr:`~.timings`.
+    """
+
+    __slots__ = ('_limits', '_problems', '_skipped', '_timings', '_duration')
+
+    def __init__(self, limits, problems, timings=None, duration=None):
+        """
+        :param limits: dict of service name to dict of limit name to
+          :py:class:`~.LimitResult`, for all checked limits
+        :type limits: dict
+        :param problems: dict of service name to list of names of limits that
+          crossed thresholds
+        :type problems: dict
+        :param timings: dict of check phase (service name, or
+          ``TrustedAdvisor``) to seconds taken
+        :type timings: dict
+        :param duration: total seconds taken to check thresholds
+        :type duration: float
+        """
+        self._limits = MappingProxyType(dict(
+            (svc, MappingProxyType(dict(lims)))
+            for svc, lims in limits.items()
+        ))
+        self._problems = MappingProxyType(dict(
+            (svc, MappingProxyType(dict(
+                (name, self._limits[svc][name]) for name in names
+            )))
+            for svc, names in problems.items() if len(names) > 0
+        ))
+        self._skipped = None
+        self._timings = MappingProxyType(dict(timings or {}))
+        self._duration = duration
+
+    @classmethod
+    def combine(cls, results, duration=None, timings=None):
+        """
+        Combine several results, such as those for individual services, into
+        a single :py:class:`~.CheckResult`. If a service appears in more than
+        one result, the last one wins.
+
+        :param results: the results to combine
+        :type results: iterable of :py:class:`~.CheckResult`
+        :param duration: total seconds taken; defaults to the sum of the
+          durations of ``results``
+        :type duration: float
+        :param timings: additional timings (e.g. for ``TrustedAdvisor``) to
+          include along with those of ``results``
+        :type timings: dict
+        :rtype: :py:class:`~.CheckResult`
+        """
+        limits = {}
+        problems = {}
+        timings = dict(timings or {})
+        total = 0.0
+        for res in results:
+            limits.update(res.limits)
+            for svc in res.limits:
+                problems[svc] = list(res.problems.get(svc, {}).keys())
+            timings.update(res.timings)
+            total += res.duration or 0.0
+        if duration is None:
+            duration = total
+        return cls(limits, problems, timings=timings, duration=duration)
+
+    @property
+    def limits(self):
+        """
+        Read-only mapping of service name to read-only mapping of limit name
+        to :py:class:`~.LimitResult`, for all checked limits.
+
+        :rtype: :py:class:`types.MappingProxyType`
+        """
+        return self._limits
+
+    @property
+    def problems(self):
+        """
+        Read-only mapping of service name to read-only mapping of limit name
+        to :py:class:`~.LimitResult`, for only the limits that crossed one or
+        more thresholds. This is also the mapping interface of this class.
+
+        :rtype: :py:class:`types.MappingProxyType`
+        """
+        return self._problems
+
+    @property
+    def skipped(self):
+        """
+        Read-only mapping of service name to read-only mapping of limit name
+        to :py:class:`~.LimitResult`, for only the limits whose usage was not
+        found because an API call needed to find it was skipped (see
+        :py:meth:`.LimitResult.get_skipped`).
+
+        :rtype: :py:class:`types.MappingProxyType`
+        """
+        if self._skipped is None:
+            skipped = {}
+            for svc, lims in self._limits.items():
+                names = [
+                    name for name, lim in lims.items()
+                    if lim.get_skipped() is not None
+                ]
+                if names:
+                    skipped[svc] = MappingProxyType(
+                        dict((name, lims[name]) for name in names)
+                    )
+            self._skipped = MappingProxyType(skipped)
+        return self._skipped
+
+    @property
+    def timings(self):
+        """
+        Read-only mapping of check phase (service name, or ``TrustedAdvisor``)
+        to the number of seconds it took.
+
+        :rtype: :py:class:`types.MappingProxyType`
+        """
+        return self._timings
+
+    @property
+    def duration(self):
+        """
+        Total number of seconds taken to check thresholds.
+
+        :rtype: float
+        """
+        return self._duration
+
+    def __getitem__(self, key):
+        return self._problems[key]
+
+    def __iter__(self):
+        return iter(self._problems)
+
+    def __len__(self):
+        return len(self._problems)
+
+    def __repr__(self):
+        return '<CheckResult of %d limits in %d services; %d with ' \
+               'problems>' % (
+                   sum(len(x) for x in self._limits.values()),
+                   len(self._limits),
+                   sum(len(x) for x in self._problems.values())
+               )
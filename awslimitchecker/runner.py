@@ -43,10 +43,24 @@ import logging
 import json
 import boto3
 import time
+from contextlib import contextmanager, ExitStack
 
 from .checker import AwsLimitChecker
-from .utils import StoreKeyValuePair, dict2cols, issue_string_tuple
+from .utils import (
+    StoreKeyValuePair, dict2cols, issue_string_tuple, skipped_string_tuple,
+    usage_detail
+)
 from .limit import SOURCE_TA, SOURCE_API, SOURCE_QUOTAS
+from .result import CheckResult
+from .history import HistoryStore, HistoryPoint
+from .cassette import Cassette
+from .events import EventUpdater
+from .snapshot import FleetRollup, STATES
+from .distributed import Coordinator, Worker, Aggregator, get_work_queue
+from .output import (
+    OUTPUT_FORMATS, get_record_writer, limit_records, usage_records,
+    threshold_records, skipped_records
+)
 from .metrics import MetricsProvider
 from .alerts import AlertProvider
 
@@ -77,6 +91,9 @@ class Runner(object):
         self.skip_ta = False
         self.service_name = None
         self.skip_check = []
+        self.limit_selection = None
+        self.usage_top_k = None
+        self.output_format = 'text'
 
     def parse_args(self, argv):
         """
@@ -118,6 +135,15 @@ class Runner(object):
                        dest='skip_check',
                        help='avoid performing actions for the specified check'
                             ' name')
+        p.add_argument('--only-limit', action='append', default=[],
+                       dest='only_limit', metavar='SERVICE/LIMIT',
+                       help='find usage for and check only the specified '
+                            'limit, making only the API calls it needs; may '
+                            'be specified multiple times')
+        p.add_argument('--plan', action='store_true', default=False,
+                       help='print the usage collection steps and API calls '
+                            'that checking the selected services or limits '
+                            'would make, and exit')
         p.add_argument('-s', '--list-services', action='store_true',
                        default=False,
                        help='print a list of all AWS service types that '
@@ -147,6 +173,18 @@ class Runner(object):
                        default=False,
                        help='find and print the current usage of all AWS '
                        'services with known limits')
+        p.add_argument('--usage-detail', action='store', type=usage_detail,
+                       default=None, metavar='full|topk=N',
+                       help='how many per-resource usage values to print for '
+                       'each limit with --show-usage or when thresholds are '
+                       'crossed; "full" (the default) prints all of them, '
+                       '"topk=N" prints only the N highest')
+        p.add_argument('--output-format', action='store',
+                       choices=OUTPUT_FORMATS, default='text',
+                       help='output format for --list-limits, --show-usage '
+                       'and threshold checks; "json", "ndjson" and "csv" '
+                       'write one record per limit or usage, as each '
+                       'service finishes (default: text)')
         p.add_argument('--iam-policy', action='store_true',
                        default=False,
                        help='output a JSON serialized IAM Policy '
@@ -262,6 +300,106 @@ class Runner(object):
                        help='Specify key/value parameters for the alert '
                             'provider constructor. See documentation for '
                             'further information.')
+        p.add_argument('--record-history', dest='record_history',
+                       action='store_true', default=False,
+                       help='after checking thresholds, record limits and '
+                            'usage to the local history store')
+        p.add_argument('--history', dest='history', action='store',
+                       nargs='?', const='', default=None,
+                       metavar='SERVICE[/LIMIT]',
+                       help='show recorded usage history (optionally only '
+                            'for one service or limit) and exit')
+        p.add_argument('--history-days', dest='history_days', type=int,
+                       action='store', default=7,
+                       help='number of days of history to show with '
+                            '--history (default: 7)')
+        p.add_argument('--history-file', dest='history_file', type=str,
+                       action='store', default=None,
+                       help='path to the history store SQLite database '
+                            '(default: history.sqlite in the cache directory)')
+        g = p.add_mutually_exclusive_group()
+        g.add_argument('--record', dest='record_dir', type=str,
+                       action='store', default=None, metavar='DIR',
+                       help='record all AWS API requests and responses to a '
+                            'cassette in DIR, with secrets removed')
+        g.add_argument('--replay', dest='replay_dir', type=str,
+                       action='store', default=None, metavar='DIR',
+                       help='replay AWS API responses from a cassette '
+                            'recorded in DIR with --record, instead of '
+                            'connecting to AWS')
+        p.add_argument('--replay-latency', dest='replay_latency',
+                       action='store_true', default=False,
+                       help='with --replay, wait for the recorded duration of '
+                            'each request before returning its response')
+        p.add_argument('--profile-cpu', dest='profile_cpu', type=str,
+                       action='store', default=None, metavar='FILE',
+                       help='profile CPU use while checking; write pstats '
+                            'files for each service to FILE.<service> and '
+                            'combined statistics to FILE')
+        p.add_argument('--profile-mem', dest='profile_mem',
+                       action='store_true', default=False,
+                       help='profile memory use while checking; print peak '
+                            'memory and top allocation sites for each '
+                            'service to STDERR')
+        p.add_argument('--event-queue', dest='event_queue', type=str,
+                       action='store', default=None, metavar='QUEUE_URL',
+                       help='run continuously; find usage once, then keep it '
+                            'up to date from CloudTrail events delivered to '
+                            'the SQS queue QUEUE_URL, checking thresholds '
+                            'after each change')
+        p.add_argument('--reconcile-minutes', dest='reconcile_minutes',
+                       type=int, action='store', default=60,
+                       help='with --event-queue, find usage for all services '
+                            'again every this many minutes (default: 60)')
+        p.add_argument('--export-snapshot', dest='export_snapshot', type=str,
+                       action='store', default=None, metavar='FILE',
+                       help='after checking thresholds, write all limits, '
+                            'thresholds and usage to a snapshot FILE')
+        p.add_argument('--fleet-report', dest='fleet_report', type=str,
+                       action='append', default=[], metavar='FILE',
+                       help='combine snapshot FILE(s) written with '
+                            '--export-snapshot, show fleet-wide limit '
+                            'utilization and exit; may be repeated')
+        p.add_argument('--fleet-top', dest='fleet_top', type=int,
+                       action='store', default=10,
+                       help='with --fleet-report or --aggregate, number of '
+                            'limits closest to exhaustion to show '
+                            '(default: 10)')
+        p.add_argument('--queue', dest='queue', type=str, action='store',
+                       default=None, metavar='URL',
+                       help='work queue for distributed checking: a '
+                            'directory (possibly on a shared filesystem) or '
+                            'a redis:// URL; use with --enqueue, --worker or '
+                            '--aggregate')
+        p.add_argument('--enqueue', dest='enqueue', action='store_true',
+                       default=False,
+                       help='with --queue, enqueue one work item per account, '
+                            'region and service, and exit')
+        p.add_argument('--fleet-account', dest='fleet_accounts', type=str,
+                       action='append', default=[], metavar='ACCOUNT_ID',
+                       help='with --enqueue, account to check (assuming '
+                            '--sts-account-role in it); may be repeated. '
+                            'Defaults to the account of the workers\' '
+                            'credentials')
+        p.add_argument('--fleet-region', dest='fleet_regions', type=str,
+                       action='append', default=[], metavar='REGION',
+                       help='with --enqueue, region to check; may be '
+                            'repeated. Defaults to the current region')
+        p.add_argument('--worker', dest='worker', action='store_true',
+                       default=False,
+                       help='with --queue, check work items from the queue '
+                            'until it is empty, and exit')
+        p.add_argument('--lease-seconds', dest='lease_seconds', type=int,
+                       action='store', default=900,
+                       help='with --worker, seconds to lease each work item '
+                            'for before another worker may take it over '
+                            '(default: 900)')
+        p.add_argument('--aggregate', dest='aggregate', action='store_true',
+                       default=False,
+                       help='with --queue, requeue expired leases, show '
+                            'progress, per-worker throughput and fleet-wide '
+                            'limit utilization of the results so far, and '
+                            'exit')
         args = p.parse_args(argv)
         args.ta_refresh_mode = None
         if args.ta_refresh_wait:
@@ -276,7 +414,27 @@ class Runner(object):
         for x in sorted(self.checker.get_service_names()):
             print(x)
 
+    def _selected_services(self):
+        """
+        Return the sorted names of the services to operate on.
+
+        :rtype: list
+        """
+        if self.service_name is not None:
+            return sorted(self.service_name)
+        return self.checker.get_service_names()
+
     def list_limits(self):
+        if self.output_format != 'text':
+            writer = get_record_writer(self.output_format)
+            for svc in self._selected_services():
+                limits = self.checker.get_limits(
+                    use_ta=(not self.skip_ta), service=[svc]
+                )[svc]
+                for lim in sorted(limits.keys()):
+                    writer.write_all(limit_records(svc, limits[lim]))
+            writer.close()
+            return
         limits = self.checker.get_limits(
             use_ta=(not self.skip_ta),
             service=self.service_name)
@@ -314,53 +472,426 @@ class Runner(object):
         policy = self.checker.get_required_iam_policy()
         print(json.dumps(policy, sort_keys=True, indent=2))
 
+    def show_history(self, name, days, path=None):
+        """
+        Print usage history from the local history store.
+
+        :param name: ``SERVICE`` or ``SERVICE/LIMIT`` to show history for, or
+          an empty string for all limits
+        :type name: str
+        :param days: number of days of history to show
+        :type days: int
+        :param path: path to the history store, or None for the default
+        :type path: str
+        """
+        service = None
+        limit = None
+        if name:
+            service, _, limit = name.partition('/')
+        with HistoryStore(path) as store:
+            points = store.query(
+                service=service, limit=limit or None,
+                start=time.time() - (days * 86400)
+            )
+        if self.output_format != 'text':
+            writer = get_record_writer(
+                self.output_format, fields=list(HistoryPoint._fields)
+            )
+            writer.write_all(dict(p._asdict()) for p in points)
+            writer.close()
+            return
+        for p in points:
+            print('{t} {a} {r} {s}/{n}{res} usage={u:g} max={m:g} '
+                  'limit={lim}'.format(
+                      t=time.strftime(
+                          '%Y-%m-%dT%H:%M:%SZ', time.gmtime(p.timestamp)
+                      ),
+                      a=p.account_id, r=p.region, s=p.service, n=p.limit,
+                      res='' if p.resource_id is None
+                      else ' (%s)' % p.resource_id,
+                      u=p.usage, m=p.max_usage, lim=p.limit_value
+                  ))
+
+    def record_history(self, result, path=None):
+        """
+        Record a result to the local history store and compact the store.
+
+        :param result: result of checking thresholds
+        :type result: :py:class:`~.CheckResult`
+        :param path: path to the history store, or None for the default
+        :type path: str
+        """
+        with HistoryStore(path) as store:
+            count = store.record(
+                result, account_id=self.checker.account_id,
+                region=self.checker.region_name
+            )
+            store.compact()
+        logger.info('Recorded %d samples to history store', count)
+
+    def export_snapshot(self, result, path):
+        """
+        Write a result to a snapshot file; see
+        :py:meth:`~.AwsLimitChecker.export_snapshot`.
+
+        :param result: result of checking thresholds
+        :type result: :py:class:`~.CheckResult`
+        :param path: path to write the snapshot to
+        :type path: str
+        """
+        count = self.checker.export_snapshot(path, result=result)
+        logger.info('Wrote %d limits to snapshot %s', count, path)
+
+    def fleet_report(self, paths, top):
+        """
+        Combine snapshot files and print fleet-wide rollups: the limits
+        closest to exhaustion, utilization percentiles per limit and counts
+        of limits by state. See :py:class:`~.FleetRollup`.
+
+        :param paths: paths to the snapshot files
+        :type paths: list
+        :param top: number of limits closest to exhaustion to show
+        :type top: int
+        """
+        rollup = FleetRollup(top=top)
+        for path in paths:
+            rollup.add_snapshot(path)
+        self._print_fleet(rollup)
+
+    def _print_fleet(self, rollup):
+        """
+        Print the fleet-wide rollups of a :py:class:`~.FleetRollup`.
+
+        :param rollup: the rollup to print
+        :type rollup: :py:class:`~.FleetRollup`
+        """
+        if self.output_format != 'text':
+            writer = get_record_writer(
+                self.output_format, fields=rollup.record_fields
+            )
+            writer.write_all(rollup.records())
+            writer.close()
+            return
+        print('Limits in %d snapshots by state: %s' % (
+            rollup.snapshots, ' '.join([
+                '%s=%d' % (state, rollup.states[state]) for state in STATES
+            ])
+        ))
+        print('\nLimits closest to exhaustion:')
+        for e in rollup.top_limits():
+            print('{a} {r} {s}/{n} {u:.1f}% of {lim} ({st})'.format(
+                a=e.account_id, r=e.region, s=e.service, n=e.limit,
+                u=e.utilization, lim=e.limit_value, st=e.state
+            ))
+        print('\nUtilization by limit:')
+        data = {}
+        for stats in rollup.limit_stats():
+            parts = ['%s=%d' % (state, stats.states.get(state, 0))
+                     for state in STATES]
+            if stats.max is not None:
+                parts.append('max=%.1f%%' % stats.max)
+                parts.extend([
+                    'p%g=%.1f%%' % (p, stats.percentiles[p])
+                    for p in rollup.percentiles
+                ])
+            data['{s}/{n}'.format(s=stats.service, n=stats.limit)] = ' '.join(
+                parts
+            )
+        print(dict2cols(data))
+
+    def _checker_kwargs(self, args):
+        """
+        Return the keyword arguments for :py:class:`~.AwsLimitChecker` from
+        command line arguments.
+
+        :param args: parsed command line arguments
+        :type args: :py:class:`argparse.Namespace`
+        :rtype: dict
+        """
+        return dict(
+            warning_threshold=args.warning_threshold,
+            critical_threshold=args.critical_threshold,
+            profile_name=args.profile_name,
+            account_id=args.sts_account_id,
+            account_role=args.sts_account_role,
+            region=args.region,
+            external_id=args.external_id,
+            mfa_serial_number=args.mfa_serial_number,
+            mfa_token=args.mfa_token,
+            ta_refresh_mode=args.ta_refresh_mode,
+            ta_refresh_timeout=args.ta_refresh_timeout,
+            check_version=args.check_version,
+            role_partition=args.role_partition,
+            ta_api_region=args.ta_api_region,
+            skip_quotas=args.skip_quotas
+        )
+
+    def enqueue(self, queue_url, accounts, regions):
+        """
+        Enqueue distributed work items for the selected services; see
+        :py:class:`~.Coordinator`.
+
+        :param queue_url: work queue URL or directory
+        :type queue_url: str
+        :param accounts: account IDs to check; defaults to the account of
+          the workers' credentials
+        :type accounts: list
+        :param regions: regions to check; defaults to the current region
+        :type regions: list
+        """
+        if len(accounts) == 0:
+            accounts = [None]
+        if len(regions) == 0:
+            regions = [self.checker.region_name]
+        services = self._selected_services()
+        coordinator = Coordinator(
+            get_work_queue(queue_url), accounts, regions, services=services
+        )
+        count = coordinator.enqueue()
+        print('Enqueued %d work items' % count)
+
+    def run_worker(self, queue_url, lease_seconds, checker_kwargs):
+        """
+        Check work items from a queue until it is empty; see
+        :py:class:`~.Worker`.
+
+        :param queue_url: work queue URL or directory
+        :type queue_url: str
+        :param lease_seconds: seconds to lease each item for
+        :type lease_seconds: int
+        :param checker_kwargs: keyword arguments for
+          :py:class:`~.AwsLimitChecker`
+        :type checker_kwargs: dict
+        """
+        kwargs = dict(checker_kwargs)
+        kwargs.pop('account_id', None)
+        kwargs.pop('region', None)
+        worker = Worker(
+            get_work_queue(queue_url), lease_seconds=lease_seconds,
+            checker_kwargs=kwargs, use_ta=(not self.skip_ta)
+        )
+        count = worker.run()
+        logger.info('Checked %d work items', count)
+
+    def aggregate(self, queue_url, top):
+        """
+        Show progress, per-worker throughput and fleet-wide rollups of the
+        results in a work queue; see :py:class:`~.Aggregator`.
+
+        :param queue_url: work queue URL or directory
+        :type queue_url: str
+        :param top: number of limits closest to exhaustion to show
+        :type top: int
+        """
+        agg = Aggregator(get_work_queue(queue_url), top=top)
+        counts = agg.collect()
+        if self.output_format == 'text':
+            print('Work items: %s' % ' '.join([
+                '%s=%d' % (k, counts[k]) for k in ['pending', 'leased', 'done']
+            ]))
+            print('\nWorkers:')
+            data = {}
+            for w in agg.worker_stats():
+                data[w.worker_id] = '%d items (%d errors) in %.1fs%s' % (
+                    w.items, w.errors, w.busy_seconds,
+                    '' if w.items_per_minute is None else
+                    ', %.1f items/minute' % w.items_per_minute
+                )
+            print(dict2cols(data))
+            for res in agg.errors:
+                print('ERROR: %s on %s: %s' % (
+                    res.item.item_id, res.worker_id, res.error
+                ))
+            print('')
+        self._print_fleet(agg.rollup)
+
     def show_usage(self):
-        self.checker.find_usage(
-            service=self.service_name, use_ta=(not self.skip_ta))
-        limits = self.checker.get_limits(
-            service=self.service_name, use_ta=(not self.skip_ta))
+        if self.output_format != 'text':
+            writer = get_record_writer(self.output_format)
+            for result in self.checker.iter_results(
+                service=self.service_name, use_ta=(not self.skip_ta),
+                limits=self.limit_selection
+            ):
+                for svc, limits in sorted(result.limits.items()):
+                    for lim in sorted(limits.keys()):
+                        writer.write_all(usage_records(
+                            svc, limits[lim], top_k=self.usage_top_k
+                        ))
+            writer.close()
+            return
+        limits = self.checker.check_thresholds(
+            service=self.service_name, use_ta=(not self.skip_ta),
+            limits=self.limit_selection
+        ).limits
         data = {}
         for svc in sorted(limits.keys()):
             for lim in sorted(limits[svc].keys()):
                 data["{s}/{l}".format(s=svc, l=lim)] = '{v}'.format(
-                    v=limits[svc][lim].get_current_usage_str())
+                    v=limits[svc][lim].get_current_usage_str(
+                        top_k=self.usage_top_k
+                    ))
         print(dict2cols(data))
 
-    def check_thresholds(self, metrics=None):
+    def _check_results(self):
+        """
+        Check thresholds and yield :py:class:`~.CheckResult` instances; a
+        single result for all services with text output, otherwise one result
+        per service as each service completes
+        (:py:meth:`~.AwsLimitChecker.iter_results`).
+
+        :rtype: generator of :py:class:`~.CheckResult`
+        """
+        if self.output_format == 'text':
+            yield self.checker.check_thresholds(
+                use_ta=(not self.skip_ta),
+                service=self.service_name,
+                limits=self.limit_selection
+            )
+            return
+        for result in self.checker.iter_results(
+            use_ta=(not self.skip_ta), service=self.service_name,
+            limits=self.limit_selection
+        ):
+            yield result
+
+    def watch_events(self, queue_url, reconcile_minutes, metrics=None,
+                     alerter=None):
+        """
+        Find usage, and then keep it up to date from CloudTrail events
+        delivered to an SQS queue (see :py:class:`~.EventUpdater`), checking
+        thresholds after each change. Runs until interrupted.
+
+        Thresholds are checked against the limits and usage already
+        collected (:py:meth:`~.AwsLimitChecker.check_collected_thresholds`),
+        without querying limits again; the results of each check are sent to
+        the metrics and alert providers, if given.
+
+        :param queue_url: URL of the SQS queue that receives the events
+        :type queue_url: str
+        :param reconcile_minutes: minutes between finding usage for all
+          services again
+        :type reconcile_minutes: int
+        :param metrics: metrics provider to send each check's results to
+        :type metrics: :py:class:`~.MetricsProvider`
+        :param alerter: alert provider to send each check's results to
+        :type alerter: :py:class:`~.AlertProvider`
+        """
+        updater = EventUpdater(
+            self.checker, queue_url,
+            reconcile_interval=reconcile_minutes * 60,
+            use_ta=(not self.skip_ta)
+        )
+
+        def on_update():
+            start_time = time.time()
+            if metrics:
+                metrics.reset()
+            res, problems, problem_str = self.check_thresholds(
+                metrics, results=[
+                    self.checker.check_collected_thresholds(
+                        service=self.service_name
+                    )
+                ]
+            )
+            duration = time.time() - start_time
+            if metrics:
+                metrics.set_run_duration(duration)
+                metrics.flush()
+            if alerter:
+                self._send_alerts(
+                    alerter, res, problems, problem_str, duration
+                )
+
+        updater.run(on_update=on_update)
+
+    def _send_alerts(self, alerter, res, problems, problem_str, duration):
+        """
+        Send the result of a threshold check to an alert provider, and flush
+        it.
+
+        :param alerter: the alert provider
+        :type alerter: :py:class:`~.AlertProvider`
+        :param res: exit code returned by :py:meth:`~.check_thresholds`
+        :type res: int
+        :param problems: limits that crossed thresholds
+        :type problems: :py:class:`~.CheckResult`
+        :param problem_str: string representation of ``problems``
+        :type problem_str: str
+        :param duration: time taken to check thresholds
+        :type duration: float
+        """
+        if res == 2:
+            alerter.on_critical(problems, problem_str, duration=duration)
+        elif res == 1:
+            alerter.on_warning(problems, problem_str, duration=duration)
+        else:
+            alerter.on_success(duration=duration)
+        alerter.flush()
+
+    def check_thresholds(self, metrics=None, results=None):
         have_warn = False
         have_crit = False
-        problems = self.checker.check_thresholds(
-            use_ta=(not self.skip_ta),
-            service=self.service_name
-        )
+        writer = None
+        if self.output_format != 'text':
+            writer = get_record_writer(self.output_format)
+        if results is None:
+            results = self._check_results()
+        checked = []
+        columns = {}
+        for result in results:
+            checked.append(result)
+            for svc in sorted(result.keys()):
+                for lim_name in sorted(result[svc].keys()):
+                    check_name = "{svc}/{limit}".format(
+                        svc=svc,
+                        limit=lim_name,
+                    )
+                    if check_name in self.skip_check:
+                        continue
+                    limit = result[svc][lim_name]
+                    warns = limit.get_warnings()
+                    crits = limit.get_criticals()
+                    if len(crits) > 0:
+                        have_crit = True
+                    if len(warns) > 0:
+                        have_warn = True
+                    k, v = issue_string_tuple(
+                        svc, limit, crits, warns, colorize=self.colorize,
+                        top_k=self.usage_top_k
+                    )
+                    columns[k] = v
+                    if writer is not None:
+                        writer.write_all(threshold_records(
+                            svc, limit, top_k=self.usage_top_k
+                        ))
+            for svc in sorted(result.skipped.keys()):
+                for lim_name in sorted(result.skipped[svc].keys()):
+                    check_name = "{svc}/{limit}".format(
+                        svc=svc,
+                        limit=lim_name,
+                    )
+                    if check_name in self.skip_check:
+                        continue
+                    limit = result.skipped[svc][lim_name]
+                    k, v = skipped_string_tuple(
+                        svc, limit, colorize=self.colorize
+                    )
+                    columns[k] = v
+                    if writer is not None:
+                        writer.write_all(skipped_records(svc, limit))
+        if writer is None:
+            problems = checked[0]
+        else:
+            problems = CheckResult.combine(checked)
         if metrics:
-            for svc, svc_limits in sorted(self.checker.get_limits().items()):
-                if self.service_name and svc not in self.service_name:
-                    continue
+            for svc, svc_limits in sorted(problems.limits.items()):
                 for _, limit in sorted(svc_limits.items()):
                     metrics.add_limit(limit)
-        columns = {}
-        for svc in sorted(problems.keys()):
-            for lim_name in sorted(problems[svc].keys()):
-                check_name = "{svc}/{limit}".format(
-                    svc=svc,
-                    limit=lim_name,
-                )
-                if check_name in self.skip_check:
-                    continue
-                limit = problems[svc][lim_name]
-                warns = limit.get_warnings()
-                crits = limit.get_criticals()
-                if len(crits) > 0:
-                    have_crit = True
-                if len(warns) > 0:
-                    have_warn = True
-                k, v = issue_string_tuple(
-                    svc, limit, crits, warns, colorize=self.colorize
-                )
-                columns[k] = v
         d2c = dict2cols(columns)
-        print(d2c)
+        if writer is None:
+            print(d2c)
+        else:
+            writer.close()
         # might as well use the Nagios exit codes,
         # even though our output doesn't work for that
         if have_crit:
@@ -377,6 +908,40 @@ class Runner(object):
             svc, limit = key.split('/')
             self.checker.set_limit_override(svc, limit, int(overrides[key]))
 
+    def set_limit_selection(self, names):
+        """
+        Restrict finding usage and checking thresholds to the named limits.
+
+        :param names: limit names in ``service/limit`` format
+        :type names: list
+        """
+        selection = {}
+        for name in names:
+            if name.count('/') != 1:
+                raise ValueError("Limit names must be in 'service/limit' "
+                                 "format; {k} is invalid.".format(k=name))
+            svc, limit = name.split('/')
+            selection.setdefault(svc, []).append(limit)
+        self.limit_selection = selection
+
+    def show_plan(self):
+        """
+        Print the usage collection steps, and the API calls each makes, that
+        checking the selected services or limits would run.
+        """
+        plan = self.checker.get_usage_plan(
+            service=self.service_name, limits=self.limit_selection
+        )
+        for svc in sorted(plan.keys()):
+            print(svc)
+            if plan[svc] is None:
+                print('  find_usage: all limits (steps not declared)')
+                continue
+            for step in plan[svc]:
+                print('  {m}: {a}'.format(
+                    m=step.method, a=', '.join(step.api_calls)
+                ))
+
     def load_json(self, path):
         """Load JSON from either a local file or S3"""
         if path.startswith('s3://'):
@@ -411,6 +976,42 @@ class Runner(object):
 
     def console_entry_point(self):
         args = self.parse_args(sys.argv[1:])
+        cassette = None
+        if args.record_dir is not None:
+            cassette = Cassette(args.record_dir, mode='record')
+        elif args.replay_dir is not None:
+            cassette = Cassette(
+                args.replay_dir, mode='replay',
+                simulate_latency=args.replay_latency
+            )
+            # don't make any network requests when replaying
+            args.check_version = False
+        if cassette is None:
+            return self._console_entry_point(args)
+        with cassette:
+            self._console_entry_point(args)
+
+    @contextmanager
+    def _profiling(self, args):
+        """
+        Context manager to profile checking thresholds according to the
+        ``--profile-cpu`` and ``--profile-mem`` options, printing the memory
+        profile report to STDERR on exit.
+
+        :param args: parsed arguments
+        :type args: :py:class:`argparse.Namespace`
+        """
+        with ExitStack() as stack:
+            if args.profile_cpu is not None:
+                stack.enter_context(
+                    self.checker.profile_cpu(args.profile_cpu)
+                )
+            if args.profile_mem:
+                mem = stack.enter_context(self.checker.profile_memory())
+                stack.callback(mem.report)
+            yield
+
+    def _console_entry_point(self, args):
         self.service_name = args.service
         if args.verbose == 1:
             logger.setLevel(logging.INFO)
@@ -428,24 +1029,11 @@ class Runner(object):
         if args.skip_ta:
             self.skip_ta = True
 
+        self.usage_top_k = args.usage_detail
+        self.output_format = args.output_format
+
         # the rest of these actually use the checker
-        self.checker = AwsLimitChecker(
-            warning_threshold=args.warning_threshold,
-            critical_threshold=args.critical_threshold,
-            profile_name=args.profile_name,
-            account_id=args.sts_account_id,
-            account_role=args.sts_account_role,
-            region=args.region,
-            external_id=args.external_id,
-            mfa_serial_number=args.mfa_serial_number,
-            mfa_token=args.mfa_token,
-            ta_refresh_mode=args.ta_refresh_mode,
-            ta_refresh_timeout=args.ta_refresh_timeout,
-            check_version=args.check_version,
-            role_partition=args.role_partition,
-            ta_api_region=args.ta_api_region,
-            skip_quotas=args.skip_quotas
-        )
+        self.checker = AwsLimitChecker(**self._checker_kwargs(args))
 
         if args.version:
             print('awslimitchecker {v} (see <{s}> for source code)'.format(
@@ -461,6 +1049,9 @@ class Runner(object):
             for check in args.skip_check:
                 self.skip_check.append(check)
 
+        if len(args.only_limit) > 0:
+            self.set_limit_selection(args.only_limit)
+
         if args.limit_override_json is not None:
             self.set_limit_overrides_from_json(args.limit_override_json)
 
@@ -488,8 +1079,13 @@ class Runner(object):
             self.iam_policy()
             raise SystemExit(0)
 
+        if args.plan:
+            self.show_plan()
+            raise SystemExit(0)
+
         if args.show_usage:
-            self.show_usage()
+            with self._profiling(args):
+                self.show_usage()
             raise SystemExit(0)
 
         if args.list_metrics_providers:
@@ -504,12 +1100,49 @@ class Runner(object):
                 print(p)
             raise SystemExit(0)
 
-        # else check
+        if args.history is not None:
+            self.show_history(
+                args.history, args.history_days, path=args.history_file
+            )
+            raise SystemExit(0)
+
+        if len(args.fleet_report) > 0:
+            self.fleet_report(args.fleet_report, args.fleet_top)
+            raise SystemExit(0)
+
+        if args.queue is not None and args.enqueue:
+            self.enqueue(args.queue, args.fleet_accounts, args.fleet_regions)
+            raise SystemExit(0)
+
+        if args.queue is not None and args.worker:
+            self.run_worker(
+                args.queue, args.lease_seconds, self._checker_kwargs(args)
+            )
+            raise SystemExit(0)
+
+        if args.queue is not None and args.aggregate:
+            self.aggregate(args.queue, args.fleet_top)
+            raise SystemExit(0)
+
         alerter = None
         if args.alert_provider:
             alerter = AlertProvider.get_provider_by_name(
                 args.alert_provider
             )(self.checker.region_name, **args.alert_config)
+
+        if args.event_queue is not None:
+            metrics = None
+            if args.metrics_provider:
+                metrics = MetricsProvider.get_provider_by_name(
+                    args.metrics_provider
+                )(self.checker.region_name, **args.metrics_config)
+            self.watch_events(
+                args.event_queue, args.reconcile_minutes, metrics=metrics,
+                alerter=alerter
+            )
+            raise SystemExit(0)
+
+        # else check
         start_time = time.time()
         try:
             metrics = None
@@ -517,29 +1150,28 @@ class Runner(object):
                 metrics = MetricsProvider.get_provider_by_name(
                     args.metrics_provider
                 )(self.checker.region_name, **args.metrics_config)
-            res, problems, problem_str = self.check_thresholds(metrics)
+            with self._profiling(args):
+                res, problems, problem_str = self.check_thresholds(metrics)
             duration = time.time() - start_time
             logger.info('Finished checking limits in %s seconds', duration)
             if metrics:
                 metrics.set_run_duration(duration)
                 metrics.flush()
+            if args.record_history:
+                self.record_history(problems, path=args.history_file)
+            if args.export_snapshot is not None:
+                self.export_snapshot(problems, args.export_snapshot)
         except Exception as ex:
             if alerter:
                 alerter.on_critical(
                     None, None, exc=ex, duration=time.time() - start_time
                 )
+                alerter.flush()
             raise
         if alerter:
-            if res == 2:
-                alerter.on_critical(
-                    problems, problem_str, duration=time.time() - start_time
-                )
-            elif res == 1:
-                alerter.on_warning(
-                    problems, problem_str, duration=time.time() - start_time
-                )
-            else:
-                alerter.on_success(duration=time.time() - start_time)
+            self._send_alerts(
+                alerter, res, problems, problem_str, time.time() - start_time
+            )
             # with alert provider, always exit zero
             raise SystemExit(0)
         raise SystemExit(res)
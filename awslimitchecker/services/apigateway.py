@@ -38,11 +38,13 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 """
 
 import abc  # noqa
+import os
+import time
 import logging
 
 from .base import _AwsService
 from ..limit import AwsLimit
-from awslimitchecker.utils import paginate_dict
+from awslimitchecker.utils import load_cache_json, save_cache_json
 
 logger = logging.getLogger(__name__)
 
@@ -103,52 +105,153 @@ class _ApigatewayService(_AwsService):
         )
         logger.debug('Found %d APIs', len(api_ids))
         # now the per-API limits...
-        warn_stages_paginated = None
         logger.debug('Finding usage for per-API limits')
-        for api_id in api_ids:
-            res_count = 0
-            paginator = self.conn.get_paginator('get_resources')
-            for resp in paginator.paginate(restApiId=api_id):
-                res_count += len(resp['items'])
+        cache_ttl = self._per_api_cache_ttl
+        cache = {}
+        if cache_ttl is not None:
+            cache = load_cache_json(self._per_api_cache_name)
+        results = self._concurrent_map(
+            lambda api_id: self._get_api_counts(
+                api_id, cache.get(api_id), cache_ttl
+            ),
+            api_ids
+        )
+        warn_stages_paginated = None
+        new_cache = {}
+        for api_id, (entry, extra_keys) in zip(api_ids, results):
+            new_cache[api_id] = entry
+            if extra_keys:
+                warn_stages_paginated = extra_keys
+            counts = entry['counts']
             self.limits['Resources per API']._add_current_usage(
-                res_count, resource_id=api_id,
+                counts['resources'], resource_id=api_id,
                 aws_type='AWS::ApiGateway::Resource'
             )
-            doc_parts = paginate_dict(
-                self.conn.get_documentation_parts,
-                restApiId=api_id,
-                alc_marker_path=['position'],
-                alc_data_path=['items'],
-                alc_marker_param='position'
-            )
             self.limits['Documentation parts per API']._add_current_usage(
-                len(doc_parts), resource_id=api_id,
+                counts['documentation_parts'], resource_id=api_id,
                 aws_type='AWS::ApiGateway::DocumentationPart'
             )
-            # note that per the boto3 docs, there's no pagination of this...
-            stages = self.conn.get_stages(restApiId=api_id)
-            if len(set(stages.keys()) - set(['item', 'ResponseMetadata'])) > 0:
-                warn_stages_paginated = stages.keys()
             self.limits['Stages per API']._add_current_usage(
-                len(stages['item']), resource_id=api_id,
+                counts['stages'], resource_id=api_id,
                 aws_type='AWS::ApiGateway::Stage'
             )
-            authorizers = paginate_dict(
-                self.conn.get_authorizers,
-                restApiId=api_id,
-                alc_marker_path=['position'],
-                alc_data_path=['items'],
-                alc_marker_param='position'
-            )
             self.limits['Custom authorizers per API']._add_current_usage(
-                len(authorizers), resource_id=api_id,
+                counts['authorizers'], resource_id=api_id,
                 aws_type='AWS::ApiGateway::Authorizer'
             )
+        if cache_ttl is not None:
+            save_cache_json(self._per_api_cache_name, new_cache)
         if warn_stages_paginated is not None:
             logger.warning(
                 'APIGateway get_stages returned more keys than present in '
-                'boto3 docs: %s', sorted(warn_stages_paginated)
+                'boto3 docs: %s', warn_stages_paginated
+            )
+
+    @property
+    def _per_api_cache_ttl(self):
+        """
+        Return the maximum age in seconds of cached per-API counts that may
+        be reused, from the ``ALC_APIGATEWAY_CACHE_TTL`` environment variable,
+        or None if per-API caching is disabled (the default).
+
+        :rtype: ``int`` or ``None``
+        """
+        val = os.environ.get('ALC_APIGATEWAY_CACHE_TTL')
+        if not val:
+            return None
+        try:
+            return int(val)
+        except Exception:
+            logger.error(
+                'ERROR: Found "ALC_APIGATEWAY_CACHE_TTL" environment '
+                'variable, but unable to parse value "%s" to an integer.', val
+            )
+        return None
+
+    @property
+    def _per_api_cache_name(self):
+        """
+        Return the cache file name for per-API counts in the current account
+        and region.
+
+        :rtype: str
+        """
+        return 'apigateway-%s-%s.json' % (
+            self.current_account_id, self.conn._client_config.region_name
+        )
+
+    def _count_items(self, operation, **kwargs):
+        """
+        Return the total number of ``items`` returned by all pages of the
+        paginated ``operation``, without combining the pages into one list.
+
+        :param operation: name of the client operation to paginate
+        :type operation: str
+        :param kwargs: parameters to pass to the operation
+        :type kwargs: dict
+        :returns: total number of items
+        :rtype: int
+        """
+        count = 0
+        paginator = self.conn.get_paginator(operation)
+        for resp in paginator.paginate(**kwargs):
+            count += len(resp['items'])
+        return count
+
+    def _get_api_counts(self, api_id, cached=None, cache_ttl=None):
+        """
+        Return the counts of resources, documentation parts, stages and
+        custom authorizers for one REST API.
+
+        The API's stages are always retrieved. If ``cached`` is given, is
+        less than ``cache_ttl`` seconds old, and has the same stage
+        fingerprint (stage names, deployment IDs and last-updated dates) as
+        the current stages, the cached counts are reused instead of paging
+        through the other per-API operations. This is called from worker
+        threads via :py:meth:`~._concurrent_map`, and must not modify limits.
+
+        :param api_id: REST API ID
+        :type api_id: str
+        :param cached: cache entry for this API from a previous run, or None
+        :type cached: ``dict`` or ``None``
+        :param cache_ttl: maximum age of a reusable cache entry, in seconds
+        :type cache_ttl: ``int`` or ``None``
+        :returns: 2-tuple of the (new) cache entry for this API, and a sorted
+          list of unexpected ``get_stages`` response keys or None
+        :rtype: tuple
+        """
+        # note that per the boto3 docs, there's no pagination of this...
+        stages = self.conn.get_stages(restApiId=api_id)
+        extra_keys = None
+        if len(set(stages.keys()) - set(['item', 'ResponseMetadata'])) > 0:
+            extra_keys = sorted(stages.keys())
+        fingerprint = sorted([
+            [
+                x.get('stageName', ''), x.get('deploymentId', ''),
+                str(x.get('lastUpdatedDate', ''))
+            ] for x in stages['item']
+        ])
+        now = time.time()
+        if (
+            cached is not None and cache_ttl is not None and
+            now - cached.get('time', 0) < cache_ttl and
+            cached.get('fingerprint') == fingerprint
+        ):
+            logger.debug('Using cached per-API counts for API %s', api_id)
+            return cached, extra_keys
+        counts = {
+            'resources': self._count_items('get_resources', restApiId=api_id),
+            'documentation_parts': self._count_items(
+                'get_documentation_parts', restApiId=api_id
+            ),
+            'stages': len(stages['item']),
+            'authorizers': self._count_items(
+                'get_authorizers', restApiId=api_id
             )
+        }
+        return {
+            'time': now, 'fingerprint': fingerprint, 'counts': counts
+        }, extra_keys
 
     def _find_usage_api_keys(self):
         """
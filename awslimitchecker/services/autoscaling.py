@@ -42,7 +42,7 @@ import logging
 
 from .base import _AwsService
 from ..limit import AwsLimit
-from ..utils import paginate_dict
+from botocore.exceptions import ClientError
 
 logger = logging.getLogger(__name__)
 
@@ -53,43 +53,92 @@ class _AutoscalingService(_AwsService):
     api_name = 'autoscaling'
     quotas_service_code = 'autoscaling'
 
+    #: Mapping of limit name to the DescribeAccountLimits usage counter, the
+    #: API method and response key that enumerate the resources if the
+    #: counter is missing, and the resource's aws_type
+    USAGE_COUNTERS = {
+        'Auto Scaling groups': (
+            'NumberOfAutoScalingGroups',
+            'describe_auto_scaling_groups',
+            'AutoScalingGroups',
+            'AWS::AutoScaling::AutoScalingGroup'
+        ),
+        'Launch configurations': (
+            'NumberOfLaunchConfigurations',
+            'describe_launch_configurations',
+            'LaunchConfigurations',
+            'AWS::AutoScaling::LaunchConfiguration'
+        ),
+    }
+
+    def __init__(self, *args, **kwargs):
+        super(_AutoscalingService, self).__init__(*args, **kwargs)
+        #: DescribeAccountLimits response received by
+        #: :py:meth:`~._update_limits_from_api`, until used by
+        #: :py:meth:`~.find_usage`
+        self._account_limits = None
+
     def find_usage(self):
         """
         Determine the current usage for each limit of this service,
         and update corresponding Limit via
         :py:meth:`~.AwsLimit._add_current_usage`.
+
+        Usage is taken from the counters in the DescribeAccountLimits
+        response (the one already received by
+        :py:meth:`~._update_limits_from_api`, if any); resources are only
+        enumerated for counters missing from the response, or if the API
+        call fails.
         """
         logger.debug("Checking usage for service %s", self.service_name)
         self.connect()
         for lim in self.limits.values():
             lim._reset_usage()
-
-        self.limits['Auto Scaling groups']._add_current_usage(
-            len(
-                paginate_dict(
-                    self.conn.describe_auto_scaling_groups,
-                    alc_marker_path=['NextToken'],
-                    alc_data_path=['AutoScalingGroups'],
-                    alc_marker_param='NextToken'
-                )['AutoScalingGroups']
-            ),
-            aws_type='AWS::AutoScaling::AutoScalingGroup',
-        )
-
-        self.limits['Launch configurations']._add_current_usage(
-            len(
-                paginate_dict(
-                    self.conn.describe_launch_configurations,
-                    alc_marker_path=['NextToken'],
-                    alc_data_path=['LaunchConfigurations'],
-                    alc_marker_param='NextToken'
-                )['LaunchConfigurations']
-            ),
-            aws_type='AWS::AutoScaling::LaunchConfiguration',
-        )
+        lims = self._account_limits
+        self._account_limits = None
+        if lims is None:
+            try:
+                lims = self.conn.describe_account_limits()
+            except ClientError as ex:
+                logger.warning(
+                    'Unable to get AutoScaling usage from '
+                    'DescribeAccountLimits (%s); counting resources instead',
+                    ex.response['Error']['Code']
+                )
+                lims = {}
+        for lname, (counter, method, key, aws_type) in sorted(
+            self.USAGE_COUNTERS.items()
+        ):
+            if counter in lims:
+                usage = lims[counter]
+            else:
+                logger.debug(
+                    'DescribeAccountLimits did not return %s; counting '
+                    'with %s', counter, method
+                )
+                usage = self._count_resources(method, key)
+            self.limits[lname]._add_current_usage(usage, aws_type=aws_type)
         self._have_usage = True
         logger.debug("Done checking usage.")
 
+    def _count_resources(self, method, key):
+        """
+        Count the resources returned by a paginated Describe API method, page
+        by page.
+
+        :param method: name of the client method to paginate
+        :type method: str
+        :param key: key of the resource list in each page
+        :type key: str
+        :returns: number of resources
+        :rtype: int
+        """
+        count = 0
+        paginator = self.conn.get_paginator(method)
+        for page in paginator.paginate(PaginationConfig={'PageSize': 100}):
+            count += len(page[key])
+        return count
+
     def get_limits(self):
         """
         Return all known limits for this service, as a dict of their names
@@ -143,10 +192,14 @@ class _AutoscalingService(_AwsService):
         """
         Query EC2's DescribeAccountAttributes API action, and update limits
         with the quotas returned. Updates ``self.limits``.
+
+        The response is kept in ``self._account_limits``, so that the next
+        :py:meth:`~.find_usage` takes usage from its counters.
         """
         self.connect()
         logger.info("Querying EC2 DescribeAccountAttributes for limits")
         lims = self.conn.describe_account_limits()
+        self._account_limits = lims
         self.limits['Auto Scaling groups']._set_api_limit(
             lims['MaxNumberOfAutoScalingGroups'])
         self.limits['Launch configurations']._set_api_limit(
@@ -38,13 +38,27 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 """
 
 import abc
+import os
 import logging
-import boto3
+from collections import namedtuple
 from datetime import datetime, timedelta
-from awslimitchecker.connectable import Connectable
+from awslimitchecker.cassette import attach_cassette
+from awslimitchecker.connectable import Connectable, boto3_client
+from awslimitchecker.limit import evaluate_thresholds
+from awslimitchecker.utils import concurrent_map
 
 logger = logging.getLogger(__name__)
 
+#: One step of a service's :py:meth:`~._AwsService.find_usage`; ``method`` is
+#: the name of the service method that runs the step, ``limits`` the names of
+#: the limits it finds usage for, ``api_calls`` the ``service:Action`` API
+#: calls it makes, and ``requires`` the names of the steps whose return values
+#: are passed to ``method`` as positional arguments.
+UsageStep = namedtuple(
+    'UsageStep', ['method', 'limits', 'api_calls', 'requires']
+)
+UsageStep.__new__.__defaults__ = ((),)
+
 
 class _AwsService(Connectable):
     __metaclass__ = abc.ABCMeta
@@ -58,6 +72,26 @@ class _AwsService(Connectable):
     #: the service code for Service Quotas, or None
     quotas_service_code = None
 
+    #: the default maximum number of concurrent API calls made by
+    #: :py:meth:`~._concurrent_map`; overridden by the
+    #: ``ALC_MAX_WORKERS_<api_name>`` environment variable
+    default_max_workers = 8
+
+    #: whether :py:meth:`~._concurrent_map` makes its calls serially, in the
+    #: calling thread; set by :py:class:`~.AwsLimitChecker` while profiling,
+    #: as :py:mod:`cProfile` only profiles the thread that enabled it
+    _serial_calls = False
+
+    #: dict of CloudTrail event name (for events from this service's
+    #: ``<api_name>.amazonaws.com`` event source) to the name of the method
+    #: that applies that event to current usage; see :py:meth:`~.apply_event`
+    event_handlers = {}
+
+    #: whether the service is global, i.e. has the same limits and usage in
+    #: every region of an account; see
+    #: :py:meth:`.AwsLimitChecker.share_global_services`
+    global_service = False
+
     def __init__(self, warning_threshold, critical_threshold,
                  boto_connection_kwargs, quotas_client):
         """
@@ -94,6 +128,7 @@ class _AwsService(Connectable):
         self._have_usage = False
         self._current_account_id = None
         self._cloudwatch_client = None
+        self._event_deltas = {}
 
     @property
     def current_account_id(self):
@@ -107,7 +142,7 @@ class _AwsService(Connectable):
         if self._current_account_id is not None:
             return self._current_account_id
         kwargs = dict(self._boto3_connection_kwargs)
-        sts = boto3.client('sts', **kwargs)
+        sts = attach_cassette(boto3_client('sts', **kwargs))
         logger.info(
             "Connected to STS in region %s", sts._client_config.region_name
         )
@@ -147,6 +182,154 @@ class _AwsService(Connectable):
         """
         raise NotImplementedError('abstract base class')
 
+    def usage_steps(self):
+        """
+        Return the steps that :py:meth:`~.find_usage` runs, in the order it
+        runs them, for services that can find usage for only some of their
+        limits. Services that support this override this method and accept a
+        ``limits`` argument to :py:meth:`~.find_usage`, which should call
+        :py:meth:`~._run_usage_steps`.
+
+        :returns: list of steps, or None if :py:meth:`~.find_usage` always
+          finds usage for all limits of this service
+        :rtype: :py:obj:`list` of :py:class:`~.UsageStep`, or :py:obj:`None`
+        """
+        return None
+
+    def usage_plan(self, limits=None):
+        """
+        Return the :py:meth:`~.usage_steps` needed to find usage for the
+        named limits, including the steps that they require, in the order
+        that they will run.
+
+        :param limits: names of the limits to find usage for, or None for all
+        :type limits: :py:obj:`list` or :py:obj:`None`
+        :returns: list of steps, or None if this service does not declare
+          usage steps
+        :rtype: :py:obj:`list` of :py:class:`~.UsageStep`, or :py:obj:`None`
+        :raises: ValueError if a limit name is not known to this service
+        """
+        steps = self.usage_steps()
+        if limits is None or steps is None:
+            return steps
+        for lname in limits:
+            if lname not in self.limits:
+                raise ValueError("{s} service has no '{l}' limit".format(
+                    s=self.service_name,
+                    l=lname))
+        by_method = dict((step.method, step) for step in steps)
+        needed = set()
+        todo = [
+            step.method for step in steps
+            if set(step.limits).intersection(limits)
+        ]
+        while todo:
+            method = todo.pop()
+            if method not in needed:
+                needed.add(method)
+                todo.extend(by_method[method].requires)
+        return [step for step in steps if step.method in needed]
+
+    def _run_usage_steps(self, limits=None):
+        """
+        Reset usage of, and then run, the :py:meth:`~.usage_steps` needed to
+        find usage for the named limits (see :py:meth:`~.usage_plan`). With
+        ``limits`` of None, usage of all limits is reset and all steps run.
+        Limits not found by the steps that run keep their current usage.
+
+        :param limits: names of the limits to find usage for, or None for all
+        :type limits: :py:obj:`list` or :py:obj:`None`
+        """
+        plan = self.usage_plan(limits)
+        if limits is None:
+            to_reset = self.limits.keys()
+        else:
+            to_reset = set()
+            for step in plan:
+                to_reset.update(step.limits)
+        for lname in to_reset:
+            self.limits[lname]._reset_usage()
+        results = {}
+        for step in plan:
+            logger.debug('Running %s usage step: %s', self.service_name,
+                         step.method)
+            results[step.method] = getattr(self, step.method)(
+                *[results[x] for x in step.requires]
+            )
+
+    def apply_event(self, event_name, detail):
+        """
+        Apply a CloudTrail management event (for an API call made to this
+        service) to the current usage of this service's limits, via the
+        method named in :py:attr:`~.event_handlers`. Handler methods take the
+        CloudTrail event record as their only argument, and return True if
+        usage was updated or False if usage cannot be updated from the event
+        and must be found again by :py:meth:`~.find_usage`.
+
+        :param event_name: CloudTrail ``eventName``
+        :type event_name: str
+        :param detail: CloudTrail event record
+        :type detail: dict
+        :returns: None if this service does not handle ``event_name``, True if
+          usage was updated, or False if usage must be found again
+        :rtype: :py:obj:`bool` or :py:obj:`None`
+        """
+        if event_name not in self.event_handlers:
+            return None
+        if not self._have_usage:
+            return False
+        try:
+            return getattr(self, self.event_handlers[event_name])(detail)
+        except (KeyError, TypeError, ValueError, IndexError):
+            logger.warning(
+                'Unable to apply %s event to %s usage', event_name,
+                self.service_name, exc_info=True
+            )
+            return False
+
+    def _apply_usage_deltas(self, deltas, resource_id=None):
+        """
+        Add each ``(limit name, delta)`` 2-tuple in ``deltas`` to the usage
+        of that limit that has no resource ID. If ``resource_id`` is given,
+        remember the deltas so that they can be undone by
+        :py:meth:`~._revert_usage_deltas` when that resource is deleted.
+
+        :param deltas: list of ``(limit name, delta)`` 2-tuples
+        :type deltas: list
+        :param resource_id: AWS ID of the created resource
+        :type resource_id: str
+        """
+        for lname, delta in deltas:
+            self.limits[lname]._adjust_current_usage(
+                delta, aws_type=self.limits[lname].limit_type
+            )
+        if resource_id is not None:
+            self._event_deltas[resource_id] = deltas
+
+    def _revert_usage_deltas(self, resource_id):
+        """
+        Undo the deltas applied by :py:meth:`~._apply_usage_deltas` for a
+        resource that has been deleted.
+
+        :param resource_id: AWS ID of the deleted resource
+        :type resource_id: str
+        :returns: whether deltas were known for the resource
+        :rtype: bool
+        """
+        deltas = self._event_deltas.pop(resource_id, None)
+        if deltas is None:
+            return False
+        self._apply_usage_deltas([(x, -d) for x, d in deltas])
+        return True
+
+    def _clear_event_deltas(self):
+        """
+        Forget the deltas remembered by :py:meth:`~._apply_usage_deltas`,
+        once usage has been found again and so includes the resources they
+        were applied for.
+        """
+        self._event_deltas = {}
+
     @abc.abstractmethod
     def get_limits(self):
         """
@@ -279,12 +462,63 @@ class _AwsService(Connectable):
         """
         if not self._have_usage:
             self.find_usage()
+        names = list(self.limits.keys())
+        results = evaluate_thresholds([self.limits[n] for n in names])
         ret = {}
-        for name, limit in self.limits.items():
-            if limit.check_thresholds() is False:
-                ret[name] = limit
+        for name, result in zip(names, results):
+            if result is False:
+                ret[name] = self.limits[name]
         return ret
 
+    @property
+    def _max_workers(self):
+        """
+        Return the maximum number of worker threads to use for concurrent API
+        calls for this service. This is the value of the
+        ``ALC_MAX_WORKERS_<self.api_name>`` environment variable if set and
+        parseable as an integer, otherwise :py:attr:`~.default_max_workers`.
+
+        :rtype: int
+        """
+        key = 'ALC_MAX_WORKERS_%s' % self.api_name
+        if key not in os.environ:
+            return self.default_max_workers
+        try:
+            max_workers = int(os.environ[key])
+        except Exception:
+            logger.error(
+                'ERROR: Found "%s" environment variable, but unable to '
+                'parse value "%s" to an integer.', key, os.environ[key]
+            )
+            return self.default_max_workers
+        logger.debug(
+            'Using max_workers=%d for "%s" API based on %s environment '
+            'variable.', max_workers, self.api_name, key
+        )
+        return max_workers
+
+    def _concurrent_map(self, func, items):
+        """
+        Call ``func`` for each of ``items`` with up to
+        :py:attr:`~._max_workers` concurrent calls (or serially, if
+        :py:attr:`~._serial_calls`), returning the results in the order of
+        ``items``. See :py:func:`~.utils.concurrent_map`.
+
+        ``func`` MUST NOT modify any limits directly; usage should be added
+        from the returned results, in the calling thread, so that the order of
+        usage values is deterministic.
+
+        :param func: callable taking a single positional argument
+        :type func: ``callable``
+        :param items: the items to call ``func`` with
+        :type items: ``iterable``
+        :returns: results of ``func``, in the order of ``items``
+        :rtype: list
+        """
+        if self._serial_calls:
+            return concurrent_map(func, items, max_workers=1)
+        return concurrent_map(func, items, max_workers=self._max_workers)
+
     def _update_service_quotas(self):
         """
         Update all limits for this service via the Service Quotas service.
@@ -305,15 +539,20 @@ class _AwsService(Connectable):
 
     def _cloudwatch_connection(self):
         """
-        Return a connected CloudWatch client instance. ONLY to be used by
-        :py:meth:`_get_cloudwatch_usage_latest`.
+        Return a connected CloudWatch client instance, created on first use
+        and kept for the service's CloudWatch usage helpers, such as
+        :py:meth:`_get_cloudwatch_usage_latest` and
+        :py:meth:`~._DynamodbService._tables_from_cloudwatch`. It is separate
+        from :py:attr:`~.conn`, which is the service's own client.
         """
         if self._cloudwatch_client is not None:
             return self._cloudwatch_client
         kwargs = dict(self._boto3_connection_kwargs)
         if self._max_retries_config is not None:
             kwargs['config'] = self._max_retries_config
-        self._cloudwatch_client = boto3.client('cloudwatch', **kwargs)
+        self._cloudwatch_client = attach_cassette(
+            boto3_client('cloudwatch', **kwargs)
+        )
         logger.info(
             "Connected to cloudwatch in region %s",
             self._cloudwatch_client._client_config.region_name
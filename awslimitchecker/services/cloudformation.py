@@ -65,13 +65,19 @@ class _CloudformationService(_AwsService):
         self.connect()
         for lim in self.limits.values():
             lim._reset_usage()
+        # ListStacks returns much smaller summaries than DescribeStacks
+        # (no parameters, outputs or tags), but includes stacks deleted in
+        # the last 90 days unless filtered by status; filter on every other
+        # status known to botocore.
+        statuses = [
+            x for x in self.conn.meta.service_model.shape_for(
+                'StackStatus'
+            ).enum if x not in ignore_statuses
+        ]
         count = 0
-        paginator = self.conn.get_paginator('describe_stacks')
-        iter = paginator.paginate()
-        for page in iter:
-            for stk in page['Stacks']:
-                if stk['StackStatus'] not in ignore_statuses:
-                    count += 1
+        paginator = self.conn.get_paginator('list_stacks')
+        for page in paginator.paginate(StackStatusFilter=statuses):
+            count += len(page['StackSummaries'])
         self.limits['Stacks']._add_current_usage(
             count, aws_type='AWS::CloudFormation::Stack'
         )
@@ -127,5 +133,5 @@ class _CloudformationService(_AwsService):
         """
         return [
             'cloudformation:DescribeAccountLimits',
-            'cloudformation:DescribeStacks'
+            'cloudformation:ListStacks'
         ]
@@ -53,6 +53,7 @@ class _CloudfrontService(_AwsService):
     service_name = "CloudFront"
     api_name = "cloudfront"  # AWS API name to connect to (boto3.client)
     quotas_service_code = "cloudfront"
+    global_service = True
 
     def find_usage(self):
         """
@@ -38,7 +38,9 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 """
 
 import abc  # noqa
+import os
 import logging
+from datetime import datetime, timedelta
 
 from .base import _AwsService
 from ..limit import AwsLimit
@@ -59,68 +61,89 @@ class _DynamodbService(_AwsService):
         :py:meth:`~.AwsLimit._add_current_usage`.
         """
         logger.debug("Checking usage for service %s", self.service_name)
-        self.connect_resource()
+        self.connect()
         for lim in self.limits.values():
             lim._reset_usage()
         self._find_usage_dynamodb()
         self._have_usage = True
         logger.debug("Done checking usage.")
 
+    @property
+    def _use_cloudwatch(self):
+        """
+        Whether table capacity and Global Secondary Index usage should be
+        retrieved in bulk from CloudWatch ``AWS/DynamoDB`` metrics instead of
+        via one DescribeTable call per table. This is enabled by setting the
+        ``ALC_DYNAMODB_CLOUDWATCH`` environment variable to ``true``.
+
+        :rtype: bool
+        """
+        return os.environ.get(
+            'ALC_DYNAMODB_CLOUDWATCH', ''
+        ).lower() in ['1', 'true', 'yes']
+
     def _find_usage_dynamodb(self):
         """calculates current usage for all DynamoDB limits"""
-        table_count = 0
+        logger.debug("Getting usage for DynamoDB tables")
+        table_names = []
+        paginator = self.conn.get_paginator('list_tables')
+        for resp in paginator.paginate():
+            table_names.extend(resp['TableNames'])
+        if self._use_cloudwatch:
+            tables = self._tables_from_cloudwatch(table_names)
+        else:
+            tables = [
+                t for t in self._concurrent_map(
+                    self._describe_table, table_names
+                ) if t is not None
+            ]
         region_read_capacity = 0
         region_write_capacity = 0
-
-        logger.debug("Getting usage for DynamoDB tables")
-        for table in self.resource_conn.tables.all():
-            table_count += 1
+        for table in tables:
             gsi_write = 0
             gsi_read = 0
-            gsi_count = 0
-            if table.global_secondary_indexes is not None:
-                for gsi in table.global_secondary_indexes:
-                    gsi_count += 1
-                    gsi_read += gsi['ProvisionedThroughput'][
-                        'ReadCapacityUnits']
-                    gsi_write += gsi['ProvisionedThroughput'][
-                        'WriteCapacityUnits']
-            table_write_capacity = table.provisioned_throughput[
+            gsis = table.get('GlobalSecondaryIndexes', [])
+            for gsi in gsis:
+                gsi_read += gsi['ProvisionedThroughput']['ReadCapacityUnits']
+                gsi_write += gsi['ProvisionedThroughput'][
+                    'WriteCapacityUnits']
+            table_write_capacity = table['ProvisionedThroughput'][
                 'WriteCapacityUnits'
             ] + gsi_write
-            table_read_capacity = table.provisioned_throughput[
+            table_read_capacity = table['ProvisionedThroughput'][
                 'ReadCapacityUnits'
             ] + gsi_read
             region_write_capacity += table_write_capacity
             region_read_capacity += table_read_capacity
 
             self.limits['Global Secondary Indexes']._add_current_usage(
-                gsi_count,
-                resource_id=table.name,
+                len(gsis),
+                resource_id=table['TableName'],
                 aws_type='AWS::DynamoDB::Table'
             )
 
-            self.limits['Local Secondary Indexes']._add_current_usage(
-                len(table.local_secondary_indexes)
-                if table.local_secondary_indexes is not None else 0,
-                resource_id=table.name,
-                aws_type='AWS::DynamoDB::Table'
-            )
+            # None if unknown, i.e. when using CloudWatch metrics
+            if table.get('LocalSecondaryIndexes', []) is not None:
+                self.limits['Local Secondary Indexes']._add_current_usage(
+                    len(table.get('LocalSecondaryIndexes', [])),
+                    resource_id=table['TableName'],
+                    aws_type='AWS::DynamoDB::Table'
+                )
 
             self.limits['Table Max Write Capacity Units']._add_current_usage(
                 table_write_capacity,
-                resource_id=table.name,
+                resource_id=table['TableName'],
                 aws_type='AWS::DynamoDB::Table'
             )
 
             self.limits['Table Max Read Capacity Units']._add_current_usage(
                 table_read_capacity,
-                resource_id=table.name,
+                resource_id=table['TableName'],
                 aws_type='AWS::DynamoDB::Table'
             )
 
         self.limits['Tables Per Region']._add_current_usage(
-            table_count,
+            len(tables),
             aws_type='AWS::DynamoDB::Table'
         )
 
@@ -134,6 +157,132 @@ class _DynamodbService(_AwsService):
             aws_type='AWS::DynamoDB::Table'
         )
 
+    def _describe_table(self, table_name):
+        """
+        Return the DescribeTable ``Table`` dict for one table, or None if the
+        table was deleted since it was listed. This is called from worker
+        threads via :py:meth:`~._concurrent_map`, and must not modify limits.
+
+        :param table_name: name of the table to describe
+        :type table_name: str
+        :rtype: ``dict`` or ``None``
+        """
+        try:
+            return self.conn.describe_table(TableName=table_name)['Table']
+        except self.conn.exceptions.ResourceNotFoundException:
+            logger.debug('Table %s no longer exists; skipping', table_name)
+        return None
+
+    def _tables_from_cloudwatch(self, table_names):
+        """
+        Build DescribeTable-like dicts for ``table_names`` from the
+        ``ProvisionedReadCapacityUnits`` and ``ProvisionedWriteCapacityUnits``
+        metrics in the ``AWS/DynamoDB`` CloudWatch namespace, retrieving all
+        tables and Global Secondary Indexes with a single paginated ListMetrics
+        call per metric and batched GetMetricData calls.
+
+        Global Secondary Indexes are discovered from the metric dimensions
+        (ListMetrics returns metrics with data in the past two weeks, so a
+        recently-deleted index may still be counted). Local Secondary Indexes
+        cannot be determined from CloudWatch, so ``LocalSecondaryIndexes`` is
+        None for every table. Tables and indexes
+        without provisioned-capacity metrics (i.e. on-demand tables) have
+        zero provisioned capacity.
+
+        :param table_names: names of all tables in the region
+        :type table_names: list
+        :returns: list of table dicts, in the order of ``table_names``
+        :rtype: list
+        """
+        logger.debug(
+            'Getting DynamoDB provisioned capacity for %d tables from '
+            'CloudWatch', len(table_names)
+        )
+        cw = self._cloudwatch_connection()
+        tables = {}
+        for name in table_names:
+            tables[name] = {
+                'TableName': name,
+                'ProvisionedThroughput': {
+                    'ReadCapacityUnits': 0, 'WriteCapacityUnits': 0
+                },
+                'GlobalSecondaryIndexes': [],
+                'LocalSecondaryIndexes': None
+            }
+        gsis = {}
+        queries = []
+        metric_keys = {}
+        metrics = {
+            'ProvisionedReadCapacityUnits': 'ReadCapacityUnits',
+            'ProvisionedWriteCapacityUnits': 'WriteCapacityUnits'
+        }
+        for metric_name in sorted(metrics.keys()):
+            paginator = cw.get_paginator('list_metrics')
+            for resp in paginator.paginate(
+                Namespace='AWS/DynamoDB', MetricName=metric_name
+            ):
+                for metric in resp['Metrics']:
+                    dims = dict(
+                        (d['Name'], d['Value']) for d in metric['Dimensions']
+                    )
+                    if dims.get('TableName') not in tables:
+                        continue
+                    if set(dims.keys()) - set(
+                        ['TableName', 'GlobalSecondaryIndexName']
+                    ):
+                        continue
+                    key = (
+                        dims['TableName'],
+                        dims.get('GlobalSecondaryIndexName'),
+                        metrics[metric_name]
+                    )
+                    if key[1] is not None and key[:2] not in gsis:
+                        gsis[key[:2]] = {
+                            'IndexName': key[1],
+                            'ProvisionedThroughput': {
+                                'ReadCapacityUnits': 0,
+                                'WriteCapacityUnits': 0
+                            }
+                        }
+                        tables[key[0]]['GlobalSecondaryIndexes'].append(
+                            gsis[key[:2]]
+                        )
+                    qid = 'm%d' % len(queries)
+                    metric_keys[qid] = key
+                    queries.append({
+                        'Id': qid,
+                        'MetricStat': {
+                            'Metric': {
+                                'Namespace': 'AWS/DynamoDB',
+                                'MetricName': metric_name,
+                                'Dimensions': metric['Dimensions']
+                            },
+                            'Period': 300,
+                            'Stat': 'Maximum'
+                        }
+                    })
+        end = datetime.utcnow() - timedelta(minutes=1)
+        start = end - timedelta(hours=1)
+        # GetMetricData accepts at most 500 queries per call
+        for i in range(0, len(queries), 500):
+            paginator = cw.get_paginator('get_metric_data')
+            for resp in paginator.paginate(
+                MetricDataQueries=queries[i:i + 500],
+                StartTime=start, EndTime=end,
+                ScanBy='TimestampDescending'
+            ):
+                for res in resp['MetricDataResults']:
+                    if len(res['Values']) < 1:
+                        continue
+                    tname, gsi_name, cap_key = metric_keys[res['Id']]
+                    if gsi_name is None:
+                        tables[tname]['ProvisionedThroughput'][
+                            cap_key] = res['Values'][0]
+                    else:
+                        gsis[(tname, gsi_name)]['ProvisionedThroughput'][
+                            cap_key] = res['Values'][0]
+        return [tables[name] for name in table_names]
+
     def get_limits(self):
         """
         Return all known limits for this service, as a dict of their names
@@ -252,6 +401,7 @@ class _DynamodbService(_AwsService):
         :rtype: list
         """
         return [
+            "cloudwatch:ListMetrics",
             "dynamodb:DescribeLimits",
             "dynamodb:DescribeTable",
             "dynamodb:ListTables"
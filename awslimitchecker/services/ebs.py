@@ -63,6 +63,25 @@ class _EbsService(_AwsService):
     api_name = 'ec2'
     quotas_service_code = 'ebs'
 
+    event_handlers = {
+        'CreateVolume': '_event_create_volume',
+        'DeleteVolume': '_event_delete_volume',
+        'CreateSnapshot': '_event_create_snapshot',
+        'CopySnapshot': '_event_create_snapshot',
+        'DeleteSnapshot': '_event_delete_snapshot',
+    }
+
+    #: mapping of volume type to storage (GiB) limit name
+    volume_type_to_storage_limit_name = {
+        'io1': 'Provisioned IOPS SSD (io1) storage (GiB)',
+        'io2': 'Provisioned IOPS SSD (io2) storage (GiB)',
+        'gp2': 'General Purpose (SSD gp2) volume storage (GiB)',
+        'gp3': 'General Purpose (SSD gp3) volume storage (GiB)',
+        'standard': 'Magnetic volume storage (GiB)',
+        'st1': 'Throughput Optimized (HDD) volume storage (GiB)',
+        'sc1': 'Cold (HDD) volume storage (GiB)'
+    }
+
     def find_usage(self):
         """
         Determine the current usage for each limit of this service,
@@ -179,18 +198,54 @@ class _EbsService(_AwsService):
     def _find_usage_snapshots(self):
         """find snapshot usage"""
         logger.debug("Getting usage for EBS snapshots")
-        snaps = paginate_dict(
-            self.conn.describe_snapshots,
-            OwnerIds=['self'],
-            alc_marker_path=['NextToken'],
-            alc_data_path=['Snapshots'],
-            alc_marker_param='NextToken'
-        )
+        # DescribeSnapshots has no lighter projection; count the largest
+        # pages allowed as they arrive, rather than collecting every snapshot
+        count = 0
+        paginator = self.conn.get_paginator('describe_snapshots')
+        for page in paginator.paginate(
+            OwnerIds=['self'], PaginationConfig={'PageSize': 1000}
+        ):
+            count += len(page['Snapshots'])
         self.limits['Active snapshots']._add_current_usage(
-            len(snaps['Snapshots']),
+            count,
             aws_type='AWS::EC2::VolumeSnapshot'
         )
 
+    def _event_create_volume(self, detail):
+        """apply a CreateVolume CloudTrail event to usage"""
+        vol = detail['responseElements']
+        deltas = [
+            ('Active volumes', 1),
+            (self.volume_type_to_storage_limit_name[vol['volumeType']],
+             vol['size'])
+        ]
+        if vol['volumeType'] in ['io1', 'io2']:
+            deltas.append((
+                'Provisioned IOPS ({t})'.format(t=vol['volumeType']),
+                vol['iops']
+            ))
+        self._apply_usage_deltas(deltas, resource_id=vol['volumeId'])
+        return True
+
+    def _event_delete_volume(self, detail):
+        """
+        apply a DeleteVolume CloudTrail event to usage, for volumes created
+        since usage was found
+        """
+        return self._revert_usage_deltas(
+            detail['requestParameters']['volumeId']
+        )
+
+    def _event_create_snapshot(self, detail):
+        """apply a CreateSnapshot or CopySnapshot CloudTrail event to usage"""
+        self._apply_usage_deltas([('Active snapshots', 1)])
+        return True
+
+    def _event_delete_snapshot(self, detail):
+        """apply a DeleteSnapshot CloudTrail event to usage"""
+        self._apply_usage_deltas([('Active snapshots', -1)])
+        return True
+
     def get_limits(self):
         """
         Return all known limits for this service, as a dict of their names
@@ -45,8 +45,9 @@ from copy import deepcopy
 
 import botocore
 
-from .base import _AwsService
+from .base import _AwsService, UsageStep
 from ..limit import AwsLimit
+from ..circuitbreaker import CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
@@ -104,6 +105,21 @@ class _Ec2Service(_AwsService):
         'u-24tb1.metal'
     ]
 
+    event_handlers = {
+        'RunInstances': '_event_run_instances',
+        'StartInstances': '_event_start_instances',
+        'StopInstances': '_event_instances_stopped',
+        'TerminateInstances': '_event_instances_stopped',
+        'CreateSecurityGroup': '_event_create_security_group',
+        'DeleteSecurityGroup': '_event_delete_security_group',
+        'AuthorizeSecurityGroupIngress': '_event_authorize_sg',
+        'AuthorizeSecurityGroupEgress': '_event_authorize_sg',
+        'RevokeSecurityGroupIngress': '_event_revoke_sg',
+        'RevokeSecurityGroupEgress': '_event_revoke_sg',
+        'AllocateAddress': '_event_allocate_address',
+        'ReleaseAddress': '_event_release_address',
+    }
+
     instance_family_to_spot_limit_name = {
         'F': 'All F Spot Instance Requests',
         'G': 'All G Spot Instance Requests',
@@ -114,29 +130,75 @@ class _Ec2Service(_AwsService):
                     ' Spot Instance Requests'
     }
 
-    def find_usage(self):
+    def find_usage(self, limits=None):
         """
         Determine the current usage for each limit of this service,
         and update corresponding Limit via
         :py:meth:`~.AwsLimit._add_current_usage`.
+
+        :param limits: names of the limits to find usage for, or None for all;
+          see :py:meth:`~._AwsService.usage_plan`
+        :type limits: :py:obj:`list` or :py:obj:`None`
         """
         logger.debug("Checking usage for service %s", self.service_name)
         self.connect()
         self.connect_resource()
-        for lim in self.limits.values():
-            lim._reset_usage()
-        if self._use_vcpu_limits:
-            self._find_usage_instances_vcpu()
-        else:
-            self._find_usage_instances_nonvcpu()
-        self._find_usage_networking_sgs()
-        self._find_usage_networking_eips()
-        self._find_usage_networking_eni_sg()
-        self._find_usage_spot_instances()
-        self._find_usage_spot_fleets()
+        self._run_usage_steps(limits)
         self._have_usage = True
         logger.debug("Done checking usage.")
 
+    def usage_steps(self):
+        """
+        Return the steps that :py:meth:`~.find_usage` runs; see
+        :py:meth:`~._AwsService.usage_steps`.
+
+        :rtype: :py:obj:`list` of :py:class:`~.UsageStep`
+        """
+        if self._use_vcpu_limits:
+            instances = '_find_usage_instances_vcpu'
+        else:
+            instances = '_find_usage_instances_nonvcpu'
+        return [
+            UsageStep(
+                instances,
+                sorted(
+                    x for x in self.limits
+                    if x.startswith('Running On-Demand ')
+                ),
+                ['ec2:DescribeReservedInstances', 'ec2:DescribeInstances']
+            ),
+            UsageStep(
+                '_find_usage_networking_sgs',
+                ['Rules per VPC security group',
+                 'VPC security groups per Region'],
+                ['ec2:DescribeSecurityGroups']
+            ),
+            UsageStep(
+                '_find_usage_networking_eips',
+                ['Elastic IP addresses (EIPs)',
+                 'VPC Elastic IP addresses (EIPs)'],
+                ['ec2:DescribeAddresses']
+            ),
+            UsageStep(
+                '_find_usage_networking_eni_sg',
+                ['VPC security groups per elastic network interface'],
+                ['ec2:DescribeNetworkInterfaces']
+            ),
+            UsageStep(
+                '_find_usage_spot_instances',
+                sorted(self.instance_family_to_spot_limit_name.values()),
+                ['cloudwatch:GetMetricData']
+            ),
+            UsageStep(
+                '_find_usage_spot_fleets',
+                ['Max active spot fleets per region',
+                 'Max launch specifications per spot fleet',
+                 'Max target capacity for all spot fleets in region',
+                 'Max target capacity per spot fleet'],
+                ['ec2:DescribeSpotFleetRequests']
+            ),
+        ]
+
     def _find_usage_instances_nonvcpu(self):
         """calculate On-Demand instance usage for all types and update Limits"""
         # update our limits with usage
@@ -231,7 +293,19 @@ class _Ec2Service(_AwsService):
         """calculate spot fleet request usage and update Limits"""
         logger.debug('Getting spot fleet request usage')
         try:
-            res = self.conn.describe_spot_fleet_requests()
+            res = self._guarded_call(
+                'DescribeSpotFleetRequests',
+                self.conn.describe_spot_fleet_requests
+            )
+        except CircuitOpenError as ex:
+            for lname in [
+                'Max active spot fleets per region',
+                'Max launch specifications per spot fleet',
+                'Max target capacity for all spot fleets in region',
+                'Max target capacity per spot fleet',
+            ]:
+                self.limits[lname]._set_skipped(str(ex))
+            return
         except botocore.exceptions.ClientError as e:
             if e.response['Error']['Code'] == 'UnsupportedOperation':
                 return
@@ -766,6 +840,176 @@ class _Ec2Service(_AwsService):
                 resource_id=iface.id,
             )
 
+    def _event_run_instances(self, detail):
+        """
+        Apply a RunInstances CloudTrail event to On-Demand instance usage.
+        Reserved Instances are not taken into account, so new instances are
+        always counted as On-Demand until usage is found again.
+
+        :param detail: CloudTrail event record
+        :type detail: dict
+        :returns: whether usage was updated
+        :rtype: bool
+        """
+        for inst in detail['responseElements']['instancesSet']['items']:
+            if (
+                inst.get('spotInstanceRequestId') or
+                inst.get('instanceLifecycle') == 'spot'
+            ):
+                continue
+            if inst.get('placement', {}).get('tenancy', 'default') != \
+                    'default':
+                continue
+            itype = inst['instanceType']
+            if self.default_limit_name in self.limits:
+                deltas = [(
+                    self.instance_family_to_limit_name.get(
+                        itype[0], self.default_limit_name
+                    ),
+                    inst['cpuOptions']['coreCount'] *
+                    inst['cpuOptions']['threadsPerCore']
+                )]
+            else:
+                deltas = [
+                    ('Running On-Demand {t} instances'.format(t=itype), 1),
+                    ('Running On-Demand EC2 instances', 1)
+                ]
+            for lname, _ in deltas:
+                if lname not in self.limits:
+                    return False
+            self._apply_usage_deltas(deltas, resource_id=inst['instanceId'])
+        return True
+
+    def _event_start_instances(self, detail):
+        """
+        StartInstances CloudTrail events don't include the instance type,
+        so instance usage must be found again.
+
+        :param detail: CloudTrail event record
+        :type detail: dict
+        :rtype: bool
+        """
+        return False
+
+    def _event_instances_stopped(self, detail):
+        """
+        Apply a StopInstances or TerminateInstances CloudTrail event to
+        On-Demand instance usage, for instances started since usage was found.
+
+        :param detail: CloudTrail event record
+        :type detail: dict
+        :returns: False if usage must be found again, otherwise True
+        :rtype: bool
+        """
+        res = True
+        for inst in detail['responseElements']['instancesSet']['items']:
+            if inst['previousState']['name'] in ['stopped', 'terminated']:
+                continue
+            if not self._revert_usage_deltas(inst['instanceId']):
+                res = False
+        return res
+
+    def _event_create_security_group(self, detail):
+        """
+        Apply a CreateSecurityGroup CloudTrail event to usage; new groups
+        have a single (egress) rule.
+
+        :param detail: CloudTrail event record
+        :type detail: dict
+        :rtype: bool
+        """
+        self._apply_usage_deltas([('VPC security groups per Region', 1)])
+        self.limits['Rules per VPC security group']._adjust_current_usage(
+            1, resource_id=detail['responseElements']['groupId'],
+            aws_type='AWS::EC2::SecurityGroupRule'
+        )
+        return True
+
+    def _event_delete_security_group(self, detail):
+        """
+        Apply a DeleteSecurityGroup CloudTrail event to usage.
+
+        :param detail: CloudTrail event record
+        :type detail: dict
+        :rtype: bool
+        """
+        self._apply_usage_deltas([('VPC security groups per Region', -1)])
+        group_id = detail['requestParameters'].get('groupId')
+        if group_id is None:
+            return False
+        self.limits['Rules per VPC security group']._remove_current_usage(
+            group_id
+        )
+        return True
+
+    def _event_authorize_sg(self, detail):
+        """
+        Apply an AuthorizeSecurityGroupIngress or
+        AuthorizeSecurityGroupEgress CloudTrail event to the rule count of
+        the security group. As the rule count is the greater of the ingress
+        and egress counts, adding the new rules gives an upper bound.
+
+        :param detail: CloudTrail event record
+        :type detail: dict
+        :rtype: bool
+        """
+        params = detail['requestParameters']
+        delta = 0
+        for perm in params['ipPermissions']['items']:
+            delta += max(
+                len(perm.get('ipRanges', {}).get('items', [])),
+                len(perm.get('ipv6Ranges', {}).get('items', []))
+            ) + len(
+                perm.get('prefixListIds', {}).get('items', [])
+            ) + len(perm.get('groups', {}).get('items', []))
+        self.limits['Rules per VPC security group']._adjust_current_usage(
+            delta, resource_id=params['groupId'],
+            aws_type='AWS::EC2::SecurityGroupRule'
+        )
+        return True
+
+    def _event_revoke_sg(self, detail):
+        """
+        The effect of revoking security group rules on the rule count can't
+        be determined from the event, so usage must be found again.
+
+        :param detail: CloudTrail event record
+        :type detail: dict
+        :rtype: bool
+        """
+        return False
+
+    def _event_allocate_address(self, detail):
+        """
+        Apply an AllocateAddress CloudTrail event to EIP usage.
+
+        :param detail: CloudTrail event record
+        :type detail: dict
+        :rtype: bool
+        """
+        if detail['responseElements'].get('domain') == 'vpc':
+            lname = 'VPC Elastic IP addresses (EIPs)'
+        else:
+            lname = 'Elastic IP addresses (EIPs)'
+        self._apply_usage_deltas([(lname, 1)])
+        return True
+
+    def _event_release_address(self, detail):
+        """
+        Apply a ReleaseAddress CloudTrail event to EIP usage. VPC addresses
+        are released by allocation ID, EC2-Classic ones by public IP.
+
+        :param detail: CloudTrail event record
+        :type detail: dict
+        :rtype: bool
+        """
+        if 'allocationId' in detail['requestParameters']:
+            lname = 'VPC Elastic IP addresses (EIPs)'
+        else:
+            lname = 'Elastic IP addresses (EIPs)'
+        self._apply_usage_deltas([(lname, -1)])
+        return True
+
     def _get_limits_networking(self):
         """
         Return a dict of VPC-related limits only.
@@ -68,6 +68,12 @@ class _EksService(_AwsService):
         logger.debug("Done checking usage.")
 
     def _find_clusters_usage(self):
+        """
+        Find usage for all EKS clusters. Clusters are inspected concurrently
+        (see :py:meth:`~._inspect_cluster`), then the Fargate profiles of all
+        clusters are described concurrently. Usage is added to limits in the
+        calling thread, in the order returned by the API.
+        """
         clusters_info = paginate_dict(
             self.conn.list_clusters,
             alc_marker_path=['nextToken'],
@@ -76,69 +82,49 @@ class _EksService(_AwsService):
         )
 
         cluster_list = clusters_info['clusters']
+        cluster_infos = self._concurrent_map(
+            self._inspect_cluster, cluster_list
+        )
+        profile_keys = []
+        for cluster, info in zip(cluster_list, cluster_infos):
+            for profile_name in info['fargate_profiles']:
+                profile_keys.append((cluster, profile_name))
+        profile_selectors = dict(zip(
+            profile_keys,
+            self._concurrent_map(self._get_fargate_selectors, profile_keys)
+        ))
 
-        for cluster in cluster_list:
-            describe_cluster_response = self.conn.describe_cluster(
-                name=cluster
-            )
-            security_group_id_list = describe_cluster_response['cluster'][
-                'resourcesVpcConfig']['securityGroupIds']
+        for cluster, info in zip(cluster_list, cluster_infos):
             self.limits[
                 'Control plane security groups per cluster']._add_current_usage(
-                len(security_group_id_list),
+                info['security_groups'],
                 resource_id=cluster,
                 aws_type='AWS::EKS::Cluster'
             )
-            public_access_cidrs_list = describe_cluster_response['cluster'][
-                'resourcesVpcConfig']['publicAccessCidrs']
             self.limits[
                 'Public endpoint access CIDR ranges per cluster'
             ]._add_current_usage(
-                len(public_access_cidrs_list),
+                info['public_access_cidrs'],
                 resource_id=cluster,
                 aws_type='AWS::EKS::Cluster'
             )
-
-            list_nodegroup_response = paginate_dict(
-                self.conn.list_nodegroups,
-                clusterName=cluster,
-                alc_marker_path=['nextToken'],
-                alc_data_path=['nodegroups'],
-                alc_marker_param='nextToken'
-            )
-            nodegroup_list = list_nodegroup_response['nodegroups']
             self.limits['Managed node groups per cluster']._add_current_usage(
-                len(nodegroup_list),
+                info['nodegroups'],
                 resource_id=cluster,
                 aws_type='AWS::EKS::Cluster')
-
-            list_fargate_profiles_response = paginate_dict(
-                self.conn.list_fargate_profiles,
-                clusterName=cluster,
-                alc_marker_path=['nextToken'],
-                alc_data_path=['fargateProfileNames'],
-                alc_marker_param='nextToken'
-            )
-            fargate_profiles_list = list_fargate_profiles_response[
-                'fargateProfileNames'
-            ]
             self.limits['Fargate profiles per cluster']._add_current_usage(
-                len(fargate_profiles_list),
+                len(info['fargate_profiles']),
                 resource_id=cluster,
                 aws_type='AWS::EKS::FargateProfile')
 
-            for fargate_profile_name in fargate_profiles_list:
-                fargate_info = self.conn.describe_fargate_profile(
-                    clusterName=cluster,
-                    fargateProfileName=fargate_profile_name
-                )
-                profile_selectors = fargate_info['fargateProfile']['selectors']
+            for fargate_profile_name in info['fargate_profiles']:
+                selectors = profile_selectors[(cluster, fargate_profile_name)]
                 self.limits['Selectors per Fargate profile']._add_current_usage(
-                    len(profile_selectors),
+                    len(selectors),
                     resource_id="{}.{}".format(cluster, fargate_profile_name),
                     aws_type='AWS::EKS::FargateProfile')
 
-                for selector in profile_selectors:
+                for selector in selectors:
                     label_pairs = selector.get('labels')
                     if label_pairs is None:
                         continue
@@ -160,6 +146,63 @@ class _EksService(_AwsService):
             resource_id=self._boto3_connection_kwargs['region_name'],
             aws_type='AWS::EKS::Cluster')
 
+    def _inspect_cluster(self, cluster):
+        """
+        Describe one EKS cluster and list its managed node groups and Fargate
+        profiles. This is called from worker threads via
+        :py:meth:`~._concurrent_map`, and must not modify limits.
+
+        :param cluster: name of the cluster
+        :type cluster: str
+        :returns: dict with integer ``security_groups``,
+          ``public_access_cidrs`` and ``nodegroups`` counts, and a
+          ``fargate_profiles`` list of profile names
+        :rtype: dict
+        """
+        describe_cluster_response = self.conn.describe_cluster(
+            name=cluster
+        )
+        vpc_config = describe_cluster_response['cluster'][
+            'resourcesVpcConfig']
+        list_nodegroup_response = paginate_dict(
+            self.conn.list_nodegroups,
+            clusterName=cluster,
+            alc_marker_path=['nextToken'],
+            alc_data_path=['nodegroups'],
+            alc_marker_param='nextToken'
+        )
+        list_fargate_profiles_response = paginate_dict(
+            self.conn.list_fargate_profiles,
+            clusterName=cluster,
+            alc_marker_path=['nextToken'],
+            alc_data_path=['fargateProfileNames'],
+            alc_marker_param='nextToken'
+        )
+        return {
+            'security_groups': len(vpc_config['securityGroupIds']),
+            'public_access_cidrs': len(vpc_config['publicAccessCidrs']),
+            'nodegroups': len(list_nodegroup_response['nodegroups']),
+            'fargate_profiles': list_fargate_profiles_response[
+                'fargateProfileNames'
+            ]
+        }
+
+    def _get_fargate_selectors(self, key):
+        """
+        Return the list of selectors for one Fargate profile. This is called
+        from worker threads via :py:meth:`~._concurrent_map`, and must not
+        modify limits.
+
+        :param key: 2-tuple of (cluster name, Fargate profile name)
+        :type key: tuple
+        :rtype: list
+        """
+        fargate_info = self.conn.describe_fargate_profile(
+            clusterName=key[0],
+            fargateProfileName=key[1]
+        )
+        return fargate_info['fargateProfile']['selectors']
+
     def get_limits(self):
         """
         Return all known limits for this service, as a dict of their names
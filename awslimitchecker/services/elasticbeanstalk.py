@@ -61,25 +61,39 @@ class _ElasticBeanstalkService(_AwsService):
         self.connect()
         for lim in self.limits.values():
             lim._reset_usage()
-        self._find_usage_applications()
-        self._find_usage_application_versions()
+        applications = self._find_usage_applications()
+        self._find_usage_application_versions(applications)
         self._find_usage_environments()
         self._have_usage = True
         logger.debug("Done checking usage.")
 
     def _find_usage_applications(self):
-        """find usage for ElasticBeanstalk applications"""
-        applications = self.conn.describe_applications()
+        """
+        find usage for ElasticBeanstalk applications
+
+        :returns: the application descriptions
+        :rtype: list
+        """
+        applications = self.conn.describe_applications()['Applications']
         self.limits['Applications']._add_current_usage(
-            len(applications['Applications']),
+            len(applications),
             aws_type='AWS::ElasticBeanstalk::Application',
         )
+        return applications
 
-    def _find_usage_application_versions(self):
-        """find usage for ElasticBeanstalk application verions"""
-        versions = self.conn.describe_application_versions()
+    def _find_usage_application_versions(self, applications):
+        """
+        find usage for ElasticBeanstalk application versions, from the
+        version labels included in each application's description; this
+        avoids downloading every version's full description (source bundle,
+        build and status details) from DescribeApplicationVersions
+
+        :param applications: application descriptions, as returned by
+          :py:meth:`~._find_usage_applications`
+        :type applications: list
+        """
         self.limits['Application versions']._add_current_usage(
-            len(versions['ApplicationVersions']),
+            sum(len(app.get('Versions', [])) for app in applications),
             aws_type='AWS::ElasticBeanstalk::ApplicationVersion',
         )
 
@@ -140,6 +154,5 @@ class _ElasticBeanstalkService(_AwsService):
         """
         return [
             "elasticbeanstalk:DescribeApplications",
-            "elasticbeanstalk:DescribeApplicationVersions",
             "elasticbeanstalk:DescribeEnvironments",
         ]
@@ -39,10 +39,10 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 
 import abc  # noqa
 import logging
-from boto3 import client
 from botocore.config import Config
 
 from .base import _AwsService
+from ..connectable import boto3_client
 from ..limit import AwsLimit
 from ..utils import paginate_dict
 
@@ -84,6 +84,10 @@ class _ElbService(_AwsService):
     api_name = 'elb'
     quotas_service_code = 'elasticloadbalancing'
 
+    def __init__(self, *args, **kwargs):
+        super(_ElbService, self).__init__(*args, **kwargs)
+        self.conn2 = None
+
     def find_usage(self):
         """
         Determine the current usage for each limit of this service,
@@ -138,22 +142,47 @@ class _ElbService(_AwsService):
         logger.debug('Done with ELBv1 usage')
         return len(lbs['LoadBalancerDescriptions'])
 
+    def _connect_elbv2(self):
+        """
+        Connect to the ELBv2 API, if not already connected, and return the
+        client. The client is shared by limit and usage collection, and is
+        safe to use from the worker threads of :py:meth:`~._concurrent_map`.
+        It uses adaptive retry mode with max attempts overridden to
+        :py:data:`~.ELBV2_MAX_RETRY_ATTEMPTS`, unless the
+        ``BOTO_MAX_RETRIES_elb`` environment variable is set.
+
+        :returns: elbv2 API connection
+        :rtype: :py:class:`ElasticLoadBalancingv2.Client`
+        """
+        if self.conn2 is not None:
+            return self.conn2
+        config = Config(retries={
+            'mode': 'adaptive', 'max_attempts': ELBV2_MAX_RETRY_ATTEMPTS
+        })
+        if self._max_retries_config is not None:
+            config = config.merge(self._max_retries_config)
+        self.conn2 = boto3_client(
+            'elbv2', config=config, **self._boto3_connection_kwargs
+        )
+        logger.debug("Connected to %s in region %s", 'elbv2',
+                     self.conn2._client_config.region_name)
+        return self.conn2
+
     def _find_usage_elbv2(self):
         """
-        Find usage for ELBv2 / Application LB and update the appropriate limits.
+        Find usage for ELBv2 / Application and Network LBs and update the
+        appropriate limits.
+
+        Listeners for all load balancers, and then rules for all ALB
+        listeners, are retrieved concurrently via
+        :py:meth:`~._concurrent_map`; usage is then added serially, in the
+        order the load balancers were returned by the API.
 
         :returns: number of Application LBs in use
         :rtype: int
         """
         logger.debug('Checking usage for ELBv2')
-        conn2 = client(
-            'elbv2',
-            config=Config(retries={'max_attempts': ELBV2_MAX_RETRY_ATTEMPTS}),
-            **self._boto3_connection_kwargs
-        )
-        logger.debug("Connected to %s in region %s (with max retry attempts "
-                     "overridden to %d)", 'elbv2',
-                     conn2._client_config.region_name, ELBV2_MAX_RETRY_ATTEMPTS)
+        conn2 = self._connect_elbv2()
         # Target groups
         tgroups = paginate_dict(
             conn2.describe_target_groups,
@@ -172,47 +201,97 @@ class _ElbService(_AwsService):
             alc_data_path=['LoadBalancers'],
             alc_marker_param='Marker'
         )
-        logger.debug(
-            'Checking usage for each of %d ALBs', len(lbs['LoadBalancers'])
-        )
-        alb_count = 0
-        nlb_count = 0
+        albs = []
+        nlbs = []
         for lb in lbs['LoadBalancers']:
             if lb.get('Type') == 'network':
-                nlb_count += 1
+                nlbs.append(lb)
             else:
-                alb_count += 1
-                self._update_usage_for_alb(
-                    conn2,
-                    lb['LoadBalancerArn'],
-                    lb['LoadBalancerName']
-                )
+                albs.append(lb)
         self.limits['Network load balancers']._add_current_usage(
-            nlb_count,
+            len(nlbs),
             aws_type='AWS::ElasticLoadBalancing::NetworkLoadBalancer'
         )
+        logger.debug(
+            'Checking usage for each of %d ALBs and %d NLBs',
+            len(albs), len(nlbs)
+        )
+        listeners = self._concurrent_map(
+            lambda lb: self._get_listeners(conn2, lb['LoadBalancerArn']),
+            albs + nlbs
+        )
+        alb_listeners = listeners[:len(albs)]
+        listener_arns = [
+            l['ListenerArn'] for lb_listeners in alb_listeners
+            for l in lb_listeners
+        ]
+        rule_counts = dict(zip(
+            listener_arns,
+            self._concurrent_map(
+                lambda arn: self._count_rules(conn2, arn), listener_arns
+            )
+        ))
+        for lb, lb_listeners in zip(albs, alb_listeners):
+            self._update_usage_for_alb(
+                lb['LoadBalancerName'], lb_listeners, rule_counts
+            )
+        for lb, lb_listeners in zip(nlbs, listeners[len(albs):]):
+            self._update_usage_for_nlb(lb['LoadBalancerName'], lb_listeners)
         logger.debug('Done with ELBv2 usage')
-        return alb_count
+        return len(albs)
 
-    def _update_usage_for_alb(self, conn, alb_arn, alb_name):
+    def _get_listeners(self, conn, lb_arn):
         """
-        Update usage for a single ALB.
+        Return the list of listeners for a single ALB or NLB.
 
         :param conn: elbv2 API connection
         :type conn: :py:class:`ElasticLoadBalancing.Client`
-        :param alb_arn: Load Balancer ARN
-        :type alb_arn: str
-        :param alb_name: Load Balancer Name
-        :type alb_name: str
+        :param lb_arn: Load Balancer ARN
+        :type lb_arn: str
+        :returns: list of listener dicts
+        :rtype: list
         """
-        logger.debug('Updating usage for ALB %s', alb_arn)
-        listeners = paginate_dict(
+        logger.debug('Getting listeners for LB %s', lb_arn)
+        return paginate_dict(
             conn.describe_listeners,
-            LoadBalancerArn=alb_arn,
+            LoadBalancerArn=lb_arn,
             alc_marker_path=['NextMarker'],
             alc_data_path=['Listeners'],
             alc_marker_param='Marker'
         )['Listeners']
+
+    def _count_rules(self, conn, listener_arn):
+        """
+        Return the number of rules for a single ALB listener.
+
+        :param conn: elbv2 API connection
+        :type conn: :py:class:`ElasticLoadBalancing.Client`
+        :param listener_arn: Listener ARN
+        :type listener_arn: str
+        :returns: number of rules on the listener
+        :rtype: int
+        """
+        return len(paginate_dict(
+            conn.describe_rules,
+            ListenerArn=listener_arn,
+            alc_marker_path=['NextMarker'],
+            alc_data_path=['Rules'],
+            alc_marker_param='Marker'
+        )['Rules'])
+
+    def _update_usage_for_alb(self, alb_name, listeners, rule_counts):
+        """
+        Update usage for a single ALB.
+
+        :param alb_name: Load Balancer Name
+        :type alb_name: str
+        :param listeners: list of listeners for the ALB, as returned by
+          :py:meth:`~._get_listeners`
+        :type listeners: list
+        :param rule_counts: dict of listener ARN to number of rules
+        :type rule_counts: dict
+        """
+        logger.debug('Updating usage for ALB %s', alb_name)
         num_rules = 0
         num_certs = 0
         for l in listeners:
@@ -221,14 +300,7 @@ class _ElbService(_AwsService):
                 if x.get('IsDefault', False) is False
             ]
             num_certs += len(certs)
-            rules = paginate_dict(
-                conn.describe_rules,
-                ListenerArn=l['ListenerArn'],
-                alc_marker_path=['NextMarker'],
-                alc_data_path=['Rules'],
-                alc_marker_param='Marker'
-            )['Rules']
-            num_rules += len(rules)
+            num_rules += rule_counts[l['ListenerArn']]
         self.limits[
             'Listeners per application load balancer']._add_current_usage(
             len(listeners),
@@ -248,25 +320,17 @@ class _ElbService(_AwsService):
             resource_id=alb_name
         )
 
-    def _update_usage_for_nlb(self, conn, nlb_arn, nlb_name):
+    def _update_usage_for_nlb(self, nlb_name, listeners):
         """
         Update usage for a single NLB.
 
-        :param conn: elbv2 API connection
-        :type conn: :py:class:`ElasticLoadBalancing.Client`
-        :param nlb_arn: Load Balancer ARN
-        :type nlb_arn: str
         :param nlb_name: Load Balancer Name
         :type nlb_name: str
+        :param listeners: list of listeners for the NLB, as returned by
+          :py:meth:`~._get_listeners`
+        :type listeners: list
         """
-        logger.debug('Updating usage for NLB %s', nlb_arn)
-        listeners = paginate_dict(
-            conn.describe_listeners,
-            LoadBalancerArn=nlb_arn,
-            alc_marker_path=['NextMarker'],
-            alc_data_path=['Listeners'],
-            alc_marker_param='Marker'
-        )['Listeners']
+        logger.debug('Updating usage for NLB %s', nlb_name)
         self.limits[
             'Listeners per network load balancer']._add_current_usage(
             len(listeners),
@@ -405,11 +469,9 @@ class _ElbService(_AwsService):
                 continue
             self.limits[name_to_limits[name]]._set_api_limit(int(attrib['Max']))
         # connect to ELBv2 API as well
-        self.conn2 = client('elbv2', **self._boto3_connection_kwargs)
-        logger.debug("Connected to %s in region %s",
-                     'elbv2', self.conn2._client_config.region_name)
+        conn2 = self._connect_elbv2()
         logger.debug("Querying ELBv2 (ALB) DescribeAccountLimits for limits")
-        attribs = self.conn2.describe_account_limits()
+        attribs = conn2.describe_account_limits()
         name_to_limits = {
             'application-load-balancers': 'Application load balancers',
             'target-groups': 'Target groups',
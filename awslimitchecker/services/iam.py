@@ -51,6 +51,7 @@ class _IamService(_AwsService):
     service_name = 'IAM'
     api_name = 'iam'
     quotas_service_code = 'iam'
+    global_service = True
 
     # mapping of iam.AccountSummary() key to limit name
     API_TO_LIMIT_NAME = {
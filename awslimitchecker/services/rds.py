@@ -40,7 +40,7 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 import abc  # noqa
 import logging
 
-from .base import _AwsService
+from .base import _AwsService, UsageStep
 from ..limit import AwsLimit
 
 logger = logging.getLogger(__name__)
@@ -75,65 +75,182 @@ class _RDSService(_AwsService):
         'ManualClusterSnapshots': 'Manual Cluster Snapshots',
     }
 
-    def find_usage(self):
+    #: AccountQuotaName of the DescribeAccountAttributes quotas that apply
+    #: to each resource; their ``Used`` value is only the highest usage of
+    #: any one resource, so usage for these is found by scanning resources
+    PER_RESOURCE_QUOTAS = [
+        'AuthorizationsPerDBSecurityGroup',
+        'ReadReplicasPerMaster',
+        'SubnetsPerDBSubnetGroup',
+    ]
+
+    def __init__(self, *args, **kwargs):
+        super(_RDSService, self).__init__(*args, **kwargs)
+        #: ``AccountQuotas`` of the DescribeAccountAttributes response
+        #: received by :py:meth:`~._update_limits_from_api`, until used by
+        #: :py:meth:`~.find_usage`
+        self._account_quotas = None
+
+    def find_usage(self, limits=None):
         """
         Determine the current usage for each limit of this service,
         and update corresponding Limit via
         :py:meth:`~.AwsLimit._add_current_usage`.
+
+        Account-level usage comes from the single DescribeAccountAttributes
+        response (the one already received by
+        :py:meth:`~._update_limits_from_api`, if any); the per-resource
+        scans run concurrently via :py:meth:`~._concurrent_map`.
+
+        :param limits: names of the limits to find usage for, or None for all;
+          see :py:meth:`~._AwsService.usage_plan`
+        :type limits: :py:obj:`list` or :py:obj:`None`
         """
         logger.debug("Checking usage for service %s", self.service_name)
         self.connect()
-        for lim in self.limits.values():
-            lim._reset_usage()
-        self._find_usage_instances()
-        self._find_usage_subnet_groups()
-        self._find_usage_security_groups()
-        # RDS API also provides usage information
-        self._update_limits_from_api()
+        plan = self.usage_plan(limits)
+        if limits is None:
+            to_reset = self.limits.keys()
+        else:
+            to_reset = set()
+            for step in plan:
+                to_reset.update(step.limits)
+        for lname in to_reset:
+            self.limits[lname]._reset_usage()
+        scans = []
+        for step in plan:
+            if step.method == '_find_usage_account_attributes':
+                self._find_usage_account_attributes()
+            else:
+                scans.append(getattr(self, step.method))
+        # quotas not used by this run must not be used by a later one
+        self._account_quotas = None
+        for usage in self._concurrent_map(lambda scan: scan(), scans):
+            for lname, value, resource_id, aws_type in usage:
+                self.limits[lname]._add_current_usage(
+                    value, resource_id=resource_id, aws_type=aws_type
+                )
         self._have_usage = True
         logger.debug("Done checking usage.")
 
+    def usage_steps(self):
+        """
+        Return the steps that :py:meth:`~.find_usage` runs; see
+        :py:meth:`~._AwsService.usage_steps`.
+
+        :rtype: :py:obj:`list` of :py:class:`~.UsageStep`
+        """
+        return [
+            UsageStep(
+                '_find_usage_account_attributes',
+                sorted(
+                    lname for qname, lname in self.API_NAME_TO_LIMIT.items()
+                    if qname not in self.PER_RESOURCE_QUOTAS
+                ),
+                ['rds:DescribeAccountAttributes']
+            ),
+            UsageStep(
+                '_find_usage_instances',
+                ['Read replicas per master'],
+                ['rds:DescribeDBInstances']
+            ),
+            UsageStep(
+                '_find_usage_subnet_groups',
+                ['Subnets per Subnet Group'],
+                ['rds:DescribeDBSubnetGroups']
+            ),
+            UsageStep(
+                '_find_usage_security_groups',
+                ['Max auths per security group', 'VPC Security Groups'],
+                ['rds:DescribeDBSecurityGroups']
+            ),
+        ]
+
+    def _find_usage_account_attributes(self):
+        """
+        Find usage for the account-level limits from the ``Used`` values of
+        DescribeAccountAttributes, calling :py:meth:`~._update_limits_from_api`
+        only if it has not already been called since the last
+        :py:meth:`~.find_usage`.
+        """
+        if self._account_quotas is None:
+            self._update_limits_from_api()
+        for lim in self._account_quotas:
+            qname = lim['AccountQuotaName']
+            if (
+                qname not in self.API_NAME_TO_LIMIT or
+                qname in self.PER_RESOURCE_QUOTAS
+            ):
+                continue
+            self.limits[self.API_NAME_TO_LIMIT[qname]]._add_current_usage(
+                lim['Used']
+            )
+
     def _find_usage_instances(self):
-        """find usage for DB Instances and related limits"""
+        """
+        Find usage for Read replicas per master. This is called from a worker
+        thread and must not modify limits.
+
+        :returns: list of (limit name, usage, resource_id, aws_type) tuples
+        :rtype: list
+        """
+        usage = []
         paginator = self.conn.get_paginator('describe_db_instances')
         for page in paginator.paginate():
             for instance in page['DBInstances']:
-                self.limits['Read replicas per master']._add_current_usage(
+                usage.append((
+                    'Read replicas per master',
                     len(instance['ReadReplicaDBInstanceIdentifiers']),
-                    aws_type='AWS::RDS::DBInstance',
-                    resource_id=instance['DBInstanceIdentifier']
-                )
+                    instance['DBInstanceIdentifier'],
+                    'AWS::RDS::DBInstance'
+                ))
+        return usage
 
     def _find_usage_subnet_groups(self):
-        """find usage for subnet groups"""
+        """
+        Find usage for Subnets per Subnet Group. This is called from a worker
+        thread and must not modify limits.
+
+        :returns: list of (limit name, usage, resource_id, aws_type) tuples
+        :rtype: list
+        """
+        usage = []
         paginator = self.conn.get_paginator('describe_db_subnet_groups')
         for page in paginator.paginate():
             for group in page['DBSubnetGroups']:
-                self.limits['Subnets per Subnet Group']._add_current_usage(
+                usage.append((
+                    'Subnets per Subnet Group',
                     len(group['Subnets']),
-                    aws_type='AWS::RDS::DBSubnetGroup',
-                    resource_id=group["DBSubnetGroupName"],
-                )
+                    group['DBSubnetGroupName'],
+                    'AWS::RDS::DBSubnetGroup'
+                ))
+        return usage
 
     def _find_usage_security_groups(self):
-        """find usage for security groups"""
-        vpc_count = 0
+        """
+        Find usage for Max auths per security group and VPC Security Groups.
+        This is called from a worker thread and must not modify limits.
 
+        :returns: list of (limit name, usage, resource_id, aws_type) tuples
+        :rtype: list
+        """
+        usage = []
+        vpc_count = 0
         paginator = self.conn.get_paginator('describe_db_security_groups')
         for page in paginator.paginate():
             for group in page['DBSecurityGroups']:
                 if 'VpcId' in group and group['VpcId'] is not None:
                     vpc_count += 1
-                self.limits['Max auths per security group']._add_current_usage(
+                usage.append((
+                    'Max auths per security group',
                     len(group["EC2SecurityGroups"]) + len(group["IPRanges"]),
-                    aws_type='AWS::RDS::DBSecurityGroup',
-                    resource_id=group['DBSecurityGroupName']
-                )
-
-        self.limits['VPC Security Groups']._add_current_usage(
-            vpc_count,
-            aws_type='AWS::RDS::DBSecurityGroup',
-        )
+                    group['DBSecurityGroupName'],
+                    'AWS::RDS::DBSecurityGroup'
+                ))
+        usage.append((
+            'VPC Security Groups', vpc_count, None, 'AWS::RDS::DBSecurityGroup'
+        ))
+        return usage
 
     def get_limits(self):
         """
@@ -332,7 +449,8 @@ class _RDSService(_AwsService):
         Query RDS's DescribeAccountAttributes API action, and update limits
         with the quotas returned. Updates ``self.limits``.
 
-        We ignore the usage information from the API,
+        The quotas are kept in ``self._account_quotas``, so that the next
+        :py:meth:`~.find_usage` takes usage from the same response.
         """
         self.connect()
         logger.info("Querying RDS DescribeAccountAttributes for limits")
@@ -345,8 +463,7 @@ class _RDSService(_AwsService):
                 continue
             lname = self.API_NAME_TO_LIMIT[lim['AccountQuotaName']]
             self.limits[lname]._set_api_limit(lim['Max'])
-            if len(self.limits[lname].get_current_usage()) < 1:
-                self.limits[lname]._add_current_usage(lim['Used'])
+        self._account_quotas = lims
         logger.debug('Done setting limits from API.')
 
     def required_iam_permissions(self):
@@ -50,6 +50,7 @@ logger = logging.getLogger(__name__)
 class _Route53Service(_AwsService):
     service_name = 'Route53'
     api_name = 'route53'  # AWS API name to connect to (boto3.client)
+    global_service = True
 
     # Route53 limit types
     MAX_RRSETS_BY_ZONE = {
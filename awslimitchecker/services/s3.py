@@ -50,6 +50,7 @@ class _S3Service(_AwsService):
 
     service_name = 'S3'
     api_name = 's3'  # AWS API name to connect to (boto3.client)
+    global_service = True
 
     def find_usage(self):
         """
@@ -41,9 +41,10 @@ import abc  # noqa
 import logging
 from collections import defaultdict
 
-from .base import _AwsService
+from .base import _AwsService, UsageStep
 from ..limit import AwsLimit
 from ..utils import paginate_dict
+from ..circuitbreaker import CircuitOpenError
 from botocore.exceptions import ClientError
 
 logger = logging.getLogger(__name__)
@@ -55,27 +56,77 @@ class _VpcService(_AwsService):
     api_name = 'ec2'
     quotas_service_code = 'vpc'
 
-    def find_usage(self):
+    event_handlers = {
+        'CreateVpc': '_event_create_vpc',
+        'DeleteVpc': '_event_delete_vpc',
+        'CreateSubnet': '_event_create_subnet',
+        'CreateInternetGateway': '_event_create_internet_gateway',
+        'DeleteInternetGateway': '_event_delete_internet_gateway',
+        'CreateNetworkInterface': '_event_create_network_interface',
+        'DeleteNetworkInterface': '_event_delete_network_interface',
+    }
+
+    def find_usage(self, limits=None):
         """
         Determine the current usage for each limit of this service,
         and update corresponding Limit via
         :py:meth:`~.AwsLimit._add_current_usage`.
+
+        :param limits: names of the limits to find usage for, or None for all;
+          see :py:meth:`~._AwsService.usage_plan`
+        :type limits: :py:obj:`list` or :py:obj:`None`
         """
         logger.debug("Checking usage for service %s", self.service_name)
         self.connect()
-        for lim in self.limits.values():
-            lim._reset_usage()
-        self._find_usage_vpcs()
-        subnet_to_az = self._find_usage_subnets()
-        self._find_usage_ACLs()
-        self._find_usage_route_tables()
-        self._find_usage_gateways()
-        self._find_usage_nat_gateways(subnet_to_az)
-        self._find_usages_vpn_gateways()
-        self._find_usage_network_interfaces()
+        self._run_usage_steps(limits)
         self._have_usage = True
         logger.debug("Done checking usage.")
 
+    def usage_steps(self):
+        """
+        Return the steps that :py:meth:`~.find_usage` runs; see
+        :py:meth:`~._AwsService.usage_steps`.
+
+        :rtype: :py:obj:`list` of :py:class:`~.UsageStep`
+        """
+        return [
+            UsageStep(
+                '_find_usage_vpcs', ['VPCs'], ['ec2:DescribeVpcs']
+            ),
+            UsageStep(
+                '_find_usage_subnets', ['Subnets per VPC'],
+                ['ec2:DescribeSubnets']
+            ),
+            UsageStep(
+                '_find_usage_ACLs',
+                ['Network ACLs per VPC', 'Rules per network ACL'],
+                ['ec2:DescribeNetworkAcls']
+            ),
+            UsageStep(
+                '_find_usage_route_tables',
+                ['Entries per route table', 'Route tables per VPC'],
+                ['ec2:DescribeRouteTables']
+            ),
+            UsageStep(
+                '_find_usage_gateways', ['Internet gateways'],
+                ['ec2:DescribeInternetGateways']
+            ),
+            UsageStep(
+                '_find_usage_nat_gateways', ['NAT Gateways per AZ'],
+                ['ec2:DescribeNatGateways'],
+                requires=('_find_usage_subnets',)
+            ),
+            UsageStep(
+                '_find_usages_vpn_gateways', ['Virtual private gateways'],
+                ['ec2:DescribeVpnGateways']
+            ),
+            UsageStep(
+                '_find_usage_network_interfaces',
+                ['Network interfaces per Region'],
+                ['ec2:DescribeNetworkInterfaces']
+            ),
+        ]
+
     def _find_usage_vpcs(self):
         """find usage for VPCs"""
         # overall number of VPCs
@@ -187,7 +238,8 @@ class _VpcService(_AwsService):
         # "This request has been administratively disabled."
         try:
             gws_per_az = defaultdict(int)
-            for gw in paginate_dict(
+            for gw in self._guarded_call(
+                'DescribeNatGateways', paginate_dict,
                 self.conn.describe_nat_gateways,
                 alc_marker_path=['NextToken'], alc_data_path=['NatGateways'],
                 alc_marker_param='NextToken'
@@ -211,6 +263,9 @@ class _VpcService(_AwsService):
                     resource_id=az,
                     aws_type='AWS::EC2::NatGateway'
                 )
+        except CircuitOpenError as ex:
+            # already logged by the circuit breaker
+            self.limits['NAT Gateways per AZ']._set_skipped(str(ex))
         except ClientError:
             logger.error('Caught exception when trying to list NAT Gateways; '
                          'perhaps NAT service does not exist in this region?',
@@ -237,19 +292,62 @@ class _VpcService(_AwsService):
 
     def _find_usage_network_interfaces(self):
         """find usage of network interfaces"""
-        enis = paginate_dict(
-            self.conn.describe_network_interfaces,
-            alc_marker_path=['NextToken'],
-            alc_data_path=['NetworkInterfaces'],
-            alc_marker_param='NextToken',
-            Filters=[{'Name': 'owner-id', 'Values': [self.current_account_id]}]
-        )
+        # DescribeNetworkInterfaces has no lighter projection; count the
+        # largest pages allowed as they arrive
+        count = 0
+        paginator = self.conn.get_paginator('describe_network_interfaces')
+        for page in paginator.paginate(
+            Filters=[{'Name': 'owner-id', 'Values': [self.current_account_id]}],
+            PaginationConfig={'PageSize': 1000}
+        ):
+            count += len(page['NetworkInterfaces'])
 
         self.limits['Network interfaces per Region']._add_current_usage(
-            len(enis['NetworkInterfaces']),
+            count,
             aws_type='AWS::EC2::NetworkInterface'
         )
 
+    def _event_create_vpc(self, detail):
+        """apply a CreateVpc CloudTrail event to usage"""
+        self._apply_usage_deltas([('VPCs', 1)])
+        return True
+
+    def _event_delete_vpc(self, detail):
+        """apply a DeleteVpc CloudTrail event to usage"""
+        self._apply_usage_deltas([('VPCs', -1)])
+        self.limits['Subnets per VPC']._remove_current_usage(
+            detail['requestParameters']['vpcId']
+        )
+        return True
+
+    def _event_create_subnet(self, detail):
+        """apply a CreateSubnet CloudTrail event to usage"""
+        self.limits['Subnets per VPC']._adjust_current_usage(
+            1, resource_id=detail['responseElements']['subnet']['vpcId'],
+            aws_type='AWS::EC2::VPC'
+        )
+        return True
+
+    def _event_create_internet_gateway(self, detail):
+        """apply a CreateInternetGateway CloudTrail event to usage"""
+        self._apply_usage_deltas([('Internet gateways', 1)])
+        return True
+
+    def _event_delete_internet_gateway(self, detail):
+        """apply a DeleteInternetGateway CloudTrail event to usage"""
+        self._apply_usage_deltas([('Internet gateways', -1)])
+        return True
+
+    def _event_create_network_interface(self, detail):
+        """apply a CreateNetworkInterface CloudTrail event to usage"""
+        self._apply_usage_deltas([('Network interfaces per Region', 1)])
+        return True
+
+    def _event_delete_network_interface(self, detail):
+        """apply a DeleteNetworkInterface CloudTrail event to usage"""
+        self._apply_usage_deltas([('Network interfaces per Region', -1)])
+        return True
+
     def get_limits(self):
         """
         Return all known limits for this service, as a dict of their names
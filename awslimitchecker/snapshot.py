@@ -0,0 +1,587 @@
+"""
+awslimitchecker/snapshot.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import gzip
+import json
+import time
+import heapq
+import logging
+import itertools
+from array import array
+from collections import namedtuple, Counter
+
+from .limit import (
+    SOURCE_OVERRIDE, SOURCE_TA, SOURCE_API, SOURCE_QUOTAS
+)
+from .version import _VERSION
+
+logger = logging.getLogger(__name__)
+
+#: ``format`` value in the header of every snapshot file
+SNAPSHOT_FORMAT = 'awslimitchecker-snapshot'
+
+#: current snapshot format version; see :py:func:`~.write_snapshot`
+SNAPSHOT_VERSION = 1
+
+#: names of the limit states counted by :py:class:`~.FleetRollup`
+STATES = ['ok', 'warning', 'critical']
+
+
+class SnapshotHeader(namedtuple('SnapshotHeader', [
+    'version', 'account_id', 'region', 'timestamp', 'awslimitchecker'
+])):
+    """
+    Header of a snapshot file: the snapshot format ``version``, the
+    ``account_id`` and ``region`` the snapshot was taken in, the
+    ``timestamp`` (integer epoch seconds) it was taken at and the
+    ``awslimitchecker`` version that took it.
+    """
+
+    __slots__ = ()
+
+
+class SnapshotLimit(namedtuple('SnapshotLimit', [
+    'service', 'name', 'limit', 'source', 'default_limit', 'thresholds',
+    'usage', 'state', 'utilization'
+])):
+    """
+    One limit read from a snapshot file.
+
+    Fields:
+
+    * ``service`` - the service name
+    * ``name`` - the limit name
+    * ``limit`` - the effective limit value, or None if unlimited
+    * ``source`` - the limit source (one of the ``SOURCE_*`` constants in
+      :py:mod:`awslimitchecker.limit`)
+    * ``default_limit`` - the default limit value
+    * ``thresholds`` - 4-tuple of the warning count, warning percent,
+      critical count and critical percent thresholds
+    * ``usage`` - list of ``(value, maximum, resource_id, aws_type)``
+      4-tuples
+    * ``state`` - one of :py:data:`~.STATES`
+    * ``utilization`` - the highest usage as a percentage of its maximum (or
+      of the limit), or None if no usage has a maximum or limit
+    """
+
+    __slots__ = ()
+
+    def restore(self, limit):
+        """
+        Set the limit value, thresholds and usage of an
+        :py:class:`~.AwsLimit` to those in this snapshot, replacing any
+        limit overrides and any limit values from Trusted Advisor, the
+        service's API or Service Quotas.
+
+        :param limit: the limit to update
+        :type limit: :py:class:`~.AwsLimit`
+        """
+        limit.limit_override = None
+        limit.api_limit = None
+        limit.quotas_limit = None
+        limit.ta_limit = None
+        limit.ta_unlimited = False
+        limit.default_limit = self.default_limit
+        if self.source == SOURCE_OVERRIDE:
+            limit.set_limit_override(self.limit)
+        elif self.source == SOURCE_API:
+            limit._set_api_limit(self.limit)
+        elif self.source == SOURCE_QUOTAS:
+            limit._set_quotas_limit(self.limit)
+        elif self.source == SOURCE_TA and self.limit is None:
+            limit._set_ta_unlimited()
+        elif self.source == SOURCE_TA:
+            limit._set_ta_limit(self.limit)
+        warn_count, warn_percent, crit_count, crit_percent = self.thresholds
+        limit.set_threshold_override(
+            warn_percent=warn_percent, warn_count=warn_count,
+            crit_percent=crit_percent, crit_count=crit_count
+        )
+        limit._reset_usage()
+        for value, maximum, resource_id, aws_type in self.usage:
+            limit._add_current_usage(
+                value, maximum=maximum, resource_id=resource_id,
+                aws_type=aws_type
+            )
+
+
+def _limit_state(lim):
+    """
+    Return the state (one of :py:data:`~.STATES`) of a checked limit.
+
+    :param lim: the checked limit
+    :type lim: :py:class:`~.LimitResult`
+    :rtype: str
+    """
+    if len(lim.get_criticals()) > 0:
+        return 'critical'
+    if len(lim.get_warnings()) > 0:
+        return 'warning'
+    return 'ok'
+
+
+def _encode_limit(service_name, lim):
+    """
+    Return the compact, JSON-serializable record for one limit. Usage is
+    stored column-wise: a list of values, and lists of maximums and resource
+    IDs only if any usage has one; AWS types are stored as a table of
+    distinct types, plus a list of indexes into it if there is more than one.
+
+    :param service_name: the name of the service
+    :type service_name: str
+    :param lim: the checked limit
+    :type lim: :py:class:`~.LimitResult`
+    :rtype: dict
+    """
+    limit_value = lim.get_limit()
+    values = []
+    maximums = []
+    resource_ids = []
+    types = []
+    type_idx = []
+    type_map = {}
+    utilization = None
+    for value, maximum, resource_id, aws_type in lim.usage.rows():
+        values.append(value)
+        maximums.append(maximum)
+        resource_ids.append(resource_id)
+        if aws_type not in type_map:
+            type_map[aws_type] = len(types)
+            types.append(aws_type)
+        type_idx.append(type_map[aws_type])
+        denominator = maximum or limit_value
+        if denominator:
+            pct = 100.0 * value / denominator
+            if utilization is None or pct > utilization:
+                utilization = pct
+    rec = {
+        's': service_name,
+        'n': lim.name,
+        'l': limit_value,
+        'src': lim.get_limit_source(),
+        'd': lim.default_limit,
+        't': list(lim.thresholds),
+        'st': _limit_state(lim),
+        'p': utilization,
+        'v': values,
+        'y': types
+    }
+    if any(m is not None for m in maximums):
+        rec['m'] = maximums
+    if any(r is not None for r in resource_ids):
+        rec['r'] = resource_ids
+    if len(types) > 1:
+        rec['yi'] = type_idx
+    return rec
+
+
+def _decode_limit(rec):
+    """
+    Reverse :py:func:`~._encode_limit`.
+
+    :param rec: the limit record
+    :type rec: dict
+    :rtype: :py:class:`~.SnapshotLimit`
+    """
+    values = rec['v']
+    num = len(values)
+    maximums = rec.get('m', [None] * num)
+    resource_ids = rec.get('r', [None] * num)
+    types = rec['y']
+    type_idx = rec.get('yi', [0] * num)
+    return SnapshotLimit(
+        service=rec['s'],
+        name=rec['n'],
+        limit=rec['l'],
+        source=rec['src'],
+        default_limit=rec['d'],
+        thresholds=tuple(rec['t']),
+        usage=[
+            (values[i], maximums[i], resource_ids[i], types[type_idx[i]])
+            for i in range(num)
+        ],
+        state=rec['st'],
+        utilization=rec['p']
+    )
+
+
+def write_snapshot(path, result, account_id=None, region=None,
+                   timestamp=None):
+    """
+    Write the limits (values, sources and thresholds) and usage of every
+    limit in a :py:class:`~.CheckResult` to a snapshot file.
+
+    Snapshots are gzip-compressed, with a JSON header line (see
+    :py:class:`~.SnapshotHeader`) followed by one compact JSON record per
+    limit, so that they can be read back one limit at a time with
+    :py:class:`~.SnapshotReader`. The header includes a format version;
+    readers refuse snapshots of other versions.
+
+    :param path: path to write the snapshot to, or a binary file object
+    :type path: str
+    :param result: result of checking thresholds
+    :type result: :py:class:`~.CheckResult`
+    :param account_id: account ID the result is for; if None, this is
+      determined from the first limit's service (which may call STS
+      GetCallerIdentity)
+    :type account_id: str
+    :param region: region name the result is for
+    :type region: str
+    :param timestamp: snapshot time as epoch seconds; defaults to now
+    :type timestamp: int
+    :return: number of limits written
+    :rtype: int
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    if account_id is None:
+        for svc_limits in result.limits.values():
+            for lim in svc_limits.values():
+                account_id = lim.service.current_account_id
+                break
+            break
+    header = {
+        'format': SNAPSHOT_FORMAT,
+        'version': SNAPSHOT_VERSION,
+        'account_id': account_id,
+        'region': region,
+        'timestamp': int(timestamp),
+        'awslimitchecker': _VERSION
+    }
+    count = 0
+    with gzip.open(path, 'wt') as fh:
+        fh.write(json.dumps(header, sort_keys=True) + '\n')
+        for svc_name, svc_limits in sorted(result.limits.items()):
+            for _, lim in sorted(svc_limits.items()):
+                fh.write(json.dumps(
+                    _encode_limit(svc_name, lim), separators=(',', ':')
+                ))
+                fh.write('\n')
+                count += 1
+    logger.debug('Wrote %d limits to snapshot %s', count, path)
+    return count
+
+
+class SnapshotReader(object):
+    """
+    Read a snapshot file written by :py:func:`~.write_snapshot`, one limit at
+    a time. The header is read (and the format version checked) on
+    construction; iterating yields a :py:class:`~.SnapshotLimit` per limit.
+    Use as a context manager, or call :py:meth:`~.close` when done.
+    """
+
+    def __init__(self, path):
+        """
+        Open a snapshot file.
+
+        :param path: path to the snapshot file, or a binary file object
+        :type path: str
+        :raises: :py:exc:`ValueError` if the file is not a snapshot of a
+          supported version
+        """
+        self.path = path
+        self._fh = gzip.open(path, 'rt')
+        try:
+            header = json.loads(self._fh.readline())
+            if header.get('format') != SNAPSHOT_FORMAT:
+                raise ValueError('%s is not an awslimitchecker snapshot' % path)
+            if header.get('version') != SNAPSHOT_VERSION:
+                raise ValueError(
+                    'Unsupported snapshot version in %s: %s' % (
+                        path, header.get('version')
+                    )
+                )
+        except Exception:
+            self._fh.close()
+            raise
+        #: the :py:class:`~.SnapshotHeader` of this snapshot
+        self.header = SnapshotHeader(
+            version=header['version'],
+            account_id=header.get('account_id'),
+            region=header.get('region'),
+            timestamp=header.get('timestamp'),
+            awslimitchecker=header.get('awslimitchecker')
+        )
+
+    def __iter__(self):
+        for line in self._fh:
+            if line.strip():
+                yield _decode_limit(json.loads(line))
+
+    def close(self):
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class FleetEntry(namedtuple('FleetEntry', [
+    'account_id', 'region', 'service', 'limit', 'utilization', 'state',
+    'limit_value'
+])):
+    """
+    One limit in one snapshot, as returned by
+    :py:meth:`.FleetRollup.top_limits`.
+    """
+
+    __slots__ = ()
+
+
+class FleetLimitStats(namedtuple('FleetLimitStats', [
+    'service', 'limit', 'count', 'states', 'max', 'percentiles'
+])):
+    """
+    Fleet-wide statistics for one limit, as returned by
+    :py:meth:`.FleetRollup.limit_stats`.
+
+    Fields:
+
+    * ``service``, ``limit`` - service and limit name
+    * ``count`` - number of snapshots that contained the limit
+    * ``states`` - dict of state (see :py:data:`~.STATES`) to count
+    * ``max`` - highest utilization percentage, or None
+    * ``percentiles`` - dict of percentile to utilization percentage (to
+      within :py:attr:`.FleetRollup.bucket_width`), for the snapshots where
+      the limit has a utilization
+    """
+
+    __slots__ = ()
+
+
+class _LimitHistogram(object):
+    """
+    Fixed-size histogram of the utilization of one limit across snapshots,
+    for :py:class:`~.FleetRollup`.
+    """
+
+    __slots__ = ('buckets', 'count', 'max', 'states')
+
+    def __init__(self, num_buckets):
+        self.buckets = array('L', [0] * num_buckets)
+        self.count = 0
+        self.max = None
+        self.states = Counter()
+
+
+class FleetRollup(object):
+    """
+    Fleet-wide rollup of many snapshots (e.g. one per account and region),
+    read one limit at a time so that memory use does not grow with the
+    number of snapshots: the ``top`` limits closest to exhaustion, per-limit
+    utilization percentiles, and counts of limits by state.
+
+    Percentiles are computed from a fixed-size histogram per limit, with
+    buckets :py:attr:`~.bucket_width` percent wide from 0 to 100 percent
+    and one more for all utilization above 100 percent.
+    """
+
+    #: width of the utilization histogram buckets, in percent
+    bucket_width = 0.1
+
+    def __init__(self, top=10, percentiles=(50, 90, 99)):
+        """
+        :param top: number of limits closest to exhaustion to keep
+        :type top: int
+        :param percentiles: utilization percentiles to compute per limit
+        :type percentiles: tuple
+        """
+        self.top = top
+        self.percentiles = tuple(percentiles)
+        #: number of snapshots added
+        self.snapshots = 0
+        #: :py:class:`collections.Counter` of limit state to count
+        self.states = Counter()
+        self._num_buckets = int(round(100 / self.bucket_width)) + 1
+        self._limits = {}
+        self._top = []
+        self._seq = itertools.count()
+
+    def add_snapshot(self, path):
+        """
+        Add every limit in a snapshot file to the rollup.
+
+        :param path: path to the snapshot file, or a binary file object
+        :type path: str
+        :return: number of limits added
+        :rtype: int
+        """
+        count = 0
+        with SnapshotReader(path) as reader:
+            for lim in reader:
+                self.add(lim, header=reader.header)
+                count += 1
+        self.snapshots += 1
+        return count
+
+    def add(self, lim, header=None):
+        """
+        Add one limit to the rollup.
+
+        :param lim: the limit
+        :type lim: :py:class:`~.SnapshotLimit`
+        :param header: header of the snapshot the limit is from
+        :type header: :py:class:`~.SnapshotHeader`
+        """
+        key = (lim.service, lim.name)
+        hist = self._limits.get(key)
+        if hist is None:
+            hist = self._limits[key] = _LimitHistogram(self._num_buckets)
+        hist.states[lim.state] += 1
+        self.states[lim.state] += 1
+        pct = lim.utilization
+        if pct is None:
+            return
+        hist.count += 1
+        if hist.max is None or pct > hist.max:
+            hist.max = pct
+        idx = min(int(pct / self.bucket_width), self._num_buckets - 1)
+        hist.buckets[max(idx, 0)] += 1
+        if self.top < 1:
+            return
+        entry = FleetEntry(
+            account_id=None if header is None else header.account_id,
+            region=None if header is None else header.region,
+            service=lim.service, limit=lim.name, utilization=pct,
+            state=lim.state, limit_value=lim.limit
+        )
+        item = (pct, next(self._seq), entry)
+        if len(self._top) < self.top:
+            heapq.heappush(self._top, item)
+        elif pct > self._top[0][0]:
+            heapq.heapreplace(self._top, item)
+
+    def top_limits(self):
+        """
+        Return the limits closest to exhaustion (highest utilization) across
+        all snapshots, highest first.
+
+        :rtype: list of :py:class:`~.FleetEntry`
+        """
+        return [
+            item[2] for item in sorted(
+                self._top, key=lambda x: (-x[0], x[1])
+            )
+        ]
+
+    def _percentile(self, hist, pct):
+        """
+        Return the ``pct`` percentile of a limit's utilization (nearest
+        rank), as the upper edge of the histogram bucket it falls in, capped
+        at the highest utilization seen.
+
+        :param hist: the limit's histogram
+        :type hist: :py:class:`~._LimitHistogram`
+        :param pct: percentile
+        :type pct: int
+        :rtype: float
+        """
+        rank = max(1, int(-(-pct * hist.count // 100)))
+        seen = 0
+        for idx, num in enumerate(hist.buckets):
+            seen += num
+            if seen >= rank:
+                break
+        if idx == len(hist.buckets) - 1:
+            return hist.max
+        return min((idx + 1) * self.bucket_width, hist.max)
+
+    def limit_stats(self):
+        """
+        Return fleet-wide statistics for each limit, sorted by service and
+        limit name.
+
+        :rtype: list of :py:class:`~.FleetLimitStats`
+        """
+        res = []
+        for (svc, name), hist in sorted(self._limits.items()):
+            percentiles = {}
+            if hist.count > 0:
+                percentiles = dict(
+                    (p, self._percentile(hist, p)) for p in self.percentiles
+                )
+            res.append(FleetLimitStats(
+                service=svc, limit=name,
+                count=sum(hist.states.values()),
+                states=dict(hist.states), max=hist.max,
+                percentiles=percentiles
+            ))
+        return res
+
+    @property
+    def record_fields(self):
+        """
+        Keys of the output records returned by :py:meth:`~.records`, in
+        order.
+
+        :rtype: list
+        """
+        return [
+            'type', 'account_id', 'region', 'service', 'limit',
+            'utilization', 'state', 'limit_value', 'count'
+        ] + STATES + ['max'] + ['p%g' % p for p in self.percentiles]
+
+    def records(self):
+        """
+        Yield the rollup as output records (dicts with all of
+        :py:attr:`~.record_fields`, for :py:class:`~.RecordWriter`): a
+        ``top`` record for each of :py:meth:`~.top_limits`, then a ``limit``
+        record for each of :py:meth:`~.limit_stats`.
+
+        :rtype: generator of dict
+        """
+        empty = dict((k, None) for k in self.record_fields)
+        for entry in self.top_limits():
+            rec = dict(empty)
+            rec.update(entry._asdict())
+            rec['type'] = 'top'
+            yield rec
+        for stats in self.limit_stats():
+            rec = dict(empty)
+            rec.update(
+                type='limit', service=stats.service, limit=stats.limit,
+                count=stats.count, max=stats.max
+            )
+            for state in STATES:
+                rec[state] = stats.states.get(state, 0)
+            for p, value in stats.percentiles.items():
+                rec['p%g' % p] = value
+            yield rec
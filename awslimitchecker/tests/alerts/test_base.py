@@ -61,6 +61,10 @@ class TestAlertProvider(object):
         cls = APTester('foo')
         assert cls._region_name == 'foo'
 
+    def test_flush(self):
+        cls = APTester('foo')
+        assert cls.flush() is None
+
     def test_providers_by_name(self):
         assert AlertProvider.providers_by_name() == {
             'APTester': APTester,
@@ -39,6 +39,7 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 
 import sys
 import json
+import hashlib
 from awslimitchecker.alerts.pagerdutyv1 import PagerDutyV1
 import pytest
 
@@ -99,6 +100,23 @@ class TestInit(object):
         assert cls._service_key_warn == 'wKey'
         assert cls._account_alias == 'myacct'
         assert cls._incident_key == 'foomyacctbarfoobaz'
+        assert cls._resend_seconds == 3600
+        assert cls._sender is None
+        assert cls._state is None
+
+    @patch.dict('os.environ', {}, clear=True)
+    def test_resend_minutes(self):
+        cls = PagerDutyV1(
+            'foo', critical_service_key='cKey', resend_minutes='0'
+        )
+        assert cls._resend_seconds == 0
+        with pytest.raises(RuntimeError) as exc:
+            PagerDutyV1(
+                'foo', critical_service_key='cKey', resend_minutes='never'
+            )
+        assert str(exc.value) == 'ERROR: PagerDutyV1 resend_minutes must ' \
+                                 'be an integer number of minutes, not ' \
+                                 '"never"'
 
     @patch.dict('os.environ', {}, clear=True)
     def test_no_crit_key(self):
@@ -122,55 +140,113 @@ class PagerDutyV1Tester(object):
             self.cls._service_key_warn = None
             self.cls._service_key_crit = None
             self.cls._account_alias = None
+            self.cls._resend_seconds = 3600
+            self.cls._http = Mock()
+            self.cls._sender = None
+            self.cls._state = None
 
 
 class TestSendEvent(PagerDutyV1Tester):
 
-    def test_success(self):
-        mock_http = Mock()
+    def setup(self):
+        super(TestSendEvent, self).setup()
+        self.skey = hashlib.sha1(b'sKey').hexdigest()[:16]
+        self.trigger = {
+            'event_type': 'trigger', 'details': {'duration_seconds': 1.2}
+        }
+        self.fprint = PagerDutyV1._fingerprint(self.trigger)
+
+    def send(self, payload, state, status=200):
         mock_resp = Mock(
-            status=200, data='{"status": "success", "message": '
-                             '"Event processed", "incident_key":'
-                             ' "iKey"}'
+            status=status, data='{"status": "success", "message": '
+                                '"Event processed", "incident_key":'
+                                ' "iKey"}'
         )
-        mock_http.request.return_value = mock_resp
+        self.cls._http.request.return_value = mock_resp
+        with patch.multiple(
+            pbm, autospec=True, load_cache_json=DEFAULT,
+            save_cache_json=DEFAULT
+        ) as mocks:
+            mocks['load_cache_json'].return_value = state
+            with patch('%s.time.time' % pbm) as m_time:
+                m_time.return_value = 5000.0
+                self.cls._send_event('sKey', payload)
+                self.cls.flush()
+        assert mocks['load_cache_json'].mock_calls == [
+            call(self.cls._state_name)
+        ]
+        return mocks['save_cache_json']
+
+    def test_success(self):
         expected = json.dumps(
-            {'foo': 'bar', 'service_key': 'sKey'}, sort_keys=True
+            dict(self.trigger, service_key='sKey'), sort_keys=True
         ).encode('utf-8')
-        with patch('%s.urllib3.PoolManager' % pbm) as mock_pm:
-            mock_pm.return_value = mock_http
-            self.cls._send_event('sKey', {'foo': 'bar'})
-        assert mock_http.mock_calls == [
+        m_save = self.send(self.trigger, {})
+        assert self.cls._http.mock_calls == [
             call.request(
                 'POST', self.cls.pd_url,
                 headers={'Content-type': 'application/json'},
                 body=expected
             )
         ]
+        assert m_save.mock_calls == [
+            call(self.cls._state_name, {
+                self.skey: {'fingerprint': self.fprint, 'sent': 5000.0}
+            })
+        ]
 
     def test_invalid_event(self):
-        mock_http = Mock()
-        mock_resp = Mock(
-            status=400, data='{"status": "invalid event",'
-                             '"message": "Event object is invalid", '
-                             '"errors": ["foo"]}'
+        with pytest.raises(RuntimeError) as exc:
+            self.send(self.trigger, {}, status=400)
+        assert str(exc.value).startswith(
+            'ERROR creating PagerDuty Event; API responded HTTP 400: '
         )
-        mock_http.request.return_value = mock_resp
-        expected = json.dumps(
-            {'foo': 'bar', 'service_key': 'sKey'}, sort_keys=True
-        ).encode('utf-8')
-        with patch('%s.urllib3.PoolManager' % pbm) as mock_pm:
-            mock_pm.return_value = mock_http
-            with pytest.raises(RuntimeError):
-                self.cls._send_event('sKey', {'foo': 'bar'})
-        assert mock_http.mock_calls == [
-            call.request(
-                'POST', self.cls.pd_url,
-                headers={'Content-type': 'application/json'},
-                body=expected
-            )
+        assert len(self.cls._http.mock_calls) == 1
+
+    def test_duplicate_trigger(self):
+        state = {self.skey: {'fingerprint': self.fprint, 'sent': 4000.0}}
+        self.trigger['details']['duration_seconds'] = 3.4
+        m_save = self.send(self.trigger, state)
+        assert self.cls._http.mock_calls == []
+        assert m_save.mock_calls == []
+
+    def test_duplicate_trigger_resend(self):
+        state = {self.skey: {'fingerprint': self.fprint, 'sent': 1000.0}}
+        m_save = self.send(self.trigger, state)
+        assert len(self.cls._http.mock_calls) == 1
+        assert m_save.mock_calls == [
+            call(self.cls._state_name, {
+                self.skey: {'fingerprint': self.fprint, 'sent': 5000.0}
+            })
         ]
 
+    def test_changed_trigger(self):
+        state = {self.skey: {'fingerprint': self.fprint, 'sent': 4000.0}}
+        self.trigger['details']['limits'] = {'foo': 'bar'}
+        self.send(self.trigger, state)
+        assert len(self.cls._http.mock_calls) == 1
+
+    def test_duplicate_resolve(self):
+        state = {self.skey: {'fingerprint': 'resolve', 'sent': 1.0}}
+        self.send({'event_type': 'resolve', 'details': {}}, state)
+        assert self.cls._http.mock_calls == []
+
+    def test_resolve_after_trigger(self):
+        state = {self.skey: {'fingerprint': self.fprint, 'sent': 4000.0}}
+        m_save = self.send({'event_type': 'resolve', 'details': {}}, state)
+        assert len(self.cls._http.mock_calls) == 1
+        assert m_save.mock_calls == [
+            call(self.cls._state_name, {
+                self.skey: {'fingerprint': 'resolve', 'sent': 5000.0}
+            })
+        ]
+
+    def test_resend_disabled(self):
+        self.cls._resend_seconds = 0
+        state = {self.skey: {'fingerprint': 'resolve', 'sent': 4000.0}}
+        self.send({'event_type': 'resolve', 'details': {}}, state)
+        assert len(self.cls._http.mock_calls) == 1
+
 
 class TestEventDict(PagerDutyV1Tester):
 
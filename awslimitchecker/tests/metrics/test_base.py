@@ -37,10 +37,26 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 ################################################################################
 """
 
-from awslimitchecker.metrics.base import MetricsProvider
+from awslimitchecker.metrics.base import (
+    MetricsProvider, PayloadSender, PayloadSendError
+)
 from awslimitchecker.metrics import Dummy, Datadog
 
+import sys
+import gzip
+import json
 import pytest
+import urllib3
+
+if (
+        sys.version_info[0] < 3 or
+        sys.version_info[0] == 3 and sys.version_info[1] < 4
+):
+    from mock import Mock, patch, call
+else:
+    from unittest.mock import Mock, patch, call
+
+pbm = 'awslimitchecker.metrics.base'
 
 
 class MPTester(MetricsProvider):
@@ -57,6 +73,49 @@ class TestMetricsProvider(object):
         assert cls._duration == 0.0
         assert cls._limits == []
 
+    def test_init_delta_heartbeat(self):
+        cls = MPTester('foo', delta_heartbeat='5')
+        assert cls._delta_heartbeat == 300
+        assert cls._delta_state_name == 'metrics-mptester-foo.json'
+
+    def test_filter_unchanged_disabled(self):
+        cls = MPTester('foo')
+        with patch('%s.load_cache_json' % pbm) as m_load:
+            res = cls._filter_unchanged([('a', 1, 'A'), ('b', 2, 'B')])
+        assert res == ['A', 'B']
+        assert m_load.mock_calls == []
+        with patch('%s.save_cache_json' % pbm) as m_save:
+            cls._save_delta_state()
+        assert m_save.mock_calls == []
+
+    def test_filter_unchanged(self):
+        cls = MPTester('foo', delta_heartbeat=1)
+        with patch('%s.load_cache_json' % pbm) as m_load:
+            m_load.return_value = {
+                'same': [1, 950],
+                'changed': [1, 950],
+                'stale': [3, 900],
+                'removed': [4, 950]
+            }
+            res = cls._filter_unchanged([
+                ('same', 1, 'S'), ('changed', 2, 'C'), ('stale', 3, 'T'),
+                ('new', 5, 'N')
+            ], now=1000)
+        assert res == ['C', 'T', 'N']
+        assert cls._suppressed_points == 1
+        assert m_load.mock_calls == [call('metrics-mptester-foo.json')]
+        with patch('%s.save_cache_json' % pbm) as m_save:
+            cls._save_delta_state()
+            cls._save_delta_state()
+        assert m_save.mock_calls == [
+            call('metrics-mptester-foo.json', {
+                'same': [1, 950],
+                'changed': [2, 1000],
+                'stale': [3, 1000],
+                'new': [5, 1000]
+            })
+        ]
+
     def test_set_run_duration(self):
         cls = MPTester('foo')
         assert cls._duration == 0.0
@@ -70,6 +129,14 @@ class TestMetricsProvider(object):
         cls.add_limit(2)
         assert cls._limits == [1, 2]
 
+    def test_reset(self):
+        cls = MPTester('foo')
+        cls.add_limit(1)
+        cls.set_run_duration(1.5)
+        cls.reset()
+        assert cls._limits == []
+        assert cls._duration == 0.0
+
     def test_providers_by_name(self):
         assert MetricsProvider.providers_by_name() == {
             'Dummy': Dummy,
@@ -85,3 +152,178 @@ class TestMetricsProvider(object):
             MetricsProvider.get_provider_by_name('3993fhej')
         assert str(exc.value) == 'ERROR: "3993fhej" is not a valid ' \
                                  'MetricsProvider class name'
+
+    def test_get_http(self):
+        cls = MPTester('foo')
+        with patch('%s.urllib3.PoolManager' % pbm) as m_pm:
+            res = cls._get_http()
+            assert cls._get_http() is res
+        assert res is m_pm.return_value
+        assert m_pm.mock_calls == [call()]
+
+    def test_json_chunks(self):
+        cls = MPTester('foo')
+        cls.max_payload_bytes = 40
+        items = [{'a': x} for x in range(6)]
+        res = list(cls._json_chunks(items, 'series'))
+        assert len(res) > 1
+        for body in res:
+            assert len(body) <= 40
+        assert [
+            i for body in res for i in json.loads(body.decode())['series']
+        ] == items
+
+    def test_json_chunks_large_item(self):
+        cls = MPTester('foo')
+        cls.max_payload_bytes = 20
+        res = list(cls._json_chunks([{'a': 'x' * 30}, {'b': 1}], 'k'))
+        assert [json.loads(x.decode()) for x in res] == [
+            {'k': [{'a': 'x' * 30}]},
+            {'k': [{'b': 1}]}
+        ]
+        assert list(cls._json_chunks([], 'k')) == []
+
+    def test_send_json_items(self):
+        cls = MPTester('foo')
+        mock_http = Mock()
+        mock_http.request.return_value = Mock(status=200, data='ok')
+        cls._http = mock_http
+        cls.max_payload_bytes = 30
+        assert cls._send_json_items(
+            'http://foo', [{'a': 1}, {'a': 2}, {'a': 3}], 'k',
+            headers={'X': 'y'}
+        ) == 2
+        cls._wait_for_sends()
+        assert len(mock_http.mock_calls) == 2
+        c = mock_http.mock_calls[0]
+        assert c[1] == ('POST', 'http://foo')
+        assert c[2]['headers'] == {'X': 'y', 'Content-Encoding': 'gzip'}
+        assert json.loads(gzip.decompress(c[2]['body']).decode()) == {
+            'k': [{'a': 1}, {'a': 2}]
+        }
+
+    def test_wait_for_sends_nothing_sent(self):
+        MPTester('foo')._wait_for_sends()
+
+    def test_wait_for_sends_http_error(self):
+        cls = MPTester('foo')
+        cls._sender = Mock()
+        cls._sender.join.return_value = [
+            PayloadSendError(status=400, data='bad'),
+            PayloadSendError(status=500, data='worse')
+        ]
+        with pytest.raises(RuntimeError) as exc:
+            cls._wait_for_sends()
+        assert str(exc.value) == 'ERROR sending metrics to MPTester; API ' \
+                                 'responded HTTP 400: bad'
+
+    def test_wait_for_sends_exception(self):
+        cls = MPTester('foo')
+        cls._sender = Mock()
+        cls._sender.join.return_value = [
+            PayloadSendError(exc=ValueError('foo'))
+        ]
+        with pytest.raises(RuntimeError) as exc:
+            cls._wait_for_sends()
+        assert str(exc.value) == 'ERROR sending metrics to MPTester: foo'
+
+
+class TestPayloadSender(object):
+
+    def setup(self):
+        self.mock_http = Mock()
+        self.cls = PayloadSender(self.mock_http, max_attempts=3, backoff=0.5)
+
+    def test_send(self):
+        self.mock_http.request.return_value = Mock(status=202, data='ok')
+        with patch('%s.time.sleep' % pbm) as m_sleep:
+            res = self.cls._send('http://foo', b'body', headers={'A': 'b'})
+        assert res is self.mock_http.request.return_value
+        assert m_sleep.mock_calls == []
+        c = self.mock_http.mock_calls[0]
+        assert c[1] == ('POST', 'http://foo')
+        assert c[2]['headers'] == {'A': 'b', 'Content-Encoding': 'gzip'}
+        assert gzip.decompress(c[2]['body']) == b'body'
+
+    def test_send_uncompressed(self):
+        self.cls = PayloadSender(self.mock_http, compress=False)
+        self.mock_http.request.return_value = Mock(status=200, data='ok')
+        self.cls._send('http://foo', b'body')
+        assert self.mock_http.mock_calls == [
+            call.request('POST', 'http://foo', headers={}, body=b'body')
+        ]
+
+    def test_send_retry(self):
+        self.mock_http.request.side_effect = [
+            Mock(status=429, data='slow down'),
+            urllib3.exceptions.ProtocolError('reset'),
+            Mock(status=200, data='ok')
+        ]
+        with patch('%s.time.sleep' % pbm) as m_sleep:
+            res = self.cls._send('http://foo', b'body')
+        assert res.status == 200
+        assert len(self.mock_http.mock_calls) == 3
+        assert m_sleep.mock_calls == [call(0.5), call(1.0)]
+
+    def test_send_retries_exhausted(self):
+        self.mock_http.request.return_value = Mock(status=502, data='bad gw')
+        with patch('%s.time.sleep' % pbm) as m_sleep:
+            with pytest.raises(PayloadSendError) as exc:
+                self.cls._send('http://foo', b'body')
+        assert exc.value.status == 502
+        assert exc.value.data == 'bad gw'
+        assert str(exc.value) == 'HTTP 502: bad gw'
+        assert len(self.mock_http.mock_calls) == 3
+        assert m_sleep.mock_calls == [call(0.5), call(1.0)]
+
+    def test_send_connection_error(self):
+        ex = urllib3.exceptions.ProtocolError('reset')
+        self.mock_http.request.side_effect = ex
+        with patch('%s.time.sleep' % pbm):
+            with pytest.raises(PayloadSendError) as exc:
+                self.cls._send('http://foo', b'body')
+        assert exc.value.exc is ex
+        assert len(self.mock_http.mock_calls) == 3
+
+    def test_send_client_error_no_retry(self):
+        self.mock_http.request.return_value = Mock(status=403, data='no')
+        with patch('%s.time.sleep' % pbm) as m_sleep:
+            with pytest.raises(PayloadSendError):
+                self.cls._send('http://foo', b'body')
+        assert len(self.mock_http.mock_calls) == 1
+        assert m_sleep.mock_calls == []
+
+    def test_put_and_join(self):
+        self.cls = PayloadSender(self.mock_http, queue_size=1, compress=False)
+        self.mock_http.request.side_effect = [
+            Mock(status=200, data='ok'),
+            Mock(status=400, data='bad'),
+            RuntimeError('boom'),
+            Mock(status=200, data='ok')
+        ]
+        for idx in range(4):
+            self.cls.put('http://foo', b'%d' % idx)
+        errors = self.cls.join()
+        assert [c[2]['body'] for c in self.mock_http.mock_calls] == [
+            b'0', b'1', b'2', b'3'
+        ]
+        assert len(errors) == 2
+        assert errors[0].status == 400
+        assert str(errors[1]) == 'boom'
+        assert self.cls.join() == []
+        assert self.cls._thread.daemon is True
+
+    def test_put_on_sent(self):
+        self.cls = PayloadSender(
+            self.mock_http, compress=False, name='my-sender'
+        )
+        self.mock_http.request.side_effect = [
+            Mock(status=200, data='ok'),
+            Mock(status=400, data='bad')
+        ]
+        sent = []
+        self.cls.put('http://foo', b'0', on_sent=lambda: sent.append(0))
+        self.cls.put('http://foo', b'1', on_sent=lambda: sent.append(1))
+        assert len(self.cls.join()) == 1
+        assert sent == [0]
+        assert self.cls._thread.name == 'my-sender'
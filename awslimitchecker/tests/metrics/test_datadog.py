@@ -39,6 +39,7 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 
 import sys
 import json
+import gzip
 from awslimitchecker.metrics import Datadog
 import pytest
 from freezegun import freeze_time
@@ -54,6 +55,7 @@ else:
 
 pbm = 'awslimitchecker.metrics.datadog'
 pb = '%s.Datadog' % pbm
+pbb = 'awslimitchecker.metrics.base'
 
 
 class TestInit(object):
@@ -103,6 +105,30 @@ class TestInit(object):
         assert m_pm.mock_calls == [call()]
         assert m_va.mock_calls == [call(cls, '1234')]
 
+    @patch.dict('os.environ', {}, clear=True)
+    def test_delta_heartbeat(self):
+        with patch('%s.urllib3.PoolManager' % pbm, autospec=True):
+            with patch('%s._validate_auth' % pb, autospec=True):
+                cls = Datadog('foo', api_key='1234', delta_heartbeat='15')
+        assert cls._delta_heartbeat == 900
+        assert cls._delta_state_name.startswith('metrics-datadog-foo-')
+        with patch('%s.urllib3.PoolManager' % pbm, autospec=True):
+            with patch('%s._validate_auth' % pb, autospec=True):
+                cls2 = Datadog(
+                    'foo', api_key='1234', delta_heartbeat='15',
+                    extra_tags='account:1234'
+                )
+        assert cls2._delta_state_name != cls._delta_state_name
+
+    @patch.dict('os.environ', {}, clear=True)
+    def test_delta_heartbeat_invalid(self):
+        with patch('%s.urllib3.PoolManager' % pbm, autospec=True):
+            with patch('%s._validate_auth' % pb, autospec=True):
+                with pytest.raises(RuntimeError) as exc:
+                    Datadog('foo', api_key='1234', delta_heartbeat='soon')
+        assert str(exc.value) == 'ERROR: delta_heartbeat must be an ' \
+                                 'integer number of minutes, not "soon"'
+
     @patch.dict('os.environ', {'DATADOG_HOST': 'http://dd.host'}, clear=True)
     def test_host_env_var(self):
         mock_http = Mock()
@@ -171,6 +197,9 @@ class DatadogTester(object):
             m_init.return_value = None
             self.cls = Datadog()
             self.cls._host = 'https://api.datadoghq.com'
+            self.cls._sender = None
+            self.cls._delta_heartbeat = None
+            self.cls._delta_state = None
 
 
 class TestValidateAuth(DatadogTester):
@@ -294,8 +323,92 @@ class TestFlush(DatadogTester):
             'POST', 'https://api.datadoghq.com/api/v1/series?api_key=myKey'
         )
         assert len(c[2]) == 2
-        assert c[2]['headers'] == {'Content-type': 'application/json'}
-        assert json.loads(c[2]['body'].decode()) == expected
+        assert c[2]['headers'] == {
+            'Content-type': 'application/json',
+            'Content-Encoding': 'gzip'
+        }
+        assert json.loads(gzip.decompress(c[2]['body']).decode()) == expected
+
+    @freeze_time("2016-12-16 10:40:42", tz_offset=0, auto_tick_seconds=6)
+    def test_chunked(self):
+        self.cls._prefix = 'prefix.'
+        self.cls._tags = ['tag1']
+        self.cls._limits = []
+        self.cls._api_key = 'myKey'
+        self.cls.max_payload_bytes = 300
+        self.cls.set_run_duration(1.5)
+        for idx in range(6):
+            lim = Mock(service=Mock(service_name='SVC1'))
+            type(lim).name = 'limit%d' % idx
+            lim.get_current_usage.return_value = []
+            lim.get_limit.return_value = None
+            self.cls.add_limit(lim)
+        mock_http = Mock()
+        mock_http.request.return_value = Mock(status=202, data='{}')
+        self.cls._http = mock_http
+        self.cls.flush()
+        bodies = [
+            json.loads(gzip.decompress(c[2]['body']).decode())
+            for c in mock_http.mock_calls
+        ]
+        assert len(bodies) > 1
+        for c in mock_http.mock_calls:
+            assert len(gzip.decompress(c[2]['body'])) <= 300
+        metrics = [s['metric'] for b in bodies for s in b['series']]
+        assert metrics == ['prefix.runtime'] + [
+            'prefix.svc1.limit%d.max_usage' % idx for idx in range(6)
+        ]
+
+    @freeze_time("2016-12-16 10:40:42", tz_offset=0, auto_tick_seconds=6)
+    def test_delta(self):
+        self.cls._prefix = 'prefix.'
+        self.cls._tags = ['tag1']
+        self.cls._limits = []
+        self.cls._api_key = 'myKey'
+        self.cls._region_name = 'foo'
+        self.cls._delta_heartbeat = 600
+        self.cls.set_run_duration(1.5)
+        for idx in range(3):
+            lim = Mock(service=Mock(service_name='SVC1'))
+            type(lim).name = 'limit%d' % idx
+            mocku = Mock()
+            mocku.get_value.return_value = idx
+            lim.get_current_usage.return_value = [mocku]
+            lim.get_limit.return_value = None
+            self.cls.add_limit(lim)
+        mock_http = Mock()
+        mock_http.request.return_value = Mock(status=202, data='{}')
+        self.cls._http = mock_http
+        previous = {
+            'prefix.svc1.limit0.max_usage': [0, 1481884800],
+            'prefix.svc1.limit1.max_usage': [5, 1481884800],
+            'prefix.svc1.limit2.max_usage': [2, 1481884000],
+            'prefix.svc1.gone.max_usage': [2, 1481884800]
+        }
+        with patch('%s.load_cache_json' % pbb) as m_load:
+            m_load.return_value = previous
+            with patch('%s.save_cache_json' % pbb) as m_save:
+                self.cls.flush()
+        name = self.cls._delta_state_name
+        assert m_load.mock_calls == [call(name)]
+        ts = 1481884842
+        assert m_save.mock_calls == [call(name, {
+            'prefix.svc1.limit0.max_usage': [0, 1481884800],
+            'prefix.svc1.limit1.max_usage': [1, ts + 6],
+            'prefix.svc1.limit2.max_usage': [2, ts + 6]
+        })]
+        body = json.loads(
+            gzip.decompress(mock_http.mock_calls[0][2]['body']).decode()
+        )
+        assert [
+            (s['metric'], s['points'][0][1]) for s in body['series']
+        ] == [
+            ('prefix.runtime', 1.5),
+            ('prefix.svc1.limit1.max_usage', 1),
+            ('prefix.svc1.limit2.max_usage', 2),
+            ('prefix.suppressed_points', 1)
+        ]
+        assert body['series'][-1]['type'] == 'count'
 
     @freeze_time("2016-12-16 10:40:42", tz_offset=0, auto_tick_seconds=6)
     def test_api_error_non_default_host(self):
@@ -325,8 +438,10 @@ class TestFlush(DatadogTester):
         mock_resp = Mock(status=503, data='{"status": "NG"}')
         mock_http.request.return_value = mock_resp
         self.cls._http = mock_http
-        with pytest.raises(RuntimeError) as exc:
-            self.cls.flush()
+        with patch('awslimitchecker.metrics.base.time.sleep') as m_sleep:
+            with pytest.raises(RuntimeError) as exc:
+                self.cls.flush()
+        assert m_sleep.mock_calls == [call(1.0), call(2.0), call(4.0)]
         assert str(exc.value) == 'ERROR sending metrics to Datadog; API ' \
                                  'responded HTTP 503: {"status": "NG"}'
         ts = 1481884842
@@ -358,12 +473,15 @@ class TestFlush(DatadogTester):
                 }
             ]
         }
-        assert len(mock_http.mock_calls) == 1
+        assert len(mock_http.mock_calls) == 4
         c = mock_http.mock_calls[0]
         assert c[0] == 'request'
         assert c[1] == (
             'POST', 'http://my.host/api/v1/series?api_key=myKey'
         )
         assert len(c[2]) == 2
-        assert c[2]['headers'] == {'Content-type': 'application/json'}
-        assert json.loads(c[2]['body'].decode()) == expected
+        assert c[2]['headers'] == {
+            'Content-type': 'application/json',
+            'Content-Encoding': 'gzip'
+        }
+        assert json.loads(gzip.decompress(c[2]['body']).decode()) == expected
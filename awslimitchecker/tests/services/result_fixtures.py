@@ -1228,55 +1228,6 @@ class ElasticBeanstalk(object):
         ]
     }
 
-    test_find_usage_application_versions = {
-        'ApplicationVersions': [
-            {
-                'ApplicationName': 'application-1',
-                'Description': 'description-1',
-                'DateCreated': datetime(2015, 1, 1),
-                'DateUpdated': datetime(2015, 1, 1),
-                'SourceBundle': {
-                    'S3Bucket': 's3-bucket',
-                    'S3Key': 's3-key'
-                },
-                'VersionLabel': 'version-2'
-            },
-            {
-                'ApplicationName': 'application-1',
-                'Description': 'description-1',
-                'DateCreated': datetime(2015, 1, 1),
-                'DateUpdated': datetime(2015, 1, 1),
-                'SourceBundle': {
-                    'S3Bucket': 's3-bucket',
-                    'S3Key': 's3-key'
-                },
-                'VersionLabel': 'version-1'
-            },
-            {
-                'ApplicationName': 'application-2',
-                'Description': 'description-1',
-                'DateCreated': datetime(2015, 1, 2),
-                'DateUpdated': datetime(2015, 1, 2),
-                'SourceBundle': {
-                    'S3Bucket': 's3-bucket',
-                    'S3Key': 's3-key'
-                },
-                'VersionLabel': 'version-2'
-            },
-            {
-                'ApplicationName': 'application-2',
-                'Description': 'description-1',
-                'DateCreated': datetime(2015, 1, 2),
-                'DateUpdated': datetime(2015, 1, 2),
-                'SourceBundle': {
-                    'S3Bucket': 's3-bucket',
-                    'S3Key': 's3-key'
-                },
-                'VersionLabel': 'version-1'
-            }
-        ]
-    }
-
     test_find_usage_environments = {
         'Environments': [
             {
@@ -5187,10 +5138,10 @@ class DynamoDB(object):
         'TableMaxWriteCapacityUnits': 444
     }
 
-    test_find_usage_dynamodb = [
-        Mock(
-            name='table1',
-            global_secondary_indexes=[
+    test_find_usage_dynamodb = {
+        'table1': {
+            'TableName': 'table1',
+            'GlobalSecondaryIndexes': [
                 {
                     'IndexName': 't1gi1',
                     'KeySchema': [],
@@ -5226,7 +5177,7 @@ class DynamoDB(object):
                     'IndexArn': 't1gi2arn'
                 }
             ],
-            local_secondary_indexes=[
+            'LocalSecondaryIndexes': [
                 {
                     'IndexName': 't1li1',
                     'KeySchema': [],
@@ -5252,17 +5203,17 @@ class DynamoDB(object):
                     'IndexArn': 't1li1arn'
                 }
             ],
-            provisioned_throughput={
+            'ProvisionedThroughput': {
                 'LastIncreaseDateTime': datetime(2015, 1, 1),
                 'LastDecreaseDateTime': datetime(2016, 1, 1),
                 'NumberOfDecreasesToday': 0,
                 'ReadCapacityUnits': 10,
                 'WriteCapacityUnits': 20
             }
-        ),
-        Mock(
-            name='table2',
-            global_secondary_indexes=[
+        },
+        'table2': {
+            'TableName': 'table2',
+            'GlobalSecondaryIndexes': [
                 {
                     'IndexName': 't2gi1',
                     'KeySchema': [],
@@ -5281,7 +5232,7 @@ class DynamoDB(object):
                     'IndexArn': 't1gi1arn'
                 }
             ],
-            local_secondary_indexes=[
+            'LocalSecondaryIndexes': [
                 {
                     'IndexName': 't2li1',
                     'KeySchema': [],
@@ -5291,30 +5242,96 @@ class DynamoDB(object):
                     'IndexArn': 't1li1arn'
                 }
             ],
-            provisioned_throughput={
+            'ProvisionedThroughput': {
                 'LastIncreaseDateTime': datetime(2015, 1, 1),
                 'LastDecreaseDateTime': datetime(2016, 1, 1),
                 'NumberOfDecreasesToday': 0,
                 'ReadCapacityUnits': 333,
                 'WriteCapacityUnits': 444
             }
-        ),
-        Mock(
-            name='table3',
-            global_secondary_indexes=None,
-            local_secondary_indexes=None,
-            provisioned_throughput={
+        },
+        'table3': {
+            'TableName': 'table3',
+            'ProvisionedThroughput': {
                 'LastIncreaseDateTime': datetime(2015, 1, 1),
                 'LastDecreaseDateTime': datetime(2016, 1, 1),
                 'NumberOfDecreasesToday': 0,
                 'ReadCapacityUnits': 600,
                 'WriteCapacityUnits': 800
             }
-        )
-    ]
-    type(test_find_usage_dynamodb[0]).name = 'table1'
-    type(test_find_usage_dynamodb[1]).name = 'table2'
-    type(test_find_usage_dynamodb[2]).name = 'table3'
+        }
+    }
+
+    test_find_usage_list_metrics = {
+        'ProvisionedReadCapacityUnits': [{
+            'Metrics': [
+                {
+                    'Namespace': 'AWS/DynamoDB',
+                    'MetricName': 'ProvisionedReadCapacityUnits',
+                    'Dimensions': [
+                        {'Name': 'TableName', 'Value': 'table1'}
+                    ]
+                },
+                {
+                    'Namespace': 'AWS/DynamoDB',
+                    'MetricName': 'ProvisionedReadCapacityUnits',
+                    'Dimensions': [
+                        {'Name': 'TableName', 'Value': 'table1'},
+                        {'Name': 'GlobalSecondaryIndexName', 'Value': 'gi1'}
+                    ]
+                },
+                {
+                    'Namespace': 'AWS/DynamoDB',
+                    'MetricName': 'ProvisionedReadCapacityUnits',
+                    'Dimensions': [
+                        {'Name': 'TableName', 'Value': 'deleted'}
+                    ]
+                }
+            ]
+        }],
+        'ProvisionedWriteCapacityUnits': [{
+            'Metrics': [
+                {
+                    'Namespace': 'AWS/DynamoDB',
+                    'MetricName': 'ProvisionedWriteCapacityUnits',
+                    'Dimensions': [
+                        {'Name': 'TableName', 'Value': 'table1'}
+                    ]
+                },
+                {
+                    'Namespace': 'AWS/DynamoDB',
+                    'MetricName': 'ProvisionedWriteCapacityUnits',
+                    'Dimensions': [
+                        {'Name': 'TableName', 'Value': 'table1'},
+                        {'Name': 'GlobalSecondaryIndexName', 'Value': 'gi1'}
+                    ]
+                },
+                {
+                    'Namespace': 'AWS/DynamoDB',
+                    'MetricName': 'ProvisionedWriteCapacityUnits',
+                    'Dimensions': [
+                        {'Name': 'TableName', 'Value': 'table1'},
+                        {'Name': 'GlobalSecondaryIndexName', 'Value': 'gi2'}
+                    ]
+                },
+                {
+                    'Namespace': 'AWS/DynamoDB',
+                    'MetricName': 'ProvisionedWriteCapacityUnits',
+                    'Dimensions': [
+                        {'Name': 'TableName', 'Value': 'table1'},
+                        {'Name': 'Operation', 'Value': 'foo'}
+                    ]
+                },
+                {
+                    'Namespace': 'AWS/DynamoDB',
+                    'MetricName': 'ProvisionedWriteCapacityUnits',
+                    'Dimensions': [
+                        {'Name': 'TableName', 'Value': 'table2'}
+                    ]
+                }
+            ]
+        }]
+    }
 
 
 class Route53(object):
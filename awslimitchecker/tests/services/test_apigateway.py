@@ -125,43 +125,51 @@ class Test_ApigatewayService(object):
         assert mocks['_find_usage_plans'].mock_calls == [call(cls)]
         assert mocks['_find_usage_vpc_links'].mock_calls == [call(cls)]
 
-    def test_find_usage_apis(self):
+    def _mock_conn(self):
         mock_conn = Mock()
         res = result_fixtures.ApiGateway.get_rest_apis
-        mock_paginator = Mock()
-        mock_paginator.paginate.return_value = res
-
-        def se_res_paginate(restApiId=None):
-            return result_fixtures.ApiGateway.get_resources[restApiId]
-
-        mock_res_paginator = Mock()
-        mock_res_paginator.paginate.side_effect = se_res_paginate
-
-        def se_get_paginator(api_name):
-            if api_name == 'get_rest_apis':
-                return mock_paginator
-            elif api_name == 'get_resources':
-                return mock_res_paginator
-
-        def se_paginate_dict(*args, **kwargs):
-            if args[0] == mock_conn.get_documentation_parts:
-                return result_fixtures.ApiGateway.doc_parts[kwargs['restApiId']]
-            if args[0] == mock_conn.get_authorizers:
-                return result_fixtures.ApiGateway.authorizers[
-                    kwargs['restApiId']
-                ]
+        paginators = {
+            'get_rest_apis': Mock(),
+            'get_resources': Mock(),
+            'get_documentation_parts': Mock(),
+            'get_authorizers': Mock()
+        }
+        paginators['get_rest_apis'].paginate.return_value = res
+        paginators['get_resources'].paginate.side_effect = \
+            lambda restApiId=None: result_fixtures.ApiGateway.get_resources[
+                restApiId]
+
+        def se_doc_parts(restApiId=None):
+            return [{'items': result_fixtures.ApiGateway.doc_parts[restApiId]}]
+
+        def se_authorizers(restApiId=None):
+            return [
+                {'items': result_fixtures.ApiGateway.authorizers[restApiId]}
+            ]
+
+        paginators['get_documentation_parts'].paginate.side_effect = \
+            se_doc_parts
+        paginators['get_authorizers'].paginate.side_effect = se_authorizers
 
         def se_get_stages(restApiId=None):
             return result_fixtures.ApiGateway.stages[restApiId]
 
-        mock_conn.get_paginator.side_effect = se_get_paginator
+        mock_conn.get_paginator.side_effect = lambda x: paginators[x]
         mock_conn.get_stages.side_effect = se_get_stages
+        return mock_conn, paginators
+
+    @patch.dict('os.environ', {}, clear=True)
+    def test_find_usage_apis(self):
+        mock_conn, paginators = self._mock_conn()
         cls = _ApigatewayService(21, 43, {}, None)
         cls.conn = mock_conn
-        with patch('%s.paginate_dict' % pbm, autospec=True) as mock_pd:
-            with patch('%s.logger' % pbm) as mock_logger:
-                mock_pd.side_effect = se_paginate_dict
-                cls._find_usage_apis()
+        with patch.multiple(
+            pbm,
+            logger=DEFAULT,
+            load_cache_json=DEFAULT,
+            save_cache_json=DEFAULT
+        ) as mocks:
+            cls._find_usage_apis()
         # APIs usage
         usage = cls.limits['Regional APIs per account'].get_current_usage()
         assert len(usage) == 1
@@ -221,144 +229,51 @@ class Test_ApigatewayService(object):
         assert usage[3].get_value() == 0
         assert usage[4].resource_id == 'api5'
         assert usage[4].get_value() == 0
-        assert mock_conn.mock_calls == [
-            call.get_paginator('get_rest_apis'),
-            call.get_paginator('get_resources'),
-            call.get_stages(restApiId='api3'),
-            call.get_paginator('get_resources'),
-            call.get_stages(restApiId='api2'),
-            call.get_paginator('get_resources'),
-            call.get_stages(restApiId='api1'),
-            call.get_paginator('get_resources'),
-            call.get_stages(restApiId='api4'),
-            call.get_paginator('get_resources'),
-            call.get_stages(restApiId='api5')
-        ]
-        assert mock_paginator.mock_calls == [call.paginate()]
-        assert mock_res_paginator.mock_calls == [
-            call.paginate(restApiId='api3'),
-            call.paginate(restApiId='api2'),
-            call.paginate(restApiId='api1'),
-            call.paginate(restApiId='api4'),
-            call.paginate(restApiId='api5')
+        assert sorted(
+            mock_conn.get_stages.mock_calls, key=lambda x: x[2]['restApiId']
+        ) == [
+            call(restApiId='api1'),
+            call(restApiId='api2'),
+            call(restApiId='api3'),
+            call(restApiId='api4'),
+            call(restApiId='api5')
         ]
-        assert mock_pd.mock_calls == [
-            call(
-                mock_conn.get_documentation_parts,
-                restApiId='api3',
-                alc_marker_path=['position'],
-                alc_data_path=['items'],
-                alc_marker_param='position'
-            ),
-            call(
-                mock_conn.get_authorizers,
-                restApiId='api3',
-                alc_marker_path=['position'],
-                alc_data_path=['items'],
-                alc_marker_param='position'
-            ),
-            call(
-                mock_conn.get_documentation_parts,
-                restApiId='api2',
-                alc_marker_path=['position'],
-                alc_data_path=['items'],
-                alc_marker_param='position'
-            ),
-            call(
-                mock_conn.get_authorizers,
-                restApiId='api2',
-                alc_marker_path=['position'],
-                alc_data_path=['items'],
-                alc_marker_param='position'
-            ),
-            call(
-                mock_conn.get_documentation_parts,
-                restApiId='api1',
-                alc_marker_path=['position'],
-                alc_data_path=['items'],
-                alc_marker_param='position'
-            ),
-            call(
-                mock_conn.get_authorizers,
-                restApiId='api1',
-                alc_marker_path=['position'],
-                alc_data_path=['items'],
-                alc_marker_param='position'
-            ),
-            call(
-                mock_conn.get_documentation_parts,
-                restApiId='api4',
-                alc_marker_path=['position'],
-                alc_data_path=['items'],
-                alc_marker_param='position'
-            ),
-            call(
-                mock_conn.get_authorizers,
-                restApiId='api4',
-                alc_marker_path=['position'],
-                alc_data_path=['items'],
-                alc_marker_param='position'
-            ),
-            call(
-                mock_conn.get_documentation_parts,
-                restApiId='api5',
-                alc_marker_path=['position'],
-                alc_data_path=['items'],
-                alc_marker_param='position'
-            ),
-            call(
-                mock_conn.get_authorizers,
-                restApiId='api5',
-                alc_marker_path=['position'],
-                alc_data_path=['items'],
-                alc_marker_param='position'
-            )
-        ]
-        assert mock_logger.mock_calls == [
+        for op in [
+            'get_resources', 'get_documentation_parts', 'get_authorizers'
+        ]:
+            assert sorted(
+                paginators[op].paginate.mock_calls,
+                key=lambda x: x[2]['restApiId']
+            ) == [
+                call(restApiId='api1'),
+                call(restApiId='api2'),
+                call(restApiId='api3'),
+                call(restApiId='api4'),
+                call(restApiId='api5')
+            ]
+        assert paginators['get_rest_apis'].mock_calls == [call.paginate()]
+        assert mocks['logger'].mock_calls == [
             call.debug('Finding usage for APIs'),
             call.debug('Found %d APIs', 5),
             call.debug('Finding usage for per-API limits')
         ]
+        assert mocks['load_cache_json'].mock_calls == []
+        assert mocks['save_cache_json'].mock_calls == []
 
+    @patch.dict('os.environ', {}, clear=True)
     def test_find_usage_apis_stages_now_paginated(self):
-        mock_conn = Mock()
-        res = result_fixtures.ApiGateway.get_rest_apis
-        mock_paginator = Mock()
-        mock_paginator.paginate.return_value = res
-
-        def se_res_paginate(restApiId=None):
-            return result_fixtures.ApiGateway.get_resources[restApiId]
-
-        mock_res_paginator = Mock()
-        mock_res_paginator.paginate.side_effect = se_res_paginate
-
-        def se_get_paginator(api_name):
-            if api_name == 'get_rest_apis':
-                return mock_paginator
-            elif api_name == 'get_resources':
-                return mock_res_paginator
-
-        def se_paginate_dict(*args, **kwargs):
-            if args[0] == mock_conn.get_documentation_parts:
-                return result_fixtures.ApiGateway.doc_parts[kwargs['restApiId']]
-            if args[0] == mock_conn.get_authorizers:
-                return result_fixtures.ApiGateway.authorizers[
-                    kwargs['restApiId']
-                ]
+        mock_conn, paginators = self._mock_conn()
 
         def se_get_stages(restApiId=None):
             r = deepcopy(result_fixtures.ApiGateway.stages[restApiId])
             r['position'] = 'foo'
             return r
 
-        mock_conn.get_paginator.side_effect = se_get_paginator
         mock_conn.get_stages.side_effect = se_get_stages
         cls = _ApigatewayService(21, 43, {}, None)
         cls.conn = mock_conn
-        with patch('%s.paginate_dict' % pbm, autospec=True) as mock_pd:
-            with patch('%s.logger' % pbm) as mock_logger:
-                mock_pd.side_effect = se_paginate_dict
-                cls._find_usage_apis()
+        with patch('%s.logger' % pbm) as mock_logger:
+            cls._find_usage_apis()
         assert mock_logger.mock_calls == [
             call.debug('Finding usage for APIs'),
             call.debug('Found %d APIs', 5),
@@ -369,6 +284,131 @@ class Test_ApigatewayService(object):
             )
         ]
 
+    @patch.dict('os.environ', {'ALC_APIGATEWAY_CACHE_TTL': '600'}, clear=True)
+    def test_find_usage_apis_cached(self):
+        mock_conn, paginators = self._mock_conn()
+        cache = {
+            'api1': {
+                'time': 9000,
+                'fingerprint': [
+                    ['', 'bar', ''],
+                    ['', 'foo', ''],
+                    ['string', 'string', '2015-01-01 00:00:00']
+                ],
+                'counts': {
+                    'resources': 30,
+                    'documentation_parts': 40,
+                    'stages': 3,
+                    'authorizers': 10
+                }
+            },
+            'api2': {
+                'time': 9000,
+                'fingerprint': [['', 'changed', '']],
+                'counts': {
+                    'resources': 20,
+                    'documentation_parts': 10,
+                    'stages': 1,
+                    'authorizers': 20
+                }
+            },
+            'api4': {
+                'time': 1000,
+                'fingerprint': [['', 'baz', '']],
+                'counts': {
+                    'resources': 5,
+                    'documentation_parts': 5,
+                    'stages': 1,
+                    'authorizers': 5
+                }
+            },
+            'gone': {}
+        }
+        cls = _ApigatewayService(21, 43, {}, None)
+        cls.conn = mock_conn
+        cls._current_account_id = '0123'
+        mock_conn._client_config.region_name = 'rname'
+        with patch.multiple(
+            pbm,
+            logger=DEFAULT,
+            load_cache_json=DEFAULT,
+            save_cache_json=DEFAULT
+        ) as mocks:
+            with patch('%s.time.time' % pbm) as mock_time:
+                mock_time.return_value = 9100
+                mocks['load_cache_json'].return_value = cache
+                cls._find_usage_apis()
+        usage = cls.limits['Resources per API'].get_current_usage()
+        assert [(u.resource_id, u.get_value()) for u in usage] == [
+            ('api3', 0), ('api2', 2), ('api1', 30), ('api4', 0), ('api5', 0)
+        ]
+        usage = cls.limits['Custom authorizers per API'].get_current_usage()
+        assert [(u.resource_id, u.get_value()) for u in usage] == [
+            ('api3', 0), ('api2', 2), ('api1', 10), ('api4', 0), ('api5', 0)
+        ]
+        assert sorted(
+            paginators['get_resources'].paginate.mock_calls,
+            key=lambda x: x[2]['restApiId']
+        ) == [
+            call(restApiId='api2'),
+            call(restApiId='api3'),
+            call(restApiId='api4'),
+            call(restApiId='api5')
+        ]
+        assert mocks['load_cache_json'].mock_calls == [
+            call('apigateway-0123-rname.json')
+        ]
+        assert len(mocks['save_cache_json'].mock_calls) == 1
+        saved = mocks['save_cache_json'].mock_calls[0][1]
+        assert saved[0] == 'apigateway-0123-rname.json'
+        assert sorted(saved[1].keys()) == [
+            'api1', 'api2', 'api3', 'api4', 'api5'
+        ]
+        assert saved[1]['api1'] == cache['api1']
+        assert saved[1]['api2'] == {
+            'time': 9100,
+            'fingerprint': [['', 'baz', '']],
+            'counts': {
+                'resources': 2,
+                'documentation_parts': 1,
+                'stages': 1,
+                'authorizers': 2
+            }
+        }
+        assert saved[1]['api4']['time'] == 9100
+
+    @patch.dict('os.environ', {}, clear=True)
+    def test_per_api_cache_ttl_unset(self):
+        cls = _ApigatewayService(21, 43, {}, None)
+        assert cls._per_api_cache_ttl is None
+
+    @patch.dict('os.environ', {'ALC_APIGATEWAY_CACHE_TTL': '60'}, clear=True)
+    def test_per_api_cache_ttl(self):
+        cls = _ApigatewayService(21, 43, {}, None)
+        assert cls._per_api_cache_ttl == 60
+
+    @patch.dict('os.environ', {'ALC_APIGATEWAY_CACHE_TTL': 'x'}, clear=True)
+    def test_per_api_cache_ttl_invalid(self):
+        cls = _ApigatewayService(21, 43, {}, None)
+        with patch('%s.logger' % pbm) as mock_logger:
+            assert cls._per_api_cache_ttl is None
+        assert len(mock_logger.error.mock_calls) == 1
+
+    def test_count_items(self):
+        mock_conn = Mock()
+        mock_conn.get_paginator.return_value.paginate.return_value = [
+            {'items': [1, 2, 3]},
+            {'items': []},
+            {'items': [4]}
+        ]
+        cls = _ApigatewayService(21, 43, {}, None)
+        cls.conn = mock_conn
+        assert cls._count_items('get_foo', restApiId='a') == 4
+        assert mock_conn.mock_calls == [
+            call.get_paginator('get_foo'),
+            call.get_paginator().paginate(restApiId='a')
+        ]
+
     def test_find_usage_plans(self):
         mock_conn = Mock()
         res = result_fixtures.ApiGateway.plans
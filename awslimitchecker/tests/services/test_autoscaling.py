@@ -38,6 +38,7 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 """
 
 import sys
+from botocore.exceptions import ClientError
 from awslimitchecker.services.autoscaling import _AutoscalingService
 
 # https://code.google.com/p/mock/issues/detail?id=249
@@ -88,55 +89,127 @@ class Test_AutoscalingService(object):
 
     def test_find_usage(self):
         mock_conn = Mock()
-
-        def se_wrapper(func, *args, **kwargs):
-            if func == mock_conn.describe_auto_scaling_groups:
-                return {
-                    'AutoScalingGroups': [
-                        {'AutoScalingGroupName': 'foo'},
-                        {'AutoScalingGroupName': 'bar'},
-                        {'AutoScalingGroupName': 'baz'},
-                    ],
-                }
-            elif func == mock_conn.describe_launch_configurations:
-                return {
-                    'LaunchConfigurations': [
-                        {'LaunchConfigurationName': 'foo'},
-                        {'LaunchConfigurationName': 'bar'},
-                    ],
-                }
-            return None
+        mock_conn.describe_account_limits.return_value = {
+            'MaxNumberOfAutoScalingGroups': 11,
+            'MaxNumberOfLaunchConfigurations': 22,
+            'NumberOfAutoScalingGroups': 3,
+            'NumberOfLaunchConfigurations': 2
+        }
 
         with patch('%s.connect' % self.pb) as mock_connect:
-            with patch('%s.paginate_dict' % self.pbm) as mock_paginate:
+            with patch('%s._count_resources' % self.pb) as mock_count:
                 cls = _AutoscalingService(21, 43, {}, None)
                 cls.conn = mock_conn
-                mock_paginate.side_effect = se_wrapper
                 assert cls._have_usage is False
                 cls.find_usage()
         assert mock_connect.mock_calls == [call()]
-        assert mock_conn.mock_calls == []
-        assert mock_paginate.mock_calls == [
-            call(
-                mock_conn.describe_auto_scaling_groups,
-                alc_marker_path=['NextToken'],
-                alc_data_path=['AutoScalingGroups'],
-                alc_marker_param='NextToken'
-            ),
-            call(
-                mock_conn.describe_launch_configurations,
-                alc_marker_path=['NextToken'],
-                alc_data_path=['LaunchConfigurations'],
-                alc_marker_param='NextToken'
-            )
-        ]
+        assert mock_conn.mock_calls == [call.describe_account_limits()]
+        assert mock_count.mock_calls == []
         assert cls._have_usage is True
         asgs = sorted(cls.limits['Auto Scaling groups'].get_current_usage())
         assert len(asgs) == 1
         assert asgs[0].get_value() == 3
+        assert asgs[0].aws_type == 'AWS::AutoScaling::AutoScalingGroup'
         lcs = sorted(cls.limits['Launch configurations'].get_current_usage())
         assert len(lcs) == 1
         assert lcs[0].get_value() == 2
+        assert lcs[0].aws_type == 'AWS::AutoScaling::LaunchConfiguration'
+
+    def test_find_usage_account_limits(self):
+        mock_conn = Mock()
+
+        with patch('%s.connect' % self.pb):
+            with patch('%s._count_resources' % self.pb) as mock_count:
+                cls = _AutoscalingService(21, 43, {}, None)
+                cls.conn = mock_conn
+                cls._account_limits = {
+                    'NumberOfAutoScalingGroups': 5,
+                    'NumberOfLaunchConfigurations': 6
+                }
+                cls.find_usage()
+        assert mock_conn.mock_calls == []
+        assert mock_count.mock_calls == []
+        assert cls._account_limits is None
+        usage = cls.limits['Auto Scaling groups'].get_current_usage()
+        assert usage[0].get_value() == 5
+        usage = cls.limits['Launch configurations'].get_current_usage()
+        assert usage[0].get_value() == 6
+
+    def test_find_usage_missing_counter(self):
+        mock_conn = Mock()
+        mock_conn.describe_account_limits.return_value = {
+            'MaxNumberOfAutoScalingGroups': 11,
+            'MaxNumberOfLaunchConfigurations': 22,
+            'NumberOfLaunchConfigurations': 2
+        }
+
+        with patch('%s.connect' % self.pb):
+            with patch('%s._count_resources' % self.pb) as mock_count:
+                mock_count.return_value = 7
+                cls = _AutoscalingService(21, 43, {}, None)
+                cls.conn = mock_conn
+                cls.find_usage()
+        assert mock_count.mock_calls == [
+            call('describe_auto_scaling_groups', 'AutoScalingGroups')
+        ]
+        usage = cls.limits['Auto Scaling groups'].get_current_usage()
+        assert usage[0].get_value() == 7
+        assert usage[0].aws_type == 'AWS::AutoScaling::AutoScalingGroup'
+        usage = cls.limits['Launch configurations'].get_current_usage()
+        assert usage[0].get_value() == 2
+
+    def test_find_usage_client_error(self):
+        mock_conn = Mock()
+        mock_conn.describe_account_limits.side_effect = ClientError(
+            {'Error': {'Code': 'AccessDenied', 'Message': 'foo'}},
+            'DescribeAccountLimits'
+        )
+
+        def se_count(method, key):
+            return {
+                'describe_auto_scaling_groups': 4,
+                'describe_launch_configurations': 8,
+            }[method]
+
+        with patch('%s.connect' % self.pb):
+            with patch('%s._count_resources' % self.pb) as mock_count:
+                with patch('%s.logger' % self.pbm) as mock_logger:
+                    mock_count.side_effect = se_count
+                    cls = _AutoscalingService(21, 43, {}, None)
+                    cls.conn = mock_conn
+                    cls.find_usage()
+        assert mock_count.mock_calls == [
+            call('describe_auto_scaling_groups', 'AutoScalingGroups'),
+            call('describe_launch_configurations', 'LaunchConfigurations')
+        ]
+        assert call.warning(
+            'Unable to get AutoScaling usage from '
+            'DescribeAccountLimits (%s); counting resources instead',
+            'AccessDenied'
+        ) in mock_logger.mock_calls
+        usage = cls.limits['Auto Scaling groups'].get_current_usage()
+        assert usage[0].get_value() == 4
+        usage = cls.limits['Launch configurations'].get_current_usage()
+        assert usage[0].get_value() == 8
+
+    def test_count_resources(self):
+        mock_conn = Mock()
+        mock_paginator = Mock()
+        mock_paginator.paginate.return_value = [
+            {'AutoScalingGroups': [{'AutoScalingGroupName': 'foo'}] * 100},
+            {'AutoScalingGroups': [{'AutoScalingGroupName': 'bar'}] * 3},
+        ]
+        mock_conn.get_paginator.return_value = mock_paginator
+        cls = _AutoscalingService(21, 43, {}, None)
+        cls.conn = mock_conn
+        res = cls._count_resources(
+            'describe_auto_scaling_groups', 'AutoScalingGroups'
+        )
+        assert res == 103
+        assert mock_conn.mock_calls == [
+            call.get_paginator('describe_auto_scaling_groups'),
+            call.get_paginator().paginate(PaginationConfig={'PageSize': 100})
+        ]
 
     def test_required_iam_permissions(self):
         cls = _AutoscalingService(21, 43, {}, None)
@@ -166,3 +239,4 @@ class Test_AutoscalingService(object):
         ]
         assert cls.limits['Auto Scaling groups'].api_limit == 11
         assert cls.limits['Launch configurations'].api_limit == 22
+        assert cls._account_limits == aslimits
@@ -37,7 +37,7 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 ################################################################################
 """
 
-from awslimitchecker.services.base import _AwsService
+from awslimitchecker.services.base import _AwsService, UsageStep
 from awslimitchecker.limit import AwsLimit
 from awslimitchecker.quotas import ServiceQuotasClient
 import pytest
@@ -57,6 +57,9 @@ if (
 else:
     from unittest.mock import patch, call, Mock, PropertyMock
 
+pbm = 'awslimitchecker.services.base'
+pb = '%s._AwsService' % pbm
+
 
 class AwsServiceTester(_AwsService):
     """class to test non-abstract methods on base class"""
@@ -77,6 +80,58 @@ class AwsServiceTester(_AwsService):
         pass
 
 
+class StepsTester(AwsServiceTester):
+    """class to test usage steps on base class"""
+
+    def __init__(self, *args):
+        super(StepsTester, self).__init__(*args)
+        self.calls = []
+
+    def get_limits(self):
+        if self.limits != {}:
+            return self.limits
+        return dict(
+            (x, Mock(spec_set=AwsLimit)) for x in ['a', 'b', 'c', 'd']
+        )
+
+    def usage_steps(self):
+        return [
+            UsageStep('_step_one', ['a'], ['svc:One']),
+            UsageStep('_step_two', ['b', 'c'], ['svc:Two', 'svc:Three']),
+            UsageStep('_step_three', ['d'], ['svc:Four'],
+                      requires=('_step_one',)),
+        ]
+
+    def _step_one(self):
+        self.calls.append('one')
+        return 'one-result'
+
+    def _step_two(self):
+        self.calls.append('two')
+
+    def _step_three(self, one):
+        self.calls.append('three(%s)' % one)
+
+
+class EventsTester(AwsServiceTester):
+    """class to test event handling on base class"""
+
+    event_handlers = {'CreateFoo': '_event_create_foo'}
+
+    def get_limits(self):
+        if self.limits != {}:
+            return self.limits
+        return {
+            'foo': AwsLimit('foo', self, 10, 80, 99, limit_type='AWS::Foo'),
+            'bar': AwsLimit('bar', self, 10, 80, 99, limit_type='AWS::Bar')
+        }
+
+    def _event_create_foo(self, detail):
+        if detail.get('bad'):
+            raise KeyError('bad')
+        return detail['res']
+
+
 class Test_AwsService(object):
 
     @pytest.mark.skipif(sys.version_info != (2, 7), reason='test for py27')
@@ -136,7 +191,7 @@ class Test_AwsService(object):
         }
         cls = AwsServiceTester(1, 2, {'foo': 'bar'}, None)
         cls._current_account_id = '987654321'
-        with patch('awslimitchecker.services.base.boto3.client') as m_boto:
+        with patch('awslimitchecker.services.base.boto3_client') as m_boto:
             m_boto.return_value = mock_sts
             res = cls.current_account_id
         assert res == '987654321'
@@ -151,7 +206,7 @@ class Test_AwsService(object):
             'Arn': 'something'
         }
         cls = AwsServiceTester(1, 2, {'foo': 'bar'}, None)
-        with patch('awslimitchecker.services.base.boto3.client') as m_boto:
+        with patch('awslimitchecker.services.base.boto3_client') as m_boto:
             m_boto.return_value = mock_sts
             res = cls.current_account_id
         assert res == '123456789'
@@ -256,50 +311,41 @@ class Test_AwsService(object):
     def test_check_thresholds(self):
         cls = AwsServiceTester(1, 2, {}, None)
         cls.find_usage()
+        cls.limits = {}
         mock_limit1 = Mock(spec_set=AwsLimit)
-        mock_limit1.check_thresholds.return_value = False
         cls.limits['foo'] = mock_limit1
         mock_limit2 = Mock(spec_set=AwsLimit)
-        mock_limit2.check_thresholds.return_value = True
         cls.limits['foo2'] = mock_limit2
         mock_limit3 = Mock(spec_set=AwsLimit)
-        mock_limit3.check_thresholds.return_value = True
         cls.limits['foo3'] = mock_limit3
         mock_limit4 = Mock(spec_set=AwsLimit)
-        mock_limit4.check_thresholds.return_value = False
         cls.limits['foo4'] = mock_limit4
         mock_find_usage = Mock()
         with patch.object(AwsServiceTester, 'find_usage', mock_find_usage):
-            res = cls.check_thresholds()
-        assert mock_limit1.mock_calls == [call.check_thresholds()]
-        assert mock_limit2.mock_calls == [call.check_thresholds()]
-        assert mock_limit3.mock_calls == [call.check_thresholds()]
-        assert mock_limit4.mock_calls == [call.check_thresholds()]
+            with patch('%s.evaluate_thresholds' % pbm) as mock_eval:
+                mock_eval.return_value = [False, True, True, False]
+                res = cls.check_thresholds()
+        assert mock_eval.mock_calls == [
+            call([mock_limit1, mock_limit2, mock_limit3, mock_limit4])
+        ]
+        assert mock_limit1.mock_calls == []
         assert res == {'foo': mock_limit1, 'foo4': mock_limit4}
         assert mock_find_usage.mock_calls == []
 
     def test_check_thresholds_find_usage(self):
         cls = AwsServiceTester(1, 2, {}, None)
+        cls.limits = {}
         mock_limit1 = Mock(spec_set=AwsLimit)
-        mock_limit1.check_thresholds.return_value = False
         cls.limits['foo'] = mock_limit1
         mock_limit2 = Mock(spec_set=AwsLimit)
-        mock_limit2.check_thresholds.return_value = True
         cls.limits['foo2'] = mock_limit2
-        mock_limit3 = Mock(spec_set=AwsLimit)
-        mock_limit3.check_thresholds.return_value = True
-        cls.limits['foo3'] = mock_limit3
-        mock_limit4 = Mock(spec_set=AwsLimit)
-        mock_limit4.check_thresholds.return_value = False
-        cls.limits['foo4'] = mock_limit4
         mock_find_usage = Mock()
         with patch.object(AwsServiceTester, 'find_usage', mock_find_usage):
-            res = cls.check_thresholds()
-        assert mock_limit1.mock_calls == [call.check_thresholds()]
-        assert mock_limit2.mock_calls == [call.check_thresholds()]
-        assert mock_limit3.mock_calls == [call.check_thresholds()]
-        assert mock_limit4.mock_calls == [call.check_thresholds()]
-        assert res == {'foo': mock_limit1, 'foo4': mock_limit4}
+            with patch('%s.evaluate_thresholds' % pbm) as mock_eval:
+                mock_eval.return_value = [True, False]
+                res = cls.check_thresholds()
+        assert mock_eval.mock_calls == [call([mock_limit1, mock_limit2])]
+        assert res == {'foo2': mock_limit2}
         assert mock_find_usage.mock_calls == [call()]
 
     def test_update_service_quotas(self):
@@ -417,12 +463,136 @@ class Test_AwsService(object):
         assert mock_limit1.mock_calls == []
         assert mock_limit2.mock_calls == []
 
+    @patch.dict('os.environ', {}, clear=True)
+    def test_max_workers_default(self):
+        cls = AwsServiceTester(1, 2, {}, None)
+        assert cls._max_workers == 8
+
+    @patch.dict(
+        'os.environ', {'ALC_MAX_WORKERS_awsservicetester': '3'}, clear=True
+    )
+    def test_max_workers_env_var(self):
+        cls = AwsServiceTester(1, 2, {}, None)
+        assert cls._max_workers == 3
+
+    @patch.dict(
+        'os.environ', {'ALC_MAX_WORKERS_awsservicetester': 'x'}, clear=True
+    )
+    def test_max_workers_env_var_invalid(self):
+        cls = AwsServiceTester(1, 2, {}, None)
+        assert cls._max_workers == 8
+
+    def test_concurrent_map(self):
+        func = Mock()
+        cls = AwsServiceTester(1, 2, {}, None)
+        with patch(
+            '%s._max_workers' % pb, new_callable=PropertyMock
+        ) as m_mw:
+            m_mw.return_value = 5
+            with patch('%s.concurrent_map' % pbm) as m_cm:
+                res = cls._concurrent_map(func, [1, 2])
+        assert res is m_cm.return_value
+        assert m_cm.mock_calls == [call(func, [1, 2], max_workers=5)]
+
+    def test_concurrent_map_serial(self):
+        func = Mock()
+        cls = AwsServiceTester(1, 2, {}, None)
+        cls._serial_calls = True
+        with patch('%s.concurrent_map' % pbm) as m_cm:
+            res = cls._concurrent_map(func, [1, 2])
+        assert res is m_cm.return_value
+        assert m_cm.mock_calls == [call(func, [1, 2], max_workers=1)]
+
+    def test_usage_plan_not_declared(self):
+        cls = AwsServiceTester(1, 2, {}, None)
+        assert cls.usage_steps() is None
+        assert cls.usage_plan() is None
+        assert cls.usage_plan(['foo']) is None
+
+    def test_usage_plan(self):
+        cls = StepsTester(1, 2, {}, None)
+        assert [x.method for x in cls.usage_plan()] == [
+            '_step_one', '_step_two', '_step_three'
+        ]
+        assert [x.method for x in cls.usage_plan(['c'])] == ['_step_two']
+        assert [x.method for x in cls.usage_plan(['d', 'b'])] == [
+            '_step_one', '_step_two', '_step_three'
+        ]
+        assert [x.method for x in cls.usage_plan(['d'])] == [
+            '_step_one', '_step_three'
+        ]
+        assert cls.usage_plan([]) == []
+        assert cls.usage_plan(['d'])[0].requires == ()
+
+    def test_usage_plan_unknown_limit(self):
+        cls = StepsTester(1, 2, {}, None)
+        with pytest.raises(ValueError) as excinfo:
+            cls.usage_plan(['a', 'z'])
+        assert str(excinfo.value) == "AwsServiceTester service has no " \
+                                     "'z' limit"
+
+    def test_run_usage_steps(self):
+        cls = StepsTester(1, 2, {}, None)
+        cls._run_usage_steps()
+        assert cls.calls == ['one', 'two', 'three(one-result)']
+        for x in ['a', 'b', 'c', 'd']:
+            assert cls.limits[x].mock_calls == [call._reset_usage()]
+
+    def test_run_usage_steps_limits(self):
+        cls = StepsTester(1, 2, {}, None)
+        cls._run_usage_steps(['d'])
+        assert cls.calls == ['one', 'three(one-result)']
+        for x in ['a', 'd']:
+            assert cls.limits[x].mock_calls == [call._reset_usage()]
+        for x in ['b', 'c']:
+            assert cls.limits[x].mock_calls == []
+
+    def test_apply_event(self):
+        cls = EventsTester(1, 2, {}, None)
+        assert cls.apply_event('CreateFoo', {'res': True}) is False
+        cls._have_usage = True
+        assert cls.apply_event('DeleteFoo', {'res': True}) is None
+        assert cls.apply_event('CreateFoo', {'res': True}) is True
+        assert cls.apply_event('CreateFoo', {'res': False}) is False
+        with patch('%s.logger' % pbm) as m_logger:
+            assert cls.apply_event('CreateFoo', {'bad': True}) is False
+        assert m_logger.mock_calls == [
+            call.warning(
+                'Unable to apply %s event to %s usage', 'CreateFoo',
+                'AwsServiceTester', exc_info=True
+            )
+        ]
+
+    def test_usage_deltas(self):
+        cls = EventsTester(1, 2, {}, None)
+        cls.limits['foo']._add_current_usage(3, aws_type='AWS::Foo')
+        cls._apply_usage_deltas([('foo', 2), ('bar', 4)], resource_id='r1')
+        cls._apply_usage_deltas([('foo', 1)])
+        assert cls.limits['foo'].get_current_usage()[0].get_value() == 6
+        bar = cls.limits['bar'].get_current_usage()
+        assert len(bar) == 1
+        assert bar[0].get_value() == 4
+        assert bar[0].aws_type == 'AWS::Bar'
+        assert cls._revert_usage_deltas('r2') is False
+        assert cls._revert_usage_deltas('r1') is True
+        assert cls._revert_usage_deltas('r1') is False
+        assert cls.limits['foo'].get_current_usage()[0].get_value() == 4
+        assert cls.limits['bar'].get_current_usage()[0].get_value() == 0
+        assert cls._event_deltas == {}
+
+    def test_clear_event_deltas(self):
+        cls = EventsTester(1, 2, {}, None)
+        cls._apply_usage_deltas([('foo', 2)], resource_id='r1')
+        cls._clear_event_deltas()
+        assert cls._revert_usage_deltas('r1') is False
+        assert cls.limits['foo'].get_current_usage()[0].get_value() == 2
+
     def test_cloudwatch_connection_needed(self):
         mock_conf = Mock(region_name='foo')
         mock_cw = Mock(_client_config=mock_conf)
         cls = AwsServiceTester(1, 2, {'foo': 'bar'}, None)
         assert cls._cloudwatch_client is None
-        with patch('awslimitchecker.services.base.boto3.client') as m_boto:
+        with patch('awslimitchecker.services.base.boto3_client') as m_boto:
             m_boto.return_value = mock_cw
             res = cls._cloudwatch_connection()
         assert res == mock_cw
@@ -436,7 +606,7 @@ class Test_AwsService(object):
         mock_cw = Mock(_client_config=mock_conf)
         cls = AwsServiceTester(1, 2, {'foo': 'bar'}, None)
         assert cls._cloudwatch_client is None
-        with patch('awslimitchecker.services.base.boto3.client') as m_boto:
+        with patch('awslimitchecker.services.base.boto3_client') as m_boto:
             with patch(
                 'awslimitchecker.connectable.Connectable._max_retries_config',
                 new_callable=PropertyMock
@@ -455,7 +625,7 @@ class Test_AwsService(object):
         mock_cw = Mock(_client_config=mock_conf)
         cls = AwsServiceTester(1, 2, {'foo': 'bar'}, None)
         cls._cloudwatch_client = mock_cw
-        with patch('awslimitchecker.services.base.boto3.client') as m_boto:
+        with patch('awslimitchecker.services.base.boto3_client') as m_boto:
             m_boto.return_value = mock_cw
             res = cls._cloudwatch_connection()
         assert res == mock_cw
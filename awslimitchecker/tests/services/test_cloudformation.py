@@ -91,15 +91,14 @@ class Test_CloudformationService(object):
         mock_paginator = Mock()
         mock_paginator.paginate.return_value = [
             {
-                'Stacks': [
+                'StackSummaries': [
                     {'StackStatus': 'CREATE_IN_PROGRESS'},
-                    {'StackStatus': 'DELETE_COMPLETE'},
                     {'StackStatus': 'DELETE_IN_PROGRESS'},
                     {'StackStatus': 'CREATE_FAILED'},
                 ]
             },
             {
-                'Stacks': [
+                'StackSummaries': [
                     {'StackStatus': 'UPDATE_COMPLETE_CLEANUP_IN_PROGRESS'},
                     {'StackStatus': 'ROLLBACK_COMPLETE'},
                     {'StackStatus': 'DELETE_FAILED'},
@@ -108,6 +107,9 @@ class Test_CloudformationService(object):
         ]
         mock_conn = Mock()
         mock_conn.get_paginator.return_value = mock_paginator
+        mock_conn.meta.service_model.shape_for.return_value.enum = [
+            'CREATE_COMPLETE', 'DELETE_COMPLETE', 'DELETE_FAILED'
+        ]
         with patch('%s.connect' % pb) as mock_connect:
             cls = _CloudformationService(21, 43, {}, None)
             cls.conn = mock_conn
@@ -116,13 +118,28 @@ class Test_CloudformationService(object):
         assert mock_connect.mock_calls == [call()]
         assert cls._have_usage is True
         assert mock_conn.mock_calls == [
-            call.get_paginator('describe_stacks'),
-            call.get_paginator().paginate()
+            call.meta.service_model.shape_for('StackStatus'),
+            call.get_paginator('list_stacks'),
+            call.get_paginator().paginate(
+                StackStatusFilter=['CREATE_COMPLETE', 'DELETE_FAILED']
+            )
         ]
-        assert mock_paginator.mock_calls == [call.paginate()]
         assert len(cls.limits['Stacks'].get_current_usage()) == 1
         assert cls.limits['Stacks'].get_current_usage()[0].get_value() == 6
 
+    def test_find_usage_status_filter(self):
+        cls = _CloudformationService(21, 43, {'region_name': 'us-east-1'}, None)
+        cls.connect()
+        with patch.object(cls.conn, 'get_paginator') as m_paginator:
+            m_paginator.return_value.paginate.return_value = []
+            cls.find_usage()
+        statuses = m_paginator.return_value.paginate.mock_calls[0][2][
+            'StackStatusFilter'
+        ]
+        assert 'DELETE_COMPLETE' not in statuses
+        assert 'CREATE_COMPLETE' in statuses
+        assert 'UPDATE_ROLLBACK_COMPLETE' in statuses
+
     def test_update_limits_from_api(self):
         mock_conn = Mock()
         mock_conn.describe_account_limits.return_value = {
@@ -154,5 +171,5 @@ class Test_CloudformationService(object):
         cls = _CloudformationService(21, 43, {}, None)
         assert cls.required_iam_permissions() == [
             'cloudformation:DescribeAccountLimits',
-            'cloudformation:DescribeStacks'
+            'cloudformation:ListStacks'
         ]
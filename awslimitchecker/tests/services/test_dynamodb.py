@@ -38,7 +38,11 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 """
 
 import sys
+import pstats
+from datetime import datetime
+from freezegun import freeze_time
 from awslimitchecker.tests.services import result_fixtures
+from awslimitchecker.checker import AwsLimitChecker
 from awslimitchecker.limit import AwsLimit
 from awslimitchecker.services.dynamodb import _DynamodbService
 
@@ -48,9 +52,9 @@ if (
         sys.version_info[0] < 3 or
         sys.version_info[0] == 3 and sys.version_info[1] < 4
 ):
-    from mock import patch, call, Mock
+    from mock import patch, call, Mock, DEFAULT
 else:
-    from unittest.mock import patch, call, Mock
+    from unittest.mock import patch, call, Mock, DEFAULT
 
 
 pb = 'awslimitchecker.services.dynamodb._DynamodbService'  # class patch base
@@ -206,35 +210,111 @@ class Test_DynamodbService(object):
                     cls.conn = mock_conn
                     assert cls._have_usage is False
                     cls.find_usage()
-        assert mock_connect.mock_calls == [call(cls)]
-        assert mock_conn_res.mock_calls == [call(cls)]
+        assert mock_connect.mock_calls == [call(cls), call(cls)]
+        assert mock_conn_res.mock_calls == []
         assert mock_conn.mock_calls == []
         assert m_client.mock_calls == []
         assert m_fud.mock_calls == [call(cls)]
         assert cls._have_usage is True
 
-    def test_find_usage_dynamodb(self):
-        response = result_fixtures.DynamoDB.test_find_usage_dynamodb
+    def test_use_cloudwatch(self):
+        cls = _DynamodbService(21, 43, {}, None)
+        with patch.dict('%s.os.environ' % pbm, {}, clear=True):
+            assert cls._use_cloudwatch is False
+        with patch.dict(
+            '%s.os.environ' % pbm, {'ALC_DYNAMODB_CLOUDWATCH': 'True'}
+        ):
+            assert cls._use_cloudwatch is True
+        with patch.dict(
+            '%s.os.environ' % pbm, {'ALC_DYNAMODB_CLOUDWATCH': 'no'}
+        ):
+            assert cls._use_cloudwatch is False
+
+    def test_describe_table(self):
         mock_conn = Mock()
-        mock_conn.describe_limits.return_value = response
-        m_client = Mock()
-        type(m_client).region_name = 'foo'
-        type(mock_conn)._client_config = m_client
+        mock_conn.describe_table.return_value = {'Table': {'foo': 'bar'}}
+        cls = _DynamodbService(21, 43, {}, None)
+        cls.conn = mock_conn
+        assert cls._describe_table('t1') == {'foo': 'bar'}
+        assert mock_conn.mock_calls == [call.describe_table(TableName='t1')]
 
-        def se_conn(cls):
-            cls.conn = mock_conn
+    def test_describe_table_deleted(self):
 
-        mock_tables = Mock()
-        mock_tables.all.return_value = response
-        mock_res_conn = Mock()
-        type(mock_res_conn).tables = mock_tables
+        class NotFound(Exception):
+            pass
 
-        with patch('%s.connect' % pb, autospec=True) as mock_connect:
-            mock_connect.side_effect = se_conn
-            cls = _DynamodbService(21, 43, {}, None)
-            cls.conn = mock_conn
-            cls.resource_conn = mock_res_conn
-            cls._find_usage_dynamodb()
+        mock_conn = Mock()
+        mock_conn.exceptions.ResourceNotFoundException = NotFound
+        mock_conn.describe_table.side_effect = NotFound()
+        cls = _DynamodbService(21, 43, {}, None)
+        cls.conn = mock_conn
+        assert cls._describe_table('t1') is None
+
+    def test_find_usage_profile_cpu(self, tmpdir):
+        tables = result_fixtures.DynamoDB.test_find_usage_dynamodb
+        mock_conn = Mock()
+        mock_conn.get_paginator.return_value.paginate.return_value = [
+            {'TableNames': sorted(tables.keys())}
+        ]
+        mock_conn.describe_table.side_effect = lambda TableName: {
+            'Table': tables[TableName]
+        }
+        with patch.dict(
+            'awslimitchecker.checker._services',
+            {'DynamoDB': _DynamodbService}, clear=True
+        ):
+            checker = AwsLimitChecker(check_version=False, skip_quotas=True)
+        cls = checker.services['DynamoDB']
+        cls.conn = mock_conn
+        path = str(tmpdir.join('prof'))
+        with patch.multiple(
+            pb, autospec=True, connect=DEFAULT,
+            _update_limits_from_api=DEFAULT
+        ):
+            with checker.profile_cpu(path):
+                assert cls._serial_calls is True
+                checker.check_thresholds(service=['DynamoDB'], use_ta=False)
+        assert cls._serial_calls is False
+        assert len(mock_conn.describe_table.mock_calls) == len(tables)
+        stats = pstats.Stats(path + '.DynamoDB').stats
+        calls = [
+            stats[func][1] for func in stats.keys()
+            if func[2] == '_describe_table'
+        ]
+        assert calls == [len(tables)]
+
+    def test_find_usage_dynamodb(self):
+        tables = result_fixtures.DynamoDB.test_find_usage_dynamodb
+        mock_conn = Mock()
+        mock_conn.get_paginator.return_value.paginate.return_value = [
+            {'TableNames': ['table1', 'table2']},
+            {'TableNames': ['deleted', 'table3']}
+        ]
+
+        cls = _DynamodbService(21, 43, {}, None)
+        cls.conn = mock_conn
+        with patch(
+            '%s._describe_table' % pb, autospec=True
+        ) as mock_describe:
+            mock_describe.side_effect = lambda _, n: tables.get(n)
+            with patch(
+                '%s._tables_from_cloudwatch' % pb, autospec=True
+            ) as mock_tfc:
+                with patch.dict('%s.os.environ' % pbm, {}, clear=True):
+                    cls._find_usage_dynamodb()
+        assert mock_conn.mock_calls == [
+            call.get_paginator('list_tables'),
+            call.get_paginator().paginate()
+        ]
+        assert sorted(
+            mock_describe.mock_calls, key=lambda c: c[1][1]
+        ) == [
+            call(cls, 'deleted'),
+            call(cls, 'table1'),
+            call(cls, 'table2'),
+            call(cls, 'table3')
+        ]
+        assert mock_tfc.mock_calls == []
         # Account/Region wide limits
         u = cls.limits['Tables Per Region'].get_current_usage()
         assert len(u) == 1
@@ -279,9 +359,196 @@ class Test_DynamodbService(object):
         assert u[2].resource_id == 'table3'
         assert u[2].get_value() == 600
 
+    def test_find_usage_dynamodb_cloudwatch(self):
+        mock_conn = Mock()
+        mock_conn.get_paginator.return_value.paginate.return_value = [
+            {'TableNames': ['t1', 't2']}
+        ]
+        cls = _DynamodbService(21, 43, {}, None)
+        cls.conn = mock_conn
+        with patch(
+            '%s._describe_table' % pb, autospec=True
+        ) as mock_describe:
+            with patch(
+                '%s._tables_from_cloudwatch' % pb, autospec=True
+            ) as mock_tfc:
+                mock_tfc.return_value = [
+                    {
+                        'TableName': 't1',
+                        'ProvisionedThroughput': {
+                            'ReadCapacityUnits': 1, 'WriteCapacityUnits': 2
+                        },
+                        'GlobalSecondaryIndexes': [{
+                            'IndexName': 'gi1',
+                            'ProvisionedThroughput': {
+                                'ReadCapacityUnits': 3,
+                                'WriteCapacityUnits': 4
+                            }
+                        }],
+                        'LocalSecondaryIndexes': None
+                    },
+                    {
+                        'TableName': 't2',
+                        'ProvisionedThroughput': {
+                            'ReadCapacityUnits': 0, 'WriteCapacityUnits': 0
+                        },
+                        'GlobalSecondaryIndexes': [],
+                        'LocalSecondaryIndexes': None
+                    }
+                ]
+                with patch.dict(
+                    '%s.os.environ' % pbm, {'ALC_DYNAMODB_CLOUDWATCH': '1'}
+                ):
+                    cls._find_usage_dynamodb()
+        assert mock_describe.mock_calls == []
+        assert mock_tfc.mock_calls == [call(cls, ['t1', 't2'])]
+        u = cls.limits['Tables Per Region'].get_current_usage()
+        assert u[0].get_value() == 2
+        u = cls.limits['Account Max Read Capacity Units'].get_current_usage()
+        assert u[0].get_value() == 4
+        u = cls.limits['Account Max Write Capacity Units'].get_current_usage()
+        assert u[0].get_value() == 6
+        u = cls.limits['Global Secondary Indexes'].get_current_usage()
+        assert [(x.resource_id, x.get_value()) for x in u] == [
+            ('t1', 1), ('t2', 0)
+        ]
+        assert cls.limits[
+            'Local Secondary Indexes'].get_current_usage() == []
+
+    @freeze_time('2020-02-03 04:05:06')
+    def test_tables_from_cloudwatch(self):
+        list_metrics = result_fixtures.DynamoDB.test_find_usage_list_metrics
+        mock_cw = Mock()
+        paginators = {
+            'list_metrics': Mock(),
+            'get_metric_data': Mock()
+        }
+        mock_cw.get_paginator.side_effect = lambda x: paginators[x]
+
+        def se_list_metrics(Namespace=None, MetricName=None):
+            return list_metrics[MetricName]
+
+        paginators['list_metrics'].paginate.side_effect = se_list_metrics
+        paginators['get_metric_data'].paginate.return_value = [
+            {
+                'MetricDataResults': [
+                    {'Id': 'm0', 'Values': [10.0, 5.0]},
+                    {'Id': 'm1', 'Values': [2.0]},
+                    {'Id': 'm2', 'Values': [20.0]},
+                ]
+            },
+            {
+                'MetricDataResults': [
+                    {'Id': 'm3', 'Values': [4.0]},
+                    {'Id': 'm4', 'Values': [6.0]},
+                    {'Id': 'm5', 'Values': []}
+                ]
+            }
+        ]
+        cls = _DynamodbService(21, 43, {}, None)
+        with patch(
+            '%s._cloudwatch_connection' % pb, autospec=True
+        ) as mock_cwc:
+            mock_cwc.return_value = mock_cw
+            res = cls._tables_from_cloudwatch(['table2', 'table1', 'table3'])
+        assert res == [
+            {
+                'TableName': 'table2',
+                'ProvisionedThroughput': {
+                    'ReadCapacityUnits': 0, 'WriteCapacityUnits': 0
+                },
+                'GlobalSecondaryIndexes': [],
+                'LocalSecondaryIndexes': None
+            },
+            {
+                'TableName': 'table1',
+                'ProvisionedThroughput': {
+                    'ReadCapacityUnits': 10.0, 'WriteCapacityUnits': 20.0
+                },
+                'GlobalSecondaryIndexes': [
+                    {
+                        'IndexName': 'gi1',
+                        'ProvisionedThroughput': {
+                            'ReadCapacityUnits': 2.0,
+                            'WriteCapacityUnits': 4.0
+                        }
+                    },
+                    {
+                        'IndexName': 'gi2',
+                        'ProvisionedThroughput': {
+                            'ReadCapacityUnits': 0,
+                            'WriteCapacityUnits': 6.0
+                        }
+                    }
+                ],
+                'LocalSecondaryIndexes': None
+            },
+            {
+                'TableName': 'table3',
+                'ProvisionedThroughput': {
+                    'ReadCapacityUnits': 0, 'WriteCapacityUnits': 0
+                },
+                'GlobalSecondaryIndexes': [],
+                'LocalSecondaryIndexes': None
+            }
+        ]
+        gmd = paginators['get_metric_data'].paginate.mock_calls
+        assert len(gmd) == 1
+        kwargs = gmd[0][2]
+        assert kwargs['StartTime'] == datetime(2020, 2, 3, 3, 4, 6)
+        assert kwargs['EndTime'] == datetime(2020, 2, 3, 4, 4, 6)
+        assert kwargs['ScanBy'] == 'TimestampDescending'
+        assert [
+            (
+                q['Id'],
+                q['MetricStat']['Metric']['MetricName'],
+                q['MetricStat']['Metric']['Dimensions']
+            ) for q in kwargs['MetricDataQueries']
+        ] == [
+            (
+                'm0', 'ProvisionedReadCapacityUnits',
+                [{'Name': 'TableName', 'Value': 'table1'}]
+            ),
+            (
+                'm1', 'ProvisionedReadCapacityUnits',
+                [
+                    {'Name': 'TableName', 'Value': 'table1'},
+                    {'Name': 'GlobalSecondaryIndexName', 'Value': 'gi1'}
+                ]
+            ),
+            (
+                'm2', 'ProvisionedWriteCapacityUnits',
+                [{'Name': 'TableName', 'Value': 'table1'}]
+            ),
+            (
+                'm3', 'ProvisionedWriteCapacityUnits',
+                [
+                    {'Name': 'TableName', 'Value': 'table1'},
+                    {'Name': 'GlobalSecondaryIndexName', 'Value': 'gi1'}
+                ]
+            ),
+            (
+                'm4', 'ProvisionedWriteCapacityUnits',
+                [
+                    {'Name': 'TableName', 'Value': 'table1'},
+                    {'Name': 'GlobalSecondaryIndexName', 'Value': 'gi2'}
+                ]
+            ),
+            (
+                'm5', 'ProvisionedWriteCapacityUnits',
+                [{'Name': 'TableName', 'Value': 'table2'}]
+            )
+        ]
+        assert mock_cw.get_paginator.mock_calls == [
+            call('list_metrics'),
+            call('list_metrics'),
+            call('get_metric_data')
+        ]
+
     def test_required_iam_permissions(self):
         cls = _DynamodbService(21, 43, {}, None)
         assert cls.required_iam_permissions() == [
+            "cloudwatch:ListMetrics",
             "dynamodb:DescribeLimits",
             "dynamodb:DescribeTable",
             "dynamodb:ListTables"
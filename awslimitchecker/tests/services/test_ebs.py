@@ -226,27 +226,24 @@ class Test_EbsService(object):
         response = result_fixtures.EBS.test_find_usage_snapshots
 
         mock_conn = Mock()
+        mock_conn.get_paginator.return_value.paginate.return_value = [
+            response, {'Snapshots': response['Snapshots'][:1]}
+        ]
 
         cls = _EbsService(21, 43, {}, None)
         cls.conn = mock_conn
         with patch('awslimitchecker.services.ebs.logger') as mock_logger:
-            with patch('%s.paginate_dict' % self.pbm) as mock_paginate:
-                mock_paginate.return_value = response
-                cls._find_usage_snapshots()
+            cls._find_usage_snapshots()
         assert mock_logger.mock_calls == [
             call.debug("Getting usage for EBS snapshots"),
         ]
         assert len(cls.limits['Active snapshots'].get_current_usage()) == 1
         assert cls.limits['Active snapshots'
-                          ''].get_current_usage()[0].get_value() == 3
-        assert mock_conn.mock_calls == []
-        assert mock_paginate.mock_calls == [
-            call(
-                mock_conn.describe_snapshots,
-                OwnerIds=['self'],
-                alc_marker_path=['NextToken'],
-                alc_data_path=['Snapshots'],
-                alc_marker_param='NextToken'
+                          ''].get_current_usage()[0].get_value() == 4
+        assert mock_conn.mock_calls == [
+            call.get_paginator('describe_snapshots'),
+            call.get_paginator().paginate(
+                OwnerIds=['self'], PaginationConfig={'PageSize': 1000}
             )
         ]
 
@@ -256,3 +253,49 @@ class Test_EbsService(object):
             "ec2:DescribeVolumes",
             "ec2:DescribeSnapshots"
         ]
+
+
+class TestEbsEvents(object):
+
+    def usage(self, cls, lname):
+        return cls.limits[lname].get_current_usage()[0].get_value()
+
+    def test_volumes(self):
+        cls = _EbsService(21, 43, {}, None)
+        cls._have_usage = True
+        cls.limits['Active volumes']._add_current_usage(4)
+        assert cls.apply_event('CreateVolume', {'responseElements': {
+            'volumeId': 'vol-1', 'size': 100, 'volumeType': 'io2',
+            'iops': 3000
+        }}) is True
+        assert cls.apply_event('CreateVolume', {'responseElements': {
+            'volumeId': 'vol-2', 'size': 8, 'volumeType': 'gp3',
+            'iops': 3000
+        }}) is True
+        assert self.usage(cls, 'Active volumes') == 6
+        assert self.usage(
+            cls, 'Provisioned IOPS SSD (io2) storage (GiB)'
+        ) == 100
+        assert self.usage(cls, 'Provisioned IOPS (io2)') == 3000
+        assert self.usage(
+            cls, 'General Purpose (SSD gp3) volume storage (GiB)'
+        ) == 8
+        assert cls.apply_event('DeleteVolume', {
+            'requestParameters': {'volumeId': 'vol-1'}
+        }) is True
+        assert cls.apply_event('DeleteVolume', {
+            'requestParameters': {'volumeId': 'vol-9'}
+        }) is False
+        assert self.usage(cls, 'Active volumes') == 5
+        assert self.usage(cls, 'Provisioned IOPS (io2)') == 0
+        assert cls.apply_event('CreateVolume', {'responseElements': {
+            'volumeId': 'vol-3', 'size': 1, 'volumeType': 'foo'
+        }}) is False
+
+    def test_snapshots(self):
+        cls = _EbsService(21, 43, {}, None)
+        cls._have_usage = True
+        assert cls.apply_event('CreateSnapshot', {}) is True
+        assert cls.apply_event('CopySnapshot', {}) is True
+        assert cls.apply_event('DeleteSnapshot', {}) is True
+        assert self.usage(cls, 'Active snapshots') == 1
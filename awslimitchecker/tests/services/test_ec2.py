@@ -46,6 +46,7 @@ from awslimitchecker.tests.services import result_fixtures
 from awslimitchecker.services.ec2 import _Ec2Service
 from awslimitchecker.limit import AwsLimit
 from awslimitchecker.services.ec2 import RI_NO_AZ
+from awslimitchecker.circuitbreaker import CircuitOpenError
 
 # https://code.google.com/p/mock/issues/detail?id=249
 # py>=3.4 should use unittest.mock not the mock package on pypi
@@ -378,6 +379,64 @@ class TestFindUsage(object):
             call(cls)
         ]
 
+    def test_vcpu_limits(self):
+        with patch.multiple(
+                pb,
+                connect=DEFAULT,
+                connect_resource=DEFAULT,
+                _find_usage_instances_nonvcpu=DEFAULT,
+                _find_usage_instances_vcpu=DEFAULT,
+                _find_usage_networking_sgs=DEFAULT,
+                _find_usage_networking_eips=DEFAULT,
+                _find_usage_networking_eni_sg=DEFAULT,
+                _find_usage_spot_instances=DEFAULT,
+                _find_usage_spot_fleets=DEFAULT,
+                autospec=True,
+        ) as mocks:
+            with patch(
+                    '%s._use_vcpu_limits' % pb, new_callable=PropertyMock
+            ) as m_use_vcpu:
+                m_use_vcpu.return_value = True
+                cls = _Ec2Service(21, 43, {}, None)
+                cls.find_usage(limits=[
+                    'Running On-Demand All Standard '
+                    '(A, C, D, H, I, M, R, T, Z) instances'
+                ])
+        assert cls._have_usage is True
+        assert mocks['_find_usage_instances_vcpu'].mock_calls == [
+            call(cls)
+        ]
+        for x in [
+            '_find_usage_instances_nonvcpu',
+            '_find_usage_networking_sgs',
+            '_find_usage_networking_eips',
+            '_find_usage_networking_eni_sg',
+            '_find_usage_spot_instances',
+            '_find_usage_spot_fleets'
+        ]:
+            assert mocks[x].mock_calls == []
+
+
+class TestUsageSteps(object):
+
+    @pytest.mark.parametrize('use_vcpu', [True, False])
+    def test_covers_all_limits(self, use_vcpu):
+        with patch(
+                '%s._use_vcpu_limits' % pb, new_callable=PropertyMock
+        ) as m_use_vcpu:
+            m_use_vcpu.return_value = use_vcpu
+            cls = _Ec2Service(21, 43, {}, None)
+            steps = cls.usage_steps()
+        covered = set()
+        for step in steps:
+            covered.update(step.limits)
+            assert hasattr(cls, step.method)
+        assert covered == set(cls.limits.keys())
+        if use_vcpu:
+            assert steps[0].method == '_find_usage_instances_vcpu'
+        else:
+            assert steps[0].method == '_find_usage_instances_nonvcpu'
+
 
 class TestInstanceUsage(object):
 
@@ -1052,6 +1111,37 @@ class TestFindUsageSpotFleets(object):
                        'req3', 'modifying')
         ]
 
+    def test_circuit_open(self):
+        mock_client_conn = Mock()
+        mock_breaker = Mock()
+        mock_breaker.call.side_effect = CircuitOpenError(
+            'k', 3, 'UnsupportedOperation', 1000
+        )
+        cls = _Ec2Service(21, 43, {'region_name': 'rname'}, None)
+        cls.conn = mock_client_conn
+        cls._circuit_breaker = mock_breaker
+        cls._find_usage_spot_fleets()
+        assert mock_client_conn.mock_calls == []
+        assert mock_breaker.mock_calls == [
+            call.call(
+                'rname', 'EC2', 'DescribeSpotFleetRequests',
+                mock_client_conn.describe_spot_fleet_requests
+            )
+        ]
+        assert len(cls.limits[
+            'Max active spot fleets per region'
+        ].get_current_usage()) == 0
+        ex = mock_breaker.call.side_effect
+        for lname in [
+            'Max active spot fleets per region',
+            'Max launch specifications per spot fleet',
+            'Max target capacity for all spot fleets in region',
+            'Max target capacity per spot fleet',
+        ]:
+            assert cls.limits[lname].get_skipped() == str(ex)
+        assert cls.limits['Running On-Demand All F instances'].get_skipped() \
+            is None
+
     def test_paginated(self):
         data = deepcopy(fixtures.test_find_usage_spot_fleets)
         data['NextToken'] = 'string'
@@ -1541,3 +1631,141 @@ class TestUseVcpuLimits(object):
             res = cls._use_vcpu_limits
         assert res is False
         assert cls.conn == mock_orig_conn
+
+
+class TestEvents(object):
+
+    def get_cls(self, use_vcpu):
+        with patch(
+                '%s._use_vcpu_limits' % pb, new_callable=PropertyMock
+        ) as m_use_vcpu:
+            m_use_vcpu.return_value = use_vcpu
+            cls = _Ec2Service(21, 43, {}, None)
+        cls._have_usage = True
+        return cls
+
+    def usage(self, cls, lname, resource_id=None):
+        for u in cls.limits[lname].get_current_usage():
+            if u.resource_id == resource_id:
+                return u.get_value()
+        return None
+
+    def run_event(self, *items):
+        return {
+            'responseElements': {'instancesSet': {'items': list(items)}}
+        }
+
+    def test_run_and_terminate_instances_vcpu(self):
+        cls = self.get_cls(True)
+        std = 'Running On-Demand All Standard ' \
+              '(A, C, D, H, I, M, R, T, Z) instances'
+        cls.limits[std]._add_current_usage(10)
+        assert cls.apply_event('RunInstances', self.run_event(
+            {
+                'instanceId': 'i-1', 'instanceType': 't3.large',
+                'placement': {'tenancy': 'default'},
+                'cpuOptions': {'coreCount': 1, 'threadsPerCore': 2}
+            },
+            {
+                'instanceId': 'i-2', 'instanceType': 'p3.2xlarge',
+                'cpuOptions': {'coreCount': 4, 'threadsPerCore': 2}
+            },
+            {
+                'instanceId': 'i-3', 'instanceType': 't3.large',
+                'spotInstanceRequestId': 'sir-1',
+                'cpuOptions': {'coreCount': 1, 'threadsPerCore': 2}
+            },
+            {
+                'instanceId': 'i-4', 'instanceType': 't3.large',
+                'placement': {'tenancy': 'dedicated'},
+                'cpuOptions': {'coreCount': 1, 'threadsPerCore': 2}
+            }
+        )) is True
+        assert self.usage(cls, std) == 12
+        assert self.usage(cls, 'Running On-Demand All P instances') == 8
+        assert cls.apply_event('TerminateInstances', self.run_event(
+            {'instanceId': 'i-1', 'previousState': {'name': 'running'}},
+            {'instanceId': 'i-9', 'previousState': {'name': 'stopped'}}
+        )) is True
+        assert self.usage(cls, std) == 10
+        assert cls.apply_event('StopInstances', self.run_event(
+            {'instanceId': 'i-2', 'previousState': {'name': 'pending'}},
+            {'instanceId': 'i-8', 'previousState': {'name': 'running'}}
+        )) is False
+        assert self.usage(cls, 'Running On-Demand All P instances') == 0
+        assert cls.apply_event('StartInstances', self.run_event(
+            {'instanceId': 'i-2'}
+        )) is False
+
+    def test_run_instances_nonvcpu(self):
+        cls = self.get_cls(False)
+        assert cls.apply_event('RunInstances', self.run_event(
+            {'instanceId': 'i-1', 'instanceType': 't2.micro'}
+        )) is True
+        assert self.usage(cls, 'Running On-Demand t2.micro instances') == 1
+        assert self.usage(cls, 'Running On-Demand EC2 instances') == 1
+        assert cls.apply_event('RunInstances', self.run_event(
+            {'instanceId': 'i-2', 'instanceType': 'zz9.huge'}
+        )) is False
+        assert self.usage(cls, 'Running On-Demand EC2 instances') == 1
+
+    def test_security_groups(self):
+        cls = self.get_cls(True)
+        rules = 'Rules per VPC security group'
+        cls.limits['VPC security groups per Region']._add_current_usage(5)
+        cls.limits[rules]._add_current_usage(3, resource_id='sg-1')
+        assert cls.apply_event('CreateSecurityGroup', {
+            'requestParameters': {'groupName': 'foo', 'vpcId': 'vpc-1'},
+            'responseElements': {'_return': True, 'groupId': 'sg-2'}
+        }) is True
+        assert self.usage(cls, 'VPC security groups per Region') == 6
+        assert self.usage(cls, rules, 'sg-2') == 1
+        assert cls.apply_event('AuthorizeSecurityGroupIngress', {
+            'requestParameters': {
+                'groupId': 'sg-1',
+                'ipPermissions': {'items': [
+                    {
+                        'ipRanges': {'items': [
+                            {'cidrIp': '10.0.0.0/8'}, {'cidrIp': '1.2.3.4/32'}
+                        ]},
+                        'ipv6Ranges': {'items': [{'cidrIpv6': '::/0'}]},
+                        'groups': {'items': [{'groupId': 'sg-2'}]}
+                    },
+                    {'prefixListIds': {'items': [{'prefixListId': 'pl-1'}]}}
+                ]}
+            }
+        }) is True
+        assert self.usage(cls, rules, 'sg-1') == 7
+        assert cls.apply_event('RevokeSecurityGroupEgress', {
+            'requestParameters': {'groupId': 'sg-1'}
+        }) is False
+        assert cls.apply_event('DeleteSecurityGroup', {
+            'requestParameters': {'groupId': 'sg-2'}
+        }) is True
+        assert self.usage(cls, 'VPC security groups per Region') == 5
+        assert self.usage(cls, rules, 'sg-2') is None
+        assert cls.apply_event('DeleteSecurityGroup', {
+            'requestParameters': {'groupName': 'bar'}
+        }) is False
+        assert self.usage(cls, 'VPC security groups per Region') == 4
+
+    def test_addresses(self):
+        cls = self.get_cls(True)
+        vpc = 'VPC Elastic IP addresses (EIPs)'
+        classic = 'Elastic IP addresses (EIPs)'
+        assert cls.apply_event('AllocateAddress', {
+            'responseElements': {'domain': 'vpc', 'allocationId': 'a'}
+        }) is True
+        assert cls.apply_event('AllocateAddress', {
+            'responseElements': {'domain': 'standard'}
+        }) is True
+        assert self.usage(cls, vpc) == 1
+        assert self.usage(cls, classic) == 1
+        assert cls.apply_event('ReleaseAddress', {
+            'requestParameters': {'allocationId': 'a'}
+        }) is True
+        assert cls.apply_event('ReleaseAddress', {
+            'requestParameters': {'publicIp': '1.2.3.4'}
+        }) is True
+        assert self.usage(cls, vpc) == 0
+        assert self.usage(cls, classic) == 0
@@ -47,9 +47,9 @@ if (
         sys.version_info[0] < 3 or
         sys.version_info[0] == 3 and sys.version_info[1] < 4
 ):
-    from mock import patch, call, Mock, DEFAULT, ANY
+    from mock import patch, call, Mock, DEFAULT
 else:
-    from unittest.mock import patch, call, Mock, DEFAULT, ANY
+    from unittest.mock import patch, call, Mock, DEFAULT
 
 
 pbm = 'awslimitchecker.services.eks'  # module patch base
@@ -129,41 +129,66 @@ class Test_EksService(object):
         selectors_limit_key = 'Selectors per Fargate profile'
         label_pairs_limit_key = 'Label pairs per Fargate profile selector'
 
+        clusters = list_clusters['clusters']
+
+        def se_describe_cluster(name=None):
+            return describe_cluster[clusters.index(name)]
+
+        def se_list_nodegroups(clusterName=None):
+            return list_nodegroups[clusters.index(clusterName)]
+
+        def se_list_fargates(clusterName=None):
+            return list_fargates[clusters.index(clusterName)]
+
+        def se_dsc_fargate(clusterName=None, fargateProfileName=None):
+            for p in dsc_fargate:
+                if p['fargateProfile'][
+                    'fargateProfileName'
+                ] == fargateProfileName:
+                    return p
+
         mock_conn = Mock()
         mock_conn.list_clusters.return_value = list_clusters
-        mock_conn.describe_cluster.side_effect = describe_cluster
-        mock_conn.list_nodegroups.side_effect = list_nodegroups
-        mock_conn.list_fargate_profiles.side_effect = list_fargates
-        mock_conn.describe_fargate_profile.side_effect = dsc_fargate
+        mock_conn.describe_cluster.side_effect = se_describe_cluster
+        mock_conn.list_nodegroups.side_effect = se_list_nodegroups
+        mock_conn.list_fargate_profiles.side_effect = se_list_fargates
+        mock_conn.describe_fargate_profile.side_effect = se_dsc_fargate
 
         cls = _EksService(21, 43, {'region_name': 'us-west-2'}, None)
         cls.conn = mock_conn
         cls._find_clusters_usage()
 
-        assert mock_conn.mock_calls == [
-            call.list_clusters(),
-            call.describe_cluster(name=ANY),
-            call.list_nodegroups(clusterName=ANY),
-            call.list_fargate_profiles(clusterName=ANY),
-            call.describe_fargate_profile(
-                clusterName=ANY,
-                fargateProfileName=ANY
-            ),
-            call.describe_cluster(name=ANY),
-            call.list_nodegroups(clusterName=ANY),
-            call.list_fargate_profiles(clusterName=ANY),
-            call.describe_fargate_profile(
-                clusterName=ANY,
-                fargateProfileName=ANY
-            ),
-            call.describe_fargate_profile(
-                clusterName=ANY,
-                fargateProfileName=ANY
-            ),
-            call.describe_fargate_profile(
-                clusterName=ANY,
-                fargateProfileName=ANY
-            ),
+        assert mock_conn.list_clusters.mock_calls == [call()]
+        assert sorted(
+            mock_conn.describe_cluster.mock_calls, key=lambda c: c[2]['name']
+        ) == [
+            call(name='devel'),
+            call(name='prod')
+        ]
+        assert sorted(
+            mock_conn.list_nodegroups.mock_calls,
+            key=lambda c: c[2]['clusterName']
+        ) == [
+            call(clusterName='devel'),
+            call(clusterName='prod')
+        ]
+        assert sorted(
+            mock_conn.list_fargate_profiles.mock_calls,
+            key=lambda c: c[2]['clusterName']
+        ) == [
+            call(clusterName='devel'),
+            call(clusterName='prod')
+        ]
+        assert sorted(
+            mock_conn.describe_fargate_profile.mock_calls,
+            key=lambda c: c[2]['fargateProfileName']
+        ) == [
+            call(clusterName='prod', fargateProfileName='bar'),
+            call(clusterName='prod', fargateProfileName='baz'),
+            call(clusterName='devel', fargateProfileName='foo'),
+            call(
+                clusterName='prod', fargateProfileName='profile_no_labels'
+            )
         ]
         assert len(cls.limits[clusters_limit_key].get_current_usage()) == 1
         assert cls.limits[clusters_limit_key].get_current_usage()[
@@ -205,6 +230,12 @@ class Test_EksService(object):
             1].get_value() == 2
         assert cls.limits[selectors_limit_key].get_current_usage()[
             2].get_value() == 3
+        assert [
+            u.resource_id for u in cls.limits[
+                selectors_limit_key].get_current_usage()
+        ] == [
+            'devel.foo', 'prod.bar', 'prod.baz', 'prod.profile_no_labels'
+        ]
 
         assert len(cls.limits[
             label_pairs_limit_key].get_current_usage()) == 6
@@ -109,10 +109,12 @@ class Test_ElasticBeanstalkService(object):
         assert mock_conn.mock_calls == []
         for x in [
             '_find_usage_applications',
-            '_find_usage_application_versions',
             '_find_usage_environments',
         ]:
             assert mocks[x].mock_calls == [call()]
+        assert mocks['_find_usage_application_versions'].mock_calls == [
+            call(mocks['_find_usage_applications'].return_value)
+        ]
 
     def test_find_usage_applications(self):
         response = result_fixtures.ElasticBeanstalk.test_find_usage_applications
@@ -123,8 +125,9 @@ class Test_ElasticBeanstalkService(object):
         cls = _ElasticBeanstalkService(21, 43, {}, None)
         cls.conn = mock_conn
 
-        cls._find_usage_applications()
+        res = cls._find_usage_applications()
 
+        assert res == response['Applications']
         assert len(cls.limits['Applications'].get_current_usage()) == 1
         assert cls.limits['Applications'].get_current_usage()[
             0].get_value() == 2
@@ -133,23 +136,21 @@ class Test_ElasticBeanstalkService(object):
         ]
 
     def test_find_usage_application_versions(self):
-        beanstalk_fixtures = result_fixtures.ElasticBeanstalk
-        response = beanstalk_fixtures.test_find_usage_application_versions
+        response = result_fixtures.ElasticBeanstalk.test_find_usage_applications
 
         mock_conn = Mock()
-        mock_conn.describe_application_versions.return_value = response
 
         cls = _ElasticBeanstalkService(21, 43, {}, None)
         cls.conn = mock_conn
 
-        cls._find_usage_application_versions()
+        cls._find_usage_application_versions(
+            response['Applications'] + [{'ApplicationName': 'application-3'}]
+        )
 
         assert len(cls.limits['Application versions'].get_current_usage()) == 1
         assert cls.limits['Application versions'].get_current_usage()[
             0].get_value() == 4
-        assert mock_conn.mock_calls == [
-            call.describe_application_versions()
-        ]
+        assert mock_conn.mock_calls == []
 
     def test_find_usage_environments(self):
         response = result_fixtures.ElasticBeanstalk.test_find_usage_environments
@@ -174,6 +175,5 @@ class Test_ElasticBeanstalkService(object):
         cls = _ElasticBeanstalkService(21, 43, {}, None)
         assert cls.required_iam_permissions() == [
             'elasticbeanstalk:DescribeApplications',
-            'elasticbeanstalk:DescribeApplicationVersions',
             'elasticbeanstalk:DescribeEnvironments',
         ]
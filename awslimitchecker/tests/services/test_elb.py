@@ -47,9 +47,9 @@ if (
         sys.version_info[0] < 3 or
         sys.version_info[0] == 3 and sys.version_info[1] < 4
 ):
-    from mock import patch, call, Mock, PropertyMock
+    from mock import patch, call, Mock, PropertyMock, DEFAULT
 else:
-    from unittest.mock import patch, call, Mock, PropertyMock
+    from unittest.mock import patch, call, Mock, PropertyMock, DEFAULT
 
 
 pbm = 'awslimitchecker.services.elb'  # patch base path - module
@@ -122,22 +122,17 @@ class Test_ElbService(object):
         mock_conn.describe_account_limits.return_value = r1
 
         with patch('%s.connect' % pb) as mock_connect:
-            with patch('%s.client' % pbm) as mock_client:
-                m_cli = mock_client.return_value
-                m_cli._client_config.region_name = PropertyMock(
-                    return_value='rname'
-                )
-                m_cli.describe_account_limits.return_value = r2
+            with patch('%s._connect_elbv2' % pb) as mock_connect2:
+                mock_connect2.return_value.describe_account_limits\
+                    .return_value = r2
                 cls = _ElbService(21, 43, {}, None)
                 cls.conn = mock_conn
-                cls._boto3_connection_kwargs = {'foo': 'bar', 'baz': 'blam'}
                 cls.get_limits()
                 cls._update_limits_from_api()
         assert mock_connect.mock_calls == [call()]
         assert mock_conn.mock_calls == [call.describe_account_limits()]
-        assert mock_client.mock_calls == [
-            call('elbv2', foo='bar', baz='blam'),
-            call().describe_account_limits()
+        assert mock_connect2.mock_calls == [
+            call(), call().describe_account_limits()
         ]
         assert cls.limits['Classic load balancers'].api_limit == 3
         assert cls.limits['Application load balancers'].api_limit == 6
@@ -152,6 +147,52 @@ class Test_ElbService(object):
             'Listeners per network load balancer'].api_limit == 100
         assert cls.limits['Network load balancers'].api_limit == 40
 
+    def test_connect_elbv2(self):
+        with patch('%s.boto3_client' % pbm) as mock_client:
+            mock_client.return_value._client_config.region_name = 'rname'
+            with patch('%s.Config' % pbm, autospec=True) as mock_conf:
+                with patch(
+                    'awslimitchecker.connectable.Connectable.'
+                    '_max_retries_config', new_callable=PropertyMock
+                ) as m_mrc:
+                    m_mrc.return_value = None
+                    cls = _ElbService(21, 43, {}, None)
+                    cls._boto3_connection_kwargs = {
+                        'foo': 'bar',
+                        'baz': 'blam'
+                    }
+                    res = cls._connect_elbv2()
+                    res2 = cls._connect_elbv2()
+        assert res is mock_client.return_value
+        assert res2 is mock_client.return_value
+        assert cls.conn2 is mock_client.return_value
+        assert mock_conf.mock_calls == [
+            call(retries={'mode': 'adaptive', 'max_attempts': 12})
+        ]
+        assert mock_client.mock_calls == [
+            call('elbv2', foo='bar', baz='blam', config=mock_conf.return_value),
+        ]
+
+    def test_connect_elbv2_max_retries(self):
+        with patch('%s.boto3_client' % pbm) as mock_client:
+            mock_client.return_value._client_config.region_name = 'rname'
+            with patch('%s.Config' % pbm, autospec=True) as mock_conf:
+                with patch(
+                    'awslimitchecker.connectable.Connectable.'
+                    '_max_retries_config', new_callable=PropertyMock
+                ) as m_mrc:
+                    m_mrc.return_value = {'retries': 5}
+                    cls = _ElbService(21, 43, {}, None)
+                    res = cls._connect_elbv2()
+        assert res is mock_client.return_value
+        assert mock_conf.mock_calls == [
+            call(retries={'mode': 'adaptive', 'max_attempts': 12}),
+            call().merge({'retries': 5})
+        ]
+        assert mock_client.mock_calls == [
+            call('elbv2', config=mock_conf.return_value.merge.return_value),
+        ]
+
     def test_find_usage(self):
         with patch('%s._find_usage_elbv1' % pb, autospec=True) as mock_v1:
             with patch('%s._find_usage_elbv2' % pb, autospec=True) as mock_v2:
@@ -220,53 +261,75 @@ class Test_ElbService(object):
     def test_find_usage_elbv2(self):
         lbs_res = result_fixtures.ELB.test_find_usage_elbv2_elbs
         tgs_res = result_fixtures.ELB.test_find_usage_elbv2_target_groups
-
-        with patch('%s.connect' % pb) as mock_connect:
-            with patch('%s.client' % pbm) as mock_client:
-                mock_client.return_value._client_config.region_name = \
-                    PropertyMock(return_value='rname')
-                with patch('%s.paginate_dict' % pbm) as mock_paginate:
-                    with patch(
-                        '%s._update_usage_for_alb' % pb, autospec=True
-                    ) as mock_u:
-                        with patch(
-                            '%s.Config' % pbm, autospec=True
-                        ) as mock_conf:
-                            mock_paginate.side_effect = [
-                                tgs_res,
-                                lbs_res
-                            ]
-                            cls = _ElbService(21, 43, {}, None)
-                            cls._boto3_connection_kwargs = {
-                                'foo': 'bar',
-                                'baz': 'blam'
-                            }
-                            res = cls._find_usage_elbv2()
+        listeners = {
+            'lb-arn1': result_fixtures.ELB.test_usage_alb_listeners[
+                'Listeners'],
+            'lb-arn2': [{'ListenerArn': 'listener4'}],
+            'lb-arn3': result_fixtures.ELB.test_usage_nlb_listeners[
+                'Listeners']
+        }
+        rules = {
+            'listener1': 2,
+            'listener2': 1,
+            'listener3': 4,
+            'listener4': 5
+        }
+        mock_conn2 = Mock()
+
+        def se_listeners(klass, conn, arn):
+            return listeners[arn]
+
+        def se_rules(klass, conn, arn):
+            return rules[arn]
+
+        with patch.multiple(
+            pb,
+            connect=DEFAULT,
+            _connect_elbv2=DEFAULT,
+            _get_listeners=DEFAULT,
+            _count_rules=DEFAULT,
+            autospec=True
+        ) as mocks:
+            with patch('%s.paginate_dict' % pbm) as mock_paginate:
+                mocks['_connect_elbv2'].return_value = mock_conn2
+                mocks['_get_listeners'].side_effect = se_listeners
+                mocks['_count_rules'].side_effect = se_rules
+                mock_paginate.side_effect = [
+                    tgs_res,
+                    lbs_res
+                ]
+                cls = _ElbService(21, 43, {}, None)
+                res = cls._find_usage_elbv2()
         assert res == 2
-        assert mock_conf.mock_calls == [
-            call(retries={'max_attempts': 12})
-        ]
-        assert mock_connect.mock_calls == []
-        assert mock_client.mock_calls == [
-            call('elbv2', foo='bar', baz='blam', config=mock_conf.return_value),
-        ]
+        assert mocks['connect'].mock_calls == []
         assert mock_paginate.mock_calls == [
             call(
-                mock_client.return_value.describe_target_groups,
+                mock_conn2.describe_target_groups,
                 alc_marker_path=['NextMarker'],
                 alc_data_path=['TargetGroups'],
                 alc_marker_param='Marker'
             ),
             call(
-                mock_client.return_value.describe_load_balancers,
+                mock_conn2.describe_load_balancers,
                 alc_marker_path=['NextMarker'],
                 alc_data_path=['LoadBalancers'],
                 alc_marker_param='Marker'
             )
         ]
-        assert mock_u.mock_calls == [
-            call(cls, mock_client.return_value, 'lb-arn1', 'lb1'),
-            call(cls, mock_client.return_value, 'lb-arn2', 'lb2')
+        assert sorted(
+            mocks['_get_listeners'].mock_calls, key=lambda x: x[1][2]
+        ) == [
+            call(cls, mock_conn2, 'lb-arn1'),
+            call(cls, mock_conn2, 'lb-arn2'),
+            call(cls, mock_conn2, 'lb-arn3')
+        ]
+        assert sorted(
+            mocks['_count_rules'].mock_calls, key=lambda x: x[1][2]
+        ) == [
+            call(cls, mock_conn2, 'listener1'),
+            call(cls, mock_conn2, 'listener2'),
+            call(cls, mock_conn2, 'listener3'),
+            call(cls, mock_conn2, 'listener4')
         ]
         lim = cls.limits['Target groups'].get_current_usage()
         assert len(lim) == 1
@@ -277,18 +340,33 @@ class Test_ElbService(object):
         assert lim[0].get_value() == 1
         assert lim[0].aws_type == \
             'AWS::ElasticLoadBalancing::NetworkLoadBalancer'
+        lim = cls.limits[
+            'Listeners per application load balancer'].get_current_usage()
+        assert [(x.resource_id, x.get_value()) for x in lim] == [
+            ('lb1', 3), ('lb2', 1)
+        ]
+        lim = cls.limits[
+            'Rules per application load balancer'].get_current_usage()
+        assert [(x.resource_id, x.get_value()) for x in lim] == [
+            ('lb1', 7), ('lb2', 5)
+        ]
+        lim = cls.limits[
+            'Certificates per application load balancer'].get_current_usage()
+        assert [(x.resource_id, x.get_value()) for x in lim] == [
+            ('lb1', 3), ('lb2', 0)
+        ]
+        lim = cls.limits[
+            'Listeners per network load balancer'].get_current_usage()
+        assert [(x.resource_id, x.get_value()) for x in lim] == [('lb3', 2)]
 
-    def test_update_usage_for_alb(self):
+    def test_get_listeners(self):
         conn = Mock()
         with patch('%s.paginate_dict' % pbm) as mock_paginate:
-            mock_paginate.side_effect = [
-                result_fixtures.ELB.test_usage_alb_listeners,
-                result_fixtures.ELB.test_usage_alb_rules[0],
-                result_fixtures.ELB.test_usage_alb_rules[1],
-                result_fixtures.ELB.test_usage_alb_rules[2]
-            ]
+            mock_paginate.return_value = \
+                result_fixtures.ELB.test_usage_nlb_listeners
             cls = _ElbService(21, 43, {}, None)
-            cls._update_usage_for_alb(conn, 'myarn', 'albname')
+            res = cls._get_listeners(conn, 'myarn')
+        assert res == result_fixtures.ELB.test_usage_nlb_listeners['Listeners']
         assert mock_paginate.mock_calls == [
             call(
                 conn.describe_listeners,
@@ -296,21 +374,18 @@ class Test_ElbService(object):
                 alc_marker_path=['NextMarker'],
                 alc_data_path=['Listeners'],
                 alc_marker_param='Marker'
-            ),
-            call(
-                conn.describe_rules,
-                ListenerArn='listener1',
-                alc_marker_path=['NextMarker'],
-                alc_data_path=['Rules'],
-                alc_marker_param='Marker'
-            ),
-            call(
-                conn.describe_rules,
-                ListenerArn='listener2',
-                alc_marker_path=['NextMarker'],
-                alc_data_path=['Rules'],
-                alc_marker_param='Marker'
-            ),
+            )
+        ]
+
+    def test_count_rules(self):
+        conn = Mock()
+        with patch('%s.paginate_dict' % pbm) as mock_paginate:
+            mock_paginate.return_value = \
+                result_fixtures.ELB.test_usage_alb_rules[2]
+            cls = _ElbService(21, 43, {}, None)
+            res = cls._count_rules(conn, 'listener3')
+        assert res == 4
+        assert mock_paginate.mock_calls == [
             call(
                 conn.describe_rules,
                 ListenerArn='listener3',
@@ -319,6 +394,14 @@ class Test_ElbService(object):
                 alc_marker_param='Marker'
             )
         ]
+
+    def test_update_usage_for_alb(self):
+        cls = _ElbService(21, 43, {}, None)
+        cls._update_usage_for_alb(
+            'albname',
+            result_fixtures.ELB.test_usage_alb_listeners['Listeners'],
+            {'listener1': 2, 'listener2': 1, 'listener3': 4}
+        )
         lim = cls.limits[
             'Listeners per application load balancer'].get_current_usage()
         assert len(lim) == 1
@@ -340,22 +423,11 @@ class Test_ElbService(object):
         assert certs[0].resource_id == 'albname'
 
     def test_update_usage_for_nlb(self):
-        conn = Mock()
-        with patch('%s.paginate_dict' % pbm) as mock_paginate:
-            mock_paginate.side_effect = [
-                result_fixtures.ELB.test_usage_nlb_listeners
-            ]
-            cls = _ElbService(21, 43, {}, None)
-            cls._update_usage_for_nlb(conn, 'mynarn', 'nlbname')
-        assert mock_paginate.mock_calls == [
-            call(
-                conn.describe_listeners,
-                LoadBalancerArn='mynarn',
-                alc_marker_path=['NextMarker'],
-                alc_data_path=['Listeners'],
-                alc_marker_param='Marker'
-            )
-        ]
+        cls = _ElbService(21, 43, {}, None)
+        cls._update_usage_for_nlb(
+            'nlbname',
+            result_fixtures.ELB.test_usage_nlb_listeners['Listeners']
+        )
         lim = cls.limits[
             'Listeners per network load balancer'].get_current_usage()
         assert len(lim) == 1
@@ -108,27 +108,167 @@ class Test_RDSService(object):
     def test_find_usage(self):
         mock_conn = Mock()
 
+        def se_instances():
+            return [('Read replicas per master', 2, 'db1',
+                     'AWS::RDS::DBInstance')]
+
+        def se_subnets():
+            return [('Subnets per Subnet Group', 3, 'sg1',
+                     'AWS::RDS::DBSubnetGroup')]
+
+        def se_security_groups():
+            return [
+                ('Max auths per security group', 1, 'sec1',
+                 'AWS::RDS::DBSecurityGroup'),
+                ('VPC Security Groups', 4, None, 'AWS::RDS::DBSecurityGroup')
+            ]
+
         with patch('%s.connect' % self.pb) as mock_connect:
             with patch.multiple(
                     self.pb,
+                    _find_usage_account_attributes=DEFAULT,
                     _find_usage_instances=DEFAULT,
                     _find_usage_subnet_groups=DEFAULT,
                     _find_usage_security_groups=DEFAULT,
                     _update_limits_from_api=DEFAULT,
             ) as mocks:
+                mocks['_find_usage_instances'].side_effect = se_instances
+                mocks['_find_usage_subnet_groups'].side_effect = se_subnets
+                mocks['_find_usage_security_groups'].side_effect = \
+                    se_security_groups
                 cls = _RDSService(21, 43, {}, None)
                 cls.conn = mock_conn
+                cls._account_quotas = []
+                cls.limits['DB instances']._add_current_usage(99)
                 assert cls._have_usage is False
                 cls.find_usage()
         assert mock_connect.mock_calls == [call()]
         assert cls._have_usage is True
+        assert cls._account_quotas is None
         for x in [
+                '_find_usage_account_attributes',
                 '_find_usage_instances',
                 '_find_usage_subnet_groups',
                 '_find_usage_security_groups',
-                '_update_limits_from_api',
         ]:
             assert mocks[x].mock_calls == [call()]
+        assert mocks['_update_limits_from_api'].mock_calls == []
+        assert cls.limits['DB instances'].get_current_usage() == []
+        usage = cls.limits['Read replicas per master'].get_current_usage()
+        assert len(usage) == 1
+        assert usage[0].get_value() == 2
+        assert usage[0].resource_id == 'db1'
+        assert usage[0].aws_type == 'AWS::RDS::DBInstance'
+        usage = cls.limits['Subnets per Subnet Group'].get_current_usage()
+        assert len(usage) == 1
+        assert usage[0].get_value() == 3
+        assert usage[0].resource_id == 'sg1'
+        usage = cls.limits['Max auths per security group'].get_current_usage()
+        assert len(usage) == 1
+        assert usage[0].get_value() == 1
+        assert usage[0].resource_id == 'sec1'
+        usage = cls.limits['VPC Security Groups'].get_current_usage()
+        assert len(usage) == 1
+        assert usage[0].get_value() == 4
+        assert usage[0].resource_id is None
+
+    def test_find_usage_limits(self):
+        mock_conn = Mock()
+
+        with patch('%s.connect' % self.pb) as mock_connect:
+            with patch.multiple(
+                    self.pb,
+                    _find_usage_account_attributes=DEFAULT,
+                    _find_usage_instances=DEFAULT,
+                    _find_usage_subnet_groups=DEFAULT,
+                    _find_usage_security_groups=DEFAULT,
+            ) as mocks:
+                mocks['_find_usage_subnet_groups'].return_value = []
+                cls = _RDSService(21, 43, {}, None)
+                cls.conn = mock_conn
+                cls.limits['DB instances']._add_current_usage(99)
+                cls.limits['Subnets per Subnet Group']._add_current_usage(5)
+                cls.find_usage(limits=['Subnets per Subnet Group'])
+        assert mock_connect.mock_calls == [call()]
+        assert cls._have_usage is True
+        assert mocks['_find_usage_subnet_groups'].mock_calls == [call()]
+        for x in [
+                '_find_usage_account_attributes',
+                '_find_usage_instances',
+                '_find_usage_security_groups',
+        ]:
+            assert mocks[x].mock_calls == []
+        assert cls.limits['Subnets per Subnet Group'].get_current_usage() == []
+        usage = cls.limits['DB instances'].get_current_usage()
+        assert len(usage) == 1
+        assert usage[0].get_value() == 99
+
+    def test_usage_steps(self):
+        cls = _RDSService(21, 43, {}, None)
+        steps = cls.usage_steps()
+        assert [x.method for x in steps] == [
+            '_find_usage_account_attributes',
+            '_find_usage_instances',
+            '_find_usage_subnet_groups',
+            '_find_usage_security_groups',
+        ]
+        assert steps[0].api_calls == ['rds:DescribeAccountAttributes']
+        assert 'DB instances' in steps[0].limits
+        assert 'Read replicas per master' not in steps[0].limits
+        assert 'VPC Security Groups' not in steps[0].limits
+        covered = []
+        for step in steps:
+            covered.extend(step.limits)
+        assert sorted(covered) == sorted(cls.limits.keys())
+
+    def test_find_usage_account_attributes(self):
+        response = result_fixtures.RDS.test_update_limits_from_api
+
+        cls = _RDSService(21, 43, {}, None)
+        cls._account_quotas = response['AccountQuotas']
+        with patch('%s._update_limits_from_api' % self.pb) as mock_update:
+            cls._find_usage_account_attributes()
+        assert mock_update.mock_calls == []
+
+        lim = cls.limits['DB instances']
+        assert lim.get_current_usage()[0].get_value() == 124
+        lim = cls.limits['Reserved Instances']
+        assert lim.get_current_usage()[0].get_value() == 96
+        lim = cls.limits['Storage quota (GB)']
+        assert lim.get_current_usage()[0].get_value() == 8320
+        lim = cls.limits['DB security groups']
+        assert lim.get_current_usage()[0].get_value() == 15
+        lim = cls.limits['DB parameter groups']
+        assert lim.get_current_usage()[0].get_value() == 39
+        lim = cls.limits['DB snapshots per user']
+        assert lim.get_current_usage()[0].get_value() == 76
+        lim = cls.limits['Event Subscriptions']
+        assert lim.get_current_usage()[0].get_value() == 1
+        lim = cls.limits['Subnet Groups']
+        assert lim.get_current_usage()[0].get_value() == 89
+        lim = cls.limits['Option Groups']
+        assert lim.get_current_usage()[0].get_value() == 2
+        for lname in [
+            'Max auths per security group',
+            'Subnets per Subnet Group',
+            'Read replicas per master',
+        ]:
+            assert cls.limits[lname].get_current_usage() == []
+
+    def test_find_usage_account_attributes_no_quotas(self):
+        cls = _RDSService(21, 43, {}, None)
+
+        def se_update():
+            cls._account_quotas = [
+                {'AccountQuotaName': 'DBClusters', 'Used': 3, 'Max': 40}
+            ]
+
+        with patch('%s._update_limits_from_api' % self.pb) as mock_update:
+            mock_update.side_effect = se_update
+            cls._find_usage_account_attributes()
+        assert mock_update.mock_calls == [call()]
+        lim = cls.limits['DB Clusters']
+        assert lim.get_current_usage()[0].get_value() == 3
 
     def test_required_iam_permissions(self):
         cls = _RDSService(21, 43, {}, None)
@@ -155,7 +295,7 @@ class Test_RDSService(object):
         cls = _RDSService(21, 43, {}, None)
         cls.conn = mock_conn
 
-        cls._find_usage_instances()
+        res = cls._find_usage_instances()
 
         assert mock_conn.mock_calls == [
             call.get_paginator('describe_db_instances'),
@@ -165,14 +305,11 @@ class Test_RDSService(object):
             call.paginate()
         ]
 
-        usage = sorted(
-            cls.limits['Read replicas per master'].get_current_usage()
-        )
-        assert len(usage) == 2
-        assert usage[0].get_value() == 0
-        assert usage[0].resource_id == 'foo'
-        assert usage[1].get_value() == 2
-        assert usage[1].resource_id == 'baz'
+        assert sorted(res, key=lambda x: x[1]) == [
+            ('Read replicas per master', 0, 'foo', 'AWS::RDS::DBInstance'),
+            ('Read replicas per master', 2, 'baz', 'AWS::RDS::DBInstance'),
+        ]
+        assert cls.limits['Read replicas per master'].get_current_usage() == []
 
     def test_find_usage_subnet_groups(self):
         data = result_fixtures.RDS.test_find_usage_subnet_groups
@@ -185,7 +322,7 @@ class Test_RDSService(object):
         cls = _RDSService(21, 43, {}, None)
         cls.conn = mock_conn
 
-        cls._find_usage_subnet_groups()
+        res = cls._find_usage_subnet_groups()
 
         assert mock_conn.mock_calls == [
             call.get_paginator('describe_db_subnet_groups'),
@@ -195,19 +332,14 @@ class Test_RDSService(object):
             call.paginate()
         ]
 
-        usage = sorted(
-            cls.limits['Subnets per Subnet Group'].get_current_usage()
-        )
-        assert len(usage) == 3
-        assert usage[0].get_value() == 1
-        assert usage[0].aws_type == 'AWS::RDS::DBSubnetGroup'
-        assert usage[0].resource_id == "SubnetGroup2"
-        assert usage[1].get_value() == 2
-        assert usage[1].aws_type == 'AWS::RDS::DBSubnetGroup'
-        assert usage[1].resource_id == "SubnetGroup1"
-        assert usage[2].get_value() == 3
-        assert usage[2].aws_type == 'AWS::RDS::DBSubnetGroup'
-        assert usage[2].resource_id == "default"
+        assert sorted(res, key=lambda x: x[1]) == [
+            ('Subnets per Subnet Group', 1, 'SubnetGroup2',
+             'AWS::RDS::DBSubnetGroup'),
+            ('Subnets per Subnet Group', 2, 'SubnetGroup1',
+             'AWS::RDS::DBSubnetGroup'),
+            ('Subnets per Subnet Group', 3, 'default',
+             'AWS::RDS::DBSubnetGroup'),
+        ]
 
     def test_find_usage_security_groups(self):
         data = result_fixtures.RDS.test_find_usage_security_groups
@@ -220,7 +352,7 @@ class Test_RDSService(object):
         cls = _RDSService(21, 43, {}, None)
         cls.conn = mock_conn
 
-        cls._find_usage_security_groups()
+        res = cls._find_usage_security_groups()
 
         assert mock_conn.mock_calls == [
             call.get_paginator('describe_db_security_groups'),
@@ -230,30 +362,21 @@ class Test_RDSService(object):
             call.paginate()
         ]
 
-        usage = sorted(cls.limits['VPC Security Groups'].get_current_usage())
-        assert len(usage) == 1
-        assert usage[0].get_value() == 2
-        assert usage[0].aws_type == 'AWS::RDS::DBSecurityGroup'
-
-        usage = sorted(
-            cls.limits['Max auths per security group'].get_current_usage()
+        assert res[-1] == (
+            'VPC Security Groups', 2, None, 'AWS::RDS::DBSecurityGroup'
         )
-        assert len(usage) == 5
-        assert usage[0].get_value() == 0
-        assert usage[0].resource_id == 'MyEmptySecurityGroup'
-        assert usage[0].aws_type == 'AWS::RDS::DBSecurityGroup'
-        assert usage[1].get_value() == 0
-        assert usage[1].resource_id == 'default:vpc-a926c2cc'
-        assert usage[1].aws_type == 'AWS::RDS::DBSecurityGroup'
-        assert usage[2].get_value() == 1
-        assert usage[2].resource_id == 'SecurityGroup1'
-        assert usage[2].aws_type == 'AWS::RDS::DBSecurityGroup'
-        assert usage[3].get_value() == 2
-        assert usage[3].resource_id == 'alctest'
-        assert usage[3].aws_type == 'AWS::RDS::DBSecurityGroup'
-        assert usage[4].get_value() == 3
-        assert usage[4].resource_id == 'SecurityGroup2'
-        assert usage[4].aws_type == 'AWS::RDS::DBSecurityGroup'
+        assert sorted(res[:-1], key=lambda x: (x[1], x[2])) == [
+            ('Max auths per security group', 0, 'MyEmptySecurityGroup',
+             'AWS::RDS::DBSecurityGroup'),
+            ('Max auths per security group', 0, 'default:vpc-a926c2cc',
+             'AWS::RDS::DBSecurityGroup'),
+            ('Max auths per security group', 1, 'SecurityGroup1',
+             'AWS::RDS::DBSecurityGroup'),
+            ('Max auths per security group', 2, 'alctest',
+             'AWS::RDS::DBSecurityGroup'),
+            ('Max auths per security group', 3, 'SecurityGroup2',
+             'AWS::RDS::DBSecurityGroup'),
+        ]
 
     def test_update_limits_from_api(self):
         response = result_fixtures.RDS.test_update_limits_from_api
@@ -264,16 +387,6 @@ class Test_RDSService(object):
             with patch('%s.connect' % self.pb) as mock_connect:
                 cls = _RDSService(21, 43, {}, None)
                 cls.conn = mock_conn
-                # limits that we still calculate usage for
-                cls.limits['Max auths per security group']._add_current_usage(1)
-                cls.limits['Subnets per Subnet Group']._add_current_usage(1)
-                cls.limits['Read replicas per master']._add_current_usage(1)
-                usage_auths = cls.limits[
-                    'Max auths per security group'].get_current_usage()
-                usage_subnets = cls.limits[
-                    'Subnets per Subnet Group'].get_current_usage()
-                usage_replicas = cls.limits[
-                    'Read replicas per master'].get_current_usage()
                 cls._update_limits_from_api()
         assert mock_connect.mock_calls == [call()]
         assert mock_conn.mock_calls == [
@@ -288,75 +401,60 @@ class Test_RDSService(object):
             ),
             call.debug('Done setting limits from API.')
         ]
+        assert cls._account_quotas == response['AccountQuotas']
+        for lim in cls.limits.values():
+            assert lim.get_current_usage() == []
 
         lim = cls.limits['DB instances']
         assert lim.api_limit == 200
-        assert lim.get_current_usage()[0].get_value() == 124
 
         lim = cls.limits['Reserved Instances']
         assert lim.api_limit == 201
-        assert lim.get_current_usage()[0].get_value() == 96
 
         lim = cls.limits['Storage quota (GB)']
         assert lim.api_limit == 100000
-        assert lim.get_current_usage()[0].get_value() == 8320
 
         lim = cls.limits['DB security groups']
         assert lim.api_limit == 25
-        assert lim.get_current_usage()[0].get_value() == 15
 
         lim = cls.limits['Max auths per security group']
         assert lim.api_limit == 20
-        assert lim.get_current_usage() == usage_auths
 
         lim = cls.limits['DB parameter groups']
         assert lim.api_limit == 50
-        assert lim.get_current_usage()[0].get_value() == 39
 
         lim = cls.limits['DB snapshots per user']
         assert lim.api_limit == 150
-        assert lim.get_current_usage()[0].get_value() == 76
 
         lim = cls.limits['Event Subscriptions']
         assert lim.api_limit == 21
-        assert lim.get_current_usage()[0].get_value() == 1
 
         lim = cls.limits['Subnet Groups']
         assert lim.api_limit == 202
-        assert lim.get_current_usage()[0].get_value() == 89
 
         lim = cls.limits['Option Groups']
         assert lim.api_limit == 22
-        assert lim.get_current_usage()[0].get_value() == 2
 
         lim = cls.limits['Subnets per Subnet Group']
         assert lim.api_limit == 23
-        assert lim.get_current_usage() == usage_subnets
 
         lim = cls.limits['Read replicas per master']
         assert lim.api_limit == 5
-        assert lim.get_current_usage() == usage_replicas
 
         lim = cls.limits['DB Clusters']
         assert lim.api_limit == 40
-        assert lim.get_current_usage()[0].get_value() == 3
 
         lim = cls.limits['DB Cluster Parameter Groups']
         assert lim.api_limit == 51
-        assert lim.get_current_usage()[0].get_value() == 6
 
         lim = cls.limits['Manual Cluster Snapshots']
         assert lim.api_limit == 101
-        assert lim.get_current_usage()[0].get_value() == 5
 
         lim = cls.limits['DB Instance Roles']
         assert lim.api_limit == 11
-        assert lim.get_current_usage()[0].get_value() == 1
 
         lim = cls.limits['DB Cluster Roles']
         assert lim.api_limit == 12
-        assert lim.get_current_usage()[0].get_value() == 2
 
         lim = cls.limits['Custom Endpoints Per DB Cluster']
         assert lim.api_limit == 13
-        assert lim.get_current_usage()[0].get_value() == 3
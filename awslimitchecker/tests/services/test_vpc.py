@@ -40,6 +40,7 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 import sys
 from awslimitchecker.tests.services import result_fixtures
 from awslimitchecker.services.vpc import _VpcService
+from awslimitchecker.circuitbreaker import CircuitOpenError
 
 from botocore.exceptions import ClientError
 
@@ -135,6 +136,46 @@ class Test_VpcService(object):
             assert mocks[x].mock_calls == [call()]
         assert mocks['_find_usage_nat_gateways'].mock_calls == [call(sn)]
 
+    def test_find_usage_limits(self):
+        sn = {'sn-1': 'az1'}
+        with patch('%s.connect' % self.pb) as mock_connect:
+            with patch.multiple(
+                    self.pb,
+                    _find_usage_vpcs=DEFAULT,
+                    _find_usage_subnets=DEFAULT,
+                    _find_usage_ACLs=DEFAULT,
+                    _find_usage_route_tables=DEFAULT,
+                    _find_usage_gateways=DEFAULT,
+                    _find_usage_nat_gateways=DEFAULT,
+                    _find_usages_vpn_gateways=DEFAULT,
+                    _find_usage_network_interfaces=DEFAULT,
+            ) as mocks:
+                mocks['_find_usage_subnets'].return_value = sn
+                cls = _VpcService(21, 43, {}, None)
+                cls.find_usage(limits=['NAT Gateways per AZ', 'VPCs'])
+        assert mock_connect.mock_calls == [call()]
+        assert cls._have_usage is True
+        assert mocks['_find_usage_vpcs'].mock_calls == [call()]
+        assert mocks['_find_usage_subnets'].mock_calls == [call()]
+        assert mocks['_find_usage_nat_gateways'].mock_calls == [call(sn)]
+        for x in [
+                '_find_usage_ACLs',
+                '_find_usage_route_tables',
+                '_find_usage_gateways',
+                '_find_usages_vpn_gateways',
+                '_find_usage_network_interfaces',
+        ]:
+            assert mocks[x].mock_calls == []
+
+    def test_usage_steps(self):
+        cls = _VpcService(21, 43, {}, None)
+        steps = cls.usage_steps()
+        covered = set()
+        for step in steps:
+            covered.update(step.limits)
+            assert hasattr(cls, step.method)
+        assert covered == set(cls.limits.keys())
+
     def test_find_usage_vpcs(self):
         response = result_fixtures.VPC.test_find_usage_vpcs
 
@@ -334,6 +375,31 @@ class Test_VpcService(object):
                        exc_info=1)
         ]
 
+    def test_find_usage_nat_gateways_circuit_open(self):
+        subnets = result_fixtures.VPC.test_find_usage_nat_gateways_subnets
+        mock_conn = Mock()
+        mock_breaker = Mock()
+        mock_breaker.call.side_effect = CircuitOpenError(
+            'k', 3, 'AuthFailure', 1000
+        )
+
+        cls = _VpcService(21, 43, {}, None)
+        cls.conn = mock_conn
+        cls._circuit_breaker = mock_breaker
+
+        with patch('%s.logger' % self.pbm, autospec=True) as mock_logger:
+            cls._find_usage_nat_gateways(subnets)
+
+        assert len(cls.limits['NAT Gateways per AZ'].get_current_usage()) == 0
+        assert cls.limits['NAT Gateways per AZ'].get_skipped() == str(
+            mock_breaker.call.side_effect
+        )
+        assert mock_conn.mock_calls == []
+        assert mock_breaker.call.mock_calls[0][1][:3] == (
+            None, 'VPC', 'DescribeNatGateways'
+        )
+        assert mock_logger.mock_calls == []
+
     def test_find_usages_vpn_gateways(self):
         response = result_fixtures.VPC.test_find_usages_vpn_gateways
 
@@ -366,7 +432,9 @@ class Test_VpcService(object):
         response = result_fixtures.VPC.test_find_usage_network_interfaces
 
         mock_conn = Mock()
-        mock_conn.describe_network_interfaces.return_value = response
+        mock_conn.get_paginator.return_value.paginate.return_value = [
+            response, response
+        ]
 
         cls = _VpcService(21, 43, {}, None)
         cls._current_account_id = '0123456789'
@@ -377,11 +445,13 @@ class Test_VpcService(object):
         assert len(cls.limits['Network interfaces per Region']
                    .get_current_usage()) == 1
         assert cls.limits['Network interfaces per Region'].get_current_usage()[
-            0].get_value() == 1
+            0].get_value() == 2
         assert mock_conn.mock_calls == [
-            call.describe_network_interfaces(Filters=[{
-                'Name': 'owner-id', 'Values': ['0123456789']
-            }]),
+            call.get_paginator('describe_network_interfaces'),
+            call.get_paginator().paginate(
+                Filters=[{'Name': 'owner-id', 'Values': ['0123456789']}],
+                PaginationConfig={'PageSize': 1000}
+            )
         ]
 
     def test_required_iam_permissions(self):
@@ -395,3 +465,40 @@ class Test_VpcService(object):
             'ec2:DescribeVpnGateways',
             'ec2:DescribeNetworkInterfaces',
         ]
+
+
+class TestVpcEvents(object):
+
+    def usage(self, cls, lname, resource_id=None):
+        for u in cls.limits[lname].get_current_usage():
+            if u.resource_id == resource_id:
+                return u.get_value()
+        return None
+
+    def test_events(self):
+        cls = _VpcService(21, 43, {}, None)
+        cls._have_usage = True
+        cls.limits['VPCs']._add_current_usage(2)
+        assert cls.apply_event('CreateVpc', {}) is True
+        assert cls.apply_event('CreateSubnet', {
+            'responseElements': {'subnet': {'vpcId': 'vpc-1'}}
+        }) is True
+        assert cls.apply_event('CreateSubnet', {
+            'responseElements': {'subnet': {'vpcId': 'vpc-1'}}
+        }) is True
+        assert self.usage(cls, 'VPCs') == 3
+        assert self.usage(cls, 'Subnets per VPC', 'vpc-1') == 2
+        assert cls.apply_event('DeleteVpc', {
+            'requestParameters': {'vpcId': 'vpc-1'}
+        }) is True
+        assert self.usage(cls, 'VPCs') == 2
+        assert self.usage(cls, 'Subnets per VPC', 'vpc-1') is None
+        assert cls.apply_event('CreateInternetGateway', {}) is True
+        assert cls.apply_event('CreateInternetGateway', {}) is True
+        assert cls.apply_event('DeleteInternetGateway', {}) is True
+        assert self.usage(cls, 'Internet gateways') == 1
+        assert cls.apply_event('CreateNetworkInterface', {}) is True
+        assert cls.apply_event('DeleteNetworkInterface', {}) is True
+        assert cls.apply_event('DeleteNetworkInterface', {}) is True
+        assert self.usage(cls, 'Network interfaces per Region') == 0
+        assert cls.apply_event('DeleteSubnet', {}) is None
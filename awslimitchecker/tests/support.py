@@ -38,9 +38,22 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 """
 
 from awslimitchecker.limit import AwsLimit
+from awslimitchecker.result import CheckResult, LimitResult
+from awslimitchecker.services.base import _AwsService
+import sys
 import logging
 from botocore.exceptions import EndpointConnectionError
 
+# https://code.google.com/p/mock/issues/detail?id=249
+# py>=3.4 should use unittest.mock not the mock package on pypi
+if (
+        sys.version_info[0] < 3 or
+        sys.version_info[0] == 3 and sys.version_info[1] < 4
+):
+    from mock import Mock, PropertyMock
+else:
+    from unittest.mock import Mock, PropertyMock
+
 
 class LogRecordHelper(object):
     """class to help working with an array of LogRecords"""
@@ -228,6 +241,52 @@ class LogRecordHelper(object):
         return count
 
 
+def mock_service(service_name='SvcName', account_id='1234'):
+    """Mock _AwsService with a name and current account ID"""
+    mock_svc = Mock(spec_set=_AwsService)
+    type(mock_svc).service_name = service_name
+    type(mock_svc).current_account_id = PropertyMock(return_value=account_id)
+    return mock_svc
+
+
+def checked_limit(name='lname', usages=(1, 9), service=None, default=10,
+                  maximum=None, resource_ids=True, override=None):
+    """
+    AwsLimit of ``service`` (default: :py:func:`mock_service`) with one usage
+    per value of ``usages`` (with resource IDs r0, r1, ... if
+    ``resource_ids``), after checking its thresholds
+    """
+    if service is None:
+        service = mock_service()
+    lim = AwsLimit(name, service, default, 80, 99)
+    if override is not None:
+        lim.set_limit_override(override)
+    for idx, val in enumerate(usages):
+        lim._add_current_usage(
+            val, maximum=maximum,
+            resource_id='r%d' % idx if resource_ids else None
+        )
+    lim.check_thresholds()
+    return lim
+
+
+def check_result(*limits, **kwargs):
+    """
+    CheckResult of checked AwsLimits, by the name of their service; problems
+    are the limits that crossed thresholds. ``kwargs`` are passed to
+    CheckResult.
+    """
+    res = {}
+    problems = {}
+    for lim in limits:
+        svc = lim.service.service_name
+        res.setdefault(svc, {})[lim.name] = LimitResult.from_limit(lim)
+        problems.setdefault(svc, [])
+        if lim.get_warnings() or lim.get_criticals():
+            problems[svc].append(lim.name)
+    return CheckResult(res, problems, **kwargs)
+
+
 def sample_limits():
     limits = {
         'SvcBar': {
@@ -0,0 +1,223 @@
+"""
+awslimitchecker/tests/test_cassette.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import gzip
+import json
+import sys
+from datetime import datetime
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+import awslimitchecker.cassette as cassette
+from awslimitchecker.cassette import (
+    Cassette, CassetteMissError, attach_cassette
+)
+
+# https://code.google.com/p/mock/issues/detail?id=249
+# py>=3.4 should use unittest.mock not the mock package on pypi
+if (
+        sys.version_info[0] < 3 or
+        sys.version_info[0] == 3 and sys.version_info[1] < 4
+):
+    from mock import patch, call, Mock
+else:
+    from unittest.mock import patch, call, Mock
+
+pbm = 'awslimitchecker.cassette'
+
+ROLE_ARN = 'arn:aws:iam::123456789012:role/foo'
+
+
+def sts_client(region='us-east-1'):
+    return boto3.client(
+        'sts', region_name=region, aws_access_key_id='x',
+        aws_secret_access_key='x'
+    )
+
+
+class TestCassette(object):
+
+    def teardown(self):
+        cassette._active = None
+
+    def record(self, path):
+        with Cassette(path, mode='record'):
+            client = attach_cassette(sts_client())
+            stub = Stubber(client)
+            stub.add_response(
+                'get_caller_identity',
+                {'Account': '123456789012', 'UserId': 'uid', 'Arn': ROLE_ARN}
+            )
+            stub.add_response(
+                'get_caller_identity',
+                {'Account': '210987654321', 'UserId': 'uid', 'Arn': ROLE_ARN}
+            )
+            stub.add_response('assume_role', {
+                'Credentials': {
+                    'AccessKeyId': 'AKIA0123456789012345',
+                    'SecretAccessKey': 'mySecretKey0123456789',
+                    'SessionToken': 'mySessionToken0123456789',
+                    'Expiration': datetime(2020, 1, 2, 3, 4, 5)
+                }
+            }, {
+                'RoleArn': ROLE_ARN, 'RoleSessionName': 'foo',
+                'SerialNumber': 'mfa-serial-12', 'TokenCode': '123456'
+            })
+            stub.add_client_error(
+                'get_session_token', service_error_code='AccessDenied',
+                http_status_code=403
+            )
+            with stub:
+                client.get_caller_identity()
+                client.get_caller_identity()
+                client.assume_role(
+                    RoleArn=ROLE_ARN, RoleSessionName='foo',
+                    SerialNumber='mfa-serial-12', TokenCode='123456'
+                )
+                with pytest.raises(ClientError):
+                    client.get_session_token()
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValueError):
+            Cassette('/foo', mode='foo')
+
+    def test_record(self, tmpdir):
+        path = str(tmpdir.join('cas'))
+        self.record(path)
+        assert cassette._active is None
+        with gzip.open(str(tmpdir.join('cas', 'cassette.json.gz')),
+                       'rt') as fh:
+            lines = [json.loads(line) for line in fh]
+        assert lines[0] == {'version': 1}
+        assert [
+            (x['service'], x['region'], x['operation'], x['status'])
+            for x in lines[1:]
+        ] == [
+            ('sts', 'us-east-1', 'GetCallerIdentity', 200),
+            ('sts', 'us-east-1', 'GetCallerIdentity', 200),
+            ('sts', 'us-east-1', 'AssumeRole', 200),
+            ('sts', 'us-east-1', 'GetSessionToken', 403)
+        ]
+        assert lines[3]['params'] == {
+            'RoleArn': ROLE_ARN, 'RoleSessionName': 'foo',
+            'SerialNumber': 'REDACTED', 'TokenCode': 'REDACTED'
+        }
+        assert lines[3]['response']['Credentials'] == {
+            'AccessKeyId': 'REDACTED',
+            'SecretAccessKey': 'REDACTED',
+            'SessionToken': 'REDACTED',
+            'Expiration': {'__datetime__': '2020-01-02T03:04:05'}
+        }
+        assert 'HTTPHeaders' not in json.dumps(lines)
+
+    def test_replay(self, tmpdir):
+        path = str(tmpdir.join('cas'))
+        self.record(path)
+        with Cassette(path, mode='replay'):
+            client = attach_cassette(sts_client())
+            res = client.assume_role(
+                RoleArn=ROLE_ARN, RoleSessionName='foo',
+                SerialNumber='mfa-serial-12', TokenCode='654321'
+            )
+            assert res['Credentials']['Expiration'] == datetime(
+                2020, 1, 2, 3, 4, 5
+            )
+            assert res['Credentials']['SessionToken'] == 'REDACTED'
+            # repeated identical requests replay in order, then repeat
+            assert [
+                client.get_caller_identity()['Account'] for _ in range(3)
+            ] == ['123456789012', '210987654321', '210987654321']
+            with pytest.raises(ClientError) as exc:
+                client.get_session_token()
+            assert exc.value.response['Error']['Code'] == 'AccessDenied'
+            # with different parameters, falls back to the same operation
+            res = client.assume_role(RoleArn=ROLE_ARN, RoleSessionName='bar')
+            assert res['Credentials']['AccessKeyId'] == 'REDACTED'
+            with pytest.raises(CassetteMissError):
+                attach_cassette(sts_client('us-west-2')).get_caller_identity()
+            with pytest.raises(CassetteMissError):
+                client.get_access_key_info(AccessKeyId='AKIA0123456789012345')
+        assert cassette._active is None
+
+    def test_replay_latency(self, tmpdir):
+        path = str(tmpdir.join('cas'))
+        self.record(path)
+        with Cassette(path, mode='replay', simulate_latency=True):
+            client = attach_cassette(sts_client())
+            with patch('%s.time.sleep' % pbm) as m_sleep:
+                client.get_caller_identity()
+        assert len(m_sleep.mock_calls) == 1
+        assert m_sleep.mock_calls[0][1][0] >= 0
+
+    def test_replay_bad_version(self, tmpdir):
+        tmpdir.mkdir('cas')
+        with gzip.open(str(tmpdir.join('cas', 'cassette.json.gz')),
+                       'wt') as fh:
+            fh.write('{"version": 99}\n')
+        with pytest.raises(RuntimeError) as exc:
+            Cassette(str(tmpdir.join('cas')), mode='replay').start()
+        assert 'Unsupported cassette version' in str(exc.value)
+
+
+class TestAttachCassette(object):
+
+    def teardown(self):
+        cassette._active = None
+
+    def test_inactive(self):
+        client = Mock()
+        assert attach_cassette(client) is client
+        assert client.mock_calls == []
+
+    def test_client(self):
+        client = Mock(meta=Mock(spec_set=['events', 'region_name']))
+        cassette._active = Mock()
+        assert attach_cassette(client) is client
+        assert cassette._active.mock_calls == [call.attach(client)]
+
+    def test_resource(self):
+        resource = Mock()
+        cassette._active = Mock()
+        assert attach_cassette(resource) is resource
+        assert cassette._active.mock_calls == [
+            call.attach(resource.meta.client)
+        ]
@@ -37,6 +37,7 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 ################################################################################
 """
 
+import pytest
 import sys
 
 from awslimitchecker.services.base import _AwsService
@@ -44,6 +45,9 @@ from awslimitchecker.checker import AwsLimitChecker
 from awslimitchecker.version import _get_version_info
 from awslimitchecker.limit import AwsLimit
 from awslimitchecker.trustedadvisor import TrustedAdvisor
+from awslimitchecker.result import CheckResult
+from awslimitchecker.snapshot import SnapshotLimit
+from awslimitchecker.circuitbreaker import CircuitBreaker
 from .support import sample_limits
 
 
@@ -140,6 +144,32 @@ class TestAwsLimitChecker(object):
         assert self.mock_quotas.mock_calls == [
             call({'region_name': None})
         ]
+        assert isinstance(self.cls.circuit_breaker, CircuitBreaker)
+        assert self.cls.circuit_breaker._scope == \
+            self.cls._circuit_breaker_scope
+        assert self.mock_svc1._circuit_breaker is self.cls.circuit_breaker
+        assert self.mock_svc2._circuit_breaker is self.cls.circuit_breaker
+        assert self.mock_ta._circuit_breaker is self.cls.circuit_breaker
+
+    def test_current_account_id(self):
+        with patch('%s.boto3_client' % pbm) as mock_boto:
+            mock_boto.return_value.get_caller_identity.return_value = {
+                'UserId': 'uid', 'Account': '111122223333', 'Arn': 'arn'
+            }
+            assert self.cls.current_account_id == '111122223333'
+            assert self.cls.current_account_id == '111122223333'
+            assert self.cls._circuit_breaker_scope() == '111122223333'
+        assert mock_boto.mock_calls == [
+            call('sts', region_name=None),
+            call().get_caller_identity()
+        ]
+
+    def test_current_account_id_given(self):
+        self.cls.account_id = '123456789012'
+        with patch('%s.boto3_client' % pbm) as mock_boto:
+            assert self.cls.current_account_id == '123456789012'
+            assert self.cls._circuit_breaker_scope() == '123456789012'
+        assert mock_boto.mock_calls == []
 
     def test_init_AGPL_message(self, capsys):
         # get rid of the class
@@ -315,8 +345,8 @@ class TestAwsLimitChecker(object):
         mock_foo.return_value = mock_svc1
         mock_bar.return_value = mock_svc2
         svcs = {'SvcFoo': mock_foo, 'SvcBar': mock_bar}
-        with patch('%s.boto3' % pbm) as mock_boto:
-            mock_boto.client.return_value.assume_role.return_value = {
+        with patch('%s.boto3_client' % pbm) as mock_boto:
+            mock_boto.return_value.assume_role.return_value = {
                 'Credentials': {
                     'AccessKeyId': 'akid',
                     'SecretAccessKey': 'sk',
@@ -357,8 +387,8 @@ class TestAwsLimitChecker(object):
         assert self.mock_version.mock_calls == [call()]
         assert self.cls.vinfo == self.mock_ver_info
         assert mock_boto.mock_calls == [
-            call.client('sts', region_name='myregion'),
-            call.client().assume_role(
+            call('sts', region_name='myregion'),
+            call().assume_role(
                 RoleArn='arn:aws:iam::123456789012:role/myrole',
                 RoleSessionName='awslimitchecker'
             )
@@ -373,8 +403,8 @@ class TestAwsLimitChecker(object):
         mock_foo.return_value = mock_svc1
         mock_bar.return_value = mock_svc2
         svcs = {'SvcFoo': mock_foo, 'SvcBar': mock_bar}
-        with patch('%s.boto3' % pbm) as mock_boto:
-            mock_boto.client.return_value.assume_role.return_value = {
+        with patch('%s.boto3_client' % pbm) as mock_boto:
+            mock_boto.return_value.assume_role.return_value = {
                 'Credentials': {
                     'AccessKeyId': 'akid',
                     'SecretAccessKey': 'sk',
@@ -421,8 +451,8 @@ class TestAwsLimitChecker(object):
         assert self.mock_version.mock_calls == [call()]
         assert self.cls.vinfo == self.mock_ver_info
         assert mock_boto.mock_calls == [
-            call.client('sts', region_name='myregion'),
-            call.client().assume_role(
+            call('sts', region_name='myregion'),
+            call().assume_role(
                 ExternalId='myextid',
                 RoleArn='arn:mypart:iam::123456789012:role/myrole',
                 RoleSessionName='awslimitchecker',
@@ -682,6 +712,46 @@ class TestAwsLimitChecker(object):
             call.update_limits()
         ]
 
+    def test_find_usage_limits(self):
+        self.mock_svc1.usage_steps.return_value = None
+        self.mock_svc2.usage_steps.return_value = []
+        self.cls.find_usage(
+            service=['SvcFoo'], use_ta=False,
+            limits={'SvcFoo': ['foo'], 'SvcBar': ['bar', 'baz']}
+        )
+        assert self.mock_svc1.mock_calls == [
+            call._update_service_quotas(),
+            call.usage_steps(),
+            call.find_usage()
+        ]
+        assert self.mock_svc2.mock_calls == [
+            call._update_limits_from_api(),
+            call._update_service_quotas(),
+            call.usage_steps(),
+            call.find_usage(limits=['bar', 'baz'])
+        ]
+        assert self.mock_ta.mock_calls == []
+
+    def test_get_usage_plan(self):
+        self.mock_svc1.usage_plan.return_value = None
+        self.mock_svc2.usage_plan.return_value = ['step']
+        assert self.cls.get_usage_plan() == {
+            'SvcFoo': None, 'SvcBar': ['step']
+        }
+        assert self.cls.get_usage_plan(service=['SvcBar']) == {
+            'SvcBar': ['step']
+        }
+        assert self.cls.get_usage_plan(
+            service=['SvcFoo'], limits={'SvcBar': ['baz']}
+        ) == {'SvcBar': ['step']}
+        assert self.mock_svc1.mock_calls == [call.usage_plan(None)]
+        assert self.mock_svc2.mock_calls == [
+            call.usage_plan(None),
+            call.usage_plan(None),
+            call.usage_plan(['baz'])
+        ]
+        assert self.mock_ta.mock_calls == []
+
     def test_set_threshold_overrides(self):
         limits = sample_limits()
         limits['SvcFoo']['zz3'] = AwsLimit(
@@ -839,6 +909,61 @@ class TestAwsLimitChecker(object):
             )
         ]
 
+    def test_export_snapshot(self):
+        mock_result = Mock()
+        with patch.multiple(
+            pb, autospec=True, check_thresholds=DEFAULT
+        ) as mocks:
+            with patch(
+                '%s.region_name' % pb, new_callable=PropertyMock
+            ) as m_rn:
+                m_rn.return_value = 'rname'
+                with patch('%s.write_snapshot' % pbm, autospec=True) as m_ws:
+                    m_ws.return_value = 3
+                    res = self.cls.export_snapshot('/p', result=mock_result)
+                    mocks['check_thresholds'].return_value = 'checked'
+                    self.cls.export_snapshot('/p2', use_ta=False)
+        assert res == 3
+        assert mocks['check_thresholds'].mock_calls == [
+            call(self.cls, use_ta=False)
+        ]
+        assert m_ws.mock_calls == [
+            call('/p', mock_result, account_id=None, region='rname'),
+            call('/p2', 'checked', account_id=None, region='rname')
+        ]
+
+    def test_import_snapshot(self):
+        svc = Mock(service_name='SvcFoo', _have_usage=False)
+        svc.limits = {
+            'foo': AwsLimit('foo', svc, 10, 80, 99),
+            'bar': AwsLimit('bar', svc, 10, 80, 99),
+        }
+        self.cls.services['SvcFoo'] = svc
+
+        def snap(sname, lname, value):
+            return SnapshotLimit(
+                service=sname, name=lname, limit=10, source=0,
+                default_limit=10, thresholds=(None, 80, None, 99),
+                usage=[(value, None, None, None)], state='ok',
+                utilization=None
+            )
+
+        with patch('%s.SnapshotReader' % pbm, autospec=True) as m_reader:
+            reader = m_reader.return_value.__enter__.return_value
+            reader.__iter__.return_value = iter([
+                snap('SvcFoo', 'foo', 9), snap('SvcFoo', 'bar', 1),
+                snap('SvcFoo', 'baz', 1), snap('SvcBaz', 'foo', 1)
+            ])
+            res = self.cls.import_snapshot('/p')
+        assert m_reader.mock_calls[0] == call('/p')
+        assert svc._have_usage is True
+        assert sorted(res.limits['SvcFoo'].keys()) == ['bar', 'foo']
+        assert list(res.keys()) == ['SvcFoo']
+        assert list(res['SvcFoo'].keys()) == ['foo']
+        assert res['SvcFoo']['foo'].get_max_usage() == 9
+        assert len(svc.limits['foo'].get_warnings()) == 1
+        assert self.mock_svc2.mock_calls == []
+
     def test_get_required_iam_policy(self):
         expected = {
             'Version': '2012-10-17',
@@ -877,57 +1002,93 @@ class TestAwsLimitChecker(object):
         assert self.mock_svc1.mock_calls == [call.required_iam_permissions()]
         assert self.mock_svc2.mock_calls == [call.required_iam_permissions()]
 
+    def se_from_limit(self, lim):
+        return 'result-%s' % lim
+
     def test_check_thresholds(self):
         self.mock_svc1.check_thresholds.return_value = {
             'foo': 'bar',
             'baz': 'blam',
         }
+        self.mock_svc1.get_limits.return_value = {
+            'foo': 'bar',
+            'baz': 'blam',
+            'quux': 'quuz',
+        }
         self.mock_svc2.check_thresholds.return_value = {}
-        res = self.cls.check_thresholds()
+        self.mock_svc2.get_limits.return_value = {'bar': 'bbar'}
+        with patch('%s.LimitResult.from_limit' % pbm) as m_from:
+            m_from.side_effect = self.se_from_limit
+            res = self.cls.check_thresholds()
+        assert isinstance(res, CheckResult)
         assert res == {
             'SvcFoo': {
-                'foo': 'bar',
-                'baz': 'blam',
+                'foo': 'result-bar',
+                'baz': 'result-blam',
+            }
+        }
+        assert res.limits == {
+            'SvcFoo': {
+                'foo': 'result-bar',
+                'baz': 'result-blam',
+                'quux': 'result-quuz',
+            },
+            'SvcBar': {
+                'bar': 'result-bbar',
             }
         }
+        assert sorted(res.timings.keys()) == [
+            'SvcBar', 'SvcFoo', 'TrustedAdvisor'
+        ]
+        assert res.duration >= 0
         assert self.mock_ta.mock_calls == [
             call.update_limits(),
         ]
         assert self.mock_svc1.mock_calls == [
             call._update_service_quotas(),
-            call.check_thresholds()
+            call.check_thresholds(),
+            call.get_limits()
         ]
         assert self.mock_svc2.mock_calls == [
             call._update_limits_from_api(),
             call._update_service_quotas(),
-            call.check_thresholds()
+            call.check_thresholds(),
+            call.get_limits()
         ]
 
     def test_check_thresholds_service(self):
         self.mock_svc1.check_thresholds.return_value = {'foo': 'bar'}
+        self.mock_svc1.get_limits.return_value = {'foo': 'bar'}
         self.mock_svc2.check_thresholds.return_value = {'baz': 'blam'}
-        res = self.cls.check_thresholds(service=['SvcFoo'])
+        with patch('%s.LimitResult.from_limit' % pbm) as m_from:
+            m_from.side_effect = self.se_from_limit
+            res = self.cls.check_thresholds(service=['SvcFoo'])
         assert res == {
             'SvcFoo': {
-                'foo': 'bar',
+                'foo': 'result-bar',
             }
         }
+        assert list(res.limits.keys()) == ['SvcFoo']
         assert self.mock_ta.mock_calls == [
             call.update_limits()
         ]
         assert self.mock_svc1.mock_calls == [
             call._update_service_quotas(),
-            call.check_thresholds()
+            call.check_thresholds(),
+            call.get_limits()
         ]
         assert self.mock_svc2.mock_calls == []
 
     def test_check_thresholds_service_api(self):
         self.mock_svc1.check_thresholds.return_value = {'foo': 'bar'}
         self.mock_svc2.check_thresholds.return_value = {'baz': 'blam'}
-        res = self.cls.check_thresholds(service=['SvcBar'])
+        self.mock_svc2.get_limits.return_value = {'baz': 'blam'}
+        with patch('%s.LimitResult.from_limit' % pbm) as m_from:
+            m_from.side_effect = self.se_from_limit
+            res = self.cls.check_thresholds(service=['SvcBar'])
         assert res == {
             'SvcBar': {
-                'baz': 'blam',
+                'baz': 'result-blam',
             }
         }
         assert self.mock_ta.mock_calls == [
@@ -937,7 +1098,8 @@ class TestAwsLimitChecker(object):
         assert self.mock_svc2.mock_calls == [
             call._update_limits_from_api(),
             call._update_service_quotas(),
-            call.check_thresholds()
+            call.check_thresholds(),
+            call.get_limits()
         ]
 
     def test_check_thresholds_no_ta(self):
@@ -945,26 +1107,248 @@ class TestAwsLimitChecker(object):
             'foo': 'bar',
             'baz': 'blam',
         }
+        self.mock_svc1.get_limits.return_value = {
+            'foo': 'bar',
+            'baz': 'blam',
+        }
         self.mock_svc2.check_thresholds.return_value = {}
+        self.mock_svc2.get_limits.return_value = {}
         self.cls.use_ta = False
-        res = self.cls.check_thresholds(use_ta=False)
+        with patch('%s.LimitResult.from_limit' % pbm) as m_from:
+            m_from.side_effect = self.se_from_limit
+            res = self.cls.check_thresholds(use_ta=False)
         assert res == {
             'SvcFoo': {
-                'foo': 'bar',
-                'baz': 'blam',
+                'foo': 'result-bar',
+                'baz': 'result-blam',
             }
         }
+        assert 'TrustedAdvisor' not in res.timings
         assert self.mock_ta.mock_calls == []
         assert self.mock_svc1.mock_calls == [
             call._update_service_quotas(),
-            call.check_thresholds()
+            call.check_thresholds(),
+            call.get_limits()
         ]
         assert self.mock_svc2.mock_calls == [
             call._update_limits_from_api(),
             call._update_service_quotas(),
-            call.check_thresholds()
+            call.check_thresholds(),
+            call.get_limits()
+        ]
+
+    def test_check_thresholds_on_service_complete(self):
+        self.mock_svc1.check_thresholds.return_value = {'foo': 'bar'}
+        self.mock_svc1.get_limits.return_value = {'foo': 'bar'}
+        self.mock_svc2.check_thresholds.return_value = {}
+        self.mock_svc2.get_limits.return_value = {'baz': 'blam'}
+        completed = []
+        with patch('%s.LimitResult.from_limit' % pbm) as m_from:
+            m_from.side_effect = self.se_from_limit
+            res = self.cls.check_thresholds(
+                on_service_complete=completed.append
+            )
+        assert sorted(list(x.limits.keys()) for x in completed) == [
+            ['SvcBar'], ['SvcFoo']
+        ]
+        for each in completed:
+            assert isinstance(each, CheckResult)
+        assert res == {'SvcFoo': {'foo': 'result-bar'}}
+        assert res.limits == {
+            'SvcFoo': {'foo': 'result-bar'},
+            'SvcBar': {'baz': 'result-blam'}
+        }
+
+    def test_check_thresholds_limits(self):
+        with patch('%s.iter_results' % pb, autospec=True) as m_iter:
+            m_iter.return_value = iter([])
+            self.cls.check_thresholds(
+                use_ta=False, limits={'SvcFoo': ['foo']}
+            )
+        assert m_iter.mock_calls == [
+            call(self.cls, service=None, use_ta=False,
+                 limits={'SvcFoo': ['foo']})
+        ]
+
+    def test_check_collected_thresholds(self):
+        self.mock_svc1.check_thresholds.return_value = {'foo': 'bar'}
+        self.mock_svc1.get_limits.return_value = {
+            'foo': 'bar', 'baz': 'blam'
+        }
+        self.mock_svc2.check_thresholds.return_value = {}
+        self.mock_svc2.get_limits.return_value = {'quux': 'quuz'}
+        with patch('%s.LimitResult.from_limit' % pbm) as m_from:
+            m_from.side_effect = self.se_from_limit
+            res = self.cls.check_collected_thresholds()
+        assert isinstance(res, CheckResult)
+        assert res == {'SvcFoo': {'foo': 'result-bar'}}
+        assert res.limits == {
+            'SvcFoo': {'foo': 'result-bar', 'baz': 'result-blam'},
+            'SvcBar': {'quux': 'result-quuz'}
+        }
+        assert sorted(res.timings.keys()) == ['SvcBar', 'SvcFoo']
+        assert self.mock_ta.mock_calls == []
+        assert self.mock_svc1.mock_calls == [
+            call.check_thresholds(),
+            call.get_limits()
+        ]
+        assert self.mock_svc2.mock_calls == [
+            call.check_thresholds(),
+            call.get_limits()
+        ]
+
+    def test_check_collected_thresholds_service(self):
+        self.mock_svc1.check_thresholds.return_value = {}
+        self.mock_svc1.get_limits.return_value = {'foo': 'bar'}
+        with patch('%s.LimitResult.from_limit' % pbm) as m_from:
+            m_from.side_effect = self.se_from_limit
+            res = self.cls.check_collected_thresholds(service=['SvcFoo'])
+        assert res == {}
+        assert res.limits == {'SvcFoo': {'foo': 'result-bar'}}
+        assert self.mock_svc2.mock_calls == []
+
+    def test_iter_results(self):
+        self.mock_svc1.check_thresholds.return_value = {'foo': 'bar'}
+        self.mock_svc1.get_limits.return_value = {'foo': 'bar'}
+        self.mock_svc2.check_thresholds.return_value = {}
+        self.mock_svc2.get_limits.return_value = {'baz': 'blam'}
+        with patch('%s.LimitResult.from_limit' % pbm) as m_from:
+            m_from.side_effect = self.se_from_limit
+            res = self.cls.iter_results(
+                service=['SvcBar', 'SvcFoo'], max_workers=1
+            )
+            assert self.mock_ta.mock_calls == []
+            first = next(res)
+            assert self.mock_ta.mock_calls == [call.update_limits()]
+            assert self.mock_svc1.mock_calls == []
+            rest = list(res)
+        assert first == {}
+        assert first.limits == {'SvcBar': {'baz': 'result-blam'}}
+        assert sorted(first.timings.keys()) == ['SvcBar']
+        assert len(rest) == 1
+        assert rest[0] == {'SvcFoo': {'foo': 'result-bar'}}
+        assert self.mock_svc1.mock_calls == [
+            call._update_service_quotas(),
+            call.check_thresholds(),
+            call.get_limits()
         ]
 
+    def test_iter_results_limits(self):
+        self.mock_svc2.usage_steps.return_value = []
+        self.mock_svc2.check_thresholds.return_value = {'baz': 'x', 'bar': 'y'}
+        self.mock_svc2.get_limits.return_value = {
+            'baz': 'blam', 'bar': 'blarg', 'foo': 'quux'
+        }
+        with patch('%s.LimitResult.from_limit' % pbm) as m_from:
+            m_from.side_effect = self.se_from_limit
+            res = list(self.cls.iter_results(
+                service=['SvcFoo'], use_ta=False, max_workers=1,
+                limits={'SvcBar': ['baz', 'foo']}
+            ))
+        assert len(res) == 1
+        assert res[0] == {'SvcBar': {'baz': 'result-blam'}}
+        assert res[0].limits == {
+            'SvcBar': {'baz': 'result-blam', 'foo': 'result-quux'}
+        }
+        assert self.mock_svc1.mock_calls == []
+        assert self.mock_svc2.mock_calls == [
+            call._update_limits_from_api(),
+            call._update_service_quotas(),
+            call.usage_steps(),
+            call.find_usage(limits=['baz', 'foo']),
+            call.check_thresholds(),
+            call.get_limits()
+        ]
+        assert self.mock_ta.mock_calls == []
+
+    def test_iter_results_concurrent(self):
+        self.mock_svc1.check_thresholds.return_value = {}
+        self.mock_svc1.get_limits.return_value = {'foo': 'bar'}
+        self.mock_svc2.check_thresholds.return_value = {}
+        self.mock_svc2.get_limits.return_value = {'baz': 'blam'}
+        with patch(
+            '%s.concurrent_imap_unordered' % pbm, autospec=True
+        ) as m_imap:
+            m_imap.return_value = iter([('SvcBar', 1), ('SvcFoo', 2)])
+            res = list(self.cls.iter_results(use_ta=False, max_workers=3))
+        assert res == [1, 2]
+        assert self.mock_ta.mock_calls == []
+        assert len(m_imap.mock_calls) == 1
+        args, kwargs = m_imap.call_args
+        assert args[0] == self.cls._check_service
+        assert sorted(args[1]) == ['SvcBar', 'SvcFoo']
+        assert kwargs == {'max_workers': 3}
+
+    def test_iter_results_default_workers(self):
+        with patch(
+            '%s.concurrent_imap_unordered' % pbm, autospec=True
+        ) as m_imap:
+            m_imap.return_value = iter([])
+            with patch.dict(
+                'os.environ', {'ALC_MAX_WORKERS_SERVICES': '2'}, clear=True
+            ):
+                list(self.cls.iter_results(service=['SvcFoo']))
+            with patch.dict('os.environ', {}, clear=True):
+                list(self.cls.iter_results(service=['SvcFoo']))
+            with patch.dict(
+                'os.environ', {'ALC_MAX_WORKERS_SERVICES': 'x'}, clear=True
+            ):
+                list(self.cls.iter_results(service=['SvcFoo']))
+        assert [c[2] for c in m_imap.mock_calls] == [
+            {'max_workers': 2}, {'max_workers': 4}, {'max_workers': 4}
+        ]
+
+    def test_iter_results_profiling(self):
+        self.mock_svc1.check_thresholds.return_value = {}
+        self.mock_svc1.get_limits.return_value = {}
+        with patch(
+            '%s.concurrent_imap_unordered' % pbm, autospec=True
+        ) as m_imap:
+            m_imap.return_value = iter([])
+            with patch('%s.CpuProfiler' % pbm, autospec=True) as m_cpu:
+                with self.cls.profile_cpu('/foo') as prof:
+                    assert prof is m_cpu.return_value
+                    assert self.mock_svc1._serial_calls is True
+                    assert self.mock_svc2._serial_calls is True
+                    list(self.cls.iter_results(
+                        service=['SvcFoo'], max_workers=3
+                    ))
+                    self.cls._check_service('SvcFoo')
+        assert [c[2] for c in m_imap.mock_calls] == [{'max_workers': 1}]
+        assert [
+            c for c in m_cpu.mock_calls
+            if c[0] in ['', '().profile', '().close']
+        ] == [
+            call('/foo'),
+            call().profile('TrustedAdvisor'),
+            call().profile('SvcFoo'),
+            call().close()
+        ]
+        assert len([
+            c for c in m_cpu.mock_calls if c[0] == '().profile().__exit__'
+        ]) == 2
+        assert self.cls._profilers == []
+        assert self.mock_svc1._serial_calls is False
+        assert self.mock_svc2._serial_calls is False
+
+    def test_profile_memory(self):
+        with patch('%s.MemoryProfiler' % pbm, autospec=True) as m_mem:
+            with pytest.raises(RuntimeError):
+                with self.cls.profile_memory(top=3) as prof:
+                    assert prof is m_mem.return_value
+                    assert self.cls._profilers == [prof]
+                    assert self.mock_svc1._serial_calls is True
+                    raise RuntimeError()
+        assert m_mem.mock_calls == [call(top=3), call().close()]
+        assert self.cls._profilers == []
+        assert self.mock_svc1._serial_calls is False
+
+    def test_iter_results_unknown_service(self):
+        with pytest.raises(KeyError):
+            list(self.cls.iter_results(service=['SvcFoo', 'SvcBaz']))
+        assert self.mock_svc1.mock_calls == []
+        assert self.mock_ta.mock_calls == []
+
     def test_region_name(self):
         mock_client = Mock(
             _client_config=Mock(region_name='rname')
@@ -977,3 +1361,116 @@ class TestAwsLimitChecker(object):
                 m_client.return_value = mock_client
                 res = self.cls.region_name
         assert res == 'rname'
+
+    def test_for_regions(self):
+        checkers = []
+
+        def se_init(checker, **kwargs):
+            checker.kwargs = kwargs
+            checkers.append(checker)
+
+        with patch.multiple(
+            pb, autospec=True, __init__=DEFAULT,
+            share_global_services=DEFAULT
+        ) as mocks:
+            mocks['__init__'].side_effect = se_init
+            res = AwsLimitChecker.for_regions(
+                ['us-east-1', 'eu-west-1', 'us-west-2'],
+                warning_threshold=50, account_id='123'
+            )
+        assert list(res.keys()) == ['us-east-1', 'eu-west-1', 'us-west-2']
+        assert list(res.values()) == checkers
+        assert checkers[0].kwargs == {
+            'region': 'us-east-1', 'warning_threshold': 50, 'account_id': '123'
+        }
+        assert checkers[1].kwargs == {
+            'region': 'eu-west-1', 'warning_threshold': 50,
+            'account_id': '123', 'check_version': False
+        }
+        assert checkers[2].kwargs['region'] == 'us-west-2'
+        assert mocks['share_global_services'].mock_calls == [
+            call(checkers[1], checkers[0]),
+            call(checkers[2], checkers[0])
+        ]
+
+
+class TestSharedGlobalServices(object):
+
+    def setup(self):
+        self.mock_svc1 = Mock(spec_set=_AwsService, global_service=False)
+        self.mock_svc2 = Mock(spec_set=ApiServiceSpec, global_service=True)
+        self.mock_glb = Mock(spec_set=ApiServiceSpec, global_service=True)
+        self.mock_reg = Mock(spec_set=_AwsService, global_service=False)
+        self.mock_ta = Mock(spec_set=TrustedAdvisor)
+        svcs = {
+            'SvcFoo': Mock(return_value=self.mock_svc1),
+            'SvcBar': Mock(return_value=self.mock_svc2)
+        }
+        with patch.dict('%s._services' % pbm, values=svcs, clear=True):
+            with patch.multiple(
+                    'awslimitchecker.checker',
+                    logger=DEFAULT,
+                    _get_version_info=DEFAULT,
+                    TrustedAdvisor=DEFAULT,
+                    ServiceQuotasClient=DEFAULT,
+                    autospec=True,
+            ) as mocks:
+                mocks['TrustedAdvisor'].return_value = self.mock_ta
+                self.cls = AwsLimitChecker(check_version=False)
+        self.other = Mock(spec=AwsLimitChecker)
+        self.other.services = {
+            'SvcFoo': self.mock_reg,
+            'SvcBar': self.mock_glb,
+            'SvcBaz': Mock(spec_set=_AwsService, global_service=True)
+        }
+        self.cls.share_global_services(self.other)
+
+    def test_share_global_services(self):
+        assert self.cls.services == {
+            'SvcFoo': self.mock_svc1,
+            'SvcBar': self.mock_glb
+        }
+        assert self.cls._shared_services == set(['SvcBar'])
+        assert self.cls._own_services() == ['SvcFoo']
+
+    def test_get_limits(self):
+        limits = sample_limits()
+        self.mock_svc1.get_limits.return_value = limits['SvcFoo']
+        self.mock_glb.get_limits.return_value = limits['SvcBar']
+        res = self.cls.get_limits(use_ta=False)
+        assert res == limits
+        assert self.mock_svc1.mock_calls == [
+            call._update_service_quotas(),
+            call.get_limits()
+        ]
+        assert self.mock_glb.mock_calls == [call.get_limits()]
+
+    def test_get_limits_service(self):
+        self.cls.get_limits(service=['SvcBar'], use_ta=False)
+        assert self.mock_svc1.mock_calls == []
+        assert self.mock_glb.mock_calls == [
+            call._update_limits_from_api(),
+            call._update_service_quotas(),
+            call.get_limits()
+        ]
+
+    def test_find_usage(self):
+        self.cls.find_usage(use_ta=False)
+        assert self.mock_svc1.mock_calls == [
+            call._update_service_quotas(),
+            call.find_usage()
+        ]
+        assert self.mock_glb.mock_calls == []
+
+    def test_get_usage_plan(self):
+        self.mock_svc1.usage_plan.return_value = None
+        assert self.cls.get_usage_plan() == {'SvcFoo': None}
+        assert self.mock_glb.mock_calls == []
+
+    def test_check_thresholds(self):
+        self.mock_svc1.check_thresholds.return_value = {}
+        self.mock_svc1.get_limits.return_value = {}
+        res = self.cls.check_thresholds(use_ta=False)
+        assert res == {}
+        assert list(res.limits.keys()) == ['SvcFoo']
+        assert self.mock_glb.mock_calls == []
@@ -0,0 +1,228 @@
+"""
+awslimitchecker/tests/test_circuitbreaker.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import sys
+import json
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+from awslimitchecker.circuitbreaker import (
+    CircuitBreaker, CircuitOpenError, STATE_NAME
+)
+
+# https://code.google.com/p/mock/issues/detail?id=249
+# py>=3.4 should use unittest.mock not the mock package on pypi
+if (
+        sys.version_info[0] < 3 or
+        sys.version_info[0] == 3 and sys.version_info[1] < 4
+):
+    from mock import patch, call, Mock
+else:
+    from unittest.mock import patch, call, Mock
+
+pbm = 'awslimitchecker.circuitbreaker'
+
+
+def client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': 'msg'}}, 'Op')
+
+
+@pytest.fixture
+def cache_dir(tmpdir):
+    with patch.dict('os.environ', {'ALC_CACHE_DIR': str(tmpdir)}):
+        yield tmpdir
+
+
+class TestCircuitBreaker(object):
+
+    def test_init_env(self):
+        with patch.dict('os.environ', {
+            'ALC_CIRCUIT_BREAKER_FAILURES': '5',
+            'ALC_CIRCUIT_BREAKER_COOLDOWN': '60'
+        }):
+            cls = CircuitBreaker('123')
+        assert cls.failures == 5
+        assert cls.cooldown == 60
+        assert cls.key('r1', 'EC2', 'Op') == '123/r1/EC2/Op'
+        assert cls.key(None, 'EC2', 'Op') == '123//EC2/Op'
+
+    def test_success(self, cache_dir):
+        cls = CircuitBreaker('123')
+        func = Mock(return_value='res')
+        assert cls.call('r1', 'EC2', 'Op', func, 1, a=2) == 'res'
+        assert func.mock_calls == [call(1, a=2)]
+        assert cls.state == {}
+        assert cache_dir.listdir() == []
+
+    def test_other_errors_not_counted(self, cache_dir):
+        cls = CircuitBreaker('123', failures=1)
+        func = Mock(side_effect=client_error('AccessDenied'))
+        with pytest.raises(ClientError):
+            cls.call('r1', 'EC2', 'Op', func)
+        func.side_effect = RuntimeError('foo')
+        with pytest.raises(RuntimeError):
+            cls.call('r1', 'EC2', 'Op', func)
+        assert cls.state == {}
+
+    def test_open_skip_probe_close(self, cache_dir):
+        cls = CircuitBreaker('123', failures=2, cooldown=100)
+        func = Mock(side_effect=client_error('Throttling'))
+        with patch('%s.time.time' % pbm) as m_time:
+            m_time.return_value = 1000
+            with pytest.raises(ClientError):
+                cls.call('r1', 'EC2', 'Op', func)
+            assert cls.state['123/r1/EC2/Op']['opened'] is None
+            with pytest.raises(ClientError):
+                cls.call('r1', 'EC2', 'Op', func)
+            assert len(func.mock_calls) == 2
+            # open; skipped without calling
+            m_time.return_value = 1050
+            with pytest.raises(CircuitOpenError) as excinfo:
+                cls.call('r1', 'EC2', 'Op', func)
+            assert len(func.mock_calls) == 2
+            assert excinfo.value.key == '123/r1/EC2/Op'
+            assert excinfo.value.failures == 2
+            assert excinfo.value.retry_at == 1100
+            assert 'skipped: failed 2 times' in str(excinfo.value)
+            assert 'after 1970-01-01T00:18:20Z' in str(excinfo.value)
+            assert cls.skipped == {'123/r1/EC2/Op': excinfo.value}
+            # other operations are not affected
+            cls.call('r1', 'EC2', 'Op2', Mock())
+            # failed probe reopens
+            m_time.return_value = 1100
+            with pytest.raises(ClientError):
+                cls.call('r1', 'EC2', 'Op', func)
+            assert len(func.mock_calls) == 3
+            assert cls.state['123/r1/EC2/Op']['failures'] == 3
+            m_time.return_value = 1150
+            with pytest.raises(CircuitOpenError):
+                cls.call('r1', 'EC2', 'Op', func)
+            # successful probe closes
+            m_time.return_value = 1200
+            func.side_effect = None
+            func.return_value = 'ok'
+            assert cls.call('r1', 'EC2', 'Op', func) == 'ok'
+        assert cls.state == {}
+        assert json.loads(cache_dir.join(STATE_NAME).read()) == {}
+
+    def test_persisted(self, cache_dir):
+        cls = CircuitBreaker('123', failures=1, cooldown=3600)
+        func = Mock(side_effect=EndpointConnectionError(endpoint_url='x'))
+        with pytest.raises(EndpointConnectionError):
+            cls.call('r1', 'VPC', 'Op', func)
+        saved = json.loads(cache_dir.join(STATE_NAME).read())
+        assert list(saved.keys()) == ['123/r1/VPC/Op']
+        assert saved['123/r1/VPC/Op']['failures'] == 1
+        # a later run skips the call
+        cls2 = CircuitBreaker('123', failures=1, cooldown=3600)
+        with pytest.raises(CircuitOpenError):
+            cls2.call('r1', 'VPC', 'Op', func)
+        assert len(func.mock_calls) == 1
+        # other scopes are not affected
+        CircuitBreaker('456', failures=1).call('r1', 'VPC', 'Op', Mock())
+
+    def test_save_merges(self, cache_dir):
+        a = CircuitBreaker('123', failures=1)
+        b = CircuitBreaker('456', failures=1)
+        a.state
+        b.state
+        with pytest.raises(ClientError):
+            a.call('r1', 'EC2', 'Op', Mock(side_effect=client_error(
+                'AuthFailure'
+            )))
+        with pytest.raises(ClientError):
+            b.call('r1', 'EC2', 'Op', Mock(side_effect=client_error(
+                'OptInRequired'
+            )))
+        saved = json.loads(cache_dir.join(STATE_NAME).read())
+        assert sorted(saved.keys()) == ['123/r1/EC2/Op', '456/r1/EC2/Op']
+
+    def test_disabled(self, cache_dir):
+        cls = CircuitBreaker('123', failures=0)
+        func = Mock(side_effect=client_error('Throttling'))
+        for _ in range(3):
+            with pytest.raises(ClientError):
+                cls.call('r1', 'EC2', 'Op', func)
+        assert cache_dir.listdir() == []
+
+    def test_reset(self, cache_dir):
+        for scope in ['123', '456']:
+            with pytest.raises(ClientError):
+                CircuitBreaker(scope, failures=1).call(
+                    'r1', 'EC2', 'Op', Mock(side_effect=client_error(
+                        'UnsupportedOperation'
+                    ))
+                )
+        CircuitBreaker('123').reset()
+        saved = json.loads(cache_dir.join(STATE_NAME).read())
+        assert list(saved.keys()) == ['456/r1/EC2/Op']
+
+    def test_scope_callable(self, cache_dir):
+        get_scope = Mock(return_value='123')
+        cls = CircuitBreaker(get_scope, failures=1)
+        assert get_scope.mock_calls == []
+        with pytest.raises(ClientError):
+            cls.call('r1', 'EC2', 'Op', Mock(side_effect=client_error(
+                'Throttling'
+            )))
+        with pytest.raises(CircuitOpenError):
+            cls.call('r1', 'EC2', 'Op', Mock())
+        assert cls.scope == '123'
+        assert get_scope.mock_calls == [call()]
+        saved = json.loads(cache_dir.join(STATE_NAME).read())
+        assert list(saved.keys()) == ['123/r1/EC2/Op']
+
+    def test_scope_callable_fails(self, cache_dir):
+        get_scope = Mock(side_effect=client_error('AccessDenied'))
+        cls = CircuitBreaker(get_scope, failures=1)
+        func = Mock(side_effect=client_error('Throttling'))
+        with patch('%s.logger' % pbm) as mock_logger:
+            for _ in range(2):
+                with pytest.raises(ClientError):
+                    cls.call('r1', 'EC2', 'Op', func)
+            cls.reset()
+        assert cls.scope is None
+        assert len(func.mock_calls) == 2
+        assert get_scope.mock_calls == [call()]
+        assert mock_logger.mock_calls == [
+            call.warning(
+                'Unable to determine the account for circuit breakers; '
+                'disabling them', exc_info=True
+            )
+        ]
+        assert cache_dir.listdir() == []
@@ -37,10 +37,14 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 ################################################################################
 """
 
-from awslimitchecker.connectable import Connectable, ConnectableCredentials
+from awslimitchecker.connectable import (
+    Connectable, ConnectableCredentials, boto3_client, boto3_resource,
+    _boto3_lock
+)
 from datetime import datetime
 import sys
 import os
+import pytest
 
 # https://code.google.com/p/mock/issues/detail?id=249
 # py>=3.4 should use unittest.mock not the mock package on pypi
@@ -167,6 +171,23 @@ class Test_Connectable(object):
         assert m_mrc.mock_calls == [call(), call()]
         assert cls.conn == mock_client.return_value
 
+    def test_connect_cassette(self):
+        cls = ConnectableTester()
+        cls.api_name = 'myapi'
+        with patch('%s._boto3_connection_kwargs' % pb,
+                   new_callable=PropertyMock, create=True) as mock_kwargs:
+            mock_kwargs.return_value = {}
+            with patch('%s.boto3' % pbm) as mock_boto3:
+                with patch('%s.attach_cassette' % pbm) as mock_attach:
+                    cls.connect()
+                    cls.connect_resource()
+        assert mock_attach.mock_calls == [
+            call(mock_boto3.client.return_value),
+            call(mock_boto3.resource.return_value)
+        ]
+        assert cls.conn == mock_attach.return_value
+        assert cls.resource_conn == mock_attach.return_value
+
     def test_connect_with_retries(self):
         mock_conn = Mock()
         mock_cc = Mock()
@@ -370,6 +391,60 @@ class Test_Connectable(object):
         assert cls.resource_conn == mock_conn
 
 
+class TestGuardedCall(object):
+
+    def test_no_breaker(self):
+        cls = ConnectableTester()
+        func = Mock(return_value='res')
+        assert cls._guarded_call('Op', func, 1, a=2) == 'res'
+        assert func.mock_calls == [call(1, a=2)]
+
+    def test_breaker(self):
+        cls = ConnectableTester()
+        cls._boto3_connection_kwargs = {'region_name': 'rname'}
+        cls._circuit_breaker = Mock()
+        func = Mock()
+        res = cls._guarded_call('Op', func, 1, a=2)
+        assert res == cls._circuit_breaker.call.return_value
+        assert cls._circuit_breaker.mock_calls == [
+            call.call('rname', 'connectable_tester', 'Op', func, 1, a=2)
+        ]
+        assert func.mock_calls == []
+
+
+class TestBoto3Client(object):
+
+    def test_client(self):
+        def se_client(*args, **kwargs):
+            assert _boto3_lock.locked()
+            return Mock()
+
+        with patch('%s.boto3.client' % pbm) as mock_client:
+            mock_client.side_effect = se_client
+            res = boto3_client('foo', region_name='bar')
+        assert mock_client.mock_calls == [call('foo', region_name='bar')]
+        assert _boto3_lock.locked() is False
+        assert res is not None
+
+    def test_resource(self):
+        def se_resource(*args, **kwargs):
+            assert _boto3_lock.locked()
+            return Mock()
+
+        with patch('%s.boto3.resource' % pbm) as mock_resource:
+            mock_resource.side_effect = se_resource
+            boto3_resource('foo', region_name='bar')
+        assert mock_resource.mock_calls == [call('foo', region_name='bar')]
+        assert _boto3_lock.locked() is False
+
+    def test_client_exception(self):
+        with patch('%s.boto3.client' % pbm) as mock_client:
+            mock_client.side_effect = RuntimeError('foo')
+            with pytest.raises(RuntimeError):
+                boto3_client('foo')
+        assert _boto3_lock.locked() is False
+
+
 class TestConnectableCredentials(object):
 
     def test_connectable_credentials(self):
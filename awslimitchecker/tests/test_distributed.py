@@ -0,0 +1,453 @@
+"""
+awslimitchecker/tests/test_distributed.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import io
+import os
+import sys
+import threading
+import pytest
+from awslimitchecker.distributed import (
+    WorkItem, Lease, WorkResult, FilesystemQueue, RedisQueue, LocalRedis,
+    get_work_queue, Coordinator, Worker, Aggregator, WorkerStats,
+    _LeaseRenewer
+)
+from awslimitchecker.snapshot import write_snapshot
+from .support import mock_service, checked_limit, check_result
+
+# https://code.google.com/p/mock/issues/detail?id=249
+# py>=3.4 should use unittest.mock not the mock package on pypi
+if (
+        sys.version_info[0] < 3 or
+        sys.version_info[0] == 3 and sys.version_info[1] < 4
+):
+    from mock import patch, call, Mock
+else:
+    from unittest.mock import patch, call, Mock
+
+pbm = 'awslimitchecker.distributed'
+
+
+def service_result(svc_name, usage):
+    return check_result(checked_limit(
+        usages=[usage], service=mock_service(svc_name), resource_ids=False
+    ))
+
+
+@pytest.fixture(params=['filesystem', 'redis'])
+def queue(request, tmpdir):
+    if request.param == 'filesystem':
+        return FilesystemQueue(str(tmpdir.join('queue')))
+    return RedisQueue(LocalRedis(), prefix='test')
+
+
+class TestWorkResult(object):
+
+    def test_json_round_trip(self):
+        res = WorkResult(
+            item=WorkItem('123', 'r1', 'EC2'), worker_id='w1', started=1.5,
+            finished=2.5, snapshot=b'\x1f\x8b\x00', error=None
+        )
+        assert WorkResult.from_json(res.to_json()) == res
+        res = res._replace(snapshot=None, error='Foo: bar')
+        assert WorkResult.from_json(res.to_json()) == res
+
+    def test_item_id(self):
+        assert WorkItem('123', 'r1', 'EC2').item_id == '123/r1/EC2'
+        assert WorkItem(None, 'r1', 'EC2').item_id == '/r1/EC2'
+
+
+class TestWorkQueue(object):
+
+    def test_lease_and_complete(self, queue):
+        a = WorkItem('123', 'r1', 'EC2')
+        b = WorkItem(None, 'r1', 'S3')
+        queue.put(a)
+        queue.put(b)
+        assert queue.counts() == {'pending': 2, 'leased': 0, 'done': 0}
+        l1 = queue.lease('w1', 60)
+        l2 = queue.lease('w2', 60)
+        assert queue.lease('w3', 60) is None
+        assert set([l1.item, l2.item]) == set([a, b])
+        assert l1.worker_id == 'w1'
+        assert queue.counts() == {'pending': 0, 'leased': 2, 'done': 0}
+        res = WorkResult(
+            item=l1.item, worker_id='w1', started=1, finished=2,
+            snapshot=b'foo', error=None
+        )
+        queue.complete(l1, res)
+        assert queue.counts() == {'pending': 0, 'leased': 1, 'done': 1}
+        assert list(queue.results()) == [res]
+
+    def test_requeue_expired(self, queue):
+        queue.put(WorkItem('123', 'r1', 'EC2'))
+        lease = queue.lease('w1', 60)
+        assert queue.requeue_expired() == 0
+        assert queue.requeue_expired(now=lease.expires + 1) == 1
+        assert queue.counts() == {'pending': 1, 'leased': 0, 'done': 0}
+        assert queue.renew(lease, 60) is None
+        lease2 = queue.lease('w2', 60)
+        assert lease2.item == lease.item
+        # late completion of the lost lease is kept, then overwritten
+        queue.complete(lease, WorkResult(
+            item=lease.item, worker_id='w1', started=1, finished=2,
+            snapshot=None, error='late'
+        ))
+        queue.complete(lease2, WorkResult(
+            item=lease.item, worker_id='w2', started=3, finished=4,
+            snapshot=b'foo', error=None
+        ))
+        assert [r.worker_id for r in queue.results()] == ['w2']
+        assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 1}
+
+    def test_renew(self, queue):
+        queue.put(WorkItem('123', 'r1', 'EC2'))
+        lease = queue.lease('w1', 10)
+        renewed = queue.renew(lease, 1000)
+        assert renewed.item == lease.item
+        assert renewed.expires > lease.expires
+        assert queue.requeue_expired(now=lease.expires + 1) == 0
+        queue.complete(renewed, WorkResult(
+            item=lease.item, worker_id='w1', started=1, finished=2,
+            snapshot=None, error=None
+        ))
+        assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 1}
+
+    def test_clear(self, queue):
+        queue.put(WorkItem('123', 'r1', 'EC2'))
+        queue.put(WorkItem('123', 'r1', 'S3'))
+        queue.lease('w1', 60)
+        queue.clear()
+        assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 0}
+        assert queue.lease('w1', 60) is None
+
+
+class TestFilesystemQueue(object):
+
+    def test_write_tmp_unique(self, tmpdir):
+        cls = FilesystemQueue(str(tmpdir))
+        path = os.path.join(cls._dir('pending'), 'foo')
+        with patch('%s.os.getpid' % pbm) as m_pid:
+            m_pid.return_value = 12
+            with patch('%s.os.rename' % pbm, side_effect=os.rename) as m_ren:
+                cls._write(path, 'data')
+        assert m_ren.mock_calls == [call(
+            str(tmpdir.join(
+                '.foo.12.%d.tmp' % threading.current_thread().ident
+            )),
+            path
+        )]
+        assert open(path).read() == 'data'
+
+
+class TestRedisQueue(object):
+
+    def test_renew_requeued_concurrently(self):
+        cls = RedisQueue(LocalRedis(), prefix='test')
+        cls.put(WorkItem('123', 'r1', 'EC2'))
+        lease = cls.lease('w1', 60)
+        zadd = cls.client.zadd
+
+        def se_zadd(key, mapping, **kwargs):
+            # expired and requeued just before the renewal
+            cls.requeue_expired(now=lease.expires + 1)
+            return zadd(key, mapping, **kwargs)
+
+        with patch.object(cls.client, 'zadd', side_effect=se_zadd):
+            assert cls.renew(lease, 60) is None
+        assert cls.counts() == {'pending': 1, 'leased': 0, 'done': 0}
+
+    def test_renew_leased_by_other_worker(self):
+        cls = RedisQueue(LocalRedis(), prefix='test')
+        cls.put(WorkItem('123', 'r1', 'EC2'))
+        lease = cls.lease('w1', 60)
+        cls.requeue_expired(now=lease.expires + 1)
+        lease2 = cls.lease('w2', 60)
+        assert cls.renew(lease, 60) is None
+        renewed = cls.renew(lease2, 120)
+        assert renewed.worker_id == 'w2'
+        assert renewed.expires >= lease2.expires
+        assert cls.counts() == {'pending': 0, 'leased': 1, 'done': 0}
+
+
+class TestLocalRedis(object):
+
+    def test_zadd(self):
+        cls = LocalRedis()
+        assert cls.zadd('z', {'a': 1, 'b': 2}) == 2
+        assert cls.zadd('z', {'a': 3, 'c': 1}) == 1
+        assert cls.zadd('z', {'a': 4, 'b': 2, 'd': 1}, ch=True) == 2
+        assert cls.zadd('z', {'a': 5, 'b': 2, 'e': 1}, xx=True) == 0
+        assert cls.zadd('z', {'a': 6, 'b': 2, 'e': 1}, xx=True, ch=True) == 1
+        assert cls.zscore('z', 'a') == 6
+        assert cls.zscore('z', 'e') is None
+        assert cls.zadd('other', {'a': 1}, xx=True, ch=True) == 0
+        assert cls.zcard('other') == 0
+
+
+class TestGetWorkQueue(object):
+
+    def test_filesystem(self, tmpdir):
+        q = get_work_queue(str(tmpdir.join('a')))
+        assert isinstance(q, FilesystemQueue)
+        assert q.path == str(tmpdir.join('a'))
+        q = get_work_queue('file://' + str(tmpdir.join('b')))
+        assert q.path == str(tmpdir.join('b'))
+
+    def test_redis(self):
+        with patch('%s.RedisQueue.from_url' % pbm) as m_from_url:
+            res = get_work_queue('redis://h:6379/0')
+        assert res is m_from_url.return_value
+        assert m_from_url.mock_calls == [call('redis://h:6379/0')]
+
+    def test_redis_not_installed(self):
+        with patch.dict(sys.modules, {'redis': None}):
+            with pytest.raises(RuntimeError) as excinfo:
+                RedisQueue.from_url('redis://h:6379/0')
+        assert 'pip install awslimitchecker[redis]' in str(excinfo.value)
+
+
+class TestCoordinator(object):
+
+    def test_enqueue(self, queue):
+        queue.put(WorkItem('old', 'r0', 'EC2'))
+        cls = Coordinator(queue, ['1', '2'], ['r1', 'r2'], services=[
+            'EC2', 'IAM'
+        ])
+        assert cls.enqueue() == 6
+        items = []
+        while True:
+            lease = queue.lease('w1', 60)
+            if lease is None:
+                break
+            items.append(lease.item)
+        assert sorted(items) == sorted([
+            WorkItem('1', 'r1', 'EC2'), WorkItem('1', 'r1', 'IAM'),
+            WorkItem('1', 'r2', 'EC2'), WorkItem('2', 'r1', 'EC2'),
+            WorkItem('2', 'r1', 'IAM'), WorkItem('2', 'r2', 'EC2')
+        ])
+
+    def test_all_services(self):
+        cls = Coordinator(Mock(), [None], ['r1'])
+        assert 'EC2' in cls.services
+        assert cls.services == sorted(cls.services)
+
+
+class TestWorker(object):
+
+    def test_run(self, queue):
+        Coordinator(
+            queue, [None, '2'], ['r1'], services=['EC2', 'VPC']
+        ).enqueue()
+        with patch('%s.AwsLimitChecker' % pbm, autospec=True) as m_checker:
+            m_checker.return_value.check_thresholds.side_effect = [
+                service_result('EC2', 5), RuntimeError('foo'),
+                service_result('EC2', 9), service_result('VPC', 1)
+            ]
+            cls = Worker(
+                queue, worker_id='w1', lease_seconds=60,
+                checker_kwargs={'profile_name': 'p'}, use_ta=False
+            )
+            assert cls.run() == 4
+        assert sorted(
+            [x for x in m_checker.mock_calls if x[0] == ''],
+            key=lambda x: sorted(x[2].items())
+        ) == [
+            call(account_id='2', check_version=False, profile_name='p',
+                 region='r1'),
+            call(check_version=False, profile_name='p', region='r1')
+        ]
+        assert m_checker.return_value.check_thresholds.mock_calls[0] == call(
+            service=['EC2'], use_ta=False
+        )
+        results = list(queue.results())
+        assert len(results) == 4
+        errors = [r for r in results if r.error is not None]
+        assert len(errors) == 1
+        assert errors[0].error == 'RuntimeError: foo'
+        assert errors[0].snapshot is None
+        assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 4}
+
+    def test_run_max_items(self, queue):
+        Coordinator(queue, [None], ['r1'], services=['EC2', 'VPC']).enqueue()
+        with patch('%s.AwsLimitChecker' % pbm, autospec=True) as m_checker:
+            m_checker.return_value.check_thresholds.return_value = \
+                service_result('EC2', 5)
+            assert Worker(queue).run(max_items=1) == 1
+        assert queue.counts()['pending'] == 1
+
+    def test_run_wait(self, queue):
+        with patch('%s.time.sleep' % pbm) as m_sleep:
+            m_sleep.side_effect = [None, StopIteration()]
+            with pytest.raises(StopIteration):
+                Worker(queue).run(wait=True, poll_interval=3)
+        assert m_sleep.mock_calls == [call(3), call(3)]
+
+    def test_run_one_renews(self, queue):
+        queue.put(WorkItem('123', 'r1', 'EC2'))
+        renewed = threading.Event()
+        renew = queue.renew
+
+        def se_renew(lease, duration):
+            res = renew(lease, duration)
+            renewed.set()
+            return res
+
+        def se_check(**kwargs):
+            assert renewed.wait(5)
+            return service_result('EC2', 5)
+
+        with patch.object(queue, 'renew', side_effect=se_renew) as m_renew:
+            with patch('%s.AwsLimitChecker' % pbm, autospec=True) as m_chk:
+                m_chk.return_value.check_thresholds.side_effect = se_check
+                cls = Worker(
+                    queue, worker_id='w1', lease_seconds=60,
+                    renew_seconds=0.01
+                )
+                res = cls.run_one()
+        assert res.error is None
+        assert m_renew.mock_calls[0][1][1] == 60
+        # completed with the renewed lease
+        assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 1}
+
+    def test_renew_seconds_default(self):
+        assert Worker(Mock(), lease_seconds=90).renew_seconds == 30
+
+    def test_default_worker_id(self):
+        with patch('%s.socket.gethostname' % pbm) as m_host:
+            m_host.return_value = 'host'
+            with patch('%s.os.getpid' % pbm) as m_pid:
+                m_pid.return_value = 12
+                assert Worker(Mock()).worker_id == 'host-12'
+
+
+class TestLeaseRenewer(object):
+
+    def test_run(self):
+        l1 = Lease(WorkItem('1', 'r1', 'EC2'), 'w1', 10, 't1')
+        l2 = l1._replace(expires=20, token='t2')
+        m_queue = Mock()
+        m_queue.renew.side_effect = [RuntimeError('foo'), l2, None]
+        cls = _LeaseRenewer(m_queue, l1, 60, 0)
+        with patch('%s.logger' % pbm) as m_logger:
+            cls.start()
+            cls.join(5)
+        assert cls.stop() == l2
+        assert m_queue.mock_calls == [
+            call.renew(l1, 60), call.renew(l1, 60), call.renew(l2, 60)
+        ]
+        assert m_logger.mock_calls == [
+            call.warning('Error renewing lease %s', 't1', exc_info=True),
+            call.warning('Lease %s was lost; it may be checked again by '
+                         'another worker', 't2')
+        ]
+
+    def test_stop(self):
+        lease = Lease(WorkItem('1', 'r1', 'EC2'), 'w1', 10, 't1')
+        m_queue = Mock()
+        cls = _LeaseRenewer(m_queue, lease, 60, 300)
+        cls.start()
+        assert cls.stop() == lease
+        assert not cls.is_alive()
+        assert m_queue.mock_calls == []
+
+
+class TestAggregator(object):
+
+    def test_collect(self, queue):
+        for acct in ['1', '2', '3', '4']:
+            queue.put(WorkItem(acct, 'r1', 'EC2'))
+        for idx, (worker, usage) in enumerate([
+            ('w1', 5), ('w1', 9), ('w2', None)
+        ]):
+            lease = queue.lease(worker, 60)
+            snapshot = None
+            if usage is not None:
+                buf = io.BytesIO()
+                write_snapshot(
+                    buf, service_result('EC2', usage),
+                    account_id=lease.item.account_id, region='r1'
+                )
+                snapshot = buf.getvalue()
+            queue.complete(lease, WorkResult(
+                item=lease.item, worker_id=worker, started=100 + idx * 2,
+                finished=101 + idx * 2, snapshot=snapshot,
+                error=None if usage is not None else 'foo'
+            ))
+        stuck = queue.lease('w3', 60)
+        cls = Aggregator(queue, top=1)
+        with patch.object(queue, 'requeue_expired') as m_requeue:
+            assert cls.collect() == {'pending': 0, 'leased': 1, 'done': 3}
+        assert m_requeue.mock_calls == [call()]
+        assert stuck.item == WorkItem('4', 'r1', 'EC2')
+        assert cls.rollup.snapshots == 2
+        assert [
+            (e.account_id, e.utilization) for e in cls.rollup.top_limits()
+        ] == [('2', 90.0)]
+        assert [e.item for e in cls.errors] == [WorkItem('3', 'r1', 'EC2')]
+        assert cls.worker_stats() == [
+            WorkerStats(
+                worker_id='w1', items=2, errors=0, busy_seconds=2,
+                items_per_minute=40.0
+            ),
+            WorkerStats(
+                worker_id='w2', items=1, errors=1, busy_seconds=1,
+                items_per_minute=60.0
+            )
+        ]
+
+    def test_worker_stats_instant(self, queue):
+        queue.put(WorkItem('1', 'r1', 'EC2'))
+        lease = queue.lease('w1', 60)
+        queue.complete(lease, WorkResult(
+            item=lease.item, worker_id='w1', started=5, finished=5,
+            snapshot=None, error='foo'
+        ))
+        cls = Aggregator(queue)
+        cls.collect()
+        assert cls.worker_stats() == [
+            WorkerStats(
+                worker_id='w1', items=1, errors=1, busy_seconds=0,
+                items_per_minute=None
+            )
+        ]
+
+    def test_lease(self):
+        assert Lease(
+            item=WorkItem('1', 'r1', 'EC2'), worker_id='w', expires=1, token=2
+        ).token == 2
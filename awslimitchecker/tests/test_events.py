@@ -0,0 +1,353 @@
+"""
+awslimitchecker/tests/test_events.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import json
+import sys
+
+from awslimitchecker.checker import AwsLimitChecker
+from awslimitchecker.events import (
+    parse_event, event_time, LocalQueue, EventUpdater
+)
+from awslimitchecker.services.base import _AwsService
+
+# https://code.google.com/p/mock/issues/detail?id=249
+# py>=3.4 should use unittest.mock not the mock package on pypi
+if (
+        sys.version_info[0] < 3 or
+        sys.version_info[0] == 3 and sys.version_info[1] < 4
+):
+    from mock import patch, call, Mock, PropertyMock, DEFAULT
+else:
+    from unittest.mock import patch, call, Mock, PropertyMock, DEFAULT
+
+pbm = 'awslimitchecker.events'
+
+
+def cloudtrail_event(name, source='ec2.amazonaws.com', region='us-east-1',
+                     **kwargs):
+    detail = {
+        'eventSource': source,
+        'eventName': name,
+        'awsRegion': region,
+        'requestParameters': {},
+        'responseElements': {}
+    }
+    detail.update(kwargs)
+    return json.dumps({
+        'version': '0',
+        'detail-type': 'AWS API Call via CloudTrail',
+        'source': 'aws.%s' % source.split('.')[0],
+        'region': region,
+        'detail': detail
+    })
+
+
+class TestParseEvent(object):
+
+    def test_eventbridge(self):
+        res = parse_event(cloudtrail_event('RunInstances'))
+        assert res['eventName'] == 'RunInstances'
+        assert res['eventSource'] == 'ec2.amazonaws.com'
+
+    def test_cloudtrail_record(self):
+        body = json.dumps({
+            'eventSource': 'ec2.amazonaws.com', 'eventName': 'CreateVpc'
+        })
+        assert parse_event(body) == json.loads(body)
+
+    def test_error(self):
+        assert parse_event(
+            cloudtrail_event('RunInstances', errorCode='Client.Unauthorized')
+        ) is None
+
+    def test_other_events(self):
+        assert parse_event(json.dumps({
+            'detail-type': 'EC2 Instance State-change Notification',
+            'detail': {'instance-id': 'i-1', 'state': 'running'}
+        })) is None
+        assert parse_event(json.dumps({'foo': 'bar'})) is None
+        assert parse_event(json.dumps(['foo'])) is None
+        assert parse_event('not json') is None
+
+
+class TestEventTime(object):
+
+    def test_simple(self):
+        assert event_time({'eventTime': '2026-01-01T00:00:00Z'}) == \
+            1767225600
+        assert event_time({'eventTime': '2026-01-01T01:00:00+01:00'}) == \
+            1767225600
+        assert event_time({'eventTime': '2026-01-01T00:00:00'}) == \
+            1767225600
+
+    def test_missing(self):
+        assert event_time({}) is None
+        assert event_time({'eventTime': 'foo'}) is None
+        assert event_time({'eventTime': None}) is None
+
+
+class TestLocalQueue(object):
+
+    def test_send_receive_delete(self):
+        q = LocalQueue()
+        q.send_message(QueueUrl='q1', MessageBody='one')
+        q.send_message(QueueUrl='q1', MessageBody='two')
+        q.send_message(QueueUrl='q2', MessageBody='three')
+        res = q.receive_message(QueueUrl='q1', MaxNumberOfMessages=10)
+        assert [m['Body'] for m in res['Messages']] == ['one', 'two']
+        # in flight
+        assert q.receive_message(QueueUrl='q1') == {}
+        q.delete_message(
+            QueueUrl='q1', ReceiptHandle=res['Messages'][0]['ReceiptHandle']
+        )
+        assert len(q._queues['q1']) == 1
+        res = q.receive_message(QueueUrl='q2', MaxNumberOfMessages=10)
+        assert [m['Body'] for m in res['Messages']] == ['three']
+
+    def test_visibility_timeout(self):
+        q = LocalQueue(visibility_timeout=0)
+        q.send_message(QueueUrl='q', MessageBody='one')
+        first = q.receive_message(QueueUrl='q')['Messages'][0]
+        second = q.receive_message(QueueUrl='q')['Messages'][0]
+        assert first['MessageId'] == second['MessageId']
+        # stale receipt handle doesn't delete
+        q.delete_message(QueueUrl='q', ReceiptHandle=first['ReceiptHandle'])
+        assert len(q._queues['q']) == 1
+        q.delete_message(QueueUrl='q', ReceiptHandle=second['ReceiptHandle'])
+        assert len(q._queues['q']) == 0
+
+    def test_max_messages(self):
+        q = LocalQueue()
+        for x in range(3):
+            q.send_message(QueueUrl='q', MessageBody=str(x))
+        res = q.receive_message(QueueUrl='q', MaxNumberOfMessages=2)
+        assert [m['Body'] for m in res['Messages']] == ['0', '1']
+        res = q.receive_message(QueueUrl='q', MaxNumberOfMessages=2)
+        assert [m['Body'] for m in res['Messages']] == ['2']
+
+    def test_wait(self):
+        q = LocalQueue()
+        with patch('%s.time.time' % pbm) as m_time:
+            m_time.side_effect = [100, 100, 105, 121]
+            with patch.object(q._cond, 'wait') as m_wait:
+                assert q.receive_message(
+                    QueueUrl='q', WaitTimeSeconds=20
+                ) == {}
+        assert m_wait.mock_calls == [call(1), call(1)]
+
+
+class TestEventUpdater(object):
+
+    def setup(self):
+        self.mock_checker = Mock(spec=AwsLimitChecker)
+        type(self.mock_checker).region_name = PropertyMock(
+            return_value='us-east-1'
+        )
+        self.svc_ec2 = Mock(spec_set=_AwsService, api_name='ec2')
+        self.svc_vpc = Mock(spec_set=_AwsService, api_name='ec2')
+        self.svc_s3 = Mock(spec_set=_AwsService, api_name='s3')
+        self.mock_checker.services = {
+            'EC2': self.svc_ec2, 'VPC': self.svc_vpc, 'S3': self.svc_s3
+        }
+        self.queue = LocalQueue()
+        self.cls = EventUpdater(
+            self.mock_checker, 'qurl', sqs_client=self.queue,
+            reconcile_interval=3600, dirty_interval=300, wait_time=0
+        )
+
+    def test_init_default_client(self):
+        self.mock_checker._boto_conn_kwargs = {'region_name': 'foo'}
+        with patch('%s.boto3_client' % pbm) as m_client:
+            with patch('%s.attach_cassette' % pbm) as m_attach:
+                m_attach.side_effect = lambda x: x
+                cls = EventUpdater(self.mock_checker, 'qurl')
+        assert m_client.mock_calls == [call('sqs', region_name='foo')]
+        assert cls._sqs is m_client.return_value
+        assert cls.reconcile_interval == 3600
+        assert cls.dirty_interval == 300
+        assert cls.wait_time == 20
+        assert cls.use_ta is True
+
+    def test_baseline(self):
+        with patch('%s.time.time' % pbm) as m_time:
+            m_time.return_value = 123
+            self.cls.dirty.add('EC2')
+            self.cls.baseline()
+        assert self.mock_checker.mock_calls == [call.find_usage(use_ta=True)]
+        assert self.cls.region == 'us-east-1'
+        assert self.cls._last_full == 123
+        assert self.cls._last_dirty == 123
+        assert self.cls.dirty == set()
+        assert self.cls._scanned == {'EC2': 123, 'VPC': 123, 'S3': 123}
+        for svc in [self.svc_ec2, self.svc_vpc, self.svc_s3]:
+            assert svc.mock_calls == [call._clear_event_deltas()]
+
+    def test_handle_message_before_baseline(self):
+        self.svc_ec2.apply_event.return_value = True
+        self.svc_vpc.apply_event.return_value = True
+        with patch('%s.time.time' % pbm) as m_time:
+            m_time.return_value = 1767225600
+            self.cls.baseline()
+        # already counted by the baseline
+        assert not self.cls.handle_message(cloudtrail_event(
+            'RunInstances', eventTime='2025-12-31T23:58:00Z'
+        ))
+        assert self.svc_ec2.apply_event.mock_calls == []
+        assert self.svc_vpc.apply_event.mock_calls == []
+        assert self.cls.applied == 0
+        assert self.cls.ignored == 1
+        assert self.cls.handle_message(cloudtrail_event(
+            'RunInstances', eventTime='2026-01-01T00:00:01Z'
+        ))
+        assert len(self.svc_ec2.apply_event.mock_calls) == 1
+        assert self.cls.applied == 1
+
+    def test_handle_message_after_reconcile(self):
+        self.svc_ec2.apply_event.return_value = True
+        self.svc_vpc.apply_event.return_value = True
+        with patch('%s.time.time' % pbm) as m_time:
+            m_time.return_value = 1767225600
+            self.cls.baseline()
+        self.cls.dirty.add('VPC')
+        assert self.cls.reconcile(now=1767225600 + 600) is True
+        assert self.cls._scanned['VPC'] == 1767225600 + 600
+        assert self.cls._scanned['EC2'] == 1767225600
+        assert self.svc_vpc.mock_calls[-1] == call._clear_event_deltas()
+        # made before the VPC reconcile, but after the EC2 baseline
+        assert self.cls.handle_message(cloudtrail_event(
+            'RunInstances', eventTime='2026-01-01T00:05:00Z'
+        ))
+        assert len(self.svc_ec2.apply_event.mock_calls) == 1
+        assert self.svc_vpc.apply_event.mock_calls == []
+        # made after the reconcile
+        assert self.cls.handle_message(cloudtrail_event(
+            'RunInstances', eventTime='2026-01-01T00:11:00Z'
+        ))
+        assert len(self.svc_ec2.apply_event.mock_calls) == 2
+        assert len(self.svc_vpc.apply_event.mock_calls) == 1
+
+    def test_handle_message(self):
+        self.cls.region = 'us-east-1'
+        self.svc_ec2.apply_event.return_value = True
+        self.svc_vpc.apply_event.return_value = None
+        assert self.cls.handle_message(cloudtrail_event('RunInstances'))
+        assert self.svc_ec2.apply_event.call_args[0][0] == 'RunInstances'
+        assert self.svc_vpc.apply_event.call_args[0][0] == 'RunInstances'
+        assert self.svc_s3.mock_calls == []
+        assert self.cls.applied == 1
+        assert self.cls.ignored == 0
+        assert self.cls.dirty == set()
+
+    def test_handle_message_dirty(self):
+        self.cls.region = 'us-east-1'
+        self.svc_ec2.apply_event.return_value = False
+        self.svc_vpc.apply_event.return_value = None
+        assert not self.cls.handle_message(
+            cloudtrail_event('StartInstances')
+        )
+        assert self.cls.applied == 0
+        assert self.cls.ignored == 1
+        assert self.cls.dirty == set(['EC2'])
+
+    def test_handle_message_ignored(self):
+        self.cls.region = 'us-east-1'
+        assert not self.cls.handle_message(
+            cloudtrail_event('RunInstances', region='us-west-2')
+        )
+        assert not self.cls.handle_message(
+            cloudtrail_event('RunInstances', errorCode='Foo')
+        )
+        assert not self.cls.handle_message('{}')
+        assert self.svc_ec2.mock_calls == []
+        assert self.cls.ignored == 3
+
+    def test_poll(self):
+        self.cls.region = 'us-east-1'
+        self.svc_ec2.apply_event.side_effect = [True, None]
+        self.svc_vpc.apply_event.return_value = None
+        self.queue.send_message(
+            QueueUrl='qurl', MessageBody=cloudtrail_event('RunInstances')
+        )
+        self.queue.send_message(
+            QueueUrl='qurl', MessageBody=cloudtrail_event('DescribeFoo')
+        )
+        self.queue.send_message(QueueUrl='other', MessageBody='foo')
+        assert self.cls.poll() == 1
+        assert len(self.queue._queues['qurl']) == 0
+        assert len(self.queue._queues['other']) == 1
+        assert self.cls.poll() == 0
+
+    def test_reconcile(self):
+        self.cls._last_full = self.cls._last_dirty = 1000
+        assert self.cls.reconcile(now=1100) is False
+        self.cls.dirty.update(['VPC', 'EC2'])
+        assert self.cls.reconcile(now=1200) is False
+        assert self.mock_checker.mock_calls == []
+        assert self.cls.reconcile(now=1300) is True
+        assert self.mock_checker.mock_calls == [
+            call.find_usage(service=['EC2', 'VPC'], use_ta=False)
+        ]
+        assert self.cls.dirty == set()
+        assert self.cls._last_dirty == 1300
+        self.cls.dirty.add('EC2')
+        assert self.cls.reconcile(now=1400) is False
+        assert self.cls.reconcile(now=4600) is True
+        assert self.mock_checker.mock_calls[-1] == call.find_usage(
+            use_ta=False
+        )
+        assert self.cls.dirty == set()
+        assert self.cls._last_full == 4600
+        assert self.cls.reconciliations == 2
+        assert self.cls._scanned == {'EC2': 4600, 'VPC': 4600, 'S3': 4600}
+
+    def test_run(self):
+        on_update = Mock()
+        with patch.multiple(
+            '%s.EventUpdater' % pbm,
+            baseline=DEFAULT,
+            poll=DEFAULT,
+            reconcile=DEFAULT,
+            autospec=True
+        ) as mocks:
+            mocks['poll'].side_effect = [0, 2, 0]
+            mocks['reconcile'].side_effect = [False, False, True]
+            self.cls.run(on_update=on_update, iterations=3)
+        assert mocks['baseline'].mock_calls == [call(self.cls)]
+        assert len(mocks['poll'].mock_calls) == 3
+        assert len(on_update.mock_calls) == 3
@@ -0,0 +1,164 @@
+"""
+awslimitchecker/tests/test_history.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import os
+import sys
+from awslimitchecker.history import HistoryStore, HistoryPoint, RAW
+from .support import mock_service, checked_limit, check_result
+
+# https://code.google.com/p/mock/issues/detail?id=249
+# py>=3.4 should use unittest.mock not the mock package on pypi
+if (
+        sys.version_info[0] < 3 or
+        sys.version_info[0] == 3 and sys.version_info[1] < 4
+):
+    from mock import patch
+else:
+    from unittest.mock import patch
+
+pbm = 'awslimitchecker.history'
+
+HOUR = 3600
+DAY = 86400
+
+
+def history_result(usages, maximum=None):
+    svc = mock_service()
+    return check_result(
+        checked_limit(usages=usages, service=svc, maximum=maximum),
+        checked_limit(
+            'other', usages=[3], service=svc, default=None,
+            resource_ids=False
+        )
+    )
+
+
+class TestHistoryStore(object):
+
+    def setup(self):
+        self.retention = [(RAW, DAY), (HOUR, 10 * DAY), (DAY, 100 * DAY)]
+
+    def store(self, tmpdir):
+        return HistoryStore(
+            str(tmpdir.join('sub', 'h.sqlite')), retention=self.retention
+        )
+
+    def test_default_path(self, tmpdir):
+        with patch.dict('os.environ', {'ALC_CACHE_DIR': str(tmpdir)}):
+            with HistoryStore() as store:
+                assert store.path == str(tmpdir.join('history.sqlite'))
+        assert os.path.exists(str(tmpdir.join('history.sqlite')))
+
+    def test_record_and_query(self, tmpdir):
+        store = self.store(tmpdir)
+        assert store.record(
+            history_result([1, 2]), region='rname', timestamp=1000.5
+        ) == 3
+        assert store.record(
+            history_result([4, 5], maximum=20), account_id='5678',
+            region='rname', timestamp=2000
+        ) == 3
+        res = store.query(service='SvcName', limit='lname', resource_id='r1')
+        assert res == [
+            HistoryPoint(
+                account_id='1234', region='rname', service='SvcName',
+                limit='lname', resource_id='r1', timestamp=1000,
+                resolution=RAW, usage=2, max_usage=2, limit_value=10,
+                samples=1
+            ),
+            HistoryPoint(
+                account_id='5678', region='rname', service='SvcName',
+                limit='lname', resource_id='r1', timestamp=2000,
+                resolution=RAW, usage=5, max_usage=5, limit_value=20,
+                samples=1
+            )
+        ]
+        res = store.query(limit='other', account_id='1234')
+        assert len(res) == 1
+        assert res[0].resource_id is None
+        assert res[0].limit_value is None
+        assert len(store.query(start=1500)) == 3
+        assert len(store.query(end=1500)) == 3
+        assert store.query(region='other') == []
+        store.close()
+
+    def test_compact(self, tmpdir):
+        store = self.store(tmpdir)
+        now = 200 * DAY
+        # two raw samples in the same hour, two days ago
+        for ts, val in [(now - 2 * DAY, 2), (now - 2 * DAY + 300, 6)]:
+            store.record(history_result([val]), region='r', timestamp=ts)
+        # a recent raw sample, kept as-is
+        store.record(history_result([9]), region='r', timestamp=now - 60)
+        assert store.compact(now=now) == 4
+        res = store.query(limit='lname')
+        assert [(p.resolution, p.usage, p.max_usage, p.samples)
+                for p in res] == [(HOUR, 4, 6, 2), (RAW, 9, 9, 1)]
+        assert res[0].timestamp == now - 2 * DAY
+        # compacting again is a no-op
+        assert store.compact(now=now) == 0
+        # later, hourly aggregates are merged into daily ones
+        store.record(history_result([1]), region='r', timestamp=now + 60)
+        assert store.compact(now=now + 20 * DAY, vacuum=True) == 10
+        res = store.query(limit='lname')
+        assert [(p.resolution, p.samples, p.max_usage)
+                for p in res] == [(DAY, 2, 6), (DAY, 1, 9), (DAY, 1, 1)]
+        assert res[0].usage == 4
+        # and eventually expire
+        assert store.compact(now=now + 200 * DAY) == 6
+        assert store.query() == []
+        store.close()
+
+    def test_compact_merges_existing(self, tmpdir):
+        store = self.store(tmpdir)
+        now = 200 * DAY
+        store.record(history_result([2]), region='r', timestamp=now - 2 * DAY)
+        store.compact(now=now)
+        store.record(
+            history_result([8], maximum=30), region='r',
+            timestamp=now - 2 * DAY + 60
+        )
+        store.compact(now=now)
+        res = store.query(limit='lname')
+        assert len(res) == 1
+        assert res[0].resolution == HOUR
+        assert res[0].samples == 2
+        assert res[0].usage == 5
+        assert res[0].max_usage == 8
+        assert res[0].limit_value == 30
@@ -41,7 +41,8 @@ import pytest
 import sys
 from awslimitchecker.limit import (
     AwsLimit, AwsLimitUsage, SOURCE_DEFAULT, SOURCE_OVERRIDE,
-    SOURCE_TA, SOURCE_API, SOURCE_QUOTAS
+    SOURCE_TA, SOURCE_API, SOURCE_QUOTAS, _UsageStore, _UsageView,
+    evaluate_thresholds
 )
 from awslimitchecker.services.base import _AwsService
 
@@ -272,6 +273,81 @@ class TestAddCurrentUsage(AwsLimitTester):
         assert limit._current_usage[1].get_value() == 4
 
 
+class TestAdjustCurrentUsage(AwsLimitTester):
+
+    def test_account_wide(self):
+        limit = AwsLimit('limitname', self.mock_svc, 3, 1, 2)
+        assert limit._adjust_current_usage(2, aws_type='foo') == 2
+        assert limit.get_current_usage() == [
+            AwsLimitUsage(limit, 2, aws_type='foo')
+        ]
+        assert limit._adjust_current_usage(3) == 5
+        assert limit._adjust_current_usage(-6) == 0
+        assert limit._adjust_current_usage(-1) == 0
+        assert len(limit.get_current_usage()) == 1
+        assert limit.get_current_usage()[0].get_value() == 0
+        assert limit.get_current_usage()[0].aws_type == 'foo'
+
+    def test_resource(self):
+        limit = AwsLimit('limitname', self.mock_svc, 3, 1, 2)
+        limit._add_current_usage(4, resource_id='a', aws_type='foo')
+        limit._add_current_usage(2.5, maximum=7, resource_id='b')
+        assert limit._adjust_current_usage(-1, resource_id='a') == 3
+        assert limit._adjust_current_usage(1, resource_id='b') == 3.5
+        assert limit._adjust_current_usage(1, resource_id='c') == 1
+        assert limit._adjust_current_usage(-1, resource_id='d') == 0
+        res = [
+            (u.get_value(), u.get_maximum(), u.resource_id, u.aws_type)
+            for u in limit.get_current_usage()
+        ]
+        assert res == [
+            (3, None, 'a', 'foo'),
+            (3.5, 7, 'b', None),
+            (1, None, 'c', None),
+            (0, None, 'd', None)
+        ]
+        assert type(res[0][0]) is int
+
+    def test_large_int(self):
+        limit = AwsLimit('limitname', self.mock_svc, 3, 1, 2)
+        limit._add_current_usage(2 ** 60, resource_id='a')
+        assert limit._adjust_current_usage(1, resource_id='a') == 2 ** 60 + 1
+        assert limit._adjust_current_usage(
+            -(2 ** 60), resource_id='a'
+        ) == 1
+        assert limit.get_current_usage()[0].get_value() == 1
+        assert limit._usage._objects == {}
+
+    def test_remove(self):
+        limit = AwsLimit('limitname', self.mock_svc, 3, 1, 2)
+        limit._add_current_usage(4, resource_id='a', aws_type='foo')
+        limit._add_current_usage(2 ** 60, maximum=9, resource_id='b')
+        limit._add_current_usage(1, resource_id='a', aws_type='foo')
+        assert limit._remove_current_usage('c') == 0
+        assert limit._remove_current_usage('a') == 2
+        assert limit.get_current_usage() == [
+            AwsLimitUsage(limit, 2 ** 60, maximum=9, resource_id='b')
+        ]
+        assert limit.get_current_usage()[0].get_value() == 2 ** 60
+
+    def test_copy_on_write(self):
+        limit = AwsLimit('limitname', self.mock_svc, 3, 1, 2)
+        limit._add_current_usage(4, resource_id='a', aws_type='foo')
+        limit._add_current_usage(2, resource_id='b')
+        store = limit._usage
+        limit._adjust_current_usage(1, resource_id='a')
+        assert limit._usage is not store
+        assert store.get(0) == (4, None, 'a', 'foo')
+        store = limit._usage
+        limit._remove_current_usage('b')
+        assert limit._usage is not store
+        assert len(store) == 2
+        assert len(limit._usage) == 1
+        store = limit._usage
+        limit._remove_current_usage('c')
+        assert limit._usage is store
+
+
 class TestGetCurrentUsage(AwsLimitTester):
 
     def test_simple(self):
@@ -282,8 +358,27 @@ class TestGetCurrentUsage(AwsLimitTester):
             1,
             2
         )
-        limit._current_usage = 2
-        assert limit.get_current_usage() == 2
+        u1 = AwsLimitUsage(limit, 2, resource_id='foo')
+        u2 = AwsLimitUsage(limit, 3.5, maximum=7, aws_type='bar')
+        limit._current_usage = [u1, u2]
+        res = limit.get_current_usage()
+        assert isinstance(res, _UsageView)
+        assert res == [u1, u2]
+        assert len(res) == 2
+        assert res[0].limit is limit
+        assert res[0].get_value() == 2
+        assert res[0].resource_id == 'foo'
+        assert res[0].aws_type is None
+        assert res[1].get_value() == 3.5
+        assert res[1].get_maximum() == 7
+        assert res[1].resource_id is None
+        assert res[1].aws_type == 'bar'
+
+    def test_reset(self):
+        limit = AwsLimit('limitname', self.mock_svc, 3, 1, 2)
+        limit._add_current_usage(2)
+        limit._reset_usage()
+        assert limit.get_current_usage() == []
 
     def test_str_none(self):
         limit = AwsLimit(
@@ -344,6 +439,48 @@ class TestGetCurrentUsage(AwsLimitTester):
         assert limit.get_current_usage_str() == 'max: foo4bar=4 (foo2bar=2, ' \
             'foo3bar=3, foo4bar=4)'
 
+    def test_str_top_k(self):
+        limit = AwsLimit('limitname', self.mock_svc, 3, 1, 2)
+        limit._add_current_usage(4, resource_id='foo4bar')
+        limit._add_current_usage(3, resource_id='foo3bar')
+        limit._add_current_usage(2, resource_id='foo2bar')
+        assert limit.get_current_usage_str(top_k=2) == 'max: foo4bar=4 ' \
+            '(top 2 of 3: foo3bar=3, foo4bar=4)'
+        assert limit.get_current_usage_str(top_k=3) == \
+            limit.get_current_usage_str()
+
+    def test_str_top_k_ties(self):
+        limit = AwsLimit('limitname', self.mock_svc, 3, 1, 2)
+        for idx, val in enumerate([5, 2, 5, 1, 5.5, 5]):
+            limit._add_current_usage(val, resource_id='r%d' % idx)
+        assert limit.get_current_usage_str() == 'max: r4=5.5 ' \
+            '(r3=1, r1=2, r0=5, r2=5, r5=5, r4=5.5)'
+        assert limit.get_current_usage_str(top_k=3) == 'max: r4=5.5 ' \
+            '(top 3 of 6: r2=5, r5=5, r4=5.5)'
+        assert limit.get_current_usage_str(top_k=1) == 'max: r4=5.5 ' \
+            '(top 1 of 6: r4=5.5)'
+
+    def test_str_max_first(self):
+        limit = AwsLimit('limitname', self.mock_svc, 3, 1, 2)
+        limit._add_current_usage(5, resource_id='a')
+        limit._add_current_usage(5, resource_id='b')
+        assert limit.get_current_usage_str() == 'max: a=5 (a=5, b=5)'
+
+
+class TestHasResourceLimits(AwsLimitTester):
+
+    def test_none(self):
+        limit = AwsLimit('limitname', self.mock_svc, 3, 1, 2)
+        limit._add_current_usage(2, resource_id='foo')
+        limit._add_current_usage(4, maximum=0, resource_id='bar')
+        assert limit.has_resource_limits() is False
+
+    def test_some(self):
+        limit = AwsLimit('limitname', self.mock_svc, 3, 1, 2)
+        limit._add_current_usage(2, resource_id='foo')
+        limit._add_current_usage(4, maximum=10, resource_id='bar')
+        assert limit.has_resource_limits() is True
+
 
 class TestGetLimit(AwsLimitTester):
 
@@ -521,7 +658,7 @@ class TestCheckThresholds(AwsLimitTester):
         assert limit._warnings == []
         assert limit._criticals == []
         assert mock_get_thresh.mock_calls == [call()]
-        assert mock_get_limit.mock_calls == [call(), call(), call()]
+        assert mock_get_limit.mock_calls == [call()]
 
     def test_ta_unlimited(self):
         limit = AwsLimit('limitname', self.mock_svc, 3, 1, 2)
@@ -541,7 +678,7 @@ class TestCheckThresholds(AwsLimitTester):
         assert limit._warnings == []
         assert limit._criticals == []
         assert mock_get_thresh.mock_calls == [call()]
-        assert mock_get_limit.mock_calls == [call(), call(), call()]
+        assert mock_get_limit.mock_calls == [call()]
 
     def test_ta_zero(self):
         limit = AwsLimit('limitname', self.mock_svc, 3, 1, 2)
@@ -561,7 +698,7 @@ class TestCheckThresholds(AwsLimitTester):
         assert limit._warnings == []
         assert limit._criticals == []
         assert mock_get_thresh.mock_calls == [call()]
-        assert mock_get_limit.mock_calls == [call(), call(), call()]
+        assert mock_get_limit.mock_calls == [call()]
 
     def test_pct_warn(self):
         limit = AwsLimit('limitname', self.mock_svc, 100, 1, 2)
@@ -580,7 +717,7 @@ class TestCheckThresholds(AwsLimitTester):
         assert limit._warnings == [u2]
         assert limit._criticals == []
         assert mock_get_thresh.mock_calls == [call()]
-        assert mock_get_limit.mock_calls == [call(), call(), call()]
+        assert mock_get_limit.mock_calls == [call()]
 
     def test_int_warn(self):
         limit = AwsLimit('limitname', self.mock_svc, 100, 1, 2)
@@ -599,7 +736,7 @@ class TestCheckThresholds(AwsLimitTester):
         assert limit._warnings == [u1]
         assert limit._criticals == []
         assert mock_get_thresh.mock_calls == [call()]
-        assert mock_get_limit.mock_calls == [call(), call(), call()]
+        assert mock_get_limit.mock_calls == [call()]
 
     def test_int_warn_crit(self):
         limit = AwsLimit('limitname', self.mock_svc, 100, 1, 2)
@@ -618,7 +755,7 @@ class TestCheckThresholds(AwsLimitTester):
         assert limit._warnings == [u1]
         assert limit._criticals == [u3]
         assert mock_get_thresh.mock_calls == [call()]
-        assert mock_get_limit.mock_calls == [call(), call(), call()]
+        assert mock_get_limit.mock_calls == [call()]
 
     def test_pct_crit(self):
         limit = AwsLimit('limitname', self.mock_svc, 100, 1, 2)
@@ -637,7 +774,7 @@ class TestCheckThresholds(AwsLimitTester):
         assert limit._warnings == []
         assert limit._criticals == [u3]
         assert mock_get_thresh.mock_calls == [call()]
-        assert mock_get_limit.mock_calls == [call(), call(), call()]
+        assert mock_get_limit.mock_calls == [call()]
 
     def test_int_crit(self):
         limit = AwsLimit('limitname', self.mock_svc, 100, 1, 2)
@@ -656,7 +793,7 @@ class TestCheckThresholds(AwsLimitTester):
         assert limit._warnings == []
         assert limit._criticals == [u1, u3]
         assert mock_get_thresh.mock_calls == [call()]
-        assert mock_get_limit.mock_calls == [call(), call(), call()]
+        assert mock_get_limit.mock_calls == [call()]
 
     def test_pct_warn_crit(self):
         limit = AwsLimit('limitname', self.mock_svc, 100, 1, 2)
@@ -675,7 +812,84 @@ class TestCheckThresholds(AwsLimitTester):
         assert limit._warnings == [u1]
         assert limit._criticals == [u3]
         assert mock_get_thresh.mock_calls == [call()]
-        assert mock_get_limit.mock_calls == [call(), call(), call()]
+        assert mock_get_limit.mock_calls == [call()]
+
+    def test_idempotent(self):
+        limit = AwsLimit('limitname', self.mock_svc, 100, 40, 80)
+        limit._add_current_usage(50, resource_id='foo4bar')
+        limit._add_current_usage(3, resource_id='foo3bar')
+        limit._add_current_usage(95, resource_id='foo2bar')
+        assert limit.check_thresholds() is False
+        assert limit.check_thresholds() is False
+        assert [u.resource_id for u in limit.get_warnings()] == ['foo4bar']
+        assert [u.resource_id for u in limit.get_criticals()] == ['foo2bar']
+        limit.set_limit_override(1000)
+        assert limit.check_thresholds() is True
+        assert limit.get_warnings() == []
+        assert limit.get_criticals() == []
+
+    def test_maximum(self):
+        limit = AwsLimit('limitname', self.mock_svc, None, 40, 80)
+        limit._add_current_usage(5, maximum=10, resource_id='a')
+        limit._add_current_usage(9, maximum=10.0, resource_id='b')
+        limit._add_current_usage(9, resource_id='c')
+        limit._add_current_usage(1, maximum=10, resource_id='d')
+        assert limit.check_thresholds() is False
+        assert [u.resource_id for u in limit.get_warnings()] == ['a']
+        assert [u.resource_id for u in limit.get_criticals()] == ['b']
+        assert limit.get_criticals()[0].get_maximum() == 10.0
+        assert limit.get_warnings()[0].limit is limit
+
+    def test_count_zero(self):
+        limit = AwsLimit('limitname', self.mock_svc, 100, 40, 80)
+        limit.set_threshold_override(warn_count=0)
+        limit._add_current_usage(0)
+        assert limit.check_thresholds() is False
+        assert limit.get_warnings() == [AwsLimitUsage(limit, 0)]
+
+    def test_evaluate_multiple(self):
+        lim1 = AwsLimit('lim1', self.mock_svc, 10, 40, 80)
+        lim1._add_current_usage(1, resource_id='a')
+        lim1._add_current_usage(9, resource_id='b')
+        lim2 = AwsLimit('lim2', self.mock_svc, 10, 40, 80)
+        lim3 = AwsLimit('lim3', self.mock_svc, 100, 40, 80)
+        lim3.set_threshold_override(warn_percent=1, crit_percent=2)
+        lim3._add_current_usage(1, resource_id='c')
+        lim3._add_current_usage(0.5, resource_id='d')
+        lim4 = AwsLimit('lim4', self.mock_svc, 0, 40, 80)
+        lim4._add_current_usage(4)
+        with patch(
+            'awslimitchecker.limit.AwsLimit.get_limit', autospec=True
+        ) as mock_get_limit:
+            mock_get_limit.side_effect = lambda x: x.default_limit
+            res = evaluate_thresholds([lim1, lim2, lim3, lim4])
+        assert res == [False, True, False, True]
+        assert len(mock_get_limit.mock_calls) == 4
+        assert lim1.get_warnings() == []
+        assert [u.resource_id for u in lim1.get_criticals()] == ['b']
+        assert lim2.get_warnings() == []
+        assert lim2.get_criticals() == []
+        assert [u.resource_id for u in lim3.get_warnings()] == ['c']
+        assert lim3.get_criticals() == []
+        assert lim4.get_warnings() == []
+        assert lim4.get_criticals() == []
+
+    def test_evaluate_empty(self):
+        lim1 = AwsLimit('lim1', self.mock_svc, 10, 40, 80)
+        assert evaluate_thresholds([lim1]) == [True]
+        assert evaluate_thresholds([]) == []
+
+
+class TestCheckThresholdsNoNumpy(TestCheckThresholds):
+    """Run all TestCheckThresholds tests without NumPy available."""
+
+    def setup(self):
+        super(TestCheckThresholdsNoNumpy, self).setup()
+        self.np_patcher = patch('awslimitchecker.limit.numpy', None)
+        self.np_patcher.start()
+
+    def teardown(self):
+        self.np_patcher.stop()
 
 
 class TestGetWarnings(AwsLimitTester):
@@ -696,6 +910,17 @@ class TestGetCriticals(AwsLimitTester):
         assert limit.get_criticals() == m
 
 
+class TestGetSkipped(AwsLimitTester):
+
+    def test_simple(self):
+        limit = AwsLimit('limitname', self.mock_svc, 100, 1, 2)
+        assert limit.get_skipped() is None
+        limit._set_skipped('k skipped')
+        assert limit.get_skipped() == 'k skipped'
+        limit._reset_usage()
+        assert limit.get_skipped() is None
+
+
 class TestGetThresholds(AwsLimitTester):
 
     def test_simple(self):
@@ -843,6 +1068,12 @@ class TestAwsLimitUsage(object):
         )
         assert str(u2) == 'foobar=3.456'
 
+    def test_slots(self):
+        u = AwsLimitUsage(Mock(spec_set=AwsLimit), 3)
+        assert not hasattr(u, '__dict__')
+        with pytest.raises(AttributeError):
+            u.foo = 'bar'
+
     def test_comparable(self):
         mock_limit = Mock(spec_set=AwsLimit)
         u1 = AwsLimitUsage(
@@ -866,3 +1097,78 @@ class TestAwsLimitUsage(object):
         assert u1 < u3
         assert u1 > u2
         assert u1 >= u2
+
+
+class TestUsageStore(object):
+
+    def test_round_trip(self):
+        s = _UsageStore()
+        s.append(2)
+        s.append(2.5, maximum=10, resource_id='foo', aws_type='AWS::T')
+        s.append(3, maximum=1.5, resource_id='bar', aws_type='AWS::T')
+        s.append(4, maximum=2, aws_type='AWS::U')
+        assert len(s) == 4
+        assert s.get(0) == (2, None, None, None)
+        assert type(s.get(0)[0]) is int
+        assert s.get(1) == (2.5, 10, 'foo', 'AWS::T')
+        assert type(s.get(1)[1]) is int
+        assert s.get(2) == (3, 1.5, 'bar', 'AWS::T')
+        assert type(s.get(2)[1]) is float
+        assert s.get(3) == (4, 2, None, 'AWS::U')
+        assert list(s.values) == [2.0, 2.5, 3.0, 4.0]
+        assert list(s.maximums) == [0.0, 10.0, 1.5, 2.0]
+        assert s._types == [None, 'AWS::T', 'AWS::U']
+        assert list(s._type_idx) == [0, 1, 1, 2]
+
+    def test_objects(self):
+        big = 2 ** 60 + 1
+        s = _UsageStore()
+        s.append(True, maximum=big)
+        s.append(None, maximum='x')
+        assert s.get(0) == (True, big, None, None)
+        assert type(s.get(0)[0]) is bool
+        assert s.get(1) == (None, 'x', None, None)
+        assert list(s.values) == [1.0, 0.0]
+
+    def test_has_maximums(self):
+        s = _UsageStore()
+        assert s.has_maximums() is False
+        s.append(1, maximum=0)
+        assert s.has_maximums() is False
+        s.append(1, maximum=3)
+        assert s.has_maximums() is True
+
+
+class TestUsageView(object):
+
+    def setup(self):
+        self.mock_limit = Mock(spec_set=AwsLimit)
+        type(self.mock_limit).name = 'lname'
+        self.store = _UsageStore()
+        for x in range(4):
+            self.store.append(x, resource_id='r%d' % x)
+        self.cls = _UsageView(self.mock_limit, self.store)
+
+    def test_sequence(self):
+        assert len(self.cls) == 4
+        assert self.cls[1].resource_id == 'r1'
+        assert self.cls[-1].resource_id == 'r3'
+        assert [u.get_value() for u in self.cls[1:3]] == [1, 2]
+        assert [u.resource_id for u in self.cls] == ['r0', 'r1', 'r2', 'r3']
+        assert max(self.cls).resource_id == 'r3'
+        assert self.cls[0].limit is self.mock_limit
+        with pytest.raises(IndexError):
+            self.cls[4]
+        with pytest.raises(IndexError):
+            self.cls[-5]
+
+    def test_eq(self):
+        assert self.cls == [
+            AwsLimitUsage(self.mock_limit, x) for x in range(4)
+        ]
+        assert self.cls != [AwsLimitUsage(self.mock_limit, 0)]
+        assert self.cls != 3
+        assert _UsageView(self.mock_limit, _UsageStore()) == []
+
+    def test_repr(self):
+        assert repr(self.cls) == '<_UsageView of 4 usages for lname>'
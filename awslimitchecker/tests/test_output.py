@@ -0,0 +1,211 @@
+"""
+awslimitchecker/tests/test_output.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import json
+import pytest
+from io import StringIO
+from awslimitchecker.output import (
+    RECORD_FIELDS, limit_records, usage_records, threshold_records,
+    skipped_records, get_record_writer, JsonRecordWriter, NdjsonRecordWriter,
+    CsvRecordWriter
+)
+from .support import sample_limits, sample_limits_api
+
+
+class TestRecords(object):
+
+    def test_limit_records(self):
+        lim = sample_limits_api()['SvcFoo']['zzz limit4']
+        res = list(limit_records('SvcFoo', lim))
+        assert res == [{
+            'type': 'limit',
+            'service': 'SvcFoo',
+            'limit': 'zzz limit4',
+            'limit_value': 34,
+            'limit_source': 'api',
+            'default_limit': 4,
+            'resource_id': None,
+            'aws_type': None,
+            'value': None,
+            'maximum': None,
+            'status': None
+        }]
+        assert sorted(res[0].keys()) == sorted(RECORD_FIELDS)
+
+    def test_limit_records_resource_limits(self):
+        lim = sample_limits_api()['SvcFoo']['limit with usage maximums']
+        lim._add_current_usage(
+            2, maximum=20, aws_type='res_type', resource_id='res2'
+        )
+        res = list(limit_records('SvcFoo', lim))
+        assert [
+            (r['resource_id'], r['aws_type'], r['limit_value'],
+             r['limit_source'], r['value'], r['maximum'])
+            for r in res
+        ] == [
+            ('res_id', 'res_type', 10, 'api', 1, 10),
+            ('res2', 'res_type', 20, 'api', 2, 20)
+        ]
+
+    def test_usage_records(self):
+        lim = sample_limits()['SvcFoo']['foo limit3']
+        for idx, val in enumerate([5, 1, 3]):
+            lim._add_current_usage(
+                val, resource_id='r%d' % idx, aws_type='AWS::Foo'
+            )
+        res = list(usage_records('SvcFoo', lim))
+        assert [(r['resource_id'], r['value']) for r in res] == [
+            ('r1', 1), ('r2', 3), ('r0', 5)
+        ]
+        assert res[0]['type'] == 'usage'
+        assert res[0]['limit_value'] == 10
+        assert res[0]['limit_source'] == 'ta'
+        assert res[0]['aws_type'] == 'AWS::Foo'
+        res = list(usage_records('SvcFoo', lim, top_k=2))
+        assert [(r['resource_id'], r['value']) for r in res] == [
+            ('r2', 3), ('r0', 5)
+        ]
+
+    def test_usage_records_no_usage(self):
+        lim = sample_limits()['SvcBar']['bar limit2']
+        res = list(usage_records('SvcBar', lim))
+        assert len(res) == 1
+        assert res[0]['value'] is None
+        assert res[0]['limit_value'] == 99
+        assert res[0]['limit_source'] == 'override'
+
+    def test_threshold_records(self):
+        lim = sample_limits()['SvcFoo']['foo limit3']
+        lim.set_threshold_override(
+            warn_percent=50, crit_percent=80
+        )
+        for idx, val in enumerate([9, 1, 6, 8]):
+            lim._add_current_usage(val, resource_id='r%d' % idx)
+        lim.check_thresholds()
+        res = list(threshold_records('SvcFoo', lim))
+        assert [(r['status'], r['resource_id'], r['value']) for r in res] == [
+            ('critical', 'r3', 8),
+            ('critical', 'r0', 9),
+            ('warning', 'r2', 6)
+        ]
+        assert set(r['type'] for r in res) == {'threshold'}
+        res = list(threshold_records('SvcFoo', lim, top_k=1))
+        assert [(r['status'], r['resource_id']) for r in res] == [
+            ('critical', 'r0'),
+            ('warning', 'r2')
+        ]
+
+    def test_skipped_records(self):
+        lim = sample_limits()['SvcFoo']['foo limit3']
+        lim._set_skipped('k skipped')
+        res = list(skipped_records('SvcFoo', lim))
+        assert len(res) == 1
+        assert res[0]['type'] == 'threshold'
+        assert res[0]['status'] == 'skipped'
+        assert res[0]['limit'] == 'foo limit3'
+        assert res[0]['value'] is None
+        assert sorted(res[0].keys()) == sorted(RECORD_FIELDS)
+
+
+class TestRecordWriters(object):
+
+    def setup(self):
+        self.recs = [
+            dict((k, None) for k in RECORD_FIELDS),
+            dict((k, None) for k in RECORD_FIELDS)
+        ]
+        self.recs[0].update(type='limit', service='S1', limit='L1', value=1)
+        self.recs[1].update(type='limit', service='S1', limit='L,2', value=2.5)
+
+    def test_ndjson(self):
+        stream = StringIO()
+        w = NdjsonRecordWriter(stream=stream)
+        w.write(self.recs[0])
+        assert stream.getvalue() == json.dumps(
+            self.recs[0], sort_keys=True
+        ) + '\n'
+        w.write_all(self.recs[1:])
+        w.close()
+        lines = stream.getvalue().splitlines()
+        assert [json.loads(x) for x in lines] == self.recs
+
+    def test_json(self):
+        stream = StringIO()
+        w = JsonRecordWriter(stream=stream)
+        w.write_all(self.recs)
+        w.close()
+        assert stream.getvalue().startswith('[\n{')
+        assert json.loads(stream.getvalue()) == self.recs
+
+    def test_json_empty(self):
+        stream = StringIO()
+        w = JsonRecordWriter(stream=stream)
+        w.close()
+        assert stream.getvalue() == '[]\n'
+        assert json.loads(stream.getvalue()) == []
+
+    def test_csv(self):
+        stream = StringIO()
+        w = CsvRecordWriter(stream=stream)
+        w.write_all(self.recs)
+        w.close()
+        assert stream.getvalue() == \
+            ','.join(RECORD_FIELDS) + '\n' \
+            'limit,S1,L1,,,,,,1,,\n' \
+            'limit,S1,"L,2",,,,,,2.5,,\n'
+
+    def test_get_record_writer(self):
+        stream = StringIO()
+        assert isinstance(
+            get_record_writer('json', stream=stream), JsonRecordWriter
+        )
+        assert isinstance(
+            get_record_writer('ndjson', stream=stream), NdjsonRecordWriter
+        )
+        assert isinstance(
+            get_record_writer('csv', stream=stream), CsvRecordWriter
+        )
+        with pytest.raises(ValueError):
+            get_record_writer('text', stream=stream)
+
+    def test_csv_fields(self):
+        stream = StringIO()
+        w = get_record_writer('csv', stream=stream, fields=['a', 'b'])
+        w.write_all([{'a': 1, 'b': None}])
+        assert stream.getvalue() == 'a,b\n1,\n'
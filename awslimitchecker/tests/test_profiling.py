@@ -0,0 +1,112 @@
+"""
+awslimitchecker/tests/test_profiling.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import os
+import pstats
+import tracemalloc
+from io import StringIO
+
+from awslimitchecker.profiling import CpuProfiler, MemoryProfiler
+
+
+def allocate(count):
+    return [str(x) * 10 for x in range(count)]
+
+
+class TestCpuProfiler(object):
+
+    def test_profile(self, tmpdir):
+        path = str(tmpdir.join('prof'))
+        prof = CpuProfiler(path)
+        with prof.profile('SvcFoo'):
+            allocate(10)
+        with prof.profile('Svc Bar/baz'):
+            allocate(10)
+        assert list(prof.paths.keys()) == ['SvcFoo', 'Svc Bar/baz']
+        assert prof.paths['Svc Bar/baz'] == path + '.Svc_Bar_baz'
+        assert not os.path.exists(path)
+        prof.close()
+        for p in [path, path + '.SvcFoo', path + '.Svc_Bar_baz']:
+            stats = pstats.Stats(p)
+            assert any(
+                func[2] == 'allocate' for func in stats.stats.keys()
+            )
+
+    def test_close_nothing_profiled(self, tmpdir):
+        path = str(tmpdir.join('prof'))
+        CpuProfiler(path).close()
+        assert not os.path.exists(path)
+
+
+class TestMemoryProfiler(object):
+
+    def test_profile(self):
+        prof = MemoryProfiler(top=2)
+        with prof.profile('SvcFoo'):
+            keep = allocate(10000)
+        assert tracemalloc.is_tracing()
+        with prof.profile('SvcBar'):
+            pass
+        prof.close()
+        assert not tracemalloc.is_tracing()
+        assert list(prof.results.keys()) == ['SvcFoo', 'SvcBar']
+        peak, stats = prof.results['SvcFoo']
+        assert peak > 10000 * 10
+        assert 1 <= len(stats) <= 2
+        assert stats[0].traceback[0].filename == __file__
+        out = StringIO()
+        prof.report(stream=out)
+        lines = out.getvalue().splitlines()
+        assert lines[0].startswith('SvcFoo: peak ')
+        assert lines[1].endswith('%s:%d' % (
+            __file__, stats[0].traceback[0].lineno
+        ))
+        assert 'SvcBar: peak ' in out.getvalue()
+        del keep
+
+    def test_already_tracing(self):
+        tracemalloc.start()
+        try:
+            prof = MemoryProfiler()
+            with prof.profile('SvcFoo'):
+                pass
+            prof.close()
+            assert tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
@@ -0,0 +1,232 @@
+"""
+awslimitchecker/tests/test_result.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import pytest
+from types import MappingProxyType
+from awslimitchecker.limit import SOURCE_DEFAULT, SOURCE_OVERRIDE
+from awslimitchecker.result import CheckResult, LimitResult
+from .support import checked_limit
+
+
+class TestLimitResult(object):
+
+    def test_from_limit(self):
+        lim = checked_limit()
+        res = LimitResult.from_limit(lim)
+        assert res.service is lim.service
+        assert res.service_name == 'SvcName'
+        assert res.name == 'lname'
+        assert res.limit == 10
+        assert res.get_limit() == 10
+        assert res.source == SOURCE_DEFAULT
+        assert res.get_limit_source() == SOURCE_DEFAULT
+        assert res.default_limit == 10
+        assert res.thresholds == (None, 80, None, 99)
+        assert res.has_resource_limits is False
+        assert res.get_current_usage() == lim.get_current_usage()
+        assert res.get_warnings() == (lim.get_current_usage()[1],)
+        assert res.get_criticals() == ()
+        assert res.get_max_usage() == 9
+        assert res.get_current_usage_str() == 'max: r1=9 (r0=1, r1=9)'
+        assert res.get_current_usage_str(top_k=1) == \
+            'max: r1=9 (top 1 of 2: r1=9)'
+        assert res.get_skipped() is None
+
+    def test_skipped(self):
+        lim = checked_limit(usages=())
+        lim._set_skipped('k skipped')
+        res = LimitResult.from_limit(lim)
+        lim._reset_usage()
+        assert res.skipped == 'k skipped'
+        assert res.get_skipped() == 'k skipped'
+
+    def test_override(self):
+        res = LimitResult.from_limit(checked_limit(override=20))
+        assert res.get_limit() == 20
+        assert res.get_limit_source() == SOURCE_OVERRIDE
+        assert res.default_limit == 10
+        assert res.get_warnings() == ()
+
+    def test_no_usage(self):
+        res = LimitResult.from_limit(checked_limit(usages=()))
+        assert res.get_max_usage() is None
+        assert res.get_current_usage_str() == '<unknown>'
+
+    def test_unaffected_by_limit_changes(self):
+        lim = checked_limit()
+        res = LimitResult.from_limit(lim)
+        lim._reset_usage()
+        lim._add_current_usage(3)
+        lim.set_limit_override(50)
+        lim.check_thresholds()
+        assert res.get_limit() == 10
+        assert res.get_max_usage() == 9
+        assert len(res.get_current_usage()) == 2
+        assert len(res.get_warnings()) == 1
+
+    def test_unaffected_by_events(self):
+        lim = checked_limit(usages=(3, 5))
+        res = LimitResult.from_limit(lim)
+        lim._adjust_current_usage(4, resource_id='r0')
+        lim._remove_current_usage('r1')
+        lim._adjust_current_usage(1, resource_id='r2')
+        assert [
+            (u.resource_id, u.get_value()) for u in lim.get_current_usage()
+        ] == [('r0', 7), ('r2', 1)]
+        assert [
+            (u.resource_id, u.get_value()) for u in res.get_current_usage()
+        ] == [('r0', 3), ('r1', 5)]
+        assert res.get_max_usage() == 5
+
+    def test_immutable(self):
+        res = LimitResult.from_limit(checked_limit())
+        with pytest.raises(AttributeError):
+            res.limit = 5
+        with pytest.raises(AttributeError):
+            res.foo = 'bar'
+
+
+class TestCheckResult(object):
+
+    def setup(self):
+        self.lim1 = LimitResult.from_limit(checked_limit(name='l1'))
+        self.lim2 = LimitResult.from_limit(checked_limit(name='l2'))
+        self.lim3 = LimitResult.from_limit(checked_limit(name='l3'))
+        self.cls = CheckResult(
+            {
+                'S1': {'l1': self.lim1, 'l2': self.lim2},
+                'S2': {'l3': self.lim3}
+            },
+            {'S1': ['l2'], 'S2': []},
+            timings={'S1': 1.5, 'S2': 0.5},
+            duration=2.25
+        )
+
+    def test_mapping(self):
+        assert self.cls == {'S1': {'l2': self.lim2}}
+        assert len(self.cls) == 1
+        assert list(self.cls) == ['S1']
+        assert self.cls['S1']['l2'] is self.lim2
+        assert 'S2' not in self.cls
+        assert dict(self.cls.items()) == {'S1': {'l2': self.lim2}}
+        assert self.cls.problems == {'S1': {'l2': self.lim2}}
+
+    def test_limits(self):
+        assert self.cls.limits == {
+            'S1': {'l1': self.lim1, 'l2': self.lim2},
+            'S2': {'l3': self.lim3}
+        }
+        assert self.cls.limits['S1']['l2'] is self.cls['S1']['l2']
+
+    def test_timings(self):
+        assert self.cls.timings == {'S1': 1.5, 'S2': 0.5}
+        assert self.cls.duration == 2.25
+
+    def test_skipped(self):
+        assert self.cls.skipped == {}
+        lim = checked_limit(name='l4', usages=())
+        lim._set_skipped('k skipped')
+        lim4 = LimitResult.from_limit(lim)
+        cls = CheckResult(
+            {'S1': {'l1': self.lim1}, 'S2': {'l3': self.lim3, 'l4': lim4}},
+            {}
+        )
+        assert cls.skipped == {'S2': {'l4': lim4}}
+        assert cls.skipped is cls.skipped
+        assert cls == {}
+        with pytest.raises(TypeError):
+            cls.skipped['S2']['l5'] = lim4
+
+    def test_defaults(self):
+        cls = CheckResult({}, {})
+        assert cls == {}
+        assert cls.limits == {}
+        assert cls.timings == {}
+        assert cls.duration is None
+
+    def test_read_only(self):
+        assert isinstance(self.cls.limits, MappingProxyType)
+        assert isinstance(self.cls.limits['S1'], MappingProxyType)
+        assert isinstance(self.cls['S1'], MappingProxyType)
+        assert isinstance(self.cls.timings, MappingProxyType)
+        with pytest.raises(TypeError):
+            self.cls['S3'] = {}
+        with pytest.raises(TypeError):
+            self.cls.limits['S1']['l4'] = self.lim1
+        with pytest.raises(TypeError):
+            self.cls['S1']['l1'] = self.lim1
+        with pytest.raises(AttributeError):
+            self.cls.foo = 'bar'
+
+    def test_copies_input(self):
+        limits = {'S1': {'l1': self.lim1}}
+        cls = CheckResult(limits, {'S1': ['l1']})
+        limits['S1']['l2'] = self.lim2
+        limits['S2'] = {}
+        assert cls.limits == {'S1': {'l1': self.lim1}}
+
+    def test_combine(self):
+        other = CheckResult(
+            {'S3': {'l1': self.lim1}},
+            {'S3': ['l1']},
+            timings={'S3': 0.25},
+            duration=0.25
+        )
+        res = CheckResult.combine([self.cls, other])
+        assert res == {'S1': {'l2': self.lim2}, 'S3': {'l1': self.lim1}}
+        assert res.limits == {
+            'S1': {'l1': self.lim1, 'l2': self.lim2},
+            'S2': {'l3': self.lim3},
+            'S3': {'l1': self.lim1}
+        }
+        assert res.timings == {'S1': 1.5, 'S2': 0.5, 'S3': 0.25}
+        assert res.duration == 2.5
+        assert CheckResult.combine([other], duration=9).duration == 9
+        res = CheckResult.combine([other], timings={'TrustedAdvisor': 3.0})
+        assert res.timings == {'TrustedAdvisor': 3.0, 'S3': 0.25}
+
+    def test_combine_empty(self):
+        res = CheckResult.combine([])
+        assert res == {}
+        assert res.limits == {}
+        assert res.duration == 0.0
+
+    def test_repr(self):
+        assert repr(self.cls) == '<CheckResult of 3 limits in 2 services; ' \
+                                 '1 with problems>'
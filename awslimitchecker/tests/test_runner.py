@@ -48,7 +48,11 @@ from freezegun import freeze_time
 from awslimitchecker.runner import Runner, console_entry_point
 from awslimitchecker.checker import AwsLimitChecker
 from awslimitchecker.limit import AwsLimit, AwsLimitUsage
-from awslimitchecker.utils import StoreKeyValuePair
+from awslimitchecker.result import CheckResult, LimitResult
+from awslimitchecker.history import HistoryPoint
+from awslimitchecker.snapshot import FleetRollup, SnapshotLimit, SnapshotHeader
+from awslimitchecker.services.base import UsageStep
+from awslimitchecker.utils import StoreKeyValuePair, usage_detail
 from .support import sample_limits, sample_limits_api
 
 # https://code.google.com/p/mock/issues/detail?id=249
@@ -57,9 +61,36 @@ if (
         sys.version_info[0] < 3 or
         sys.version_info[0] == 3 and sys.version_info[1] < 4
 ):
-    from mock import patch, call, Mock, mock_open, PropertyMock
+    from mock import (
+        patch, call, Mock, MagicMock, mock_open, PropertyMock, DEFAULT
+    )
 else:
-    from unittest.mock import patch, call, Mock, mock_open, PropertyMock
+    from unittest.mock import (
+        patch, call, Mock, MagicMock, mock_open, PropertyMock, DEFAULT
+    )
+
+
+def check_result(limits):
+    return CheckResult(
+        dict(
+            (svc, dict(
+                (name, LimitResult.from_limit(lim))
+                for name, lim in lims.items()
+            ))
+            for svc, lims in limits.items()
+        ),
+        {}
+    )
+
+
+def problem_result(problems):
+    for lims in problems.values():
+        for lim in lims.values():
+            lim.get_skipped.return_value = None
+    return CheckResult(
+        problems,
+        dict((svc, list(lims.keys())) for svc, lims in problems.items())
+    )
 
 
 def red(s):
@@ -106,6 +137,8 @@ class TestInit(RunnerTester):
         assert self.cls.skip_ta is False
         assert self.cls.service_name is None
         assert len(self.cls.skip_check) == 0
+        assert self.cls.limit_selection is None
+        assert self.cls.usage_top_k is None
 
 
 class TestParseArgs(RunnerTester):
@@ -128,6 +161,29 @@ class TestParseArgs(RunnerTester):
         assert res.role_partition == 'aws'
         assert res.ta_api_region == 'us-east-1'
         assert res.skip_quotas is False
+        assert res.record_history is False
+        assert res.history is None
+        assert res.history_days == 7
+        assert res.history_file is None
+        assert res.record_dir is None
+        assert res.replay_dir is None
+        assert res.replay_latency is False
+        assert res.profile_cpu is None
+        assert res.profile_mem is False
+        assert res.only_limit == []
+        assert res.plan is False
+        assert res.event_queue is None
+        assert res.reconcile_minutes == 60
+        assert res.export_snapshot is None
+        assert res.fleet_report == []
+        assert res.fleet_top == 10
+        assert res.queue is None
+        assert res.enqueue is False
+        assert res.fleet_accounts == []
+        assert res.fleet_regions == []
+        assert res.worker is False
+        assert res.lease_seconds == 900
+        assert res.aggregate is False
 
     def test_parser(self):
         argv = ['-V']
@@ -159,6 +215,17 @@ class TestParseArgs(RunnerTester):
                                 dest='skip_check', default=[],
                                 help='avoid performing actions for the '
                                      'specified check name'),
+            call().add_argument('--only-limit', action='append', default=[],
+                                dest='only_limit', metavar='SERVICE/LIMIT',
+                                help='find usage for and check only the '
+                                     'specified limit, making only the API '
+                                     'calls it needs; may be specified '
+                                     'multiple times'),
+            call().add_argument('--plan', action='store_true', default=False,
+                                help='print the usage collection steps and '
+                                     'API calls that checking the selected '
+                                     'services or limits would make, and '
+                                     'exit'),
             call().add_argument('-s', '--list-services',
                                 default=False, action='store_true',
                                 help='print a list of all AWS service types '
@@ -191,6 +258,22 @@ class TestParseArgs(RunnerTester):
                                 default=False,
                                 help='find and print the current usage of '
                                 'all AWS services with known limits'),
+            call().add_argument('--usage-detail', action='store',
+                                type=usage_detail, default=None,
+                                metavar='full|topk=N',
+                                help='how many per-resource usage values to '
+                                'print for each limit with --show-usage or '
+                                'when thresholds are crossed; "full" (the '
+                                'default) prints all of them, "topk=N" prints '
+                                'only the N highest'),
+            call().add_argument('--output-format', action='store',
+                                choices=['text', 'json', 'ndjson', 'csv'],
+                                default='text',
+                                help='output format for --list-limits, '
+                                '--show-usage and threshold checks; "json", '
+                                '"ndjson" and "csv" write one record per '
+                                'limit or usage, as each service finishes '
+                                '(default: text)'),
             call().add_argument('--iam-policy', action='store_true',
                                 default=False,
                                 help='output a JSON serialized IAM Policy '
@@ -325,6 +408,125 @@ class TestParseArgs(RunnerTester):
                                      'alert provider constructor. See '
                                      'documentation for further information.'
                                 ),
+            call().add_argument('--record-history', dest='record_history',
+                                action='store_true', default=False,
+                                help='after checking thresholds, record '
+                                     'limits and usage to the local history '
+                                     'store'),
+            call().add_argument('--history', dest='history', action='store',
+                                nargs='?', const='', default=None,
+                                metavar='SERVICE[/LIMIT]',
+                                help='show recorded usage history (optionally '
+                                     'only for one service or limit) and '
+                                     'exit'),
+            call().add_argument('--history-days', dest='history_days',
+                                type=int, action='store', default=7,
+                                help='number of days of history to show with '
+                                     '--history (default: 7)'),
+            call().add_argument('--history-file', dest='history_file',
+                                type=str, action='store', default=None,
+                                help='path to the history store SQLite '
+                                     'database (default: history.sqlite in '
+                                     'the cache directory)'),
+            call().add_mutually_exclusive_group(),
+            call().add_mutually_exclusive_group().add_argument(
+                '--record', dest='record_dir', type=str, action='store',
+                default=None, metavar='DIR',
+                help='record all AWS API requests and responses to a '
+                     'cassette in DIR, with secrets removed'),
+            call().add_mutually_exclusive_group().add_argument(
+                '--replay', dest='replay_dir', type=str, action='store',
+                default=None, metavar='DIR',
+                help='replay AWS API responses from a cassette recorded in '
+                     'DIR with --record, instead of connecting to AWS'),
+            call().add_argument('--replay-latency', dest='replay_latency',
+                                action='store_true', default=False,
+                                help='with --replay, wait for the recorded '
+                                     'duration of each request before '
+                                     'returning its response'),
+            call().add_argument('--profile-cpu', dest='profile_cpu', type=str,
+                                action='store', default=None, metavar='FILE',
+                                help='profile CPU use while checking; write '
+                                     'pstats files for each service to '
+                                     'FILE.<service> and combined statistics '
+                                     'to FILE'),
+            call().add_argument('--profile-mem', dest='profile_mem',
+                                action='store_true', default=False,
+                                help='profile memory use while checking; '
+                                     'print peak memory and top allocation '
+                                     'sites for each service to STDERR'),
+            call().add_argument('--event-queue', dest='event_queue', type=str,
+                                action='store', default=None,
+                                metavar='QUEUE_URL',
+                                help='run continuously; find usage once, '
+                                     'then keep it up to date from '
+                                     'CloudTrail events delivered to the SQS '
+                                     'queue QUEUE_URL, checking thresholds '
+                                     'after each change'),
+            call().add_argument('--reconcile-minutes',
+                                dest='reconcile_minutes', type=int,
+                                action='store', default=60,
+                                help='with --event-queue, find usage for all '
+                                     'services again every this many minutes '
+                                     '(default: 60)'),
+            call().add_argument('--export-snapshot', dest='export_snapshot',
+                                type=str, action='store', default=None,
+                                metavar='FILE',
+                                help='after checking thresholds, write all '
+                                     'limits, thresholds and usage to a '
+                                     'snapshot FILE'),
+            call().add_argument('--fleet-report', dest='fleet_report',
+                                type=str, action='append', default=[],
+                                metavar='FILE',
+                                help='combine snapshot FILE(s) written with '
+                                     '--export-snapshot, show fleet-wide '
+                                     'limit utilization and exit; may be '
+                                     'repeated'),
+            call().add_argument('--fleet-top', dest='fleet_top', type=int,
+                                action='store', default=10,
+                                help='with --fleet-report or --aggregate, '
+                                     'number of limits closest to '
+                                     'exhaustion to show (default: 10)'),
+            call().add_argument('--queue', dest='queue', type=str,
+                                action='store', default=None, metavar='URL',
+                                help='work queue for distributed checking: '
+                                     'a directory (possibly on a shared '
+                                     'filesystem) or a redis:// URL; use '
+                                     'with --enqueue, --worker or '
+                                     '--aggregate'),
+            call().add_argument('--enqueue', dest='enqueue',
+                                action='store_true', default=False,
+                                help='with --queue, enqueue one work item '
+                                     'per account, region and service, and '
+                                     'exit'),
+            call().add_argument('--fleet-account', dest='fleet_accounts',
+                                type=str, action='append', default=[],
+                                metavar='ACCOUNT_ID',
+                                help='with --enqueue, account to check '
+                                     '(assuming --sts-account-role in it); '
+                                     'may be repeated. Defaults to the '
+                                     'account of the workers\' credentials'),
+            call().add_argument('--fleet-region', dest='fleet_regions',
+                                type=str, action='append', default=[],
+                                metavar='REGION',
+                                help='with --enqueue, region to check; may '
+                                     'be repeated. Defaults to the current '
+                                     'region'),
+            call().add_argument('--worker', dest='worker',
+                                action='store_true', default=False,
+                                help='with --queue, check work items from '
+                                     'the queue until it is empty, and exit'),
+            call().add_argument('--lease-seconds', dest='lease_seconds',
+                                type=int, action='store', default=900,
+                                help='with --worker, seconds to lease each '
+                                     'work item for before another worker '
+                                     'may take it over (default: 900)'),
+            call().add_argument('--aggregate', dest='aggregate',
+                                action='store_true', default=False,
+                                help='with --queue, requeue expired leases, '
+                                     'show progress, per-worker throughput '
+                                     'and fleet-wide limit utilization of '
+                                     'the results so far, and exit'),
             call().parse_args(argv)
         ]
 
@@ -394,6 +596,31 @@ class TestParseArgs(RunnerTester):
             'EC2/Running On-Demand c5.9xlarge instances',
         ]
 
+    def test_usage_detail(self):
+        assert self.cls.parse_args([]).usage_detail is None
+        res = self.cls.parse_args(['--usage-detail', 'full'])
+        assert res.usage_detail is None
+        res = self.cls.parse_args(['--usage-detail=topk=3'])
+        assert res.usage_detail == 3
+
+    def test_usage_detail_invalid(self, capsys):
+        with pytest.raises(SystemExit) as excinfo:
+            self.cls.parse_args(['--usage-detail', 'topk=none'])
+        assert excinfo.value.code == 2
+        out, err = capsys.readouterr()
+        assert 'must be "full" or "topk=N"' in err
+
+    def test_output_format(self):
+        res = self.cls.parse_args([])
+        assert res.output_format == 'text'
+        res = self.cls.parse_args(['--output-format=ndjson'])
+        assert res.output_format == 'ndjson'
+
+    def test_output_format_invalid(self, capsys):
+        with pytest.raises(SystemExit) as excinfo:
+            self.cls.parse_args(['--output-format', 'xml'])
+        assert excinfo.value.code == 2
+
     def test_list_metrics_providers(self):
         res = self.cls.parse_args(['--list-metrics-providers'])
         assert res.list_metrics_providers is True
@@ -430,6 +657,350 @@ class TestParseArgs(RunnerTester):
         assert res.ta_api_region == 'bar'
 
 
+class TestHistory(RunnerTester):
+
+    def point(self, resource_id=None):
+        return HistoryPoint(
+            account_id='1234', region='rname', service='SvcFoo',
+            limit='foo limit3', resource_id=resource_id,
+            timestamp=1481884842, resolution=0, usage=2.5, max_usage=3,
+            limit_value=10, samples=1
+        )
+
+    def test_parse_args(self):
+        res = self.cls.parse_args([
+            '--history', 'SvcFoo/foo limit3', '--history-days=3',
+            '--history-file=/foo', '--record-history'
+        ])
+        assert res.history == 'SvcFoo/foo limit3'
+        assert res.history_days == 3
+        assert res.history_file == '/foo'
+        assert res.record_history is True
+        assert self.cls.parse_args(['--history']).history == ''
+
+    @freeze_time("2016-12-16 10:40:42", tz_offset=0)
+    def test_show_history(self, capsys):
+        with patch('%s.HistoryStore' % pb, autospec=True) as mock_hs:
+            store = mock_hs.return_value.__enter__.return_value
+            store.query.return_value = [
+                self.point(), self.point(resource_id='r1')
+            ]
+            self.cls.show_history('SvcFoo/foo limit3', 2, path='/foo')
+        assert mock_hs.mock_calls[0] == call('/foo')
+        assert store.query.mock_calls == [
+            call(service='SvcFoo', limit='foo limit3',
+                 start=1481884842 - 172800)
+        ]
+        out, err = capsys.readouterr()
+        assert out == '2016-12-16T10:40:42Z 1234 rname SvcFoo/foo limit3 ' \
+                      'usage=2.5 max=3 limit=10\n' \
+                      '2016-12-16T10:40:42Z 1234 rname SvcFoo/foo limit3 ' \
+                      '(r1) usage=2.5 max=3 limit=10\n'
+
+    def test_show_history_service_ndjson(self, capsys):
+        self.cls.output_format = 'ndjson'
+        with patch('%s.HistoryStore' % pb, autospec=True) as mock_hs:
+            store = mock_hs.return_value.__enter__.return_value
+            store.query.return_value = [self.point()]
+            self.cls.show_history('SvcFoo', 7)
+        assert mock_hs.mock_calls[0] == call(None)
+        assert store.query.mock_calls[0][2]['service'] == 'SvcFoo'
+        assert store.query.mock_calls[0][2]['limit'] is None
+        out, err = capsys.readouterr()
+        assert json.loads(out) == dict(self.point()._asdict())
+
+    def test_record_history(self):
+        self.cls.checker = Mock(account_id=None, region_name='rname')
+        mock_res = Mock()
+        with patch('%s.HistoryStore' % pb, autospec=True) as mock_hs:
+            store = mock_hs.return_value.__enter__.return_value
+            store.record.return_value = 3
+            self.cls.record_history(mock_res, path='/foo')
+        assert mock_hs.mock_calls[0] == call('/foo')
+        assert store.mock_calls == [
+            call.record(mock_res, account_id=None, region='rname'),
+            call.compact()
+        ]
+
+
+class TestSnapshots(RunnerTester):
+
+    def rollup(self):
+        rollup = FleetRollup(top=2)
+        for acct, pct, state in [
+            ('1', 95.0, 'critical'), ('2', 40.0, 'ok'), ('3', None, 'ok')
+        ]:
+            rollup.add(SnapshotLimit(
+                service='SvcFoo', name='foo', limit=10, source=0,
+                default_limit=10, thresholds=(None, 80, None, 99), usage=[],
+                state=state, utilization=pct
+            ), header=SnapshotHeader(
+                version=1, account_id=acct, region='rname', timestamp=1,
+                awslimitchecker='1.2.3'
+            ))
+        rollup.add(SnapshotLimit(
+            service='SvcBar', name='bar', limit=None, source=0,
+            default_limit=None, thresholds=(None, 80, None, 99), usage=[],
+            state='ok', utilization=None
+        ))
+        rollup.snapshots = 3
+        return rollup
+
+    def test_parse_args(self):
+        res = self.cls.parse_args([
+            '--export-snapshot=/foo', '--fleet-report=/a',
+            '--fleet-report', '/b', '--fleet-top=3'
+        ])
+        assert res.export_snapshot == '/foo'
+        assert res.fleet_report == ['/a', '/b']
+        assert res.fleet_top == 3
+
+    def test_export_snapshot(self):
+        self.cls.checker = Mock(spec_set=AwsLimitChecker)
+        self.cls.checker.export_snapshot.return_value = 3
+        self.cls.export_snapshot('res', '/foo')
+        assert self.cls.checker.mock_calls == [
+            call.export_snapshot('/foo', result='res')
+        ]
+
+    def test_fleet_report(self, capsys):
+        with patch('%s.FleetRollup' % pb, autospec=True) as m_rollup:
+            m_rollup.return_value = self.rollup()
+            with patch.object(FleetRollup, 'add_snapshot') as m_add:
+                self.cls.fleet_report(['/a', '/b'], 2)
+        assert m_rollup.mock_calls == [call(top=2)]
+        assert m_add.mock_calls == [call('/a'), call('/b')]
+        out, err = capsys.readouterr()
+        assert out == 'Limits in 3 snapshots by state: ok=3 warning=0 ' \
+                      'critical=1\n' \
+                      '\nLimits closest to exhaustion:\n' \
+                      '1 rname SvcFoo/foo 95.0% of 10 (critical)\n' \
+                      '2 rname SvcFoo/foo 40.0% of 10 (ok)\n' \
+                      '\nUtilization by limit:\n' \
+                      'SvcBar/bar  ok=1 warning=0 critical=0\n' \
+                      'SvcFoo/foo  ok=2 warning=0 critical=1 max=95.0% ' \
+                      'p50=40.1% p90=95.0% p99=95.0%\n\n'
+
+    def test_fleet_report_csv(self, capsys):
+        self.cls.output_format = 'csv'
+        with patch('%s.FleetRollup' % pb, autospec=True) as m_rollup:
+            m_rollup.return_value = self.rollup()
+            with patch.object(FleetRollup, 'add_snapshot'):
+                self.cls.fleet_report(['/a'], 2)
+        out, err = capsys.readouterr()
+        lines = out.splitlines()
+        assert lines[0] == 'type,account_id,region,service,limit,' \
+                           'utilization,state,limit_value,count,ok,warning,' \
+                           'critical,max,p50,p90,p99'
+        assert lines[1] == 'top,1,rname,SvcFoo,foo,95.0,critical,10,,,,,,,,'
+        assert lines[4] == 'limit,,,SvcFoo,foo,,,,3,2,0,1,95.0,40.1,95.0,95.0'
+        assert len(lines) == 5
+
+
+class TestDistributed(RunnerTester):
+
+    def test_parse_args(self):
+        res = self.cls.parse_args([
+            '--queue=/q', '--enqueue', '--fleet-account=123',
+            '--fleet-account', '456', '--fleet-region=us-east-1',
+            '--worker', '--lease-seconds=60', '--aggregate'
+        ])
+        assert res.queue == '/q'
+        assert res.enqueue is True
+        assert res.fleet_accounts == ['123', '456']
+        assert res.fleet_regions == ['us-east-1']
+        assert res.worker is True
+        assert res.lease_seconds == 60
+        assert res.aggregate is True
+
+    def test_enqueue(self, capsys):
+        self.cls.checker = Mock(spec_set=AwsLimitChecker)
+        self.cls.service_name = ['EC2', 'AutoScaling']
+        with patch.multiple(
+            pb,
+            get_work_queue=DEFAULT,
+            Coordinator=DEFAULT,
+            autospec=True
+        ) as mocks:
+            mocks['Coordinator'].return_value.enqueue.return_value = 4
+            self.cls.enqueue('/q', ['123'], ['r1', 'r2'])
+        assert mocks['get_work_queue'].mock_calls == [call('/q')]
+        assert mocks['Coordinator'].mock_calls == [
+            call(
+                mocks['get_work_queue'].return_value, ['123'], ['r1', 'r2'],
+                services=['AutoScaling', 'EC2']
+            ),
+            call().enqueue()
+        ]
+        out, err = capsys.readouterr()
+        assert out == 'Enqueued 4 work items\n'
+
+    def test_enqueue_defaults(self, capsys):
+        self.cls.checker = Mock(spec_set=AwsLimitChecker)
+        type(self.cls.checker).region_name = 'rname'
+        self.cls.checker.get_service_names.return_value = ['EC2']
+        with patch.multiple(
+            pb,
+            get_work_queue=DEFAULT,
+            Coordinator=DEFAULT,
+            autospec=True
+        ) as mocks:
+            mocks['Coordinator'].return_value.enqueue.return_value = 1
+            self.cls.enqueue('/q', [], [])
+        assert mocks['Coordinator'].mock_calls[0] == call(
+            mocks['get_work_queue'].return_value, [None], ['rname'],
+            services=['EC2']
+        )
+
+    def test_run_worker(self):
+        self.cls.skip_ta = True
+        with patch.multiple(
+            pb,
+            get_work_queue=DEFAULT,
+            Worker=DEFAULT,
+            autospec=True
+        ) as mocks:
+            mocks['Worker'].return_value.run.return_value = 2
+            self.cls.run_worker(
+                '/q', 60, {'account_id': '123', 'region': 'r1', 'foo': 'bar'}
+            )
+        assert mocks['Worker'].mock_calls == [
+            call(
+                mocks['get_work_queue'].return_value, lease_seconds=60,
+                checker_kwargs={'foo': 'bar'}, use_ta=False
+            ),
+            call().run()
+        ]
+
+    def test_aggregate(self, capsys):
+        rollup = FleetRollup()
+        res = Mock(
+            item=Mock(item_id='1/r1/EC2'), worker_id='w1', error='Foo: bar'
+        )
+        with patch.multiple(
+            pb,
+            get_work_queue=DEFAULT,
+            Aggregator=DEFAULT,
+            autospec=True
+        ) as mocks:
+            agg = mocks['Aggregator'].return_value
+            agg.collect.return_value = {'pending': 1, 'leased': 2, 'done': 3}
+            agg.rollup = rollup
+            agg.errors = [res]
+            agg.worker_stats.return_value = [
+                Mock(worker_id='w1', items=2, errors=1, busy_seconds=3.0,
+                     items_per_minute=12.0),
+                Mock(worker_id='w2', items=1, errors=0, busy_seconds=1.0,
+                     items_per_minute=None)
+            ]
+            with patch('%s.Runner._print_fleet' % pb, autospec=True) as m_pf:
+                self.cls.aggregate('/q', 4)
+        assert mocks['Aggregator'].mock_calls[0] == call(
+            mocks['get_work_queue'].return_value, top=4
+        )
+        assert m_pf.mock_calls == [call(self.cls, rollup)]
+        out, err = capsys.readouterr()
+        assert out == 'Work items: pending=1 leased=2 done=3\n' \
+                      '\nWorkers:\n' \
+                      'w1  2 items (1 errors) in 3.0s, 12.0 items/minute\n' \
+                      'w2  1 items (0 errors) in 1.0s\n\n' \
+                      'ERROR: 1/r1/EC2 on w1: Foo: bar\n\n'
+
+    def test_aggregate_csv(self, capsys):
+        self.cls.output_format = 'csv'
+        with patch.multiple(
+            pb,
+            get_work_queue=DEFAULT,
+            Aggregator=DEFAULT,
+            autospec=True
+        ) as mocks:
+            mocks['Aggregator'].return_value.rollup = FleetRollup()
+            with patch('%s.Runner._print_fleet' % pb, autospec=True) as m_pf:
+                self.cls.aggregate('/q', 4)
+        assert len(m_pf.mock_calls) == 1
+        out, err = capsys.readouterr()
+        assert out == ''
+
+
+class TestProfiling(RunnerTester):
+
+    def test_none(self):
+        self.cls.checker = Mock()
+        args = argparse.Namespace(profile_cpu=None, profile_mem=False)
+        with self.cls._profiling(args):
+            pass
+        assert self.cls.checker.mock_calls == []
+
+    def test_cpu_and_mem(self):
+        self.cls.checker = MagicMock()
+        args = argparse.Namespace(profile_cpu='/foo', profile_mem=True)
+        with self.cls._profiling(args):
+            assert self.cls.checker.profile_cpu.mock_calls[0] == call('/foo')
+            assert self.cls.checker.profile_memory.mock_calls[0] == call()
+        mem = self.cls.checker.profile_memory.return_value.__enter__()
+        assert mem.report.mock_calls == [call()]
+
+
+class TestWatchEvents(RunnerTester):
+
+    def run_update(self, metrics=None, alerter=None, res=0):
+        mock_checker = Mock(spec_set=AwsLimitChecker)
+        mock_result = Mock()
+        mock_checker.check_collected_thresholds.return_value = mock_result
+        self.cls.checker = mock_checker
+        self.cls.skip_ta = True
+        self.cls.service_name = ['Foo']
+        with patch('%s.EventUpdater' % pb, autospec=True) as m_upd:
+            with patch(
+                '%s.Runner.check_thresholds' % pb, autospec=True
+            ) as mock_ct:
+                mock_ct.return_value = res, {'Foo': 'bar'}, 'FooBar'
+                self.cls.watch_events(
+                    'https://queue', 5, metrics=metrics, alerter=alerter
+                )
+                assert m_upd.mock_calls[0] == call(
+                    mock_checker, 'https://queue', reconcile_interval=300,
+                    use_ta=False
+                )
+                on_update = m_upd.mock_calls[1][2]['on_update']
+                assert mock_ct.mock_calls == []
+                on_update()
+        assert mock_checker.mock_calls == [
+            call.check_collected_thresholds(service=['Foo'])
+        ]
+        assert mock_ct.mock_calls == [
+            call(self.cls, metrics, results=[mock_result])
+        ]
+
+    def test_happy_path(self):
+        self.run_update()
+
+    @freeze_time("2016-12-16 10:40:42", tz_offset=0, auto_tick_seconds=6)
+    def test_metrics_and_alerts(self):
+        mock_metrics = Mock()
+        mock_alerter = Mock()
+        self.run_update(metrics=mock_metrics, alerter=mock_alerter, res=2)
+        assert mock_metrics.mock_calls == [
+            call.reset(),
+            call.set_run_duration(6),
+            call.flush()
+        ]
+        assert mock_alerter.mock_calls == [
+            call.on_critical({'Foo': 'bar'}, 'FooBar', duration=6),
+            call.flush()
+        ]
+
+    def test_warning_alert(self):
+        mock_alerter = Mock()
+        self.run_update(alerter=mock_alerter, res=1)
+        assert mock_alerter.mock_calls[0][0] == 'on_warning'
+
+    def test_ok_alert(self):
+        mock_alerter = Mock()
+        self.run_update(alerter=mock_alerter)
+        assert mock_alerter.mock_calls[0][0] == 'on_success'
+
+
 class TestListServices(RunnerTester):
 
     def test_happy_path(self, capsys):
@@ -466,6 +1037,34 @@ class TestIamPolicy(RunnerTester):
         ]
 
 
+class TestShowPlan(RunnerTester):
+
+    def test_happy_path(self, capsys):
+        mock_checker = Mock(spec_set=AwsLimitChecker)
+        mock_checker.get_usage_plan.return_value = {
+            'SvcFoo': None,
+            'SvcBar': [
+                UsageStep('_find_a', ['A'], ['bar:DescribeA']),
+                UsageStep('_find_b', ['B', 'C'], ['bar:ListB', 'bar:GetC']),
+            ]
+        }
+        self.cls.checker = mock_checker
+        self.cls.service_name = ['SvcFoo']
+        self.cls.limit_selection = {'SvcBar': ['B']}
+        self.cls.show_plan()
+        out, err = capsys.readouterr()
+        assert out == 'SvcBar\n' \
+                      '  _find_a: bar:DescribeA\n' \
+                      '  _find_b: bar:ListB, bar:GetC\n' \
+                      'SvcFoo\n' \
+                      '  find_usage: all limits (steps not declared)\n'
+        assert mock_checker.mock_calls == [
+            call.get_usage_plan(
+                service=['SvcFoo'], limits={'SvcBar': ['B']}
+            )
+        ]
+
+
 class TestListDefaults(RunnerTester):
 
     def test_simple(self, capsys):
@@ -561,6 +1160,56 @@ class TestListLimits(RunnerTester):
             })
         ]
 
+    def se_get_limits(self, use_ta=True, service=None):
+        limits = sample_limits_api()
+        return dict((svc, limits[svc]) for svc in service)
+
+    def test_ndjson(self, capsys):
+        mock_checker = Mock(spec_set=AwsLimitChecker)
+        mock_checker.get_service_names.return_value = ['SvcBar', 'SvcFoo']
+        mock_checker.get_limits.side_effect = self.se_get_limits
+        self.cls.checker = mock_checker
+        self.cls.output_format = 'ndjson'
+        self.cls.skip_ta = True
+        self.cls.list_limits()
+        out, err = capsys.readouterr()
+        assert mock_checker.mock_calls == [
+            call.get_service_names(),
+            call.get_limits(use_ta=False, service=['SvcBar']),
+            call.get_limits(use_ta=False, service=['SvcFoo'])
+        ]
+        res = [json.loads(line) for line in out.splitlines()]
+        assert [
+            (r['service'], r['limit'], r['resource_id'], r['limit_value'],
+             r['limit_source'])
+            for r in res
+        ] == [
+            ('SvcBar', 'bar limit2', None, 99, 'override'),
+            ('SvcBar', 'barlimit1', None, 1, 'default'),
+            ('SvcFoo', 'foo limit3', None, 10, 'ta'),
+            ('SvcFoo', 'limit with usage maximums', 'res_id', 10, 'api'),
+            ('SvcFoo', 'zzz limit4', None, 34, 'api'),
+            ('SvcFoo', 'zzz limit5', None, 60.0, 'quotas')
+        ]
+        assert set(r['type'] for r in res) == {'limit'}
+
+    def test_csv_one_service(self, capsys):
+        mock_checker = Mock(spec_set=AwsLimitChecker)
+        mock_checker.get_limits.side_effect = self.se_get_limits
+        self.cls.checker = mock_checker
+        self.cls.output_format = 'csv'
+        self.cls.service_name = ['SvcBar']
+        self.cls.list_limits()
+        out, err = capsys.readouterr()
+        assert mock_checker.mock_calls == [
+            call.get_limits(use_ta=True, service=['SvcBar'])
+        ]
+        assert out == 'type,service,limit,limit_value,limit_source,' \
+                      'default_limit,resource_id,aws_type,value,maximum,' \
+                      'status\n' \
+                      'limit,SvcBar,bar limit2,99,override,2,,,,,\n' \
+                      'limit,SvcBar,barlimit1,1,default,1,,,,,\n'
+
 
 class TestSetLimitOverride(RunnerTester):
 
@@ -598,6 +1247,25 @@ class TestSetLimitOverride(RunnerTester):
             "'service/limit' format; EC2 is invalid."
 
 
+class TestSetLimitSelection(RunnerTester):
+
+    def test_simple(self):
+        self.cls.set_limit_selection([
+            'EC2/Foo bar', 'VPC/VPCs', 'EC2/Baz'
+        ])
+        assert self.cls.limit_selection == {
+            'EC2': ['Foo bar', 'Baz'],
+            'VPC': ['VPCs']
+        }
+
+    def test_error(self):
+        with pytest.raises(ValueError) as excinfo:
+            self.cls.set_limit_selection(['EC2/Foo', 'EC2'])
+        assert excinfo.value.args[0] == "Limit names must be in " \
+            "'service/limit' format; EC2 is invalid."
+        assert self.cls.limit_selection is None
+
+
 class TestLoadJson(RunnerTester):
 
     def test_local_file_py27(self):
@@ -767,7 +1435,7 @@ class TestShowUsage(RunnerTester):
         limits['SvcBar']['bar limit2']._add_current_usage(22)
         limits['SvcBar']['barlimit1']._add_current_usage(11)
         mock_checker = Mock(spec_set=AwsLimitChecker)
-        mock_checker.get_limits.return_value = limits
+        mock_checker.check_thresholds.return_value = check_result(limits)
         self.cls.checker = mock_checker
         with patch('awslimitchecker.runner.dict2cols') as mock_d2c:
             mock_d2c.return_value = 'd2cval'
@@ -775,8 +1443,9 @@ class TestShowUsage(RunnerTester):
         out, err = capsys.readouterr()
         assert out == 'd2cval\n'
         assert mock_checker.mock_calls == [
-            call.find_usage(service=None, use_ta=True),
-            call.get_limits(service=None, use_ta=True)
+            call.check_thresholds(
+                service=None, use_ta=True, limits=None
+            )
         ]
         assert mock_d2c.mock_calls == [
             call({
@@ -792,7 +1461,7 @@ class TestShowUsage(RunnerTester):
         }
         limits['SvcFoo']['foo limit3']._add_current_usage(33)
         mock_checker = Mock(spec_set=AwsLimitChecker)
-        mock_checker.get_limits.return_value = limits
+        mock_checker.check_thresholds.return_value = check_result(limits)
         self.cls.checker = mock_checker
         self.cls.service_name = ['SvcFoo']
         self.cls.skip_ta = True
@@ -802,8 +1471,9 @@ class TestShowUsage(RunnerTester):
         out, err = capsys.readouterr()
         assert out == 'd2cval\n'
         assert mock_checker.mock_calls == [
-            call.find_usage(service=['SvcFoo'], use_ta=False),
-            call.get_limits(service=['SvcFoo'], use_ta=False)
+            call.check_thresholds(
+                service=['SvcFoo'], use_ta=False, limits=None
+            )
         ]
         assert mock_d2c.mock_calls == [
             call({
@@ -811,13 +1481,63 @@ class TestShowUsage(RunnerTester):
             })
         ]
 
+    def test_top_k(self, capsys):
+        limits = sample_limits()
+        for idx in range(5):
+            limits['SvcFoo']['foo limit3']._add_current_usage(
+                idx, resource_id='r%d' % idx
+            )
+        mock_checker = Mock(spec_set=AwsLimitChecker)
+        mock_checker.check_thresholds.return_value = check_result(limits)
+        self.cls.checker = mock_checker
+        self.cls.usage_top_k = 2
+        with patch('awslimitchecker.runner.dict2cols') as mock_d2c:
+            mock_d2c.return_value = 'd2cval'
+            self.cls.show_usage()
+        assert mock_d2c.mock_calls[0][1][0]['SvcFoo/foo limit3'] == \
+            'max: r4=4 (top 2 of 5: r3=3, r4=4)'
+
+    def test_ndjson(self, capsys):
+        limits = sample_limits()
+        for idx in range(5):
+            limits['SvcFoo']['foo limit3']._add_current_usage(
+                idx, resource_id='r%d' % idx, aws_type='AWS::Foo'
+            )
+
+        mock_checker = Mock(spec_set=AwsLimitChecker)
+        mock_checker.iter_results.return_value = iter([
+            check_result({'SvcFoo': limits['SvcFoo']}),
+            check_result({'SvcBar': limits['SvcBar']})
+        ])
+        self.cls.checker = mock_checker
+        self.cls.output_format = 'ndjson'
+        self.cls.usage_top_k = 2
+        self.cls.show_usage()
+        out, err = capsys.readouterr()
+        assert mock_checker.mock_calls == [
+            call.iter_results(
+                service=None, use_ta=True, limits=None
+            )
+        ]
+        res = [json.loads(line) for line in out.splitlines()]
+        assert [
+            (r['type'], r['service'], r['limit'], r['resource_id'],
+             r['aws_type'], r['value'])
+            for r in res
+        ] == [
+            ('usage', 'SvcFoo', 'foo limit3', 'r3', 'AWS::Foo', 3),
+            ('usage', 'SvcFoo', 'foo limit3', 'r4', 'AWS::Foo', 4),
+            ('usage', 'SvcBar', 'bar limit2', None, None, None),
+            ('usage', 'SvcBar', 'barlimit1', None, None, None)
+        ]
+
 
 class TestCheckThresholds(RunnerTester):
 
     def test_ok(self, capsys):
         """no problems, return 0 and print nothing"""
         mock_checker = Mock(spec_set=AwsLimitChecker)
-        mock_checker.check_thresholds.return_value = {}
+        mock_checker.check_thresholds.return_value = CheckResult({}, {})
         mock_checker.get_limits.return_value = {}
         self.cls.checker = mock_checker
         with patch('awslimitchecker.runner.dict2cols') as mock_d2c:
@@ -826,26 +1546,44 @@ class TestCheckThresholds(RunnerTester):
         out, err = capsys.readouterr()
         assert out == '\n'
         assert mock_checker.mock_calls == [
-            call.check_thresholds(use_ta=True, service=None)
+            call.check_thresholds(
+                use_ta=True, service=None, limits=None
+            )
         ]
         assert res == (0, {}, '')
 
+    def test_results(self, capsys):
+        """check given results instead of checking thresholds"""
+        mock_checker = Mock(spec_set=AwsLimitChecker)
+        self.cls.checker = mock_checker
+        result = CheckResult({'S1': {}}, {})
+        with patch('awslimitchecker.runner.dict2cols') as mock_d2c:
+            mock_d2c.return_value = ''
+            res = self.cls.check_thresholds(results=[result])
+        assert mock_checker.mock_calls == []
+        assert res == (0, result, '')
+
     def test_metrics(self, capsys):
         """no problems, return 0 and print nothing; send metrics"""
         mock_checker = Mock(spec_set=AwsLimitChecker)
-        mock_checker.check_thresholds.return_value = {}
         mock_lim1 = Mock()
         mock_lim2 = Mock()
         mock_lim3 = Mock()
-        mock_checker.get_limits.return_value = {
-            'S1': {
-                'lim1': mock_lim1,
-                'lim2': mock_lim2
+        for lim in [mock_lim1, mock_lim2, mock_lim3]:
+            lim.get_skipped.return_value = None
+        result = CheckResult(
+            {
+                'S1': {
+                    'lim1': mock_lim1,
+                    'lim2': mock_lim2
+                },
+                'S2': {
+                    'lim3': mock_lim3
+                }
             },
-            'S2': {
-                'lim3': mock_lim3
-            }
-        }
+            {}
+        )
+        mock_checker.check_thresholds.return_value = result
         mock_metrics = Mock()
         self.cls.checker = mock_checker
         self.cls.service_name = ['S1']
@@ -855,14 +1593,132 @@ class TestCheckThresholds(RunnerTester):
         out, err = capsys.readouterr()
         assert out == '\n'
         assert mock_checker.mock_calls == [
-            call.check_thresholds(use_ta=True, service=['S1']),
-            call.get_limits()
+            call.check_thresholds(
+                use_ta=True, service=['S1'], limits=None
+            )
         ]
         assert res == (0, {}, '')
+        assert res[1] is result
         assert mock_metrics.mock_calls == [
             call.add_limit(mock_lim1),
-            call.add_limit(mock_lim2)
+            call.add_limit(mock_lim2),
+            call.add_limit(mock_lim3)
+        ]
+
+    def test_ndjson(self, capsys):
+        limits = sample_limits()
+        limits['SvcFoo']['foo limit3']._add_current_usage(
+            9, resource_id='r1'
+        )
+        limits['SvcBar']['barlimit1']._add_current_usage(11)
+        limits['SvcBar']['bar limit2']._add_current_usage(90)
+        for svc_limits in limits.values():
+            for lim in svc_limits.values():
+                lim.check_thresholds()
+
+        def svc_result(svc):
+            problems = [
+                name for name, lim in limits[svc].items()
+                if lim.get_warnings() or lim.get_criticals()
+            ]
+            return CheckResult(
+                {svc: dict(
+                    (n, LimitResult.from_limit(lim))
+                    for n, lim in limits[svc].items()
+                )},
+                {svc: problems}, timings={svc: 1.0}, duration=1.0
+            )
+
+        mock_checker = Mock(spec_set=AwsLimitChecker)
+        mock_checker.iter_results.return_value = iter([
+            svc_result('SvcFoo'), svc_result('SvcBar')
+        ])
+        mock_metrics = Mock()
+        self.cls.checker = mock_checker
+        self.cls.output_format = 'ndjson'
+        self.cls.colorize = False
+        self.cls.skip_check = ['SvcBar/bar limit2']
+        self.cls.service_name = ['SvcFoo', 'SvcBar']
+        res = self.cls.check_thresholds(metrics=mock_metrics)
+        out, err = capsys.readouterr()
+        assert mock_checker.mock_calls == [
+            call.iter_results(
+                use_ta=True, service=['SvcFoo', 'SvcBar'], limits=None
+            )
         ]
+        recs = [json.loads(line) for line in out.splitlines()]
+        assert [
+            (r['type'], r['service'], r['limit'], r['resource_id'],
+             r['value'], r['status'])
+            for r in recs
+        ] == [
+            ('threshold', 'SvcFoo', 'foo limit3', 'r1', 9, 'critical'),
+            ('threshold', 'SvcBar', 'barlimit1', None, 11, 'critical')
+        ]
+        assert res[0] == 2
+        assert isinstance(res[1], CheckResult)
+        assert sorted(res[1].keys()) == ['SvcBar', 'SvcFoo']
+        assert sorted(res[1]['SvcBar'].keys()) == ['bar limit2', 'barlimit1']
+        assert res[1].timings == {'SvcBar': 1.0, 'SvcFoo': 1.0}
+        assert res[2] == 'SvcBar/barlimit1   (limit 1) CRITICAL: 11\n' \
+                         'SvcFoo/foo limit3  (limit 10) CRITICAL: r1=9\n'
+        assert len(mock_metrics.add_limit.mock_calls) == 3
+
+    def test_json_no_problems(self, capsys):
+        mock_checker = Mock(spec_set=AwsLimitChecker)
+        mock_checker.iter_results.return_value = iter([
+            CheckResult({'SvcFoo': {}}, {})
+        ])
+        self.cls.checker = mock_checker
+        self.cls.output_format = 'json'
+        self.cls.service_name = ['SvcFoo']
+        self.cls.skip_ta = True
+        res = self.cls.check_thresholds()
+        out, err = capsys.readouterr()
+        assert out == '[]\n'
+        assert mock_checker.mock_calls == [
+            call.iter_results(
+                use_ta=False, service=['SvcFoo'], limits=None
+            )
+        ]
+        assert res == (0, {}, '')
+
+    def test_skipped(self, capsys):
+        limits = sample_limits()
+        limits['SvcFoo']['foo limit3']._set_skipped('k skipped')
+        limits['SvcBar']['barlimit1']._set_skipped('k2 skipped')
+        mock_checker = Mock(spec_set=AwsLimitChecker)
+        mock_checker.check_thresholds.return_value = check_result(limits)
+        self.cls.checker = mock_checker
+        self.cls.colorize = False
+        self.cls.skip_check = ['SvcBar/barlimit1']
+        res = self.cls.check_thresholds()
+        out, err = capsys.readouterr()
+        assert res[0] == 0
+        assert res[1] == {}
+        assert res[2] == 'SvcFoo/foo limit3  (limit 10) SKIPPED: k skipped\n'
+        assert out == res[2] + '\n'
+
+    def test_skipped_ndjson(self, capsys):
+        limits = sample_limits()
+        limits['SvcFoo']['foo limit3']._set_skipped('k skipped')
+        mock_checker = Mock(spec_set=AwsLimitChecker)
+        mock_checker.iter_results.return_value = iter([
+            check_result(limits)
+        ])
+        self.cls.checker = mock_checker
+        self.cls.output_format = 'ndjson'
+        self.cls.colorize = False
+        res = self.cls.check_thresholds()
+        out, err = capsys.readouterr()
+        recs = [json.loads(line) for line in out.splitlines()]
+        assert [
+            (r['type'], r['service'], r['limit'], r['value'], r['status'])
+            for r in recs
+        ] == [
+            ('threshold', 'SvcFoo', 'foo limit3', None, 'skipped')
+        ]
+        assert res[0] == 0
 
     def test_many_problems(self):
         """lots of problems"""
@@ -892,7 +1748,7 @@ class TestCheckThresholds(RunnerTester):
         mock_limit4.get_criticals.return_value = [mock_c2]
 
         mock_checker = Mock(spec_set=AwsLimitChecker)
-        mock_checker.check_thresholds.return_value = {
+        mock_checker.check_thresholds.return_value = problem_result({
             'svc2': {
                 'limit3': mock_limit3,
                 'limit4': mock_limit4,
@@ -901,10 +1757,10 @@ class TestCheckThresholds(RunnerTester):
                 'limit1': mock_limit1,
                 'limit2': mock_limit2,
             },
-        }
+        })
         mock_checker.get_limits.return_value = {}
 
-        def se_print(s, l, c, w, colorize=True):
+        def se_print(s, l, c, w, colorize=True, top_k=None):
             return ('{s}/{l}'.format(s=s, l=l.name), '')
 
         self.cls.checker = mock_checker
@@ -916,21 +1772,27 @@ class TestCheckThresholds(RunnerTester):
                 mock_d2c.return_value = 'd2cval'
                 res = self.cls.check_thresholds()
         assert mock_checker.mock_calls == [
-            call.check_thresholds(use_ta=True, service=None)
+            call.check_thresholds(
+                use_ta=True, service=None, limits=None
+            )
         ]
         assert mock_print.mock_calls == [
             call(
                 'svc1', mock_limit1, [mock_c1], [mock_w1],
-                colorize=False
+                colorize=False,
+                top_k=None
             ),
             call(
-                'svc1', mock_limit2, [], [mock_w2], colorize=False
+                'svc1', mock_limit2, [], [mock_w2], colorize=False,
+                top_k=None
             ),
             call(
-                'svc2', mock_limit3, [], [mock_w3], colorize=False
+                'svc2', mock_limit3, [], [mock_w3], colorize=False,
+                top_k=None
             ),
             call(
-                'svc2', mock_limit4, [mock_c2], [], colorize=False
+                'svc2', mock_limit4, [mock_c2], [], colorize=False,
+                top_k=None
             ),
         ]
         assert mock_d2c.mock_calls == [
@@ -968,15 +1830,15 @@ class TestCheckThresholds(RunnerTester):
         mock_limit2.get_criticals.return_value = []
 
         mock_checker = Mock(spec_set=AwsLimitChecker)
-        mock_checker.check_thresholds.return_value = {
+        mock_checker.check_thresholds.return_value = problem_result({
             'svc1': {
                 'limit1': mock_limit1,
                 'limit2': mock_limit2,
             },
-        }
+        })
         mock_checker.get_limits.return_value = {}
 
-        def se_print(s, l, c, w, colorize=True):
+        def se_print(s, l, c, w, colorize=True, top_k=None):
             return ('{s}/{l}'.format(s=s, l=l.name), '')
 
         self.cls.checker = mock_checker
@@ -989,11 +1851,14 @@ class TestCheckThresholds(RunnerTester):
                 res = self.cls.check_thresholds()
 
         assert mock_checker.mock_calls == [
-            call.check_thresholds(use_ta=True, service=None)
+            call.check_thresholds(
+                use_ta=True, service=None, limits=None
+            )
         ]
         assert mock_print.mock_calls == [
             call(
-                'svc1', mock_limit2, [], [mock_w2], colorize=True
+                'svc1', mock_limit2, [], [mock_w2], colorize=True,
+                top_k=None
             ),
         ]
         assert mock_d2c.mock_calls == [
@@ -1022,14 +1887,14 @@ class TestCheckThresholds(RunnerTester):
         mock_limit2.get_criticals.return_value = []
 
         mock_checker = Mock(spec_set=AwsLimitChecker)
-        mock_checker.check_thresholds.return_value = {
+        mock_checker.check_thresholds.return_value = problem_result({
             'svc2': {
                 'limit2': mock_limit2,
             },
             'svc1': {
                 'limit1': mock_limit1,
             },
-        }
+        })
         mock_checker.get_limits.return_value = {}
 
         self.cls.checker = mock_checker
@@ -1040,15 +1905,19 @@ class TestCheckThresholds(RunnerTester):
                 mock_d2c.return_value = 'd2cval'
                 res = self.cls.check_thresholds()
         assert mock_checker.mock_calls == [
-            call.check_thresholds(use_ta=True, service=None)
+            call.check_thresholds(
+                use_ta=True, service=None, limits=None
+            )
         ]
         assert mock_print.mock_calls == [
             call(
                 'svc1', mock_limit1, [], [mock_w1, mock_w2],
-                colorize=True
+                colorize=True,
+                top_k=None
             ),
             call(
-                'svc2', mock_limit2, [], [mock_w3], colorize=True
+                'svc2', mock_limit2, [], [mock_w3], colorize=True,
+                top_k=None
             ),
         ]
         assert res == (1, {
@@ -1074,11 +1943,11 @@ class TestCheckThresholds(RunnerTester):
         mock_limit2.get_criticals.return_value = []
 
         mock_checker = Mock(spec_set=AwsLimitChecker)
-        mock_checker.check_thresholds.return_value = {
+        mock_checker.check_thresholds.return_value = problem_result({
             'svc2': {
                 'limit2': mock_limit2,
             },
-        }
+        })
         mock_checker.get_limits.return_value = {}
 
         self.cls.checker = mock_checker
@@ -1090,11 +1959,14 @@ class TestCheckThresholds(RunnerTester):
                 mock_d2c.return_value = 'd2cval'
                 res = self.cls.check_thresholds()
         assert mock_checker.mock_calls == [
-            call.check_thresholds(use_ta=True, service=['svc2'])
+            call.check_thresholds(
+                use_ta=True, service=['svc2'], limits=None
+            )
         ]
         assert mock_print.mock_calls == [
             call(
-                'svc2', mock_limit2, [], [mock_w3], colorize=True
+                'svc2', mock_limit2, [], [mock_w3], colorize=True,
+                top_k=None
             ),
         ]
         assert res == (1, {
@@ -1112,11 +1984,11 @@ class TestCheckThresholds(RunnerTester):
         mock_limit1.get_criticals.return_value = [mock_c1, mock_c2]
 
         mock_checker = Mock(spec_set=AwsLimitChecker)
-        mock_checker.check_thresholds.return_value = {
+        mock_checker.check_thresholds.return_value = problem_result({
             'svc1': {
                 'limit1': mock_limit1,
             },
-        }
+        })
         mock_checker.get_limits.return_value = {}
 
         self.cls.checker = mock_checker
@@ -1128,12 +2000,15 @@ class TestCheckThresholds(RunnerTester):
                 mock_d2c.return_value = 'd2cval'
             res = self.cls.check_thresholds()
         assert mock_checker.mock_calls == [
-            call.check_thresholds(use_ta=False, service=None)
+            call.check_thresholds(
+                use_ta=False, service=None, limits=None
+            )
         ]
         assert mock_print.mock_calls == [
             call(
                 'svc1', mock_limit1, [mock_c1, mock_c2], [],
-                colorize=True
+                colorize=True,
+                top_k=None
             ),
         ]
         assert res == (2, {
@@ -1203,6 +2078,77 @@ class TestConsoleEntryPoint(RunnerTester):
             call(self.cls)
         ]
 
+    def test_plan_only_limit(self):
+        argv = [
+            'awslimitchecker', '--plan',
+            '--only-limit', 'VPC/VPCs', '--only-limit', 'VPC/Subnets per VPC'
+        ]
+        with patch.object(sys, 'argv', argv):
+            with patch('%s.Runner.show_plan' % pb, autospec=True) as mock_plan:
+                with patch('%s.AwsLimitChecker' % pb, autospec=True):
+                    with pytest.raises(SystemExit) as excinfo:
+                        self.cls.console_entry_point()
+        assert excinfo.value.code == 0
+        assert mock_plan.mock_calls == [
+            call(self.cls)
+        ]
+        assert self.cls.limit_selection == {
+            'VPC': ['VPCs', 'Subnets per VPC']
+        }
+
+    def test_event_queue(self):
+        argv = [
+            'awslimitchecker', '--event-queue', 'https://queue',
+            '--reconcile-minutes', '15'
+        ]
+        with patch.object(sys, 'argv', argv):
+            with patch(
+                '%s.Runner.watch_events' % pb, autospec=True
+            ) as mock_watch:
+                with patch('%s.AwsLimitChecker' % pb, autospec=True):
+                    with pytest.raises(SystemExit) as excinfo:
+                        self.cls.console_entry_point()
+        assert excinfo.value.code == 0
+        assert mock_watch.mock_calls == [
+            call(self.cls, 'https://queue', 15, metrics=None, alerter=None)
+        ]
+
+    def test_event_queue_providers(self):
+        argv = [
+            'awslimitchecker', '--event-queue', 'https://queue',
+            '--metrics-provider=FooProvider', '--alert-provider=MyAlerter'
+        ]
+        mock_rn = PropertyMock(return_value='rname')
+        with patch.object(sys, 'argv', argv):
+            with patch(
+                '%s.Runner.watch_events' % pb, autospec=True
+            ) as mock_watch:
+                with patch.multiple(
+                    '%s' % pb,
+                    MetricsProvider=DEFAULT,
+                    AlertProvider=DEFAULT,
+                ) as mocks:
+                    with patch(
+                        '%s.AwsLimitChecker' % pb, spec_set=AwsLimitChecker
+                    ) as mock_alc:
+                        type(mock_alc.return_value).region_name = mock_rn
+                        with pytest.raises(SystemExit) as excinfo:
+                            self.cls.console_entry_point()
+        assert excinfo.value.code == 0
+        m_metrics = mocks['MetricsProvider'].get_provider_by_name
+        m_alert = mocks['AlertProvider'].get_provider_by_name
+        assert m_metrics.mock_calls == [
+            call('FooProvider'), call()('rname')
+        ]
+        assert m_alert.mock_calls == [call('MyAlerter'), call()('rname')]
+        assert mock_watch.mock_calls == [
+            call(
+                self.cls, 'https://queue', 60,
+                metrics=m_metrics.return_value.return_value,
+                alerter=m_alert.return_value.return_value
+            )
+        ]
+
     def test_list_defaults_skip_quotas(self):
         argv = ['awslimitchecker', '--list-defaults', '--skip-quotas']
         with patch.object(sys, 'argv', argv):
@@ -1447,6 +2393,27 @@ class TestConsoleEntryPoint(RunnerTester):
             call(self.cls, '/path/to/file.json')
         ]
 
+    def test_usage_detail(self):
+        argv = ['awslimitchecker', '-u', '--usage-detail=topk=7']
+        with patch.object(sys, 'argv', argv):
+            with patch('%s.Runner.show_usage' % pb, autospec=True) as mock_show:
+                with pytest.raises(SystemExit) as excinfo:
+                    self.cls.console_entry_point()
+        assert excinfo.value.code == 0
+        assert mock_show.mock_calls == [call(self.cls)]
+        assert self.cls.usage_top_k == 7
+        assert self.cls.output_format == 'text'
+
+    def test_output_format(self):
+        argv = ['awslimitchecker', '-u', '--output-format=csv']
+        with patch.object(sys, 'argv', argv):
+            with patch('%s.Runner.show_usage' % pb, autospec=True) as mock_show:
+                with pytest.raises(SystemExit) as excinfo:
+                    self.cls.console_entry_point()
+        assert excinfo.value.code == 0
+        assert mock_show.mock_calls == [call(self.cls)]
+        assert self.cls.output_format == 'csv'
+
     def test_show_usage(self):
         argv = ['awslimitchecker', '-u']
         with patch.object(sys, 'argv', argv):
@@ -1828,7 +2795,8 @@ class TestConsoleEntryPoint(RunnerTester):
         assert m_gpbn.mock_calls == [
             call('MyAlerter'),
             call()('rname', foo='bar', baz='blam'),
-            call()().on_critical(None, None, exc=exc, duration=6)
+            call()().on_critical(None, None, exc=exc, duration=6),
+            call()().flush()
         ]
 
     @freeze_time("2016-12-16 10:40:42", tz_offset=0, auto_tick_seconds=6)
@@ -1864,7 +2832,8 @@ class TestConsoleEntryPoint(RunnerTester):
         assert m_gpbn.mock_calls == [
             call('MyAlerter'),
             call()('rname', foo='bar', baz='blam'),
-            call()().on_success(duration=12)
+            call()().on_success(duration=12),
+            call()().flush()
         ]
 
     @freeze_time("2016-12-16 10:40:42", tz_offset=0, auto_tick_seconds=6)
@@ -1900,7 +2869,8 @@ class TestConsoleEntryPoint(RunnerTester):
         assert m_gpbn.mock_calls == [
             call('MyAlerter'),
             call()('rname', foo='bar', baz='blam'),
-            call()().on_warning({'Foo': 'bar'}, 'FooBar', duration=12)
+            call()().on_warning({'Foo': 'bar'}, 'FooBar', duration=12),
+            call()().flush()
         ]
 
     @freeze_time("2016-12-16 10:40:42", tz_offset=0, auto_tick_seconds=6)
@@ -1936,7 +2906,8 @@ class TestConsoleEntryPoint(RunnerTester):
         assert m_gpbn.mock_calls == [
             call('MyAlerter'),
             call()('rname', foo='bar', baz='blam'),
-            call()().on_critical({'Foo': 'bar'}, 'FooBar', duration=12)
+            call()().on_critical({'Foo': 'bar'}, 'FooBar', duration=12),
+            call()().flush()
         ]
 
     @freeze_time("2016-12-16 10:40:42", tz_offset=0, auto_tick_seconds=6)
@@ -1974,6 +2945,162 @@ class TestConsoleEntryPoint(RunnerTester):
             call().flush()
         ]
 
+    def test_check_thresholds_record_history(self):
+        argv = ['awslimitchecker', '--record-history', '--history-file=/foo']
+        with patch.object(sys, 'argv', argv):
+            with patch.multiple(
+                '%s.Runner' % pb, autospec=True, check_thresholds=DEFAULT,
+                record_history=DEFAULT
+            ) as mocks:
+                mocks['check_thresholds'].return_value = 0, 'res', 'foo'
+                with patch(
+                    '%s.AwsLimitChecker' % pb, spec_set=AwsLimitChecker
+                ):
+                    with pytest.raises(SystemExit) as excinfo:
+                        self.cls.console_entry_point()
+        assert excinfo.value.code == 0
+        assert mocks['record_history'].mock_calls == [
+            call(self.cls, 'res', path='/foo')
+        ]
+
+    def test_check_thresholds_export_snapshot(self):
+        argv = ['awslimitchecker', '--export-snapshot=/foo']
+        with patch.object(sys, 'argv', argv):
+            with patch.multiple(
+                '%s.Runner' % pb, autospec=True, check_thresholds=DEFAULT,
+                export_snapshot=DEFAULT
+            ) as mocks:
+                mocks['check_thresholds'].return_value = 1, 'res', 'foo'
+                with patch(
+                    '%s.AwsLimitChecker' % pb, spec_set=AwsLimitChecker
+                ):
+                    with pytest.raises(SystemExit) as excinfo:
+                        self.cls.console_entry_point()
+        assert excinfo.value.code == 1
+        assert mocks['export_snapshot'].mock_calls == [
+            call(self.cls, 'res', '/foo')
+        ]
+
+    def test_fleet_report(self):
+        argv = [
+            'awslimitchecker', '--fleet-report=/a', '--fleet-report=/b',
+            '--fleet-top=5'
+        ]
+        with patch.object(sys, 'argv', argv):
+            with patch(
+                '%s.Runner.fleet_report' % pb, autospec=True
+            ) as mock_fr:
+                with patch(
+                    '%s.AwsLimitChecker' % pb, spec_set=AwsLimitChecker
+                ):
+                    with pytest.raises(SystemExit) as excinfo:
+                        self.cls.console_entry_point()
+        assert excinfo.value.code == 0
+        assert mock_fr.mock_calls == [
+            call(self.cls, ['/a', '/b'], 5)
+        ]
+
+    def test_enqueue(self):
+        argv = [
+            'awslimitchecker', '--queue=/q', '--enqueue',
+            '--fleet-account=123', '--fleet-region=r1'
+        ]
+        with patch.object(sys, 'argv', argv):
+            with patch('%s.Runner.enqueue' % pb, autospec=True) as mock_enq:
+                with patch(
+                    '%s.AwsLimitChecker' % pb, spec_set=AwsLimitChecker
+                ):
+                    with pytest.raises(SystemExit) as excinfo:
+                        self.cls.console_entry_point()
+        assert excinfo.value.code == 0
+        assert mock_enq.mock_calls == [call(self.cls, '/q', ['123'], ['r1'])]
+
+    def test_worker(self):
+        argv = [
+            'awslimitchecker', '--queue=/q', '--worker', '--lease-seconds=60',
+            '--sts-account-role=foo'
+        ]
+        with patch.object(sys, 'argv', argv):
+            with patch(
+                '%s.Runner.run_worker' % pb, autospec=True
+            ) as mock_worker:
+                with patch(
+                    '%s.AwsLimitChecker' % pb, spec_set=AwsLimitChecker
+                ):
+                    with pytest.raises(SystemExit) as excinfo:
+                        self.cls.console_entry_point()
+        assert excinfo.value.code == 0
+        assert len(mock_worker.mock_calls) == 1
+        args = mock_worker.mock_calls[0][1]
+        assert args[1:3] == ('/q', 60)
+        assert args[3]['account_role'] == 'foo'
+        assert args[3]['warning_threshold'] == 80
+
+    def test_aggregate(self):
+        argv = [
+            'awslimitchecker', '--queue=/q', '--aggregate', '--fleet-top=3'
+        ]
+        with patch.object(sys, 'argv', argv):
+            with patch(
+                '%s.Runner.aggregate' % pb, autospec=True
+            ) as mock_agg:
+                with patch(
+                    '%s.AwsLimitChecker' % pb, spec_set=AwsLimitChecker
+                ):
+                    with pytest.raises(SystemExit) as excinfo:
+                        self.cls.console_entry_point()
+        assert excinfo.value.code == 0
+        assert mock_agg.mock_calls == [call(self.cls, '/q', 3)]
+
+    def test_record(self):
+        argv = ['awslimitchecker', '--record=/foo', '-l']
+        with patch.object(sys, 'argv', argv):
+            with patch('%s.Cassette' % pb, autospec=True) as mock_cas:
+                with patch(
+                    '%s.Runner._console_entry_point' % pb, autospec=True
+                ) as mock_cep:
+                    self.cls.console_entry_point()
+        assert mock_cas.mock_calls == [
+            call('/foo', mode='record'),
+            call().__enter__(),
+            call().__exit__(None, None, None)
+        ]
+        assert len(mock_cep.mock_calls) == 1
+        assert mock_cep.mock_calls[0][1][1].check_version is True
+
+    def test_replay(self):
+        argv = ['awslimitchecker', '--replay=/foo', '--replay-latency']
+        with patch.object(sys, 'argv', argv):
+            with patch('%s.Cassette' % pb, autospec=True) as mock_cas:
+                with patch(
+                    '%s.Runner._console_entry_point' % pb, autospec=True
+                ) as mock_cep:
+                    mock_cep.side_effect = SystemExit(2)
+                    with pytest.raises(SystemExit):
+                        self.cls.console_entry_point()
+        assert mock_cas.mock_calls[0] == call(
+            '/foo', mode='replay', simulate_latency=True
+        )
+        assert mock_cas.mock_calls[1] == call().__enter__()
+        assert mock_cas.mock_calls[2][0] == '().__exit__'
+        assert mock_cep.mock_calls[0][1][1].check_version is False
+
+    def test_history(self):
+        argv = ['awslimitchecker', '--history', 'SvcFoo', '--history-days=3']
+        with patch.object(sys, 'argv', argv):
+            with patch(
+                '%s.Runner.show_history' % pb, autospec=True
+            ) as mock_sh:
+                with patch(
+                    '%s.AwsLimitChecker' % pb, spec_set=AwsLimitChecker
+                ):
+                    with pytest.raises(SystemExit) as excinfo:
+                        self.cls.console_entry_point()
+        assert excinfo.value.code == 0
+        assert mock_sh.mock_calls == [
+            call(self.cls, 'SvcFoo', 3, path=None)
+        ]
+
     def test_list_metrics_providers(self, capsys):
         argv = ['awslimitchecker', '--list-metrics-providers']
         with patch.object(sys, 'argv', argv):
@@ -0,0 +1,259 @@
+"""
+awslimitchecker/tests/test_snapshot.py
+
+The latest version of this package is available at:
+<https://github.com/jantman/awslimitchecker>
+
+################################################################################
+Copyright 2015-2018 Jason Antman <jason@jasonantman.com>
+
+    This file is part of awslimitchecker, also known as awslimitchecker.
+
+    awslimitchecker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    awslimitchecker is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with awslimitchecker.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/awslimitchecker> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+################################################################################
+"""
+
+import gzip
+import json
+import pytest
+from awslimitchecker.snapshot import (
+    write_snapshot, SnapshotReader, SnapshotHeader, SnapshotLimit,
+    FleetRollup, FleetEntry, SNAPSHOT_FORMAT, SNAPSHOT_VERSION
+)
+from awslimitchecker.limit import (
+    AwsLimit, SOURCE_DEFAULT, SOURCE_OVERRIDE, SOURCE_TA, SOURCE_API,
+    SOURCE_QUOTAS
+)
+from .support import mock_service, check_result
+
+
+def snapshot_result(scale=1):
+    svc = mock_service()
+    lim = AwsLimit('lname', svc, 10, 80, 99)
+    lim._set_api_limit(20)
+    lim.set_threshold_override(warn_count=15)
+    for idx, val in enumerate([2, 9]):
+        lim._add_current_usage(
+            val * scale, resource_id='r%d' % idx, aws_type='AWS::Foo'
+        )
+    mixed = AwsLimit('mixed', svc, 5, 80, 99)
+    mixed._add_current_usage(1.5, maximum=2, resource_id='a', aws_type='A')
+    mixed._add_current_usage(4.5, aws_type='B')
+    empty = AwsLimit('empty', svc, None, 80, 99)
+    empty._set_ta_unlimited()
+    limits = [lim, mixed, empty]
+    for x in limits:
+        x.check_thresholds()
+    return check_result(*limits)
+
+
+class TestWriteSnapshot(object):
+
+    def test_round_trip(self, tmpdir):
+        path = str(tmpdir.join('snap.gz'))
+        assert write_snapshot(
+            path, snapshot_result(), region='rname', timestamp=1000.5
+        ) == 3
+        with SnapshotReader(path) as reader:
+            assert reader.header == SnapshotHeader(
+                version=SNAPSHOT_VERSION, account_id='1234', region='rname',
+                timestamp=1000, awslimitchecker=reader.header.awslimitchecker
+            )
+            limits = list(reader)
+        assert limits == [
+            SnapshotLimit(
+                service='SvcName', name='empty', limit=None, source=SOURCE_TA,
+                default_limit=None, thresholds=(None, 80, None, 99),
+                usage=[], state='ok', utilization=None
+            ),
+            SnapshotLimit(
+                service='SvcName', name='lname', limit=20, source=SOURCE_API,
+                default_limit=10, thresholds=(15, 80, None, 99),
+                usage=[
+                    (2, None, 'r0', 'AWS::Foo'), (9, None, 'r1', 'AWS::Foo')
+                ],
+                state='ok', utilization=45.0
+            ),
+            SnapshotLimit(
+                service='SvcName', name='mixed', limit=5,
+                source=SOURCE_DEFAULT, default_limit=5,
+                thresholds=(None, 80, None, 99),
+                usage=[(1.5, 2, 'a', 'A'), (4.5, None, None, 'B')],
+                state='warning', utilization=90.0
+            )
+        ]
+        assert isinstance(limits[1].usage[0][0], int)
+        assert isinstance(limits[2].usage[0][0], float)
+
+    def test_compact_columns(self, tmpdir):
+        path = str(tmpdir.join('snap.gz'))
+        write_snapshot(path, snapshot_result(), account_id='5678')
+        with gzip.open(path, 'rt') as fh:
+            lines = [json.loads(x) for x in fh]
+        assert lines[0]['format'] == SNAPSHOT_FORMAT
+        assert lines[0]['account_id'] == '5678'
+        lname = lines[2]
+        assert lname['v'] == [2, 9]
+        assert lname['r'] == ['r0', 'r1']
+        assert lname['y'] == ['AWS::Foo']
+        assert 'm' not in lname
+        assert 'yi' not in lname
+        assert lines[3]['m'] == [2, None]
+        assert lines[3]['yi'] == [0, 1]
+
+    def test_bad_format(self, tmpdir):
+        path = str(tmpdir.join('snap.gz'))
+        with gzip.open(path, 'wt') as fh:
+            fh.write(json.dumps({'version': 1}) + '\n')
+        with pytest.raises(ValueError) as excinfo:
+            SnapshotReader(path)
+        assert 'not an awslimitchecker snapshot' in str(excinfo.value)
+
+    def test_bad_version(self, tmpdir):
+        path = str(tmpdir.join('snap.gz'))
+        with gzip.open(path, 'wt') as fh:
+            fh.write(json.dumps(
+                {'format': SNAPSHOT_FORMAT, 'version': 99}
+            ) + '\n')
+        with pytest.raises(ValueError) as excinfo:
+            SnapshotReader(path)
+        assert 'Unsupported snapshot version' in str(excinfo.value)
+
+
+class TestRestore(object):
+
+    def restore(self, source, limit):
+        snap = SnapshotLimit(
+            service='SvcName', name='lname', limit=limit, source=source,
+            default_limit=7, thresholds=(3, 50, 4, 60),
+            usage=[(5, 6, 'r1', 'T')], state='critical', utilization=83.3
+        )
+        lim = AwsLimit('lname', mock_service(), 10, 80, 99)
+        lim.set_limit_override(1)
+        lim._add_current_usage(100)
+        snap.restore(lim)
+        return lim
+
+    def test_restore(self):
+        lim = self.restore(SOURCE_API, 30)
+        assert lim.get_limit() == 30
+        assert lim.get_limit_source() == SOURCE_API
+        assert lim.default_limit == 7
+        assert lim._get_thresholds() == (3, 50, 4, 60)
+        assert len(lim.get_current_usage()) == 1
+        u = lim.get_current_usage()[0]
+        assert (u.get_value(), u.get_maximum(), u.resource_id, u.aws_type) == (
+            5, 6, 'r1', 'T'
+        )
+
+    @pytest.mark.parametrize('source,limit,expected', [
+        (SOURCE_DEFAULT, 7, 7),
+        (SOURCE_OVERRIDE, 30, 30),
+        (SOURCE_QUOTAS, 30, 30),
+        (SOURCE_TA, 30, 30),
+        (SOURCE_TA, None, None),
+    ])
+    def test_restore_sources(self, source, limit, expected):
+        lim = self.restore(source, limit)
+        assert lim.get_limit_source() == source
+        assert lim.get_limit() == expected
+
+
+class TestFleetRollup(object):
+
+    def write(self, tmpdir, name, scale, account_id):
+        path = str(tmpdir.join(name))
+        write_snapshot(
+            path, snapshot_result(scale=scale), account_id=account_id,
+            region='rname'
+        )
+        return path
+
+    def test_rollup(self, tmpdir):
+        paths = [
+            self.write(tmpdir, 'a.gz', 1, 'a'),
+            self.write(tmpdir, 'b.gz', 2, 'b'),
+            self.write(tmpdir, 'c.gz', 0, 'c')
+        ]
+        rollup = FleetRollup(top=2)
+        assert [rollup.add_snapshot(p) for p in paths] == [3, 3, 3]
+        assert rollup.snapshots == 3
+        assert rollup.states == {'ok': 5, 'warning': 4}
+        assert rollup.top_limits() == [
+            FleetEntry(
+                account_id='a', region='rname', service='SvcName',
+                limit='mixed', utilization=90.0, state='warning',
+                limit_value=5
+            ),
+            FleetEntry(
+                account_id='b', region='rname', service='SvcName',
+                limit='lname', utilization=90.0, state='warning',
+                limit_value=20
+            )
+        ]
+        stats = dict(
+            ((s.service, s.limit), s) for s in rollup.limit_stats()
+        )
+        assert stats[('SvcName', 'empty')].count == 3
+        assert stats[('SvcName', 'empty')].max is None
+        assert stats[('SvcName', 'empty')].percentiles == {}
+        lname = stats[('SvcName', 'lname')]
+        assert lname.states == {'ok': 2, 'warning': 1}
+        assert lname.max == 90.0
+        assert lname.percentiles[50] == pytest.approx(45.1)
+        assert lname.percentiles[99] == 90.0
+
+    def test_percentiles_overflow(self):
+        rollup = FleetRollup(top=0, percentiles=(10, 100))
+        for pct in [5.0, 250.0, 120.0]:
+            rollup.add(SnapshotLimit(
+                service='S', name='L', limit=1, source=SOURCE_DEFAULT,
+                default_limit=1, thresholds=(None, 80, None, 99), usage=[],
+                state='critical', utilization=pct
+            ))
+        assert rollup.top_limits() == []
+        stats = rollup.limit_stats()[0]
+        assert stats.percentiles[10] == pytest.approx(5.1)
+        assert stats.percentiles[100] == 250.0
+
+    def test_records(self, tmpdir):
+        rollup = FleetRollup(top=1, percentiles=(50, 99.9))
+        rollup.add_snapshot(self.write(tmpdir, 'a.gz', 1, 'a'))
+        assert rollup.record_fields[-3:] == ['max', 'p50', 'p99.9']
+        recs = list(rollup.records())
+        assert len(recs) == 4
+        for rec in recs:
+            assert sorted(rec.keys()) == sorted(rollup.record_fields)
+        assert recs[0]['type'] == 'top'
+        assert recs[0]['limit'] == 'mixed'
+        assert recs[0]['account_id'] == 'a'
+        assert recs[0]['count'] is None
+        assert recs[3]['type'] == 'limit'
+        assert recs[3]['limit'] == 'mixed'
+        assert recs[3]['warning'] == 1
+        assert recs[3]['ok'] == 0
+        assert recs[3]['p99.9'] == 90.0
@@ -42,6 +42,7 @@ from botocore.exceptions import ClientError
 from awslimitchecker.trustedadvisor import TrustedAdvisor, datetime_now
 from awslimitchecker.services.base import _AwsService
 from awslimitchecker.limit import AwsLimit
+from awslimitchecker.circuitbreaker import CircuitOpenError
 import pytest
 from datetime import datetime
 from freezegun import freeze_time
@@ -359,6 +360,23 @@ class TestGetLimitCheckId(object):
             call.describe_trusted_advisor_checks(language='en')
         ]
 
+    def test_circuit_open(self):
+        mock_breaker = Mock()
+        mock_breaker.call.side_effect = CircuitOpenError(
+            'k', 3, 'SubscriptionRequiredException', 1000
+        )
+        self.cls._circuit_breaker = mock_breaker
+        res = self.cls._get_limit_check_id()
+        assert res == (None, None)
+        assert self.cls.have_ta is False
+        assert self.mock_conn.mock_calls == []
+        assert mock_breaker.mock_calls == [
+            call.call(
+                'us-east-1', 'TrustedAdvisor', 'DescribeTrustedAdvisorChecks',
+                self.mock_conn.describe_trusted_advisor_checks, language='en'
+            )
+        ]
+
     def test_subscription_required(self):
 
         def se_api(language=None):
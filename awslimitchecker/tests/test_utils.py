@@ -40,13 +40,16 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 import argparse
 import pytest
 import sys
+import threading
 import termcolor
 
 from awslimitchecker.limit import AwsLimit, AwsLimitUsage
 from awslimitchecker.utils import (
     StoreKeyValuePair, dict2cols, paginate_dict, _get_dict_value_by_path,
     _set_dict_value_by_path, _get_latest_version, color_output,
-    issue_string_tuple
+    issue_string_tuple, concurrent_map, concurrent_imap_unordered,
+    get_cache_dir, load_cache_json, save_cache_json, usage_detail,
+    top_k_indexes, usage_list_str, skipped_string_tuple
 )
 
 # https://code.google.com/p/mock/issues/detail?id=249
@@ -293,6 +296,160 @@ class TestPaginateDict(object):
         ]
 
 
+class TestConcurrentMap(object):
+
+    def test_serial(self):
+        with patch('%s.ThreadPoolExecutor' % pbm) as m_tpe:
+            res = concurrent_map(lambda x: x * 2, [3, 1, 2])
+        assert res == [6, 2, 4]
+        assert m_tpe.mock_calls == []
+
+    def test_one_item(self):
+        with patch('%s.ThreadPoolExecutor' % pbm) as m_tpe:
+            res = concurrent_map(lambda x: x * 2, [3], max_workers=4)
+        assert res == [6]
+        assert m_tpe.mock_calls == []
+
+    def test_concurrent(self):
+        res = concurrent_map(lambda x: x * 2, range(20), max_workers=4)
+        assert res == [x * 2 for x in range(20)]
+
+    def test_concurrent_workers(self):
+        with patch('%s.ThreadPoolExecutor' % pbm) as m_tpe:
+            m_tpe.return_value.__enter__.return_value.map.return_value = \
+                iter([6, 2])
+            res = concurrent_map(lambda x: x * 2, (3, 1), max_workers=4)
+        assert res == [6, 2]
+        assert m_tpe.mock_calls[0] == call(max_workers=2)
+
+    def test_exception(self):
+        def func(x):
+            if x == 3:
+                raise RuntimeError('foo')
+            return x
+
+        with pytest.raises(RuntimeError) as excinfo:
+            concurrent_map(func, range(5), max_workers=3)
+        assert str(excinfo.value) == 'foo'
+
+
+class TestConcurrentImapUnordered(object):
+
+    def test_serial(self):
+        with patch('%s.ThreadPoolExecutor' % pbm) as m_tpe:
+            res = concurrent_imap_unordered(lambda x: x * 2, [3, 1, 2])
+            assert next(res) == (3, 6)
+            assert list(res) == [(1, 2), (2, 4)]
+        assert m_tpe.mock_calls == []
+
+    def test_one_item(self):
+        with patch('%s.ThreadPoolExecutor' % pbm) as m_tpe:
+            res = list(concurrent_imap_unordered(
+                lambda x: x * 2, [3], max_workers=4
+            ))
+        assert res == [(3, 6)]
+        assert m_tpe.mock_calls == []
+
+    def test_concurrent(self):
+        res = list(concurrent_imap_unordered(
+            lambda x: x * 2, range(20), max_workers=4
+        ))
+        assert sorted(res) == [(x, x * 2) for x in range(20)]
+
+    def test_completion_order(self):
+        second_done = threading.Event()
+
+        def func(x):
+            if x == 'slow':
+                assert second_done.wait(5)
+            return x.upper()
+
+        res = concurrent_imap_unordered(func, ['slow', 'fast'], max_workers=2)
+        assert next(res) == ('fast', 'FAST')
+        second_done.set()
+        assert list(res) == [('slow', 'SLOW')]
+
+    def test_exception(self):
+        def func(x):
+            if x == 3:
+                raise RuntimeError('foo')
+            return x
+
+        with pytest.raises(RuntimeError) as excinfo:
+            list(concurrent_imap_unordered(func, range(5), max_workers=3))
+        assert str(excinfo.value) == 'foo'
+
+    def test_close_cancels(self):
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def func(x):
+            calls.append(x)
+            if x == 0:
+                return x
+            started.set()
+            assert release.wait(5)
+            return x
+
+        res = concurrent_imap_unordered(func, range(10), max_workers=2)
+        assert next(res) == (0, 0)
+        assert started.wait(5)
+        # both workers are now blocked; close() cancels the pending calls
+        # then waits for the running ones, which the timer releases
+        threading.Timer(0.1, release.set).start()
+        res.close()
+        assert sorted(calls) == [0, 1, 2]
+
+
+class TestCacheFuncs(object):
+
+    @patch.dict('os.environ', {'ALC_CACHE_DIR': '/foo/bar'}, clear=True)
+    def test_get_cache_dir_env_var(self):
+        assert get_cache_dir() == '/foo/bar'
+
+    @patch.dict('os.environ', {'XDG_CACHE_HOME': '/xdg'}, clear=True)
+    def test_get_cache_dir_xdg(self):
+        assert get_cache_dir() == '/xdg/awslimitchecker'
+
+    @patch.dict('os.environ', {'HOME': '/home/me'}, clear=True)
+    def test_get_cache_dir_default(self):
+        assert get_cache_dir() == '/home/me/.cache/awslimitchecker'
+
+    def test_save_and_load(self, tmpdir):
+        d = str(tmpdir.join('sub', 'dir'))
+        with patch.dict('os.environ', {'ALC_CACHE_DIR': d}, clear=True):
+            save_cache_json('foo.json', {'a': [1, 2], 'b': None})
+            res = load_cache_json('foo.json')
+        assert res == {'a': [1, 2], 'b': None}
+        assert tmpdir.join('sub', 'dir').listdir() == [
+            tmpdir.join('sub', 'dir', 'foo.json')
+        ]
+
+    def test_load_missing(self, tmpdir):
+        with patch.dict(
+            'os.environ', {'ALC_CACHE_DIR': str(tmpdir)}, clear=True
+        ):
+            assert load_cache_json('foo.json') == {}
+
+    def test_load_invalid(self, tmpdir):
+        tmpdir.join('foo.json').write('[1, 2]')
+        tmpdir.join('bar.json').write('{not json')
+        with patch.dict(
+            'os.environ', {'ALC_CACHE_DIR': str(tmpdir)}, clear=True
+        ):
+            assert load_cache_json('foo.json') == {}
+            assert load_cache_json('bar.json') == {}
+
+    def test_save_error(self, tmpdir):
+        tmpdir.join('file').write('x')
+        d = str(tmpdir.join('file'))
+        with patch.dict('os.environ', {'ALC_CACHE_DIR': d}, clear=True):
+            with patch('%s.logger' % pbm) as mock_logger:
+                save_cache_json('foo.json', {'a': 1})
+        assert len(mock_logger.error.mock_calls) == 1
+
+
 class TestDictFuncs(object):
 
     def test_get_dict_value_by_path(self):
@@ -637,3 +794,99 @@ class TestIssueStringTuple(object):
             call('CRITICAL: 8, 10, c2id=12', 'red', colorize=True),
             call('WARNING: w2id=10, w3id=10, 11', 'yellow', colorize=True)
         ]
+
+
+class TestSkippedStringTuple(object):
+
+    def test_simple(self):
+        mock_limit = Mock(spec_set=AwsLimit)
+        type(mock_limit).name = 'limitname'
+        mock_limit.get_limit.return_value = 12
+        mock_limit.get_skipped.return_value = 'k skipped'
+
+        def se_color(s, c, colorize=True):
+            return 'xX%sXx' % s
+
+        with patch('%s.color_output' % pbm) as m_co:
+            m_co.side_effect = se_color
+            res = skipped_string_tuple('svcname', mock_limit, colorize=False)
+        assert res == ('svcname/limitname',
+                       '(limit 12) xXSKIPPED: k skippedXx')
+        assert m_co.mock_calls == [
+            call('SKIPPED: k skipped', 'yellow', colorize=False)
+        ]
+
+
+class TestUsageDetail(object):
+
+    def test_full(self):
+        assert usage_detail('full') is None
+
+    def test_topk(self):
+        assert usage_detail('topk=5') == 5
+
+    def test_invalid(self):
+        for val in ['foo', 'topk=', 'topk=0', 'topk=-2', 'topk=x', 'top=3']:
+            with pytest.raises(argparse.ArgumentTypeError):
+                usage_detail(val)
+
+
+class TestTopKIndexes(object):
+
+    def test_all(self):
+        vals = [3, 1, 2, 1]
+        assert top_k_indexes(vals) == [1, 3, 2, 0]
+        assert top_k_indexes(vals, 4) == [1, 3, 2, 0]
+        assert top_k_indexes(vals, 10) == [1, 3, 2, 0]
+        assert top_k_indexes([]) == []
+
+    def test_top(self):
+        vals = [3, 1, 2, 1, 9, 2]
+        assert top_k_indexes(vals, 1) == [4]
+        assert top_k_indexes(vals, 3) == [5, 0, 4]
+
+    def test_matches_sort(self):
+        vals = [5, 1, 5, 2, 5, 1, 3, 3]
+        full = top_k_indexes(vals)
+        for k in range(1, len(vals) + 1):
+            assert top_k_indexes(vals, k) == full[-k:]
+
+
+class TestUsageListStr(object):
+
+    def test_full(self):
+        mock_limit = Mock(spec_set=AwsLimit)
+        usages = [
+            AwsLimitUsage(mock_limit, 10),
+            AwsLimitUsage(mock_limit, 12, resource_id='c2id'),
+            AwsLimitUsage(mock_limit, 8)
+        ]
+        assert usage_list_str(usages) == '8, 10, c2id=12'
+        assert usage_list_str(usages, top_k=3) == '8, 10, c2id=12'
+
+    def test_top_k(self):
+        mock_limit = Mock(spec_set=AwsLimit)
+        usages = [
+            AwsLimitUsage(mock_limit, 10),
+            AwsLimitUsage(mock_limit, 12, resource_id='c2id'),
+            AwsLimitUsage(mock_limit, 8)
+        ]
+        assert usage_list_str(usages, top_k=2) == 'top 2 of 3: 10, c2id=12'
+
+    def test_issue_string_tuple(self):
+        mock_limit = Mock(spec_set=AwsLimit)
+        type(mock_limit).name = 'limitname'
+        mock_limit.get_limit.return_value = 5
+        crits = [
+            AwsLimitUsage(mock_limit, 10),
+            AwsLimitUsage(mock_limit, 12, resource_id='c2id'),
+            AwsLimitUsage(mock_limit, 8)
+        ]
+        warns = [AwsLimitUsage(mock_limit, 4)]
+        res = issue_string_tuple(
+            'svcname', mock_limit, crits, warns, colorize=False, top_k=1
+        )
+        assert res == (
+            'svcname/limitname',
+            '(limit 5) CRITICAL: top 1 of 3: c2id=12 WARNING: 4'
+        )
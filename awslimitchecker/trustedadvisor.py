@@ -42,6 +42,7 @@ from botocore.exceptions import ClientError
 from dateutil import parser
 import logging
 from .connectable import Connectable
+from .circuitbreaker import CircuitOpenError
 from datetime import datetime, timedelta
 from pytz import utc
 from time import sleep
@@ -252,9 +253,13 @@ class TrustedAdvisor(Connectable):
         """
         logger.debug("Querying Trusted Advisor checks")
         try:
-            checks = self.conn.describe_trusted_advisor_checks(
-                language='en'
+            checks = self._guarded_call(
+                'DescribeTrustedAdvisorChecks',
+                self.conn.describe_trusted_advisor_checks, language='en'
             )['checks']
+        except CircuitOpenError:
+            self.have_ta = False
+            return None, None
         except ClientError as ex:
             if ex.response['Error']['Code'] == 'SubscriptionRequiredException':
                 logger.warning(
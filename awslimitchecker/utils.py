@@ -38,11 +38,14 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 """
 
 import argparse
+import heapq
+import os
 import logging
 from copy import deepcopy
 import json
 import urllib3
 import termcolor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from awslimitchecker.version import _VERSION_TUP, _VERSION
 
 logger = logging.getLogger(__name__)
@@ -89,15 +92,11 @@ def dict2cols(d, spaces=2, separator=' '):
     """
     if len(d) == 0:
         return ''
-    s = ''
     maxlen = max([len(k) for k in d.keys()])
     fmt_str = '{k:' + separator + '<' + str(maxlen + spaces) + '}{v}\n'
-    for k in sorted(d.keys()):
-        s += fmt_str.format(
-            k=k,
-            v=d[k],
-        )
-    return s
+    return ''.join([
+        fmt_str.format(k=k, v=d[k]) for k in sorted(d.keys())
+    ])
 
 
 def paginate_dict(function_ref, *argv, **kwargs):
@@ -169,6 +168,72 @@ def paginate_dict(function_ref, *argv, **kwargs):
     return res
 
 
+def concurrent_map(func, items, max_workers=1):
+    """
+    Call ``func`` once for each element of ``items``, using a thread pool of
+    at most ``max_workers`` threads, and return a list of the results in the
+    same order as ``items``. Exceptions raised by ``func`` are re-raised in
+    the calling thread.
+
+    If ``max_workers`` is less than 2 or there are fewer than 2 items, the
+    calls are made serially in the current thread.
+
+    :param func: callable taking a single positional argument
+    :type func: ``callable``
+    :param items: the items to call ``func`` with
+    :type items: ``iterable``
+    :param max_workers: maximum number of concurrent calls
+    :type max_workers: int
+    :returns: results of ``func``, in the order of ``items``
+    :rtype: list
+    """
+    items = list(items)
+    if max_workers < 2 or len(items) < 2:
+        return [func(x) for x in items]
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(items))
+    ) as executor:
+        return list(executor.map(func, items))
+
+
+def concurrent_imap_unordered(func, items, max_workers=1):
+    """
+    Call ``func`` once for each element of ``items``, using a thread pool of
+    at most ``max_workers`` threads, and yield ``(item, result)`` 2-tuples as
+    each call completes. Exceptions raised by ``func`` are re-raised in the
+    consuming thread when their result is reached; calls that have not yet
+    started are cancelled if the generator is closed early.
+
+    If ``max_workers`` is less than 2 or there are fewer than 2 items, the
+    calls are made serially in the current thread, in the order of
+    ``items``, as the generator is consumed.
+
+    :param func: callable taking a single positional argument
+    :type func: ``callable``
+    :param items: the items to call ``func`` with
+    :type items: ``iterable``
+    :param max_workers: maximum number of concurrent calls
+    :type max_workers: int
+    :returns: ``(item, result)`` tuples, in completion order
+    :rtype: generator
+    """
+    items = list(items)
+    if max_workers < 2 or len(items) < 2:
+        for x in items:
+            yield x, func(x)
+        return
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(items))
+    ) as executor:
+        futures = dict((executor.submit(func, x), x) for x in items)
+        try:
+            for fut in as_completed(futures):
+                yield futures[fut], fut.result()
+        finally:
+            for fut in futures:
+                fut.cancel()
+
+
 def _get_dict_value_by_path(d, path):
     """
     Given a dict (``d``) and a list specifying the hierarchical path to a key
@@ -215,6 +280,77 @@ def _set_dict_value_by_path(d, val, path):
     return tmp_d
 
 
+def get_cache_dir():
+    """
+    Return the path to the local directory awslimitchecker uses for state
+    that persists between runs. This is the value of the ``ALC_CACHE_DIR``
+    environment variable if set, otherwise ``awslimitchecker`` under
+    ``$XDG_CACHE_HOME`` (default ``~/.cache``). The directory is not
+    created by this function.
+
+    :return: path to the cache directory
+    :rtype: str
+    """
+    if os.environ.get('ALC_CACHE_DIR'):
+        return os.environ['ALC_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache'
+    )
+    return os.path.join(base, 'awslimitchecker')
+
+
+def load_cache_json(name):
+    """
+    Load and return the JSON-serialized dict stored as ``name`` in the
+    directory returned by :py:func:`~.get_cache_dir`. If the file does not
+    exist or cannot be read or parsed, return an empty dict.
+
+    This function MUST not ever raise an exception.
+
+    :param name: cache file name
+    :type name: str
+    :return: cached data
+    :rtype: dict
+    """
+    path = os.path.join(get_cache_dir(), name)
+    try:
+        with open(path, 'r') as fh:
+            data = json.load(fh)
+        if not isinstance(data, dict):
+            raise ValueError('cache file does not contain a JSON object')
+        return data
+    except Exception:
+        logger.debug('Unable to load cache file %s', path, exc_info=True)
+    return {}
+
+
+def save_cache_json(name, data):
+    """
+    JSON-serialize ``data`` and store it as ``name`` in the directory
+    returned by :py:func:`~.get_cache_dir`, creating the directory if needed.
+    The file is written to a temporary path and then renamed into place, so
+    readers never see a partially-written file. Errors are logged and
+    otherwise ignored.
+
+    :param name: cache file name
+    :type name: str
+    :param data: data to store
+    :type data: dict
+    """
+    cache_dir = get_cache_dir()
+    path = os.path.join(cache_dir, name)
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        with open(tmp_path, 'w') as fh:
+            json.dump(data, fh, sort_keys=True)
+        os.replace(tmp_path, path)
+        logger.debug('Wrote cache file %s', path)
+    except Exception:
+        logger.error('Unable to write cache file %s', path, exc_info=True)
+
+
 def _get_latest_version():
     """
     Attempt to retrieve the latest awslimitchecker version from PyPI, timing
@@ -255,7 +391,78 @@ def color_output(s, color, colorize=True):
     return termcolor.colored(s, color)
 
 
-def issue_string_tuple(service_name, limit, crits, warns, colorize=True):
+def usage_detail(value):
+    """
+    Parse the value of the ``--usage-detail`` command line option, for use
+    as an argparse ``type``. ``full`` means all usage values are shown, and
+    returns None; ``topk=N`` means only the ``N`` highest usage values are
+    shown, and returns ``N``.
+
+    :param value: option value
+    :type value: str
+    :returns: maximum number of usage values to show, or None for all
+    :rtype: ``int`` or ``None``
+    :raises: :py:exc:`argparse.ArgumentTypeError`
+    """
+    if value == 'full':
+        return None
+    if value.startswith('topk='):
+        try:
+            k = int(value[5:])
+        except ValueError:
+            k = 0
+        if k > 0:
+            return k
+    raise argparse.ArgumentTypeError(
+        'must be "full" or "topk=N" with N a positive integer; got "%s"' %
+        value
+    )
+
+
+def top_k_indexes(values, k=None):
+    """
+    Return the indexes of the ``k`` largest of ``values``, in ascending order
+    of value; if ``k`` is None or at least ``len(values)``, return the indexes
+    of all values. The result is always the same as the last ``k`` indexes of
+    a stable ascending sort, i.e. equal values are ordered by index, but for
+    small ``k`` it is found with a heap in O(n log k) time.
+
+    :param values: numeric values
+    :type values: ``list``, ``array.array`` or other sequence
+    :param k: number of indexes to return, or None for all
+    :type k: ``int`` or ``None``
+    :rtype: list
+    """
+    n = len(values)
+    if k is None or k >= n:
+        return sorted(range(n), key=values.__getitem__)
+    res = heapq.nlargest(k, range(n), key=lambda i: (values[i], i))
+    res.reverse()
+    return res
+
+
+def usage_list_str(usages, top_k=None):
+    """
+    Return a comma-separated string of the ``str()`` values of the given
+    :py:class:`~.AwsLimitUsage` instances in ascending order. If ``top_k`` is
+    an integer less than ``len(usages)``, only the ``top_k`` highest usages
+    are included, prefixed with ``top K of N:``.
+
+    :param usages: usages to list
+    :type usages: :py:obj:`list` of :py:class:`~.AwsLimitUsage`
+    :param top_k: maximum number of usages to list, or None for all
+    :type top_k: ``int`` or ``None``
+    :rtype: str
+    """
+    idxs = top_k_indexes([u.get_value() for u in usages], top_k)
+    s = ', '.join([str(usages[i]) for i in idxs])
+    if len(idxs) < len(usages):
+        s = 'top {k} of {n}: {s}'.format(k=len(idxs), n=len(usages), s=s)
+    return s
+
+
+def issue_string_tuple(service_name, limit, crits, warns, colorize=True,
+                       top_k=None):
     """
     Return a 2-tuple of key (service/limit name)/value (usage) strings
     describing a limit that has crossed its threshold.
@@ -273,6 +480,9 @@ def issue_string_tuple(service_name, limit, crits, warns, colorize=True):
     :param colorize: whether or not to colorize output; passed through to
       :py:func:`~.color_output`.
     :type colorize: bool
+    :param top_k: if not None, only list this many of the highest critical
+      and warning usages; see :py:func:`~.usage_list_str`.
+    :type top_k: ``int`` or ``None``
     :returns: 2-tuple of strings describing crossed thresholds,
       first describing the service and limit name and second listing the
       limit and usage
@@ -281,13 +491,13 @@ def issue_string_tuple(service_name, limit, crits, warns, colorize=True):
     usage_str = ''
     if len(crits) > 0:
         tmp = 'CRITICAL: '
-        tmp += ', '.join([str(x) for x in sorted(crits)])
+        tmp += usage_list_str(crits, top_k=top_k)
         usage_str += color_output(tmp, 'red', colorize=colorize)
     if len(warns) > 0:
         if len(crits) > 0:
             usage_str += ' '
         tmp = 'WARNING: '
-        tmp += ', '.join([str(x) for x in sorted(warns)])
+        tmp += usage_list_str(warns, top_k=top_k)
         usage_str += color_output(tmp, 'yellow', colorize=colorize)
     k = "{s}/{l}".format(
         s=service_name,
@@ -298,3 +508,28 @@ def issue_string_tuple(service_name, limit, crits, warns, colorize=True):
         u=usage_str,
     )
     return k, v
+
+
+def skipped_string_tuple(service_name, limit, colorize=True):
+    """
+    Return a 2-tuple of key (service/limit name)/value strings describing a
+    limit whose usage was not found because an API call was skipped (see
+    :py:meth:`.AwsLimit.get_skipped`), like :py:func:`~.issue_string_tuple`.
+
+    :param service_name: the name of the service
+    :type service_name: str
+    :param limit: the Limit this relates to
+    :type limit: :py:class:`~.AwsLimit` or :py:class:`~.LimitResult`
+    :param colorize: whether or not to colorize output; passed through to
+      :py:func:`~.color_output`.
+    :type colorize: bool
+    :rtype: tuple
+    """
+    k = "{s}/{l}".format(s=service_name, l=limit.name)
+    v = "(limit {v}) {u}".format(
+        v=limit.get_limit(),
+        u=color_output(
+            'SKIPPED: ' + limit.get_skipped(), 'yellow', colorize=colorize
+        )
+    )
+    return k, v
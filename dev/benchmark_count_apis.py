@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# Benchmark API calls used to find usage of count-only limits
+#
+# For each limit whose usage is only a count, makes the API calls that were
+# previously used and the lighter calls now used by the service class,
+# against the account of the current credentials, and compares the number
+# of requests, bytes of response bodies received, time taken and peak
+# memory allocated. Usage: benchmark_count_apis.py [REGION]
+
+import sys
+import time
+import tracemalloc
+
+import boto3
+
+from awslimitchecker.utils import paginate_dict
+from awslimitchecker.services.cloudformation import _CloudformationService
+from awslimitchecker.services.ebs import _EbsService
+from awslimitchecker.services.vpc import _VpcService
+from awslimitchecker.services.elasticbeanstalk import _ElasticBeanstalkService
+from awslimitchecker.services.autoscaling import _AutoscalingService
+
+
+class Counter(object):
+    """Count requests and response bytes of a boto3 client."""
+
+    def __init__(self, client):
+        self.requests = 0
+        self.bytes = 0
+        client.meta.events.register('after-call', self.after_call)
+
+    def after_call(self, http_response=None, **kwargs):
+        self.requests += 1
+        self.bytes += len(http_response.content)
+
+
+def measure(name, api_name, func):
+    client = boto3.client(api_name, region_name=region)
+    counter = Counter(client)
+    tracemalloc.start()
+    start = time.time()
+    count = func(client)
+    duration = time.time() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('  %-8s count=%-6d %4d requests %10d bytes %6.2fs %10d bytes '
+          'peak memory' % (
+              name, count, counter.requests, counter.bytes, duration, peak
+          ))
+    return counter.bytes, duration
+
+
+def service(cls, client):
+    svc = cls(80, 99, {'region_name': region}, None)
+    svc.conn = client
+    svc._current_account_id = account_id
+    return svc
+
+
+def usage(svc, limit_name):
+    return svc.limits[limit_name].get_current_usage()[0].get_value()
+
+
+def stacks_old(client):
+    count = 0
+    for page in client.get_paginator('describe_stacks').paginate():
+        for stk in page['Stacks']:
+            if stk['StackStatus'] != 'DELETE_COMPLETE':
+                count += 1
+    return count
+
+
+def stacks_new(client):
+    svc = service(_CloudformationService, client)
+    svc.find_usage()
+    return usage(svc, 'Stacks')
+
+
+def snapshots_old(client):
+    return len(paginate_dict(
+        client.describe_snapshots,
+        OwnerIds=['self'],
+        alc_marker_path=['NextToken'],
+        alc_data_path=['Snapshots'],
+        alc_marker_param='NextToken'
+    )['Snapshots'])
+
+
+def snapshots_new(client):
+    svc = service(_EbsService, client)
+    svc._find_usage_snapshots()
+    return usage(svc, 'Active snapshots')
+
+
+def enis_old(client):
+    return len(paginate_dict(
+        client.describe_network_interfaces,
+        alc_marker_path=['NextToken'],
+        alc_data_path=['NetworkInterfaces'],
+        alc_marker_param='NextToken',
+        Filters=[{'Name': 'owner-id', 'Values': [account_id]}]
+    )['NetworkInterfaces'])
+
+
+def enis_new(client):
+    svc = service(_VpcService, client)
+    svc._find_usage_network_interfaces()
+    return usage(svc, 'Network interfaces per Region')
+
+
+def app_versions_old(client):
+    client.describe_applications()
+    return len(client.describe_application_versions()['ApplicationVersions'])
+
+
+def app_versions_new(client):
+    svc = service(_ElasticBeanstalkService, client)
+    svc._find_usage_application_versions(svc._find_usage_applications())
+    return usage(svc, 'Application versions')
+
+
+def asgs_old(client):
+    return len(paginate_dict(
+        client.describe_auto_scaling_groups,
+        alc_marker_path=['NextToken'],
+        alc_data_path=['AutoScalingGroups'],
+        alc_marker_param='NextToken'
+    )['AutoScalingGroups']) + len(paginate_dict(
+        client.describe_launch_configurations,
+        alc_marker_path=['NextToken'],
+        alc_data_path=['LaunchConfigurations'],
+        alc_marker_param='NextToken'
+    )['LaunchConfigurations'])
+
+
+def asgs_new(client):
+    svc = service(_AutoscalingService, client)
+    svc.find_usage()
+    return usage(svc, 'Auto Scaling groups') + usage(
+        svc, 'Launch configurations'
+    )
+
+
+CASES = [
+    ('CloudFormation Stacks', 'cloudformation', stacks_old, stacks_new),
+    ('EBS Active snapshots', 'ec2', snapshots_old, snapshots_new),
+    ('VPC Network interfaces per Region', 'ec2', enis_old, enis_new),
+    ('ElasticBeanstalk Application versions (and Applications)',
+     'elasticbeanstalk', app_versions_old, app_versions_new),
+    ('AutoScaling Auto Scaling groups and Launch configurations',
+     'autoscaling', asgs_old, asgs_new),
+]
+
+
+if __name__ == "__main__":
+    region = boto3.session.Session().region_name
+    if len(sys.argv) > 1:
+        region = sys.argv[1]
+    account_id = boto3.client(
+        'sts', region_name=region
+    ).get_caller_identity()['Account']
+    print('Account %s region %s:' % (account_id, region))
+    for title, api_name, old, new in CASES:
+        print(title)
+        old_bytes, old_time = measure('previous', api_name, old)
+        new_bytes, new_time = measure('current', api_name, new)
+        if old_bytes > 0:
+            print('  %.1f%% fewer bytes, %.1f%% less time' % (
+                100.0 * (old_bytes - new_bytes) / old_bytes,
+                100.0 * (old_time - new_time) / old_time
+            ))
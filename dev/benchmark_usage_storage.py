@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# Benchmark memory used to store per-resource usage in AwsLimit
+#
+# Compares AwsLimit's columnar usage storage against the previous
+# representation of one AwsLimitUsage object (with a __dict__) per usage, in
+# a plain list. Usage: benchmark_usage_storage.py [NUM_USAGES]
+
+import sys
+import time
+import tracemalloc
+from unittest.mock import Mock
+
+from awslimitchecker.limit import AwsLimit
+from awslimitchecker.services.base import _AwsService
+
+
+class LegacyUsage(object):
+    """AwsLimitUsage as it was stored before columnar storage."""
+
+    def __init__(self, limit, value, maximum=None, resource_id=None,
+                 aws_type=None):
+        self.limit = limit
+        self.value = value
+        self.maximum = maximum
+        self.resource_id = resource_id
+        self.aws_type = aws_type
+
+
+def resource_ids(count):
+    # built at runtime, like IDs parsed from API responses
+    return ['sg-%017x' % i for i in range(count)]
+
+
+def measure(name, func, count):
+    ids = resource_ids(count)
+    tracemalloc.start()
+    start = time.time()
+    keep = func(ids)
+    duration = time.time() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('%-10s %12d bytes (%6.1f bytes/usage) in %.2fs' % (
+        name, current, current / count, duration
+    ))
+    del keep
+    return current
+
+
+def legacy(ids):
+    lim = AwsLimit('Rules per VPC security group', svc, 60, 80, 99)
+    usage = []
+    for idx, rid in enumerate(ids):
+        usage.append(LegacyUsage(
+            lim, idx % 60, resource_id=rid, aws_type='AWS::EC2::SecurityGroup'
+        ))
+    return lim, usage
+
+
+def columnar(ids):
+    lim = AwsLimit('Rules per VPC security group', svc, 60, 80, 99)
+    for idx, rid in enumerate(ids):
+        lim._add_current_usage(
+            idx % 60, resource_id=rid, aws_type='AWS::EC2::SecurityGroup'
+        )
+    return lim
+
+
+if __name__ == "__main__":
+    count = 500000
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+    svc = Mock(spec_set=_AwsService)
+    print('Storing %d usages (excluding resource ID strings):' % count)
+    before = measure('legacy', legacy, count)
+    after = measure('columnar', columnar, count)
+    print('Saved %d bytes (%.1f%%)' % (
+        before - after, 100.0 * (before - after) / before
+    ))
@@ -86,6 +86,12 @@ setup(
     description='A script and python module to check your AWS service limits and usage, and warn when usage approaches limits.',
     long_description=long_description,
     install_requires=requires,
+    extras_require={
+        # vectorized threshold evaluation; see limit.evaluate_thresholds()
+        'numpy': ['numpy'],
+        # Redis work queues; see distributed.RedisQueue
+        'redis': ['redis']
+    },
     keywords="AWS EC2 Amazon boto boto3 limits cloud",
     classifiers=classifiers
 )